@@ -0,0 +1,148 @@
+"""
+Throughput of the sync vs async database path under many concurrent clients.
+
+Both apps serve ``GET /tickets/{id}`` from the same SQLite file. The sync app
+uses ``def`` handlers with a blocking ``Session`` (FastAPI's threadpool path);
+the async app is the real router stack on ``AsyncSession`` through aiosqlite.
+``--latency-ms`` adds a sleep to every statement, in the thread that runs it,
+to stand in for the network round trip to a real database server.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_async_db --clients 500 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from benchmarks.common import async_sqlite_engine, seed, use_async_engine
+from intelligagent.api import tickets
+from intelligagent.core.cache import cache
+from intelligagent.schemas.ticket import Ticket as TicketSchema
+from intelligagent.services import ticket_service
+
+
+def add_statement_latency(sync_engine, latency: float, is_async: bool) -> None:
+    """Sleep for ``latency`` seconds on every statement the engine executes."""
+    if not latency:
+        return
+
+    def delay(statement: str) -> None:
+        time.sleep(latency)
+
+    @event.listens_for(sync_engine, "connect")
+    def set_trace_callback(dbapi_connection, connection_record):
+        if is_async:
+            # Runs on aiosqlite's connection thread, not the event loop
+            dbapi_connection.run_async(lambda conn: conn.set_trace_callback(delay))
+        else:
+            dbapi_connection.set_trace_callback(delay)
+
+
+def build_sync_app(SyncSessionLocal) -> FastAPI:
+    """Build an app serving the ticket read through sync handlers."""
+    app = FastAPI()
+
+    def get_db():
+        db = SyncSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/tickets/{ticket_id}", response_model=TicketSchema)
+    def read_ticket(ticket_id: int, db: Session = Depends(get_db)):
+        db_ticket = ticket_service.get_ticket(db, ticket_id=ticket_id)
+        if db_ticket is None:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        return db_ticket
+
+    return app
+
+
+def build_async_app(async_engine) -> FastAPI:
+    """Build an app serving the real async ticket router."""
+    app = FastAPI()
+    app.include_router(tickets.router)
+    use_async_engine(app, async_engine)
+    return app
+
+
+async def drive(app: FastAPI, clients: int, requests: int, tickets_count: int) -> float:
+    """Run ``clients`` concurrent clients and return requests per second."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker() -> None:
+            for _ in range(requests):
+                response = await client.get(f"/tickets/{random.randint(1, tickets_count)}")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return clients * requests / elapsed
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        sync_engine = create_engine(
+            f"sqlite:///{db_path}",
+            connect_args={"check_same_thread": False},
+            pool_size=args.pool_size,
+            # Overflow must be unbounded: with any hard cap below the client
+            # count the sync app deadlocks, because sessions that have
+            # finished their handler keep their connection until get_db's
+            # teardown wins a threadpool slot, and every slot is held by a
+            # handler blocked on checkout.
+            max_overflow=-1,
+        )
+        seed(sync_engine, args.users, args.tickets)
+        add_statement_latency(sync_engine, args.latency_ms / 1000, is_async=False)
+
+        async_engine = async_sqlite_engine(db_path, args.pool_size)
+        add_statement_latency(async_engine.sync_engine, args.latency_ms / 1000, is_async=True)
+
+        sync_app = build_sync_app(sessionmaker(autoflush=False, bind=sync_engine))
+        async_app = build_async_app(async_engine)
+        cache.enabled = False  # Compare the database paths, not cache hits
+
+        results = {}
+        for name, app in (("sync", sync_app), ("async", async_app)):
+            await drive(app, min(args.clients, 20), 2, args.tickets)  # warm up pools
+            results[name] = await drive(app, args.clients, args.requests, args.tickets)
+
+        await async_engine.dispose()
+        sync_engine.dispose()
+
+    print(
+        f"clients={args.clients} requests/client={args.requests} "
+        f"pool_size={args.pool_size} latency_ms={args.latency_ms}"
+    )
+    for name, rps in results.items():
+        print(f"{name:>6}: {rps:10.1f} req/s")
+    print(f" ratio: {results['async'] / results['sync']:10.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--tickets", type=int, default=10_000)
+    parser.add_argument("--pool-size", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated per-statement round trip")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
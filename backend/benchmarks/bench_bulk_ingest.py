@@ -0,0 +1,80 @@
+"""
+Ticket ingestion rate: one POST /tickets per ticket vs POST /tickets/bulk.
+
+Both paths go through the real app in-process against a SQLite file via
+aiosqlite. The bulk path streams NDJSON, as the email and chat gateways do.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_bulk_ingest --single 2000 --bulk 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, func, select
+
+from benchmarks.common import async_sqlite_engine, seed, use_async_engine
+from intelligagent.db.models import Ticket
+from main import app
+
+
+def ticket_rows(count: int, users: int):
+    return [
+        {"title": f"Gateway ticket {i}", "description": "Forwarded from email", "requester_id": i % users + 1}
+        for i in range(count)
+    ]
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        seed(sync_engine, args.users, 0)
+        async_engine = async_sqlite_engine(db_path)
+        use_async_engine(app, async_engine)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            start = time.perf_counter()
+            for row in ticket_rows(args.single, args.users):
+                (await client.post("/tickets/", json=row)).raise_for_status()
+            single_rate = args.single / (time.perf_counter() - start)
+
+            body = "".join(json.dumps(row) + "\n" for row in ticket_rows(args.bulk, args.users))
+            start = time.perf_counter()
+            response = await client.post(
+                "/tickets/bulk",
+                params={"batch_size": args.batch_size},
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+            response.raise_for_status()
+            bulk_rate = response.json()["created"] / (time.perf_counter() - start)
+
+        with sync_engine.connect() as conn:
+            total = conn.scalar(select(func.count()).select_from(Ticket))
+        assert total == args.single + args.bulk, total
+        app.dependency_overrides.clear()
+        await async_engine.dispose()
+        sync_engine.dispose()
+
+    print(f"single: {single_rate:10.0f} tickets/s ({args.single} requests)")
+    print(f"  bulk: {bulk_rate:10.0f} tickets/s ({args.bulk} rows, batch_size={args.batch_size})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--single", type=int, default=2_000)
+    parser.add_argument("--bulk", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Cost of dashboard polling with and without conditional GETs.
+
+Each simulated dashboard watches one requester: every round it polls
+``GET /users/{id}``, ``GET /tickets/user/{id}`` and ``GET /tickets/{id}`` for
+one of that user's tickets. Between rounds ``--change-rate`` of the watched
+tickets are edited. The ``full`` client ignores ETags; the ``conditional``
+client sends back the last ETag it saw in If-None-Match. Both run against the
+real routers over one SQLite file, and report throughput and response bytes.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_conditional_get --dashboards 200 --rounds 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, update
+
+from benchmarks.common import SEED_START, async_sqlite_engine, seed, use_async_engine
+from intelligagent.api import tickets, users
+from intelligagent.core.cache import cache
+from intelligagent.db.models import Ticket
+from intelligagent.services.async_ticket_service import ticket_key
+
+
+def build_app(async_engine) -> FastAPI:
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(tickets.router)
+    use_async_engine(app, async_engine)
+    return app
+
+
+def edit_tickets(sync_engine, ticket_ids, round_: int) -> None:
+    """Edit tickets the way agents would, moving updated_at forward."""
+    if not ticket_ids:
+        return
+    with sync_engine.begin() as conn:
+        conn.execute(
+            update(Ticket)
+            .where(Ticket.id.in_(ticket_ids))
+            .values(description=f"edited in round {round_}", updated_at=SEED_START + timedelta(days=365, seconds=round_))
+        )
+
+
+async def poll(app, sync_engine, args, conditional: bool) -> dict:
+    rng = random.Random(3)
+    watched_users = rng.sample(range(1, args.users + 1), args.dashboards)
+    # seed() gives user u the tickets u, u + users, u + 2 * users, ...
+    watched_tickets = [user_id + args.users * rng.randrange(args.tickets // args.users) for user_id in watched_users]
+    etags = {}
+    stats = {"requests": 0, "not_modified": 0, "bytes": 0, "elapsed": 0.0}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def get(url: str) -> None:
+            headers = {"If-None-Match": etags[url]} if conditional and url in etags else {}
+            response = await client.get(url, headers=headers)
+            if response.status_code == 304:
+                stats["not_modified"] += 1
+            else:
+                response.raise_for_status()
+                etags[url] = response.headers["ETag"]
+            stats["requests"] += 1
+            stats["bytes"] += len(response.content)
+
+        async def dashboard(user_id: int, ticket_id: int) -> None:
+            for url in (f"/users/{user_id}", f"/tickets/user/{user_id}", f"/tickets/{ticket_id}"):
+                await get(url)
+
+        for round_ in range(args.rounds + 1):
+            changed = rng.sample(watched_tickets, int(len(watched_tickets) * args.change_rate))
+            edit_tickets(sync_engine, changed, round_)
+            # Edits bypass the API, so drop their cached copies as its writes would
+            await cache.delete(*(ticket_key(ticket_id) for ticket_id in changed))
+            start = time.perf_counter()
+            await asyncio.gather(*(dashboard(u, t) for u, t in zip(watched_users, watched_tickets)))
+            if round_:  # Round 0 only primes the ETags
+                stats["elapsed"] += time.perf_counter() - start
+            else:
+                stats = {**stats, "requests": 0, "not_modified": 0, "bytes": 0}
+    return stats
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        seed(sync_engine, args.users, args.tickets)
+        async_engine = async_sqlite_engine(db_path)
+        app = build_app(async_engine)
+        cache.enabled = not args.no_cache
+
+        results = {}
+        for name, conditional in (("full", False), ("conditional", True)):
+            results[name] = await poll(app, sync_engine, args, conditional)
+
+        await async_engine.dispose()
+        sync_engine.dispose()
+
+    print(
+        f"dashboards={args.dashboards} rounds={args.rounds} change_rate={args.change_rate} "
+        f"tickets/user={args.tickets // args.users} cache={'off' if args.no_cache else 'on'}"
+    )
+    for name, stats in results.items():
+        rps = stats["requests"] / stats["elapsed"]
+        print(
+            f"{name:>12}: {rps:8.1f} req/s  {stats['elapsed'] / stats['requests'] * 1000:6.2f} ms/req  "
+            f"{stats['bytes'] / stats['requests']:8.0f} bytes/req  304s={stats['not_modified']}"
+        )
+    full, conditional = results["full"], results["conditional"]
+    print(
+        f"{'saving':>12}: {full['elapsed'] / conditional['elapsed']:.2f}x faster, "
+        f"{full['bytes'] / max(conditional['bytes'], 1):.1f}x fewer bytes"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dashboards", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--change-rate", type=float, default=0.05, help="share of watched tickets edited per round")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--tickets", type=int, default=50_000)
+    parser.add_argument("--no-cache", action="store_true", help="measure the database path only")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
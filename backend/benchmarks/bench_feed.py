@@ -0,0 +1,154 @@
+"""
+Idle stream capacity and fan-out latency of GET /tickets/stream on one worker.
+
+Seeds a small SQLite database, starts ``python main.py`` with one worker and
+the in-process feed, and opens ``--connections`` event streams, each filtered
+to one of the seeded agents in turn. Reports the server's resident memory
+before and after, per connection, then reassigns a ticket to an agent
+``--rounds`` times and reports how long after the write returned the last of
+that agent's streams received the change.
+
+Each side needs a file descriptor per connection; the soft limit is raised
+to the hard one. Run from ``backend/``:
+
+    python -m benchmarks.bench_feed --connections 10000 --rounds 20
+"""
+import argparse
+import asyncio
+import os
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.bench_workers import free_port, wait_ready
+from benchmarks.loadtest.dataset import Dataset, seed_dataset
+
+OPEN_BATCH = 500  # Connections opened at once, below the listen backlog
+
+
+def rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    raise RuntimeError("no VmRSS")
+
+
+async def open_stream(port: int, agent_id: int):
+    """A raw connection subscribed to ``agent_id``'s tickets, read up to ``feed.ready``."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 20)
+    writer.write(
+        f"GET /tickets/stream?assignee_id={agent_id} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n"
+        .encode()
+    )
+    await writer.drain()
+    await reader.readuntil(b"event: feed.ready")
+    return reader, writer
+
+
+async def watch(reader, agent_id: int, arrivals) -> None:
+    """Record when each change reaches this stream."""
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        if line.startswith(b"event: ticket.updated"):
+            arrivals[agent_id].append(time.perf_counter())
+
+
+async def run(args, port: int, server_pid: int, dataset: Dataset) -> None:
+    agents = dataset.agents[:args.agents]
+    before = rss_kib(server_pid)
+    streams, per_agent = [], defaultdict(int)
+    start = time.perf_counter()
+    for offset in range(0, args.connections, OPEN_BATCH):
+        batch = [agents[index % len(agents)] for index in range(offset, min(offset + OPEN_BATCH, args.connections))]
+        opened = await asyncio.gather(*(open_stream(port, agent_id) for agent_id in batch))
+        streams.extend(zip(batch, opened))
+        for agent_id in batch:
+            per_agent[agent_id] += 1
+    opened_in = time.perf_counter() - start
+    await asyncio.sleep(1)
+    after = rss_kib(server_pid)
+    print(f"{len(streams):,} streams open in {opened_in:.1f}s; server RSS {before / 1024:.0f} MiB -> "
+          f"{after / 1024:.0f} MiB, {(after - before) / len(streams):.1f} KiB per stream")
+
+    arrivals = defaultdict(list)
+    watchers = [asyncio.create_task(watch(reader, agent_id, arrivals)) for agent_id, (reader, _) in streams]
+    latencies = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+        for round_number in range(args.rounds):
+            agent_id = agents[round_number % len(agents)]
+            arrivals.clear()
+            response = await client.put(f"/tickets/{round_number + 1}", json={"assignee_id": agent_id})
+            response.raise_for_status()
+            written = time.perf_counter()
+            deadline = written + 30
+            while len(arrivals[agent_id]) < per_agent[agent_id] and time.perf_counter() < deadline:
+                await asyncio.sleep(0.001)
+            if len(arrivals[agent_id]) < per_agent[agent_id]:
+                raise TimeoutError(f"{len(arrivals[agent_id])} of {per_agent[agent_id]} streams got round {round_number}")
+            latencies.append(max(arrivals[agent_id]) - written)
+    latencies.sort()
+    print(f"fan-out to {args.connections // len(agents):,} streams per change: "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms")
+    for task in watchers:
+        task.cancel()
+    for _, (_, writer) in streams:
+        writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--agents", type=int, default=10, help="agents the streams are spread over")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))  # Inherited by the server
+    if hard < args.connections + 100:
+        parser.error(f"{args.connections} connections need a file descriptor limit above {hard}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'feed.db')}"
+        sync_engine = create_engine(database_url)
+        seed_dataset(sync_engine, users=200, tickets=max(args.rounds, 100), comments=0)
+        dataset = Dataset.inspect(sync_engine)
+        sync_engine.dispose()
+
+        port = free_port()
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "CACHE_BACKEND": "memory",
+            "FEED_BACKEND": "memory",
+            "RATE_LIMIT_PER_SECOND": "0",
+            "SLA_ENABLED": "false",
+            "SIMILARITY_INDEX_PATH": os.path.join(tmp, "ticket-index"),
+            "DEBUG": "false",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(port), "--workers", "1"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(server, f"http://127.0.0.1:{port}")
+            asyncio.run(run(args, port, server.pid, dataset))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+
+if __name__ == "__main__":
+    main()
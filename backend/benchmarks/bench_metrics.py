@@ -0,0 +1,190 @@
+"""
+Overhead of the Prometheus instrumentation on the API's request path.
+
+Sends the same mix of reads (``/health``, single tickets and users, list pages
+and a user's tickets) to the real routers with and without instrumentation:
+``MetricsMiddleware``, the query hooks, the pool event listeners and the
+``@count_queries`` service wrappers. Requests go straight through the ASGI
+interface, with no HTTP client or server in front, so the request handling
+itself is the whole baseline and the overhead is not diluted.
+
+Thread hand-offs to the SQLite driver make batches of requests too noisy to
+resolve a couple of percent, so every request is sent to both variants back to
+back, alternating which goes first, and the overhead is the total time of the
+instrumented requests over the total of their plain twins. The cache is off so
+twins do the same work.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_metrics --requests 5000
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+
+from benchmarks.common import async_sqlite_engine, seed, use_async_engine
+from intelligagent.api import comments, tickets, users
+from intelligagent.core import metrics
+from intelligagent.core.cache import cache
+from intelligagent.services import comment_service, ticket_search, ticket_service, user_service
+
+SERVICE_MODULES = (comment_service, ticket_search, ticket_service, user_service)
+MAX_OVERFLOW = 20  # That of async_sqlite_engine's default pool
+
+
+def build_app(async_engine, instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(tickets.router)
+    app.include_router(comments.router)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+    use_async_engine(app, async_engine)
+    return app
+
+
+@contextlib.contextmanager
+def uninstrumented(engine):
+    """Run without query hooks, pool events or service function wrappers."""
+    metrics.uninstall_query_hooks()
+    metrics.uninstrument_engine("bench")
+    swapped = [
+        (module, name, fn)
+        for module in SERVICE_MODULES
+        for name, fn in vars(module).items()
+        if callable(fn) and hasattr(fn, "__wrapped__")
+    ]
+    for module, name, fn in swapped:
+        setattr(module, name, fn.__wrapped__)
+    try:
+        yield
+    finally:
+        for module, name, fn in swapped:
+            setattr(module, name, fn)
+        metrics.instrument_engine(engine, "bench", MAX_OVERFLOW)
+        metrics.install_query_hooks()
+
+
+def request_paths(rng: random.Random, n: int, args) -> list:
+    """``n`` random (path, route) pairs."""
+    paths = []
+    for _ in range(n):
+        user_id = rng.randint(1, args.users)
+        paths.append(rng.choice([
+            ("/health", "/health"),
+            (f"/tickets/{rng.randint(1, args.tickets)}", "/tickets/{ticket_id}"),
+            (f"/users/{user_id}", "/users/{user_id}"),
+            (f"/tickets/user/{user_id}", "/tickets/user/{user_id}"),
+            ("/tickets/?limit=20", "/tickets/"),
+        ]))
+    return paths
+
+
+async def call(app, path: str) -> int:
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def timed_call(app, path: str) -> float:
+    start = time.perf_counter()
+    status = await call(app, path)
+    elapsed = time.perf_counter() - start
+    assert status in (200, 404), path
+    return elapsed
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        seed(sync_engine, args.users, args.tickets)
+        sync_engine.dispose()
+        async_engine = async_sqlite_engine(db_path)
+        metrics.install_query_hooks()
+        metrics.instrument_engine(async_engine.sync_engine, "bench", MAX_OVERFLOW)
+        plain = build_app(async_engine, instrumented=False)
+        instrumented = build_app(async_engine, instrumented=True)
+        cache.enabled = False
+        rng = random.Random(5)
+
+        async def run_plain(path: str) -> float:
+            with uninstrumented(async_engine.sync_engine):
+                return await timed_call(plain, path)
+
+        for path, _ in request_paths(rng, 200, args):  # Warm up connections and code paths
+            await run_plain(path)
+            await timed_call(instrumented, path)
+
+        # (plain, instrumented) seconds per route
+        timings = defaultdict(list)
+        gc.disable()
+        for i, (path, route) in enumerate(request_paths(rng, args.requests, args)):
+            if i % 2:
+                instrumented_time = await timed_call(instrumented, path)
+                plain_time = await run_plain(path)
+            else:
+                plain_time = await run_plain(path)
+                instrumented_time = await timed_call(instrumented, path)
+            timings[route].append((plain_time, instrumented_time))
+            if i % 500 == 499:
+                gc.collect()
+        gc.enable()
+        await async_engine.dispose()
+
+    print(f"requests={args.requests} users={args.users} tickets={args.tickets}")
+    print(f"{'route':>24} {'n':>5} {'plain':>10} {'instrumented':>13} {'added':>9}")
+    pairs = []
+    for route, route_pairs in sorted(timings.items()):
+        pairs += route_pairs
+        plain_us = statistics.median(p for p, _ in route_pairs) * 1e6
+        added_us = statistics.median(i - p for p, i in route_pairs) * 1e6
+        print(f"{route:>24} {len(route_pairs):5d} {plain_us:8.1f}us {plain_us + added_us:11.1f}us {added_us:+7.1f}us")
+    plain_total = sum(p for p, _ in pairs)
+    instrumented_total = sum(i for _, i in pairs)
+    print(
+        f"{'all (mean)':>24} {len(pairs):5d} {plain_total / len(pairs) * 1e6:8.1f}us "
+        f"{instrumented_total / len(pairs) * 1e6:11.1f}us {instrumented_total / plain_total - 1:+8.2%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--tickets", type=int, default=20_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
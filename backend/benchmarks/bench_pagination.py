@@ -0,0 +1,79 @@
+"""
+Cost of deep pages: OFFSET pagination vs keyset cursors.
+
+Seeds a SQLite file, then times fetching page N of the ticket listing with
+``get_tickets`` (OFFSET) and ``get_tickets_page`` (cursor) for increasing N.
+The cursor for page N is built from the last row of page N - 1 up front, as a
+client walking the listing would hold it.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_pagination --tickets 200000 --limit 20
+"""
+import argparse
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import seed, timed
+from intelligagent.db.models import Ticket
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.schemas.ticket import TicketSort
+from intelligagent.services import ticket_service
+from intelligagent.services.pagination import encode_cursor
+
+
+def cursor_for_page(db, page: int, limit: int, sort: TicketSort) -> str:
+    """Cursor positioned after the last row of ``page - 1`` (newest first)."""
+    if page == 1:
+        return None
+    column = getattr(Ticket, sort.value)
+    last = (
+        db.query(Ticket)
+        .order_by(column.desc(), Ticket.id.desc())
+        .offset((page - 1) * limit - 1)
+        .first()
+    )
+    return encode_cursor(sort.value, getattr(last, sort.value), last.id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--tickets", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pages", default="1,100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    pages = [int(p) for p in args.pages.split(",") if (int(p) - 1) * args.limit < args.tickets]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        seed(engine, args.users, args.tickets)
+        SessionLocal = sessionmaker(autoflush=False, bind=engine)
+
+        print(f"tickets={args.tickets} limit={args.limit} (median of {args.repeat}, ms)")
+        print(f"{'page':>8} {'offset':>10} {'cursor':>10}")
+        with SessionLocal() as db:
+            for page in pages:
+                cursor = cursor_for_page(db, page, args.limit, TicketSort.CREATED_AT)
+                offset_ms = timed(
+                    lambda: ticket_service.get_tickets(db, skip=(page - 1) * args.limit, limit=args.limit),
+                    args.repeat,
+                )
+                cursor_ms = timed(
+                    lambda: ticket_service.get_tickets_page(
+                        db, limit=args.limit, cursor=cursor,
+                        sort=TicketSort.CREATED_AT, order=SortOrder.DESC,
+                    ),
+                    args.repeat,
+                )
+                db.expunge_all()
+                print(f"{page:>8} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
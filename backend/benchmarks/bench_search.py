@@ -0,0 +1,103 @@
+"""
+Latency of ranked full-text ticket search.
+
+Seeds a SQLite file with tickets and comments whose words follow a Zipf
+distribution over a 5,000-word vocabulary, so some terms match a large share
+of tickets and others only a handful. Then times ``search_tickets`` over a
+mix of one- and two-word queries on support vocabulary, and reports p50/p99.
+The most frequent filler words (the stop words of real text) are never
+queried.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_search --tickets 500000 --queries 500
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from intelligagent.db.database import Base
+from intelligagent.db.models import Comment, Ticket, User
+from intelligagent.services.ticket_search import search_tickets
+
+SUPPORT_TERMS = [
+    "printer", "offline", "password", "reset", "vpn", "email", "laptop", "screen", "slow",
+    "login", "error", "invoice", "refund", "shipping", "crash", "update", "install", "license",
+    "wifi", "battery", "keyboard", "calendar", "sync", "backup", "permission", "timeout",
+    "certificate", "database", "export", "report", "mobile", "browser", "camera", "audio",
+]
+FILLER_WORDS = 50
+VOCABULARY = (
+    [f"filler{i}" for i in range(FILLER_WORDS)]
+    + SUPPORT_TERMS
+    + [f"term{i}" for i in range(5_000 - FILLER_WORDS - len(SUPPORT_TERMS))]
+)
+# Zipf weights by rank: word i is (i + 1) times rarer than the most common one
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+
+def words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=count))
+
+
+def seed(engine, tickets: int, comments_per_ticket: int, batch_size: int = 20_000) -> None:
+    """Create the schema and insert tickets and comments; triggers fill the index."""
+    rng = random.Random(42)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "bench@example.com", "name": "Bench", "role": "CUSTOMER"}])
+        for start in range(0, tickets, batch_size):
+            stop = min(start + batch_size, tickets)
+            conn.execute(insert(Ticket), [
+                {
+                    "title": words(rng, 4), "description": words(rng, 20),
+                    "status": "OPEN", "priority": "MEDIUM", "requester_id": 1,
+                }
+                for _ in range(start, stop)
+            ])
+            conn.execute(insert(Comment), [
+                {"body": words(rng, 12), "ticket_id": ticket_id, "author_id": 1, "is_internal": False}
+                for ticket_id in range(start + 1, stop + 1)
+                for _ in range(comments_per_ticket)
+            ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickets", type=int, default=200_000)
+    parser.add_argument("--comments-per-ticket", type=int, default=1)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        start = time.perf_counter()
+        seed(engine, args.tickets, args.comments_per_ticket)
+        print(f"seeded {args.tickets} tickets in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(7)
+        queries = [" ".join(rng.sample(SUPPORT_TERMS, rng.choice([1, 2]))) for _ in range(args.queries)]
+        SessionLocal = sessionmaker(autoflush=False, bind=engine)
+        samples = []
+        with SessionLocal() as db:
+            for q in queries:
+                start = time.perf_counter()
+                search_tickets(db, q, args.limit)
+                samples.append((time.perf_counter() - start) * 1000)
+                db.expunge_all()
+        samples.sort()
+        p50 = samples[len(samples) // 2]
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"queries={len(samples)} limit={args.limit} p50={p50:.2f}ms p99={p99:.2f}ms max={samples[-1]:.2f}ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
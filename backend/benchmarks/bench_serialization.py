@@ -0,0 +1,78 @@
+"""
+Serializing a page of tickets: FastAPI's response_model path vs PageSerializer.
+
+The ``response_model`` path is FastAPI's own ``serialize_response`` over ORM
+tickets (validate each into the schema, dump to primitives) followed by
+``JSONResponse.render``. The fast path is ``PageSerializer.dump_json`` over
+Core rows of the same tickets. Both produce the same bytes; this checks that
+and reports the median time of each, with and without the query that loads
+the page.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_serialization --limit 1000
+"""
+import argparse
+import asyncio
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.common import seed, timed
+from intelligagent.api import tickets
+from intelligagent.db.models import Ticket
+from intelligagent.services import ticket_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--limit", type=int, default=1000, help="tickets per page")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    seed(engine, users=100, tickets=args.limit * 2)
+    db = sessionmaker(bind=engine)()
+    route = next(r for r in tickets.router.routes if isinstance(r, APIRoute) and r.name == "read_tickets")
+    serializer = tickets.TICKET_PAGE
+    columns = serializer.columns(Ticket)
+    loop = asyncio.new_event_loop()
+
+    def load_models():
+        return ticket_service.get_tickets_page(db, limit=args.limit)
+
+    def load_rows():
+        return ticket_service.get_tickets_page(db, limit=args.limit, columns=columns)
+
+    def response_model_path(models, next_cursor) -> bytes:
+        content = loop.run_until_complete(serialize_response(
+            field=route.response_field, response_content={"items": models, "next_cursor": next_cursor}
+        ))
+        return JSONResponse(content).body
+
+    models, next_cursor = load_models()
+    rows, _ = load_rows()
+    assert response_model_path(models, next_cursor) == serializer.dump_json(rows, next_cursor)
+
+    serialize_slow = timed(lambda: response_model_path(models, next_cursor), args.repeat)
+    serialize_fast = timed(lambda: serializer.dump_json(rows, next_cursor), args.repeat)
+
+    def slow_total():
+        db.expunge_all()
+        response_model_path(*load_models())
+
+    total_slow = timed(slow_total, args.repeat)
+    total_fast = timed(lambda: serializer.dump_json(*load_rows()), args.repeat)
+
+    print(f"page of {args.limit} tickets, median of {args.repeat}")
+    print(f"{'':>16} {'response_model':>15} {'PageSerializer':>15} {'speedup':>8}")
+    print(f"{'serialize only':>16} {serialize_slow:13.2f}ms {serialize_fast:13.2f}ms {serialize_slow / serialize_fast:7.1f}x")
+    print(f"{'query+serialize':>16} {total_slow:13.2f}ms {total_fast:13.2f}ms {total_slow / total_fast:7.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Latency of similar ticket search over a rebuilt vector index.
+
+Generates ticket texts whose words follow the Zipf distribution of
+``bench_search``, with every 20th ticket a reworded copy of one of a few
+hundred "outage" tickets, rebuilds an index from them in a temporary
+directory, then times top-10 searches for the texts of random tickets and
+single-ticket appends, and reports p50/p99.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_similarity --tickets 3000000 --queries 500
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from benchmarks.bench_search import words
+from intelligagent.services.ticket_similarity import TicketVectorIndex
+
+OUTAGES = 300
+
+
+def ticket_texts(tickets: int, seed: int = 42):
+    """Yield ``(id, text)`` for ``tickets`` synthetic tickets, ids from 1."""
+    rng = random.Random(seed)
+    outages = [words(rng, 24) for _ in range(OUTAGES)]
+    for ticket_id in range(1, tickets + 1):
+        if ticket_id % 20 == 0:
+            text = rng.choice(outages).split()
+            text[rng.randrange(len(text))] = words(rng, 1)  # One word changed
+            yield ticket_id, " ".join(text)
+        else:
+            yield ticket_id, f"{words(rng, 4)}\n{words(rng, 20)}"
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tickets", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--scan-budget", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = TicketVectorIndex(tmp) if args.scan_budget is None else TicketVectorIndex(tmp, scan_budget=args.scan_budget)
+        start = time.perf_counter()
+        index.rebuild(ticket_texts(args.tickets))
+        print(f"rebuild: {args.tickets:,} tickets in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(7)
+        texts = dict(ticket_texts(min(args.tickets, 100_000)))
+        queries = [index.vectorizer.transform(texts[rng.randint(1, len(texts))]) for _ in range(args.queries)]
+        index.search(queries[0])  # Maps and warms the files
+
+        latencies = []
+        for vector in queries:
+            start = time.perf_counter()
+            index.search(vector, limit=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        p50, p99 = percentiles(latencies)
+        print(f"search (top 10, scan budget {index.scan_budget:,}): p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+        appends = []
+        for offset, (_, text) in enumerate(ticket_texts(200, seed=1), start=1):
+            start = time.perf_counter()
+            index.add([(args.tickets + offset, text)])
+            appends.append((time.perf_counter() - start) * 1000)
+        p50, p99 = percentiles(appends)
+        print(f"append: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
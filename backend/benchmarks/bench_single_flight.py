@@ -0,0 +1,86 @@
+"""
+Database queries behind a stampede of identical reads, with and without single-flight.
+
+For each hot read route, ``--clients`` requests for the same URL arrive at
+once on a cold cache, as they do when a popular ticket changes and every
+open dashboard refetches it. Runs the real routers over one SQLite file and
+counts the statements that reach the database, with single-flight disabled
+and enabled, along with the wall time of the burst.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_single_flight --clients 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, event
+
+from benchmarks.common import async_sqlite_engine, seed
+from benchmarks.loadtest.runner import build_app
+from intelligagent.core.cache import InMemoryRedis, cache
+from intelligagent.core.singleflight import flights
+
+ROUTES = ("/tickets/{ticket_id}", "/users/{user_id}", "/tickets/user/{user_id}", "/tickets/?limit=100", "/users/?limit=100")
+
+
+async def stampede(client: httpx.AsyncClient, url: str, clients: int, queries: list) -> dict:
+    cache.reset(remote=InMemoryRedis())
+    flights.reset()
+    before = len(queries)
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(client.get(url) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    for response in responses:
+        response.raise_for_status()
+    if len({response.content for response in responses}) != 1:
+        raise AssertionError(f"{url} answered the same request differently")
+    return {"queries": len(queries) - before, "elapsed": elapsed}
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        seed(sync_engine, args.users, args.tickets)
+        sync_engine.dispose()
+        async_engine = async_sqlite_engine(db_path, pool_size=args.clients)
+        queries = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *_: queries.append(1))
+        app = build_app(async_engine)
+
+        results = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for route in ROUTES:
+                url = route.format(ticket_id=1, user_id=1)
+                await client.get(url)  # Warm the pool and the route's serializers
+                for enabled in (False, True):
+                    flights.enabled = enabled
+                    results[route, enabled] = await stampede(client, url, args.clients, queries)
+        await async_engine.dispose()
+
+    print(f"clients={args.clients} tickets={args.tickets} users={args.users}, cold cache per burst")
+    print(f"{'route':>26}  {'queries off':>11} {'queries on':>10}  {'ms off':>8} {'ms on':>8}")
+    for route in ROUTES:
+        off, on = results[route, False], results[route, True]
+        print(
+            f"{route:>26}  {off['queries']:>11} {on['queries']:>10}  "
+            f"{off['elapsed'] * 1000:8.1f} {on['elapsed'] * 1000:8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=200, help="identical requests per burst")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--tickets", type=int, default=50_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
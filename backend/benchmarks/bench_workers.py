@@ -0,0 +1,141 @@
+"""
+Cold start and throughput of ``python main.py`` across worker counts.
+
+Seeds a load-test database (SQLite unless ``--database-url``), then for each
+worker count starts the server, times how long it takes to answer its first
+ticket read (workers warm up before they accept connections, so this includes
+the warm-up), and drives a read-only scenario mix from several client
+processes for ``--duration`` seconds. Reports requests per second and the
+speedup over the first worker count. Clients share the machine with the
+server; give them cores of their own (``--clients``) or scaling flattens
+early.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_workers --workers 1 2 4 8 16 --duration 15
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.loadtest.dataset import Dataset, seed_dataset
+from benchmarks.loadtest.runner import drive, open_client
+from benchmarks.loadtest.scenarios import Context, select_scenarios
+
+READ_ROUTES = ["GET /tickets/{ticket_id}", "GET /tickets/user/{user_id}", "GET /users/{user_id}"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str, workers: int, port: int, tmp: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "CACHE_BACKEND": "memory",
+        "FEED_BACKEND": "memory",
+        "RATE_LIMIT_PER_SECOND": "0",
+        "SIMILARITY_INDEX_PATH": os.path.join(tmp, f"ticket-index-{workers}"),
+        "DEBUG": "false",
+    }
+    return subprocess.Popen(
+        [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(server: subprocess.Popen, base_url: str, timeout: float = 120.0) -> float:
+    """Seconds from now until the server answers a ticket read."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/tickets/1").status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            time.sleep(0.02)
+    raise TimeoutError(f"server not ready after {timeout:.0f}s")
+
+
+def client_process(base_url: str, dataset: Dataset, routes, concurrency: int, duration: float, seed: int):
+    """Drive the mix from one process; returns (requests, errors, elapsed)."""
+
+    async def go():
+        async with open_client(concurrency, base_url=base_url) as client:
+            return await drive(client, select_scenarios(routes), Context(dataset), concurrency,
+                               duration=duration, seed=seed)
+
+    recording = asyncio.run(go())
+    requests = sum(len(latencies) for latencies in recording.latencies.values())
+    return requests, sum(recording.errors.values()), recording.elapsed
+
+
+def measure(args, database_url: str, dataset: Dataset, workers: int, tmp: str):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    launched = time.perf_counter()
+    server = start_server(database_url, workers, port, tmp)
+    try:
+        wait_ready(server, base_url)
+        cold_start = time.perf_counter() - launched
+        per_client = max(1, args.concurrency // args.clients)
+        jobs = [(base_url, dataset, args.routes, per_client, args.duration, index + 1) for index in range(args.clients)]
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            results = pool.starmap(client_process, jobs)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    requests = sum(result[0] for result in results)
+    errors = sum(result[1] for result in results)
+    elapsed = max(result[2] for result in results)
+    return cold_start, requests / elapsed, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--database-url", help="sync URL of a seeded database; a SQLite file is seeded by default")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--tickets", type=int, default=20_000)
+    parser.add_argument("--comments", type=int, default=20_000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64, help="connections across all client processes")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 4), help="client processes")
+    parser.add_argument("--routes", nargs="*", default=READ_ROUTES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'workers.db')}"
+        sync_engine = create_engine(database_url)
+        if not args.database_url:
+            seed_dataset(sync_engine, args.users, args.tickets, args.comments)
+        dataset = Dataset.inspect(sync_engine)
+        sync_engine.dispose()
+
+        print(f"{'workers':>7} {'cold start':>11} {'req/s':>9} {'speedup':>8} {'errors':>7}")
+        baseline = None
+        for workers in args.workers:
+            cold_start, throughput, errors = measure(args, database_url, dataset, workers, tmp)
+            baseline = baseline or throughput
+            print(f"{workers:>7} {cold_start * 1000:>9.0f}ms {throughput:>9,.0f} {throughput / baseline:>7.2f}x {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from intelligagent.core.cache import InMemoryRedis, cache
+from intelligagent.db.database import Base, get_async_db, get_read_db
+from intelligagent.db.models import Ticket, User
+from intelligagent.services import sla
+
+PRIORITIES = ["LOW", "MEDIUM", "HIGH"]
+SEED_START = datetime(2024, 1, 1)
+
+
+def seed(sync_engine, users: int, tickets: int, batch_size: int = 50_000) -> None:
+    """Create the schema and bulk insert users and tickets.
+
+    Tickets are spread one second apart so timestamp sorts have distinct keys.
+    """
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(
+            User.__table__.insert(),
+            [{"email": f"user{i}@example.com", "name": f"User {i}", "role": "CUSTOMER"} for i in range(users)],
+        )
+        for start in range(0, tickets, batch_size):
+            conn.execute(
+                Ticket.__table__.insert(),
+                [
+                    {
+                        "title": f"Ticket {i}",
+                        "description": "Benchmark ticket",
+                        "status": "OPEN",
+                        "priority": PRIORITIES[i % 3],
+                        "requester_id": i % users + 1,
+                        "created_at": SEED_START + timedelta(seconds=i),
+                        "updated_at": SEED_START + timedelta(seconds=i),
+                    }
+                    for i in range(start, min(start + batch_size, tickets))
+                ],
+            )
+
+
+def timed(fn, repeat: int) -> float:
+    """Return the median wall time of ``repeat`` calls to ``fn`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def async_sqlite_engine(db_path: str, pool_size: int = 20):
+    """Pooled aiosqlite engine (aiosqlite defaults to NullPool for files)."""
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=pool_size,
+    )
+
+
+def use_async_engine(app, async_engine) -> None:
+    """Point ``app``'s get_async_db and get_read_db dependencies at ``async_engine``.
+
+    Also swaps the cache's Redis tier for the in-process stand-in so runs
+    don't depend on (or time out against) a Redis server, and loads SLA
+    deadlines from ``async_engine`` on first use.
+    """
+    SessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    sla.tracker = sla.create_tracker(SessionLocal)
+
+    async def override_get_async_db():
+        async with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
+    cache.reset(remote=InMemoryRedis())
@@ -0,0 +1,19 @@
+"""
+Load-testing suite for the ticket and user API.
+
+- ``dataset`` seeds a SQLite file or a Postgres database at a chosen scale,
+  with skewed ownership and activity: a few requesters own many tickets and
+  a few tickets collect most comments.
+- ``scenarios`` describes one weighted request per route of
+  ``api/tickets.py`` and ``api/users.py``, picking hot keys with the same skew.
+- ``runner`` drives the scenarios with concurrent httpx clients, in process
+  over ASGI or against a running server, and records every latency.
+- ``results`` reduces the latencies to throughput and p50/p95/p99 per route,
+  writes them as JSON and diffs two result files for regressions.
+
+Run from ``backend/``:
+
+    python -m benchmarks.loadtest seed --db load.db --users 100000 --tickets 5000000 --comments 20000000
+    python -m benchmarks.loadtest run --db load.db --concurrency 32 --duration 60 --output before.json
+    python -m benchmarks.loadtest compare before.json after.json
+"""
@@ -0,0 +1,150 @@
+"""
+Command line for the load-testing suite; see ``benchmarks/loadtest/__init__.py``.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine
+
+from benchmarks.loadtest.dataset import Dataset, seed_dataset
+from benchmarks.loadtest.results import compare, format_summary, load_results, summarize, write_results
+from benchmarks.loadtest.runner import build_app, create_load_engine, drive, open_client
+from benchmarks.loadtest.scenarios import Context, select_scenarios
+from intelligagent.core.cache import cache
+
+
+def database_url(args) -> str:
+    return args.database_url or f"sqlite:///{args.db}"
+
+
+def print_progress(table: str, done: int, total: int) -> None:
+    print(f"\r{table}: {done:,}/{total:,}", end="\n" if done == total else "", file=sys.stderr, flush=True)
+
+
+def seed_command(args) -> None:
+    engine = create_engine(database_url(args))
+    start = time.perf_counter()
+    seed_dataset(engine, args.users, args.tickets, args.comments, skew=args.skew, seed=args.seed,
+                 progress=print_progress)
+    engine.dispose()
+    print(f"seeded {args.users:,} users, {args.tickets:,} tickets, {args.comments:,} comments "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+async def run_load(args, url: str) -> dict:
+    sync_engine = create_engine(url)
+    dataset = Dataset.inspect(sync_engine, skew=args.skew)
+    sync_engine.dispose()
+    scenarios = select_scenarios(args.routes)
+    ctx = Context(dataset)
+
+    async_engine = app = None
+    if not args.base_url:
+        async_engine = create_load_engine(url, pool_size=args.concurrency)
+        app = build_app(async_engine)
+        cache.enabled = not args.no_cache
+    try:
+        async with open_client(args.concurrency, app=app, base_url=args.base_url) as client:
+            if args.warmup:
+                await drive(client, scenarios, ctx, args.concurrency, requests=args.warmup, seed=args.seed + 1)
+            recording = await drive(
+                client, scenarios, ctx, args.concurrency,
+                requests=args.requests, duration=args.duration, seed=args.seed,
+            )
+    finally:
+        if async_engine is not None:
+            await async_engine.dispose()
+
+    return summarize(recording, {
+        "target": args.base_url or "in-process",
+        "database": url.rpartition("@")[2],
+        "dataset": dataset.as_dict(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "duration_s": args.duration,
+        "warmup": args.warmup,
+        "cache": "off" if args.no_cache else "on",
+        "routes": [scenario.name for scenario in scenarios],
+        "seed": args.seed,
+    })
+
+
+def run_command(args) -> None:
+    if args.requests is None and args.duration is None:
+        args.requests = 2_000
+    if args.db or args.database_url:
+        results = asyncio.run(run_load(args, database_url(args)))
+    else:
+        if args.base_url:
+            sys.exit("--base-url needs --db or --database-url pointing at the server's database")
+        with tempfile.TemporaryDirectory() as tmp:
+            args.db = os.path.join(tmp, "loadtest.db")
+            seed_command(args)
+            results = asyncio.run(run_load(args, database_url(args)))
+
+    output = args.output or f"loadtest-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    write_results(results, output)
+    print(format_summary(results))
+    print(f"results written to {output}")
+
+
+def compare_command(args) -> None:
+    table, regressed = compare(load_results(args.before), load_results(args.after), threshold=args.threshold)
+    print(table)
+    if regressed:
+        sys.exit(f"{len(regressed)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressed)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description="Load-test the ticket and user API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_database_options(command, required_help: str) -> None:
+        target = command.add_mutually_exclusive_group()
+        target.add_argument("--db", help=f"SQLite file {required_help}")
+        target.add_argument("--database-url", help="sync SQLAlchemy URL of a Postgres (or other) database")
+        command.add_argument("--skew", type=float, default=3.0, help="popularity exponent; 1 is uniform")
+        command.add_argument("--seed", type=int, default=1, help="RNG seed for data and request mix")
+
+    def add_scale_options(command) -> None:
+        command.add_argument("--users", type=int, default=1_000)
+        command.add_argument("--tickets", type=int, default=20_000)
+        command.add_argument("--comments", type=int, default=60_000)
+
+    seed = commands.add_parser("seed", help="create and fill a load-test database")
+    add_database_options(seed, "to create")
+    add_scale_options(seed)
+    seed.set_defaults(handler=seed_command)
+
+    run = commands.add_parser("run", help="drive every route and write a JSON result file")
+    add_database_options(run, "seeded earlier; without it a temporary one is seeded at the given scale")
+    add_scale_options(run)
+    run.add_argument("--base-url", help="load a running server instead of the in-process app")
+    run.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    run.add_argument("--requests", type=int, help="requests to send (default 2000 unless --duration)")
+    run.add_argument("--duration", type=float, help="seconds to run for instead of a request count")
+    run.add_argument("--warmup", type=int, default=200, help="unrecorded requests sent first")
+    run.add_argument("--routes", nargs="*", default=[], help="only scenarios whose name contains one of these")
+    run.add_argument("--no-cache", action="store_true", help="disable the in-process app's cache")
+    run.add_argument("--output", help="result file (default loadtest-<timestamp>.json)")
+    run.set_defaults(handler=run_command)
+
+    diff = commands.add_parser("compare", help="diff two result files; exits 1 on regressions")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    diff.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as a regression")
+    diff.set_defaults(handler=compare_command)
+
+    args = parser.parse_args()
+    if args.command == "seed" and not (args.db or args.database_url):
+        parser.error("seed needs --db or --database-url")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
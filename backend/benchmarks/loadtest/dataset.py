@@ -0,0 +1,185 @@
+"""
+Seeding a load-test database and describing what is in it.
+
+Activity is skewed the way a support desk's is: ``skew`` is the exponent
+applied to a uniform draw before it is scaled to a rank, so with the default
+of 3 the top 1% of requesters own about a fifth of the tickets, and the top
+1% of tickets collect about a fifth of the comments. Ranks are scattered over
+the id range so hot rows are not all the oldest ones.
+"""
+import math
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+from sqlalchemy import delete, func, select
+
+from intelligagent.db.database import Base
+from intelligagent.db.models import Comment, OutboxEvent, Ticket, User, UserRole
+
+SEED_START = datetime(2024, 1, 1)
+SEED_SPAN = timedelta(days=365)
+
+# Every AGENT_EVERY-th user is an agent; the rest are customers
+AGENT_EVERY = 50
+
+# Titles, descriptions and comments draw on a small vocabulary so searches hit
+VOCABULARY = (
+    "login", "password", "reset", "invoice", "refund", "billing", "export", "report", "dashboard", "timeout",
+    "error", "crash", "upload", "download", "email", "notification", "sync", "mobile", "browser", "permission",
+    "account", "subscription", "payment", "shipping", "order", "api", "webhook", "integration", "slow", "outage",
+)
+# In-progress tickets are capped per agent below the dispatch cap so agents can still claim work
+STATUS_MIX = ("OPEN",) * 4 + ("IN_PROGRESS",) * 2 + ("CLOSED",) * 4
+IN_PROGRESS_PER_AGENT = 2
+PRIORITY_MIX = ("LOW",) * 3 + ("MEDIUM",) * 5 + ("HIGH",) * 2
+
+
+def _stride(n: int) -> int:
+    stride = 1_000_003 % n or 1
+    while math.gcd(stride, n) != 1:
+        stride += 1
+    return stride
+
+
+class SkewedIds:
+    """Draws ids in ``1..n`` with power-law popularity."""
+
+    def __init__(self, n: int, skew: float):
+        self.n = n
+        self.skew = skew
+        self.stride = _stride(n)
+
+    def draw(self, rng: random.Random) -> int:
+        rank = int(self.n * rng.random() ** self.skew)
+        return rank * self.stride % self.n + 1
+
+
+def ticket_created_at(ticket_id: int, tickets: int) -> datetime:
+    """When seeded ticket ``ticket_id`` was opened; one per step across ``SEED_SPAN``, oldest first."""
+    step = max(1, int(SEED_SPAN.total_seconds()) // max(tickets, 1))
+    return SEED_START + timedelta(seconds=(ticket_id - 1) * step)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def _batches(count: int, batch_size: int) -> Iterator[range]:
+    for start in range(0, count, batch_size):
+        yield range(start, min(start + batch_size, count))
+
+
+def seed_dataset(
+    sync_engine, users: int, tickets: int, comments: int, skew: float = 3.0, seed: int = 1,
+    batch_size: int = 20_000, progress=None,
+) -> None:
+    """Create the schema in an empty database and fill it.
+
+    Rows go in with multi-row Core INSERTs in one transaction per batch. The
+    outbox rows the triggers write are deleted at the end, since no relay
+    runs during a load test.
+    """
+    rng = random.Random(seed)
+    Base.metadata.create_all(bind=sync_engine)
+    if sync_engine.dialect.name == "sqlite":
+        with sync_engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    agents = max(1, users // AGENT_EVERY)
+    in_progress = [0] * agents
+    requesters = SkewedIds(users, skew)
+    hot_tickets = SkewedIds(tickets, skew)
+
+    def report(table: str, done: int, total: int) -> None:
+        if progress is not None:
+            progress(table, done, total)
+
+    for rows in _batches(users, batch_size):
+        with sync_engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [
+                {
+                    "email": f"user{i + 1}@example.com",
+                    "name": f"User {i + 1}",
+                    "role": "AGENT" if i % AGENT_EVERY == 0 else "CUSTOMER",
+                    "created_at": SEED_START,
+                    "updated_at": SEED_START,
+                }
+                for i in rows
+            ])
+        report("users", rows.stop, users)
+
+    for rows in _batches(tickets, batch_size):
+        batch = []
+        for i in rows:
+            status = rng.choice(STATUS_MIX)
+            agent = rng.randrange(agents)
+            if status == "IN_PROGRESS":
+                if in_progress[agent] < IN_PROGRESS_PER_AGENT:
+                    in_progress[agent] += 1
+                else:
+                    status = "CLOSED"
+            created_at = ticket_created_at(i + 1, tickets)
+            batch.append({
+                "title": f"{_sentence(rng, 3)} #{i + 1}",
+                "description": _sentence(rng, 12),
+                "status": status,
+                "priority": rng.choice(PRIORITY_MIX),
+                "requester_id": requesters.draw(rng),
+                "assignee_id": None if status == "OPEN" else agent * AGENT_EVERY + 1,
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+        with sync_engine.begin() as conn:
+            conn.execute(Ticket.__table__.insert(), batch)
+        report("tickets", rows.stop, tickets)
+
+    for rows in _batches(comments, batch_size):
+        batch = []
+        for _ in rows:
+            ticket_id = hot_tickets.draw(rng)
+            internal = rng.random() < 0.1
+            batch.append({
+                "body": _sentence(rng, 20),
+                "is_internal": internal,
+                "ticket_id": ticket_id,
+                "author_id": rng.randrange(agents) * AGENT_EVERY + 1 if internal or rng.random() < 0.5
+                else requesters.draw(rng),
+                "created_at": ticket_created_at(ticket_id, tickets) + timedelta(minutes=rng.randrange(1, 10_000)),
+            })
+        with sync_engine.begin() as conn:
+            conn.execute(Comment.__table__.insert(), batch)
+        report("comments", rows.stop, comments)
+
+    with sync_engine.begin() as conn:
+        conn.execute(delete(OutboxEvent))
+    with sync_engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Size of a seeded database, which scenarios draw ids from."""
+
+    users: int
+    tickets: int
+    comments: int
+    agents: List[int]
+    skew: float
+
+    @classmethod
+    def inspect(cls, sync_engine, skew: float = 3.0) -> "Dataset":
+        with sync_engine.connect() as conn:
+            users = conn.scalar(select(func.max(User.id))) or 0
+            tickets = conn.scalar(select(func.max(Ticket.id))) or 0
+            comments = conn.scalar(select(func.max(Comment.id))) or 0
+            agents = list(conn.scalars(select(User.id).where(User.role == UserRole.AGENT).order_by(User.id).limit(1000)))
+        if not users or not tickets or not agents:
+            raise ValueError("database has no seeded users, tickets or agents; run the seed command first")
+        return cls(users=users, tickets=tickets, comments=comments, agents=agents, skew=skew)
+
+    def as_dict(self) -> dict:
+        return {"users": self.users, "tickets": self.tickets, "comments": self.comments, "skew": self.skew}
+
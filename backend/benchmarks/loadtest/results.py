@@ -0,0 +1,124 @@
+"""
+Summarizing a run as JSON and diffing two runs.
+
+A result file holds the run's settings and environment under ``meta`` and,
+per route and for the whole run, the request and error counts, throughput
+and latency percentiles in milliseconds. ``compare`` lines two files up and
+flags routes whose throughput fell or whose p95/p99 grew by more than a
+threshold.
+"""
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import sqlalchemy
+
+from benchmarks.loadtest.runner import Recording
+
+PERCENTILES = (50, 95, 99)
+OVERALL = "all"
+
+
+def percentile(ordered: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending sequence."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize_latencies(latencies: List[float], elapsed: float, errors: int) -> dict:
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(ordered, pct) * 1000, 3)
+    summary["max_ms"] = round(ordered[-1] * 1000, 3) if ordered else 0.0
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def summarize(recording: Recording, settings: dict) -> dict:
+    """The JSON document for one run; ``settings`` are the run's options and dataset."""
+    routes = {}
+    for name in sorted(recording.latencies):
+        routes[name] = summarize_latencies(recording.latencies[name], recording.elapsed, recording.errors[name])
+        routes[name]["statuses"] = dict(sorted(recording.statuses[name].items()))
+    everything = [latency for latencies in recording.latencies.values() for latency in latencies]
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "elapsed_s": round(recording.elapsed, 3),
+            **settings,
+        },
+        OVERALL: summarize_latencies(everything, recording.elapsed, sum(recording.errors.values())),
+        "routes": routes,
+    }
+
+
+def write_results(results: dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _rows(results: dict) -> Dict[str, dict]:
+    return {**results["routes"], OVERALL: results[OVERALL]}
+
+
+def format_summary(results: dict) -> str:
+    lines = [f"{'route':<32} {'requests':>8} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for name, row in _rows(results).items():
+        lines.append(
+            f"{name:<32} {row['requests']:8d} {row['errors']:6d} {row['throughput_rps']:9.1f} "
+            f"{row['p50_ms']:9.2f} {row['p95_ms']:9.2f} {row['p99_ms']:9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def _change(before: float, after: float) -> float:
+    return after / before - 1 if before else 0.0
+
+
+def compare(before: dict, after: dict, threshold: float = 0.1) -> Tuple[str, List[str]]:
+    """A table of changes per route, and the routes that regressed by more than ``threshold``.
+
+    Routes present in only one of the runs are listed but never flagged.
+    """
+    before_rows, after_rows = _rows(before), _rows(after)
+    lines = [f"{'route':<32} {'req/s':>16} {'p50':>16} {'p95':>16} {'p99':>16}"]
+    regressed = []
+    for name in [*sorted((set(before_rows) | set(after_rows)) - {OVERALL}), OVERALL]:
+        old, new = before_rows.get(name), after_rows.get(name)
+        if old is None or new is None:
+            lines.append(f"{name:<32} only in {'after' if old is None else 'before'}")
+            continue
+        changes = {key: _change(old[key], new[key]) for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")}
+        worse = changes["throughput_rps"] < -threshold or max(changes["p95_ms"], changes["p99_ms"]) > threshold
+        if worse:
+            regressed.append(name)
+        cells = " ".join(f"{new[key]:9.2f} {change:+6.1%}" for key, change in changes.items())
+        lines.append(f"{name:<32} {cells}{'  REGRESSED' if worse else ''}")
+    return "\n".join(lines), regressed
@@ -0,0 +1,119 @@
+"""
+Driving the scenarios with concurrent clients.
+
+``concurrency`` workers share one httpx client and each loops: pick a
+scenario by weight, send it, record its latency and status. A run stops
+after ``requests`` requests or ``duration`` seconds, whichever is set.
+Each worker has its own seeded RNG, so two runs send the same mix.
+"""
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from benchmarks.common import use_async_engine
+from benchmarks.loadtest.scenarios import Context, Scenario
+from intelligagent.api import tickets, users
+from intelligagent.db.database import enable_sqlite_foreign_keys, get_async_database_url
+
+
+class Recording:
+    """Latencies in seconds and statuses per scenario, plus the run's wall time."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.elapsed = 0.0
+
+    def record(self, scenario: Scenario, latency: float, status: Optional[int]) -> None:
+        self.latencies[scenario.name].append(latency)
+        self.statuses[scenario.name][str(status) if status is not None else "exception"] += 1
+        if status not in scenario.ok:
+            self.errors[scenario.name] += 1
+
+
+def build_app(async_engine) -> FastAPI:
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(tickets.router)
+    use_async_engine(app, async_engine)
+    return app
+
+
+def create_load_engine(database_url: str, pool_size: int):
+    """An async engine for ``database_url`` (a sync URL) with a pool for every worker."""
+    async_engine = create_async_engine(
+        get_async_database_url(database_url),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=pool_size,
+    )
+    enable_sqlite_foreign_keys(async_engine.sync_engine)
+    return async_engine
+
+
+@asynccontextmanager
+async def open_client(concurrency: int, app=None, base_url: Optional[str] = None) -> AsyncIterator[httpx.AsyncClient]:
+    """A client calling ``app`` in process, or the server at ``base_url``."""
+    if app is not None:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            yield client
+    else:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+            yield client
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    scenarios: Sequence[Scenario],
+    ctx: Context,
+    concurrency: int,
+    requests: Optional[int] = None,
+    duration: Optional[float] = None,
+    seed: int = 1,
+) -> Recording:
+    """Send the weighted mix of ``scenarios`` from ``concurrency`` workers."""
+    if requests is None and duration is None:
+        raise ValueError("set requests or duration")
+    recording = Recording()
+    weights = [scenario.weight for scenario in scenarios]
+    remaining = requests
+    deadline = None
+
+    async def worker(index: int) -> None:
+        nonlocal remaining
+        rng = random.Random(seed * 1_000 + index)
+        while True:
+            if remaining is not None:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            scenario = rng.choices(scenarios, weights)[0]
+            request = scenario.build(rng, ctx)
+            status = None
+            start = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, **request)
+                status = response.status_code
+            except httpx.HTTPError:
+                pass
+            recording.record(scenario, time.perf_counter() - start, status)
+
+    start = time.perf_counter()
+    if duration is not None:
+        deadline = start + duration
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    recording.elapsed = time.perf_counter() - start
+    return recording
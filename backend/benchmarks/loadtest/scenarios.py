@@ -0,0 +1,183 @@
+"""
+The request mix: one weighted scenario per route of the ticket and user APIs.
+
+Reads dominate, as on a help desk: single tickets and users, a requester's
+tickets and ticket threads make up most of the traffic, and writes are about
+a fifth. Ids are drawn with the dataset's skew, so hot tickets and users are
+requested far more often than the rest.
+"""
+import itertools
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, FrozenSet, List, Sequence
+
+from benchmarks.loadtest.dataset import VOCABULARY, Dataset, SkewedIds, ticket_created_at
+
+
+class Context:
+    """Per-run state scenarios draw from: hot ids and unique names for new rows."""
+
+    def __init__(self, dataset: Dataset):
+        self.dataset = dataset
+        self.users = SkewedIds(dataset.users, dataset.skew)
+        self.tickets = SkewedIds(dataset.tickets, dataset.skew)
+        self.token = uuid.uuid4().hex[:8]
+        self.serial = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One route: how often it is hit, how to build a request and which statuses are successes."""
+
+    name: str  # "METHOD /route/{template}", the key results are reported under
+    weight: int
+    build: Callable[[random.Random, Context], Dict[str, Any]]
+    ok: FrozenSet[int] = frozenset({200})
+
+    @property
+    def method(self) -> str:
+        return self.name.split(" ", 1)[0]
+
+
+def _ticket_body(rng: random.Random, ctx: Context) -> dict:
+    return {
+        "title": f"{' '.join(rng.sample(VOCABULARY, 3))} (load {ctx.token})",
+        "description": " ".join(rng.choices(VOCABULARY, k=12)),
+        "priority": rng.choice(["low", "medium", "medium", "high"]),
+        "requester_id": ctx.users.draw(rng),
+    }
+
+
+def get_ticket(rng, ctx):
+    return {"url": f"/tickets/{ctx.tickets.draw(rng)}"}
+
+
+def get_ticket_detail(rng, ctx):
+    return {"url": f"/tickets/{ctx.tickets.draw(rng)}/full", "params": {"limit": 20}}
+
+
+def get_user_tickets(rng, ctx):
+    return {"url": f"/tickets/user/{ctx.users.draw(rng)}"}
+
+
+def list_tickets(rng, ctx):
+    return {"url": "/tickets/", "params": {"limit": 50, "sort": rng.choice(["created_at", "updated_at", "priority"])}}
+
+
+def search_tickets(rng, ctx):
+    return {"url": "/tickets/search", "params": {"q": " ".join(rng.sample(VOCABULARY, rng.randint(1, 2)))}}
+
+
+def export_tickets(rng, ctx):
+    start = ticket_created_at(ctx.tickets.draw(rng), ctx.dataset.tickets)
+    return {
+        "url": "/tickets/export",
+        "params": {
+            "format": rng.choice(["ndjson", "csv"]),
+            "status": "open",
+            "created_from": start.isoformat(),
+            "created_to": (start + timedelta(days=1)).isoformat(),
+        },
+    }
+
+
+def similar_tickets(rng, ctx):
+    return {"url": f"/tickets/{ctx.tickets.draw(rng)}/similar", "params": {"limit": 10}}
+
+
+def sla_at_risk(rng, ctx):
+    return {"url": "/tickets/sla/at-risk", "params": {"within_minutes": rng.choice([60, 240, 1440])}}
+
+
+def stream_ticket_changes(rng, ctx):
+    # A dashboard subscribing: the stream is cut short so the request completes
+    return {"url": "/tickets/stream", "params": {"assignee_id": rng.choice(ctx.dataset.agents), "max_seconds": 0.05}}
+
+
+def ticket_stats(rng, ctx):
+    return {"url": "/tickets/stats"}
+
+
+def create_ticket(rng, ctx):
+    return {"url": "/tickets/", "json": _ticket_body(rng, ctx)}
+
+
+def create_tickets_bulk(rng, ctx):
+    rows = "\n".join(json.dumps(_ticket_body(rng, ctx)) for _ in range(50))
+    return {"url": "/tickets/bulk", "content": rows, "headers": {"Content-Type": "application/x-ndjson"}}
+
+
+def dispatch_ticket(rng, ctx):
+    return {"url": "/tickets/dispatch/next", "json": {"agent_id": rng.choice(ctx.dataset.agents)}}
+
+
+def update_ticket(rng, ctx):
+    change = rng.choice([
+        {"priority": rng.choice(["low", "medium", "high"])},
+        {"status": "in_progress", "assignee_id": rng.choice(ctx.dataset.agents)},
+        {"status": "closed"},
+        {"description": " ".join(rng.choices(VOCABULARY, k=12))},
+    ])
+    return {"url": f"/tickets/{ctx.tickets.draw(rng)}", "json": change}
+
+
+def update_tickets_bulk(rng, ctx):
+    if rng.random() < 0.5:  # Reassign a batch, as when an agent leaves
+        ids = [ctx.tickets.draw(rng) for _ in range(50)]
+        return {"url": "/tickets/bulk", "json": {"ids": ids, "update": {"assignee_id": rng.choice(ctx.dataset.agents)}}}
+    body = {"filter": {"assignee_id": rng.choice(ctx.dataset.agents), "status": "open"}, "update": {"status": "closed"}}
+    return {"url": "/tickets/bulk", "params": {"dry_run": "true"}, "json": body}
+
+
+def get_user(rng, ctx):
+    return {"url": f"/users/{ctx.users.draw(rng)}"}
+
+
+def list_users(rng, ctx):
+    return {"url": "/users/", "params": {"limit": 50, "sort": rng.choice(["created_at", "email"])}}
+
+
+def create_user(rng, ctx):
+    serial = next(ctx.serial)
+    return {"url": "/users/", "json": {"email": f"load-{ctx.token}-{serial}@example.com", "name": f"Load {serial}"}}
+
+
+def update_user(rng, ctx):
+    return {"url": f"/users/{ctx.users.draw(rng)}", "json": {"name": f"Renamed {next(ctx.serial)}"}}
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("GET /tickets/{ticket_id}", 20, get_ticket),
+    Scenario("GET /tickets/{ticket_id}/full", 10, get_ticket_detail),
+    Scenario("GET /tickets/user/{user_id}", 12, get_user_tickets),
+    Scenario("GET /tickets/", 8, list_tickets),
+    Scenario("GET /tickets/search", 6, search_tickets),
+    Scenario("GET /tickets/export", 1, export_tickets),
+    Scenario("GET /tickets/stats", 2, ticket_stats),
+    Scenario("GET /tickets/{ticket_id}/similar", 3, similar_tickets),
+    Scenario("GET /tickets/sla/at-risk", 2, sla_at_risk),
+    Scenario("GET /tickets/stream", 1, stream_ticket_changes),
+    Scenario("POST /tickets/", 6, create_ticket),
+    Scenario("POST /tickets/bulk", 1, create_tickets_bulk),
+    # 204 when nothing is open, 409 when the agent is at its workload cap
+    Scenario("POST /tickets/dispatch/next", 3, dispatch_ticket, frozenset({200, 204, 409})),
+    Scenario("PUT /tickets/{ticket_id}", 6, update_ticket),
+    Scenario("PATCH /tickets/bulk", 1, update_tickets_bulk),
+    Scenario("GET /users/{user_id}", 15, get_user),
+    Scenario("GET /users/", 5, list_users),
+    Scenario("POST /users/", 2, create_user),
+    Scenario("PUT /users/{user_id}", 5, update_user),
+]
+
+
+def select_scenarios(names: Sequence[str]) -> List[Scenario]:
+    """The scenarios whose name contains any of ``names``; all of them when ``names`` is empty."""
+    if not names:
+        return list(SCENARIOS)
+    chosen = [scenario for scenario in SCENARIOS if any(name in scenario.name for name in names)]
+    if not chosen:
+        raise ValueError(f"no scenario matches {', '.join(names)}")
+    return chosen
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from intelligagent.db.database import get_async_db
+from intelligagent.schemas.comment import Comment, CommentCreate, CommentUpdate, CommentWithAuthor
+from intelligagent.schemas.pagination import Page, SortOrder
+from intelligagent.services import async_comment_service as comment_service
+from intelligagent.services import async_ticket_service as ticket_service
+from intelligagent.services.comment_service import TicketNotFound
+from intelligagent.services.pagination import InvalidCursor
+from intelligagent.services.ticket_service import UserNotFound
+
+router = APIRouter(prefix="/comments", tags=["comments"])
+
+@router.post("/", response_model=Comment)
+async def create_comment(comment: CommentCreate, db: AsyncSession = Depends(get_async_db)):
+    """Add a comment to a ticket."""
+    try:
+        return await comment_service.create_comment(db=db, comment=comment)
+    except (TicketNotFound, UserNotFound) as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+@router.get("/ticket/{ticket_id}", response_model=Page[CommentWithAuthor])
+async def read_ticket_comments(
+    ticket_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order: SortOrder = SortOrder.ASC,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get a page of a ticket's comments with their authors, oldest first by default."""
+    # Verify that the ticket exists
+    db_ticket = await ticket_service.get_ticket(db, ticket_id=ticket_id)
+    if db_ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+
+    try:
+        comments, next_cursor = await comment_service.get_comments_page(
+            db, ticket_id, limit=limit, cursor=cursor, order=order
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"items": comments, "next_cursor": next_cursor}
+
+@router.get("/{comment_id}", response_model=CommentWithAuthor)
+async def read_comment(comment_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get a specific comment by ID."""
+    db_comment = await comment_service.get_comment(db, comment_id=comment_id)
+    if db_comment is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return db_comment
+
+@router.put("/{comment_id}", response_model=Comment)
+async def update_comment(comment_id: int, comment: CommentUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Edit a comment."""
+    db_comment = await comment_service.update_comment(db, comment_id=comment_id, comment_update=comment)
+    if db_comment is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return db_comment
+
+@router.delete("/{comment_id}", status_code=204)
+async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a comment."""
+    if not await comment_service.delete_comment(db, comment_id=comment_id):
+        raise HTTPException(status_code=404, detail="Comment not found")
@@ -0,0 +1,47 @@
+"""
+Conditional GET support for the read endpoints.
+
+ETags are strong and built only from version metadata: an entity's id and
+``updated_at``, or a collection's count and latest ``updated_at``. That lets a
+request carrying ``If-None-Match`` be answered with a 304 from a metadata
+query, or the cached entity, without loading and serializing the resource.
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import Response
+
+
+def _stamp(part) -> str:
+    if isinstance(part, datetime):
+        # Cached and freshly loaded values must hash alike whatever their tzinfo object
+        if part.tzinfo is not None:
+            part = part.astimezone(timezone.utc)
+        return part.isoformat()
+    return str(part)
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag for the version described by ``parts``."""
+    digest = hashlib.blake2b("|".join(_stamp(part) for part in parts).encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag``.
+
+    Uses the weak comparison RFC 9110 prescribes for ``If-None-Match``, so a
+    ``W/`` prefix added by a proxy does not defeat the match.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -1,52 +1,489 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+import json
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+from typing import AsyncIterator, List, Optional, Set, Tuple
 
-from intelligagent.db.database import get_db
-from intelligagent.schemas.ticket import Ticket, TicketCreate, TicketUpdate, TicketWithRequester
-from intelligagent.services import ticket_service, user_service
+from intelligagent.api.conditional import etag_matches, make_etag, not_modified
+from intelligagent.api.responses import PageSerializer
+from intelligagent.core.config import settings
+from intelligagent.core.singleflight import flights, shared_key
+from intelligagent.db.database import get_async_db, get_read_db
+from intelligagent.db.models import SlaKind, Ticket as TicketModel, TicketStatus, TicketPriority, UserRole
+from intelligagent.schemas.pagination import Page, SortOrder
+from intelligagent.schemas.ticket import (
+    Ticket, TicketCreate, TicketUpdate, TicketWithRequester, TicketDetail, TicketDispatch, TicketSort, TicketBulkResult,
+    TicketStats, TicketCreated, SimilarTicket, TicketSlaDeadline, TicketBulkUpdate, TicketBulkUpdateResult,
+)
+from intelligagent.services import async_ticket_service as ticket_service
+from intelligagent.services import async_user_service as user_service
+from intelligagent.services import sla, ticket_feed, ticket_similarity, ticket_triage
+from intelligagent.services.pagination import InvalidCursor
+from intelligagent.services.ticket_export import ExportFormat, MEDIA_TYPES, iter_ticket_export
+from intelligagent.services.ticket_service import UserNotFound, WorkloadCapReached
 
 router = APIRouter(prefix="/tickets", tags=["tickets"])
 
-@router.post("/", response_model=Ticket)
-def create_ticket(ticket: TicketCreate, db: Session = Depends(get_db)):
-    """Create a new ticket."""
-    # Verify that the requester exists
-    db_user = user_service.get_user(db, user_id=ticket.requester_id)
-    if not db_user:
-        raise HTTPException(status_code=404, detail="Requester not found")
-    
-    return ticket_service.create_ticket(db=db, ticket=ticket)
-
-@router.get("/", response_model=List[Ticket])
-def read_tickets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get list of tickets."""
-    tickets = ticket_service.get_tickets(db, skip=skip, limit=limit)
-    return tickets
-
-@router.get("/{ticket_id}", response_model=Ticket)
-def read_ticket(ticket_id: int, db: Session = Depends(get_db)):
-    """Get a specific ticket by ID."""
-    db_ticket = ticket_service.get_ticket(db, ticket_id=ticket_id)
+TICKET_PAGE = PageSerializer(Ticket)
+TICKET_LIST = TypeAdapter(List[Ticket])
+
+@router.post("/", response_model=TicketCreated)
+async def create_ticket(ticket: TicketCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a new ticket; it is triaged in the background when triage is enabled.
+
+    ``similar_tickets`` lists existing tickets similar enough to be likely
+    duplicates of the new one, most similar first.
+    """
+    try:
+        created = await ticket_service.create_ticket(db=db, ticket=ticket)
+    except UserNotFound as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    ticket_triage.submit(created.id, created.title, created.description, created.priority)
+    matches = await asyncio.to_thread(ticket_similarity.check_new_ticket, created.id, created.title, created.description)
+    return TicketCreated(
+        **created.model_dump(), similar_tickets=[{"id": ticket_id, "score": score} for ticket_id, score in matches]
+    )
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'body'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without buffering the whole body."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+async def _iter_bulk_rows(request: Request) -> AsyncIterator[Tuple[int, Optional[TicketCreate], Optional[str]]]:
+    """Yield ``(index, ticket, error)`` for each row of a JSON array or NDJSON body."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        index = 0
+        async for line in _iter_lines(request.stream()):
+            if not line.strip():
+                continue
+            try:
+                yield index, TicketCreate.model_validate_json(line), None
+            except ValidationError as exc:
+                yield index, None, _validation_detail(exc)
+            index += 1
+        return
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of tickets")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of tickets")
+    for index, row in enumerate(rows):
+        try:
+            yield index, TicketCreate.model_validate(row), None
+        except ValidationError as exc:
+            yield index, None, _validation_detail(exc)
+
+@router.post("/bulk", response_model=TicketBulkResult)
+async def create_tickets_bulk(
+    request: Request,
+    batch_size: int = Query(settings.BULK_INSERT_BATCH_SIZE, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Create many tickets from a JSON array or an NDJSON stream.
+
+    Send NDJSON with ``Content-Type: application/x-ndjson``; it is inserted
+    batch by batch as it arrives. Rows that fail validation or reference an
+    unknown requester are reported in ``errors`` and the rest are created.
+    """
+    ids: List[int] = []
+    errors: List[dict] = []
+    known_requesters: Set[int] = set()
+    batch: List[Tuple[int, TicketCreate]] = []
+
+    async def flush():
+        outcomes = await ticket_service.create_tickets_bulk(
+            db, [ticket for _, ticket in batch], known_requesters
+        )
+        created = []
+        for (index, ticket), (ticket_id, error) in zip(batch, outcomes):
+            if error is None:
+                ids.append(ticket_id)
+                created.append((ticket_id, ticket.title, ticket.description))
+                ticket_triage.submit(ticket_id, ticket.title, ticket.description, ticket.priority)
+            else:
+                errors.append({"index": index, "detail": error})
+        await asyncio.to_thread(ticket_similarity.index_tickets, created)
+        batch.clear()
+
+    async for index, ticket, error in _iter_bulk_rows(request):
+        if error is not None:
+            errors.append({"index": index, "detail": error})
+            continue
+        batch.append((index, ticket))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    errors.sort(key=lambda error: error["index"])
+    return {"created": len(ids), "failed": len(errors), "ids": ids, "errors": errors}
+
+@router.patch("/bulk", response_model=TicketBulkUpdateResult)
+async def update_tickets_bulk(
+    bulk: TicketBulkUpdate,
+    dry_run: bool = Query(False),
+    chunk_size: int = Query(settings.BULK_UPDATE_CHUNK_SIZE, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Apply one set of changes to the tickets listed in ``ids`` or to every ticket matching ``filter``.
+
+    Tickets change ``chunk_size`` at a time, one UPDATE ... RETURNING per
+    chunk, each committed on its own. With ``dry_run`` nothing changes and
+    ``matched`` counts the tickets that would.
+    """
+    if (bulk.ids is None) == (bulk.filter is None):
+        raise HTTPException(status_code=400, detail="Give either ids or filter")
+    if bulk.filter is not None and not bulk.filter.dict(exclude_none=True):
+        raise HTTPException(status_code=400, detail="Filter must set at least one criterion")
+    changes = bulk.update.dict(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="Update must set at least one field")
+
+    if dry_run:
+        matched = await ticket_service.count_tickets_matching(db, bulk.ids, bulk.filter, chunk_size)
+        return {"dry_run": True, "matched": matched, "ids": []}
+    try:
+        rows = await ticket_service.update_tickets_bulk(db, bulk.update, bulk.ids, bulk.filter, chunk_size)
+    except UserNotFound as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    if "title" in changes or "description" in changes:
+        await asyncio.to_thread(
+            ticket_similarity.index_tickets, [(row.id, row.title, row.description) for row in rows]
+        )
+    return {"dry_run": False, "matched": len(rows), "ids": [row.id for row in rows]}
+
+@router.post("/dispatch/next", response_model=Ticket, responses={204: {"description": "No open tickets"}})
+async def dispatch_next_ticket(dispatch: TicketDispatch, db: AsyncSession = Depends(get_async_db)):
+    """Claim the highest-priority, oldest open ticket for an agent.
+
+    The ticket moves to in_progress and is assigned to the agent. Agents
+    already holding DISPATCH_MAX_IN_PROGRESS tickets in progress get a 409.
+    """
+    agent = await user_service.get_user(db, user_id=dispatch.agent_id)
+    if agent is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    if agent.role != UserRole.AGENT:
+        raise HTTPException(status_code=403, detail="Only agents can claim tickets")
+
+    try:
+        ticket = await ticket_service.claim_next_ticket(db, agent.id, settings.DISPATCH_MAX_IN_PROGRESS)
+    except WorkloadCapReached as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if ticket is None:
+        return Response(status_code=204)
+    return ticket
+
+@router.get("/", response_model=Page[Ticket])
+async def read_tickets(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: TicketSort = TicketSort.CREATED_AT,
+    order: SortOrder = SortOrder.DESC,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get a page of tickets; pass next_cursor back as cursor for the next page.
+
+    Identical requests made while the page is being read share its query and JSON.
+    """
+    async def load():
+        rows, next_cursor = await ticket_service.get_tickets_page(
+            db, limit=limit, cursor=cursor, sort=sort, order=order, columns=TICKET_PAGE.columns(TicketModel)
+        )
+        return TICKET_PAGE.dump_json(rows, next_cursor)
+    try:
+        body = await flights.do(shared_key(db, "tickets", limit, cursor, sort, order), load)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return Response(body, media_type="application/json")
+
+@router.get("/search", response_model=List[Ticket])
+async def search_tickets(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Search titles, descriptions and comments; best matches first."""
+    return await ticket_service.search_tickets(db, q=q, limit=limit)
+
+@router.get("/export")
+async def export_tickets(
+    format: ExportFormat = ExportFormat.NDJSON,
+    status: Optional[TicketStatus] = None,
+    priority: Optional[TicketPriority] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_comments: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Stream all matching tickets as NDJSON or CSV, oldest first."""
+    # The session stays open until the stream finishes: dependencies with
+    # yield are torn down after the response has been sent
+    chunks = iter_ticket_export(
+        db,
+        export_format=format,
+        include_comments=include_comments,
+        chunk_size=settings.EXPORT_CHUNK_SIZE,
+        status=status,
+        priority=priority,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tickets.{format.value}"'},
+    )
+
+@router.get("/stats", response_model=TicketStats)
+async def read_ticket_stats(db: AsyncSession = Depends(get_read_db)):
+    """Get ticket counts by status, priority and assignee, and open tickets by age.
+
+    Read from counters kept up to date by the ticket writes themselves, so
+    the cost does not grow with the number of tickets.
+    """
+    return await ticket_service.get_ticket_stats(db)
+
+@router.get("/sla/at-risk", response_model=List[TicketSlaDeadline], responses={503: {"description": "Not available yet"}})
+async def read_sla_at_risk(
+    within_minutes: float = Query(settings.SLA_AT_RISK_MINUTES, gt=0, le=7 * 24 * 60),
+    kind: Optional[SlaKind] = None,
+    assignee_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Get the SLA deadlines of unclosed tickets that are breached or due within ``within_minutes``, soonest first.
+
+    Answered from the deadlines tracked in process; the tickets table is not queried.
+    """
+    tracker = sla.tracker
+    if tracker is None:
+        raise HTTPException(status_code=503, detail="SLA tracking is disabled")
+    if not await tracker.ready():
+        raise HTTPException(status_code=503, detail="SLA deadlines are still loading", headers={"Retry-After": "5"})
+    now = tracker.clock()
+    return [
+        TicketSlaDeadline(
+            ticket_id=entry.ticket_id, kind=entry.kind, priority=entry.priority, assignee_id=entry.assignee_id,
+            deadline=entry.deadline, breached=entry.deadline <= now,
+            seconds_left=(entry.deadline - now).total_seconds(),
+        )
+        for entry in tracker.at_risk(timedelta(minutes=within_minutes), kind, assignee_id, limit)
+    ]
+
+def _open_feed(ticket_ids: List[int], requester_ids: List[int], assignee_ids: List[int]) -> ticket_feed.TicketFeed:
+    """The feed a new stream subscribes to; raises HTTPException when it cannot take the stream."""
+    feed = ticket_feed.feed
+    if feed is None:
+        raise HTTPException(status_code=503, detail="The ticket feed is disabled")
+    if len(ticket_ids) + len(requester_ids) + len(assignee_ids) > settings.FEED_MAX_FILTER_IDS:
+        raise HTTPException(status_code=400, detail=f"A stream can filter on at most {settings.FEED_MAX_FILTER_IDS} ids")
+    if feed.full:
+        raise HTTPException(status_code=503, detail="Too many open streams", headers={"Retry-After": "5"})
+    return feed
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}, 503: {"description": "Feed disabled or full"}},
+)
+async def stream_ticket_changes(
+    ticket_id: List[int] = Query([]),
+    requester_id: List[int] = Query([]),
+    assignee_id: List[int] = Query([]),
+    max_seconds: float = Query(settings.FEED_STREAM_MAX_SECONDS, gt=0, le=24 * 60 * 60),
+):
+    """Stream ticket and comment changes as server-sent events once they commit.
+
+    Repeat ``ticket_id``, ``requester_id`` or ``assignee_id`` to get only the
+    changes to tickets matching any of them; a reassignment also reaches the
+    previous assignee. Events are named after their type and carry
+    ``{"type", "ticket_id", "data"}``, ``data`` being the ticket or comment.
+    ``feed.ready`` comes first; ``feed.reset`` means changes were missed and
+    the client should refetch. The stream ends after ``max_seconds`` and
+    EventSource reconnects.
+    """
+    feed = _open_feed(ticket_id, requester_id, assignee_id)
+    events = ticket_feed.iter_sse(
+        feed, ticket_id, requester_id, assignee_id, max_seconds, settings.FEED_KEEPALIVE_INTERVAL
+    )
+    return StreamingResponse(
+        events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _close_on_disconnect(websocket: WebSocket, subscription: ticket_feed.Subscription) -> None:
+    # Clients only listen; anything they send is ignored
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        subscription.close()
+
+@router.websocket("/stream")
+async def stream_ticket_changes_ws(
+    websocket: WebSocket,
+    ticket_id: List[int] = Query([]),
+    requester_id: List[int] = Query([]),
+    assignee_id: List[int] = Query([]),
+):
+    """The WebSocket form of GET /tickets/stream: the same filters, and each event as a JSON text message."""
+    try:
+        feed = _open_feed(ticket_id, requester_id, assignee_id)
+    except HTTPException as exc:
+        await websocket.close(code=1013 if exc.status_code == 503 else 1008, reason=exc.detail)
+        return
+    await websocket.accept()
+    subscription = feed.subscribe(ticket_id, requester_id, assignee_id)
+    watcher = asyncio.create_task(_close_on_disconnect(websocket, subscription))
+    try:
+        ready = ticket_feed.control_event("feed.ready", filters=subscription.filters())
+        await websocket.send_text(ready.message)
+        while events := await subscription.get():
+            for event in events:
+                await websocket.send_text(event.message)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close(code=1012)  # The feed closed: the worker is stopping
+    except (WebSocketDisconnect, OSError):
+        pass
+    finally:
+        watcher.cancel()
+        feed.unsubscribe(subscription)
+
+@router.get("/{ticket_id}", response_model=Ticket, responses={304: {"description": "Not modified"}})
+async def read_ticket(
+    ticket_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get a specific ticket by ID.
+
+    The ETag changes whenever the ticket does; sending it back in
+    If-None-Match gets a 304 decided from the ticket's updated_at alone.
+    """
+    if if_none_match:
+        updated_at = await ticket_service.get_ticket_version(db, ticket_id=ticket_id)
+        if updated_at is not None:
+            etag = make_etag("ticket", ticket_id, updated_at)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+    db_ticket = await ticket_service.get_ticket(db, ticket_id=ticket_id)
     if db_ticket is None:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    response.headers["ETag"] = make_etag("ticket", db_ticket.id, db_ticket.updated_at)
     return db_ticket
 
+@router.get("/{ticket_id}/full", response_model=TicketDetail)
+async def read_ticket_detail(
+    ticket_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get a ticket with requester, assignee and a page of comments with authors.
+
+    ``limit`` and ``cursor`` page through the comment thread, oldest first.
+    """
+    try:
+        detail = await ticket_service.get_ticket_detail(
+            db, ticket_id, comment_limit=limit, comment_cursor=cursor
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return detail
+
+@router.get("/{ticket_id}/similar", response_model=List[SimilarTicket])
+async def read_similar_tickets(
+    ticket_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    min_score: float = Query(settings.SIMILARITY_MIN_SCORE, ge=0, le=1),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get the tickets whose title and description are most similar to a ticket's, most similar first.
+
+    ``score`` is the cosine similarity of the two texts' vectors, from 0 to 1.
+    """
+    if ticket_similarity.index is None:
+        raise HTTPException(status_code=503, detail="Similar ticket search is disabled")
+    db_ticket = await ticket_service.get_ticket(db, ticket_id=ticket_id)
+    if db_ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    matches = await asyncio.to_thread(
+        ticket_similarity.find_similar, db_ticket.id, db_ticket.title, db_ticket.description, limit, min_score
+    )
+    tickets = {
+        similar.id: similar
+        for similar in await ticket_service.get_tickets_by_ids(db, [similar_id for similar_id, _ in matches])
+    }
+    return [
+        SimilarTicket(**Ticket.model_validate(tickets[similar_id]).model_dump(), score=score)
+        for similar_id, score in matches
+        if similar_id in tickets
+    ]
+
 @router.put("/{ticket_id}", response_model=Ticket)
-def update_ticket(ticket_id: int, ticket: TicketUpdate, db: Session = Depends(get_db)):
+async def update_ticket(ticket_id: int, ticket: TicketUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update a ticket."""
-    db_ticket = ticket_service.update_ticket(db, ticket_id=ticket_id, ticket_update=ticket)
+    try:
+        db_ticket = await ticket_service.update_ticket(db, ticket_id=ticket_id, ticket_update=ticket)
+    except UserNotFound as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
     if db_ticket is None:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    if ticket.title is not None or ticket.description is not None:
+        await asyncio.to_thread(
+            ticket_similarity.index_tickets, [(db_ticket.id, db_ticket.title, db_ticket.description)]
+        )
     return db_ticket
 
-@router.get("/user/{user_id}", response_model=List[Ticket])
-def read_tickets_by_user(user_id: int, db: Session = Depends(get_db)):
-    """Get all tickets created by a specific user."""
+@router.get("/user/{user_id}", response_model=List[Ticket], responses={304: {"description": "Not modified"}})
+async def read_tickets_by_user(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get all tickets created by a specific user.
+
+    The ETag covers how many tickets there are and when the latest changed;
+    a matching If-None-Match gets a 304 without loading the list. Identical
+    requests made while the list is being read share its query and JSON.
+    """
     # Verify that the user exists
-    db_user = user_service.get_user(db, user_id=user_id)
+    db_user = await user_service.get_user(db, user_id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    tickets = ticket_service.get_tickets_by_user(db, user_id=user_id)
-    return tickets
+
+    if if_none_match:
+        count, last_updated = await ticket_service.get_tickets_by_user_version(db, user_id=user_id)
+        etag = make_etag("user-tickets", user_id, count, last_updated)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    async def load():
+        tickets = await ticket_service.get_tickets_by_user(db, user_id=user_id)
+        last_updated = max((ticket.updated_at for ticket in tickets), default=None)
+        body = TICKET_LIST.dump_json(TICKET_LIST.validate_python(tickets, from_attributes=True))
+        return body, make_etag("user-tickets", user_id, len(tickets), last_updated)
+    body, etag = await flights.do(shared_key(db, "user-tickets", user_id), load)
+    return Response(body, media_type="application/json", headers={"ETag": etag})
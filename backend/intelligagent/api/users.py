@@ -1,41 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from intelligagent.db.database import get_db
-from intelligagent.schemas.user import User, UserCreate, UserUpdate
-from intelligagent.services import user_service
+from intelligagent.api.conditional import etag_matches, make_etag, not_modified
+from intelligagent.api.responses import PageSerializer
+from intelligagent.core.singleflight import flights, shared_key
+from intelligagent.db.database import get_async_db, get_read_db
+from intelligagent.db.models import User as UserModel
+from intelligagent.schemas.pagination import Page, SortOrder
+from intelligagent.schemas.user import User, UserCreate, UserUpdate, UserSort
+from intelligagent.services import async_user_service as user_service
+from intelligagent.services.pagination import InvalidCursor
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+USER_PAGE = PageSerializer(User)
+
 @router.post("/", response_model=User)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new user."""
     # Check if user with this email already exists
-    db_user = user_service.get_user_by_email(db, email=user.email)
+    db_user = await user_service.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    return user_service.create_user(db=db, user=user)
-
-@router.get("/", response_model=List[User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get list of users."""
-    users = user_service.get_users(db, skip=skip, limit=limit)
-    return users
-
-@router.get("/{user_id}", response_model=User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    """Get a specific user by ID."""
-    db_user = user_service.get_user(db, user_id=user_id)
+    return await user_service.create_user(db=db, user=user)
+
+@router.get("/", response_model=Page[User])
+async def read_users(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: UserSort = UserSort.CREATED_AT,
+    order: SortOrder = SortOrder.DESC,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get a page of users; pass next_cursor back as cursor for the next page.
+
+    Identical requests made while the page is being read share its query and JSON.
+    """
+    async def load():
+        rows, next_cursor = await user_service.get_users_page(
+            db, limit=limit, cursor=cursor, sort=sort, order=order, columns=USER_PAGE.columns(UserModel)
+        )
+        return USER_PAGE.dump_json(rows, next_cursor)
+    try:
+        body = await flights.do(shared_key(db, "users", limit, cursor, sort, order), load)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return Response(body, media_type="application/json")
+
+@router.get("/{user_id}", response_model=User, responses={304: {"description": "Not modified"}})
+async def read_user(
+    user_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get a specific user by ID.
+
+    A matching If-None-Match gets a 304 decided from the user's updated_at alone.
+    """
+    if if_none_match:
+        updated_at = await user_service.get_user_version(db, user_id=user_id)
+        if updated_at is not None:
+            etag = make_etag("user", user_id, updated_at)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+    db_user = await user_service.get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    response.headers["ETag"] = make_etag("user", db_user.id, db_user.updated_at)
     return db_user
 
 @router.put("/{user_id}", response_model=User)
-def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_db)):
+async def update_user(user_id: int, user: UserUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update a user."""
-    db_user = user_service.update_user(db, user_id=user_id, user_update=user)
+    db_user = await user_service.update_user(db, user_id=user_id, user_update=user)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
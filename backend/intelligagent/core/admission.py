@@ -0,0 +1,367 @@
+"""
+Admission control and load shedding for the API.
+
+Under a spike, requests beyond what the database pool can serve only wait
+for connections and push every request's latency up until they all time
+out. ``AdmissionMiddleware`` turns that into fast, explicit rejections:
+
+- Reads and writes each get a ``ConcurrencyLimiter``: a fixed number of
+  requests run at once and the rest wait in a bounded FIFO queue. A request
+  is shed with 503 and ``Retry-After`` when the queue is full, when the wait
+  predicted from recent service times already exceeds the queue SLO, or when
+  it has waited that long without getting a slot.
+- ``RateLimiter`` holds a token bucket per client in Redis, shared by every
+  worker, and answers 429 with ``Retry-After`` once a client's bucket is
+  empty. While Redis is unreachable the buckets are kept per process.
+- Paths in ``exempt`` (``/health``, ``/metrics``) bypass both, so probes and
+  scrapes are answered however loaded the API is.
+- Paths in ``streams`` (``/tickets/stream``) are rate limited but take no
+  slot: a stream holds its connection for as long as the client listens,
+  and would otherwise keep a slot from the requests it saves.
+
+The limiters only ever run on the event loop, so they need no locks.
+"""
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from intelligagent.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Weight of the latest request in the service time average
+SERVICE_TIME_SMOOTHING = 0.1
+
+# Atomically refill a client's bucket for the time since its last request and
+# take a token. Returns the seconds until a token is available, 0 if one was
+# taken; a string, since Redis truncates Lua numbers to integers.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class Shed(Exception):
+    """A request was refused a slot; retry after ``retry_after`` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` requests at once, with up to ``queue_size`` waiting at most ``max_wait`` seconds."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.service_time = 0.0  # Moving average of seconds a request holds its slot
+        self.admitted = 0
+        self.shed: Dict[str, int] = {"queue_full": 0, "deadline": 0, "timeout": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        """Seconds a request joining the queue now is expected to wait.
+
+        With every slot busy, one frees up every ``service_time / limit``
+        seconds on average.
+        """
+        return (len(self._waiters) + 1) * self.service_time / self.limit
+
+    def _shed(self, reason: str) -> Shed:
+        self.shed[reason] += 1
+        return Shed(reason, max(self.expected_wait(), 1.0))
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in line for one if need be; raises ``Shed`` instead of waiting too long."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise self._shed("queue_full")
+        if self.expected_wait() > self.max_wait:
+            raise self._shed("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the wait ran out
+            if not waiter.done() or waiter.cancelled():
+                self._discard(waiter)
+                raise self._shed("timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        self.admitted += 1
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the longest-waiting request if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def observe(self, seconds: float) -> None:
+        """Record how long a request held its slot."""
+        self.service_time += SERVICE_TIME_SMOOTHING * (seconds - self.service_time)
+
+
+class LocalTokenBuckets:
+    """Per-key token buckets in process memory, keeping the ``maxsize`` most recently used keys.
+
+    An evicted key starts again from a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, maxsize: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str) -> float:
+        """Take a token for ``key``; returns 0, or the seconds until a token is available."""
+        now = self._clock()
+        tokens, at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - at) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class RateLimiter:
+    """Token bucket per client: ``rate`` requests a second with bursts of up to ``burst``.
+
+    Buckets live in Redis when ``remote`` is set. After a Redis failure the
+    local buckets are used for ``retry_interval`` seconds before Redis is
+    tried again; each worker then limits on its own, so a client can get up
+    to one full rate per worker until Redis is back.
+    """
+
+    def __init__(
+        self,
+        remote,
+        rate: float,
+        burst: int,
+        namespace: str = "intelligagent:ratelimit",
+        retry_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.remote = remote
+        self.namespace = namespace
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self.local = LocalTokenBuckets(rate, burst, clock=clock)
+        self._remote_down_until = 0.0
+        self.limited = 0
+        self.errors = 0
+
+    @property
+    def remote(self):
+        """The Redis client holding the buckets; ``None`` keeps them in process."""
+        return self._remote
+
+    @remote.setter
+    def remote(self, remote) -> None:
+        self._remote = remote
+        self._script = remote.register_script(TOKEN_BUCKET_SCRIPT) if remote is not None else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    async def take(self, client: str) -> float:
+        """Take a token for ``client``; returns 0, or the seconds until it may retry."""
+        wait = None
+        if self._script is not None and self._clock() >= self._remote_down_until:
+            try:
+                wait = float(await self._script(keys=[f"{self.namespace}:{client}"], args=[self.rate, self.burst]))
+            except (RedisError, OSError) as exc:
+                self.errors += 1
+                self._remote_down_until = self._clock() + self.retry_interval
+                logger.warning("Rate limiting in process for %.0fs; Redis failed: %s", self.retry_interval, exc)
+        if wait is None:
+            wait = self.local.take(client)
+        if wait:
+            self.limited += 1
+        return wait
+
+    def reset(self) -> None:
+        """Empty the local buckets and counters, and try Redis again on the next request."""
+        self._remote_down_until = 0.0
+        self.local.clear()
+        self.limited = 0
+        self.errors = 0
+
+
+class AdmissionController:
+    """The limiters ``AdmissionMiddleware`` applies, and the paths it lets straight through."""
+
+    def __init__(
+        self,
+        reads: ConcurrencyLimiter,
+        writes: ConcurrencyLimiter,
+        rate_limiter: Optional[RateLimiter] = None,
+        exempt: Iterable[str] = ("/health", "/metrics"),
+        trust_forwarded_for: bool = False,
+        streams: Iterable[str] = ("/tickets/stream",),
+    ):
+        self.reads = reads
+        self.writes = writes
+        self.rate_limiter = rate_limiter
+        self.exempt = frozenset(exempt)
+        self.streams = frozenset(streams)
+        self.trust_forwarded_for = trust_forwarded_for
+
+    def limiter(self, method: str) -> ConcurrencyLimiter:
+        return self.reads if method in SAFE_METHODS else self.writes
+
+    def client(self, scope) -> str:
+        """The client's address; the first X-Forwarded-For hop when that header is trusted."""
+        if self.trust_forwarded_for:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an ``AdmissionController`` to HTTP requests.
+
+    A request keeps its slot until its response has been sent, streamed
+    bodies included, since that is as long as it holds a connection.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller
+        if scope["type"] != "http" or scope["path"] in controller.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        rate_limiter = controller.rate_limiter
+        if rate_limiter is not None and rate_limiter.enabled:
+            wait = await rate_limiter.take(controller.client(scope))
+            if wait:
+                await _reject(send, 429, "Rate limit exceeded", wait)
+                return
+        if scope["path"] in controller.streams:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = controller.limiter(scope["method"])
+        try:
+            await limiter.acquire()
+        except Shed as exc:
+            await _reject(send, 503, "Server is overloaded, retry later", exc.retry_after)
+            return
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.observe(time.monotonic() - start)
+            limiter.release()
+
+
+def create_admission() -> AdmissionController:
+    """Build the application's admission controller from settings."""
+    rate_limiter = None
+    if settings.RATE_LIMIT_PER_SECOND > 0:
+        remote = None
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            remote = redis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=settings.CACHE_REDIS_TIMEOUT,
+                socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT,
+            )
+        rate_limiter = RateLimiter(remote, settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+    return AdmissionController(
+        reads=ConcurrencyLimiter(
+            "read", settings.ADMISSION_READ_CONCURRENCY, settings.ADMISSION_READ_QUEUE, settings.ADMISSION_QUEUE_SLO
+        ),
+        writes=ConcurrencyLimiter(
+            "write", settings.ADMISSION_WRITE_CONCURRENCY, settings.ADMISSION_WRITE_QUEUE, settings.ADMISSION_QUEUE_SLO
+        ),
+        rate_limiter=rate_limiter,
+        trust_forwarded_for=settings.RATE_LIMIT_TRUST_FORWARDED_FOR,
+    )
+
+
+# Global admission controller
+admission = create_admission()
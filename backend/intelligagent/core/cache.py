@@ -0,0 +1,355 @@
+"""
+Two-tier read-through cache: a bounded in-process LRU in front of Redis.
+
+Values are pydantic models or plain JSON types. Redis holds their JSON form
+shared by every worker; the local tier holds decoded objects for a short TTL,
+which also bounds how stale another worker's copy can be after a write.
+Redis failures are counted and treated as misses so the database remains the
+source of truth. Concurrent misses for a key share one load through
+``core.singleflight``, loads from the primary and from replicas apart.
+
+Writes win over loads: a load that read the database before a write to its
+key committed must not cache what it read afterwards. Writes and
+invalidations leave a tombstone in the shared tier for ``invalidation_ttl``
+seconds, while loads only fill it where the key is absent (``SET NX``).
+Writers never store their value there: two writers of a key may commit in
+one order and reach Redis in the other, so the shared copy is only ever
+loaded from the database once the tombstone expires. Within a worker, a
+write to a key being loaded keeps that load out of the local tier too.
+Loads from a read replica, which may lag the primary, only fill the local
+tier.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+
+from intelligagent.core.config import settings
+from intelligagent.core.singleflight import flights
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Shared-tier value of an invalidated key; never valid JSON
+TOMBSTONE = b""
+
+
+class CacheStats:
+    """Hit and miss counters for a cache."""
+
+    def __init__(self):
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "hit_ratio": (self.local_hits + self.remote_hits) / lookups if lookups else 0.0,
+        }
+
+
+class LRUCache:
+    """Thread-safe bounded LRU mapping whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class InMemoryRedis:
+    """In-process stand-in for the subset of ``redis.asyncio.Redis`` the cache uses.
+
+    Suitable for tests and single-process development without a Redis server.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        if nx and await self.get(key) is not None:
+            return None
+        if isinstance(value, str):
+            value = value.encode()
+        self._data[key] = (self._clock() + ex if ex else None, value)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction: bool = True) -> "InMemoryPipeline":
+        return InMemoryPipeline(self)
+
+    async def flushdb(self) -> bool:
+        self._data.clear()
+        return True
+
+
+class InMemoryPipeline:
+    """Queues ``set`` calls for ``InMemoryRedis`` like a redis-py pipeline."""
+
+    def __init__(self, redis: InMemoryRedis):
+        self._redis = redis
+        self._commands = []
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> "InMemoryPipeline":
+        self._commands.append((key, value, ex, nx))
+        return self
+
+    async def execute(self) -> list:
+        commands, self._commands = self._commands, []
+        return [await self._redis.set(*command) for command in commands]
+
+    async def __aenter__(self) -> "InMemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._commands = []
+
+
+class TwoTierCache:
+    """Read-through cache with a local LRU tier and a shared Redis tier."""
+
+    def __init__(
+        self,
+        remote,
+        maxsize: int = 10_000,
+        local_ttl: float = 5.0,
+        remote_ttl: int = 300,
+        namespace: str = "intelligagent",
+        enabled: bool = True,
+        invalidation_ttl: int = 10,
+    ):
+        self.remote = remote
+        self.local = LRUCache(maxsize, local_ttl)
+        self.remote_ttl = remote_ttl
+        self.namespace = namespace
+        self.enabled = enabled
+        self.invalidation_ttl = invalidation_ttl
+        self.stats = CacheStats()
+        self._adapters: Dict[Any, TypeAdapter] = {}
+        # Keys being loaded: [loads in flight, writes to the key since the first began]
+        self._loads: Dict[str, List[int]] = {}
+
+    def _adapter(self, schema) -> TypeAdapter:
+        adapter = self._adapters.get(schema)
+        if adapter is None:
+            adapter = self._adapters[schema] = TypeAdapter(schema)
+        return adapter
+
+    def prepare(self, *schemas) -> None:
+        """Build the serializers of ``schemas`` now rather than on their first lookup."""
+        for schema in schemas:
+            self._adapter(schema)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str, schema) -> Any:
+        """Return the cached value for ``key`` as ``schema``, or ``None`` on a miss."""
+        if not self.enabled:
+            return None
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.stats.local_hits += 1
+            return value
+        try:
+            raw = await self.remote.get(self._key(key))
+        except (RedisError, OSError) as exc:
+            self.stats.errors += 1
+            logger.warning("Cache read for %s failed: %s", key, exc)
+            raw = None
+        if not raw:  # Absent, or a tombstone
+            self.stats.misses += 1
+            return None
+        value = self._adapter(schema).validate_json(raw)
+        self.local.set(key, value)
+        self.stats.remote_hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        """Store a freshly committed ``value`` locally, leaving a tombstone in the shared tier."""
+        if not self.enabled:
+            return
+        self.local.set(key, value)
+        self._written(key)
+        self._forget_flights(key)
+        self.stats.sets += 1
+        await self._tombstone(key)
+
+    async def delete(self, *keys: str) -> None:
+        """Drop ``keys`` from both tiers, leaving tombstones in the shared one."""
+        if not self.enabled or not keys:
+            return
+        for key in keys:
+            self.local.delete(key)
+            self._written(key)
+            self._forget_flights(key)
+        self.stats.invalidations += len(keys)
+        await self._tombstone(*keys)
+
+    async def _tombstone(self, *keys: str) -> None:
+        try:
+            async with self.remote.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(self._key(key), TOMBSTONE, ex=self.invalidation_ttl)
+                await pipe.execute()
+        except (RedisError, OSError) as exc:
+            self.stats.errors += 1
+            logger.warning("Cache invalidation for %s failed: %s", keys, exc)
+
+    async def get_or_load(
+        self, key: str, schema, loader: Callable[[], Awaitable[Any]], shared: bool = True, coalesce: bool = True
+    ) -> Any:
+        """Return the cached value, calling ``loader`` and caching its result on a miss.
+
+        ``None`` results are not cached, so a missing row is looked up again next time.
+        Concurrent misses for ``key`` in this worker share one call of ``loader``,
+        unless ``coalesce`` is false. Pass ``shared=False`` when ``loader`` reads
+        a replica: its result then only fills the local tier, and is never
+        shared with loads from the primary.
+        """
+        if self.enabled:
+            value = self.local.get(key, _MISSING)
+            if value is not _MISSING:
+                self.stats.local_hits += 1
+                return value
+        flight = (key, shared) if coalesce else None
+        return await flights.do(flight, lambda: self._read_through(key, schema, loader, shared))
+
+    async def _read_through(self, key: str, schema, loader: Callable[[], Awaitable[Any]], shared: bool) -> Any:
+        value = await self.get(key, schema)
+        if value is not None:
+            return value
+        entry = self._loads.setdefault(key, [0, 0])
+        entry[0] += 1
+        generation = entry[1]
+        try:
+            value = await loader()
+            if value is not None:
+                await self._fill(key, value, schema, shared, generation)
+        finally:
+            entry[0] -= 1
+            if not entry[0]:
+                del self._loads[key]
+        return value
+
+    async def _fill(self, key: str, value: Any, schema, shared: bool, generation: int) -> None:
+        """Cache a loaded value, unless ``key`` was written since its load began."""
+        if not self.enabled:
+            return
+        if shared:
+            try:
+                stored = await self.remote.set(
+                    self._key(key), self._adapter(schema).dump_json(value), ex=self.remote_ttl, nx=True
+                )
+            except (RedisError, OSError) as exc:
+                self.stats.errors += 1
+                logger.warning("Cache write for %s failed: %s", key, exc)
+            else:
+                if not stored:
+                    return  # Written or invalidated meanwhile; what the load read may be older
+        if self._loads[key][1] == generation:
+            self.local.set(key, value)
+            self.stats.sets += 1
+
+    @staticmethod
+    def _forget_flights(key: str) -> None:
+        flights.forget((key, True))
+        flights.forget((key, False))
+
+    def _written(self, key: str) -> None:
+        entry = self._loads.get(key)
+        if entry is not None:
+            entry[1] += 1
+
+    def reset(self, remote=None) -> None:
+        """Clear the local tier and counters, optionally swapping the remote tier."""
+        if remote is not None:
+            self.remote = remote
+        self.local.clear()
+        self._loads.clear()
+        self.stats = CacheStats()
+
+
+def create_cache() -> TwoTierCache:
+    """Build the application cache from settings."""
+    if settings.CACHE_BACKEND == "memory":
+        remote = InMemoryRedis()
+    else:
+        remote = redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT,
+        )
+    return TwoTierCache(
+        remote,
+        maxsize=settings.CACHE_LOCAL_MAXSIZE,
+        local_ttl=settings.CACHE_LOCAL_TTL,
+        remote_ttl=settings.CACHE_TTL,
+        enabled=settings.CACHE_ENABLED,
+        invalidation_ttl=settings.CACHE_INVALIDATION_TTL,
+    )
+
+
+# Global cache instance
+cache = create_cache()
@@ -1,4 +1,5 @@
 import os
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,18 +7,124 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "postgresql://intelligagent:intelligagent123@db:5432/intelligagent"
+    ASYNC_DATABASE_URL: Optional[str] = None  # Derived from DATABASE_URL when unset
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    BULK_INSERT_BATCH_SIZE: int = 1000  # Rows per multi-row INSERT in bulk endpoints
+    BULK_UPDATE_CHUNK_SIZE: int = 500  # Tickets changed per UPDATE ... RETURNING by PATCH /tickets/bulk
+    EXPORT_CHUNK_SIZE: int = 1000  # Rows fetched from the export cursor at a time
     
+    # Read replicas (read-only endpoints use them; with none, everything uses DATABASE_URL)
+    DATABASE_REPLICA_URLS: str = ""  # Comma-separated sync URLs, async drivers derived as for DATABASE_URL
+    REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0  # Seconds between SELECT 1 probes of each replica
+    READ_YOUR_WRITES_WINDOW: float = 5.0  # Seconds a client reads from the primary after a write; 0 disables
+    
+    # Dispatch
+    DISPATCH_MAX_IN_PROGRESS: int = 5  # Tickets an agent may hold in progress at once
+    
+    # Ticket stats (counters kept by triggers; see services/ticket_stats.py)
+    TICKET_STATS_RECONCILE_INTERVAL: float = 3600.0  # Seconds between recounts fixing counter drift
+    
+    # SLAs per priority, in minutes from ticket creation (see services/sla.py); JSON in the environment
+    SLA_ENABLED: bool = True
+    SLA_FIRST_RESPONSE_MINUTES: Dict[str, float] = {"high": 60, "medium": 240, "low": 1440}
+    SLA_RESOLUTION_MINUTES: Dict[str, float] = {"high": 480, "medium": 2880, "low": 10080}
+    SLA_AT_RISK_MINUTES: float = 60.0  # Default window of GET /tickets/sla/at-risk
+    SLA_SYNC_INTERVAL: float = 5.0  # Seconds between reads of tickets changed by other processes
+    SLA_LOAD_PAGE_SIZE: int = 5000  # Unclosed tickets read per query when loading deadlines
+    
+    # Ticket change feed (GET /tickets/stream and its WebSocket; see services/ticket_feed.py)
+    FEED_ENABLED: bool = True
+    FEED_BACKEND: str = "redis"  # "redis" to fan changes out to every worker, or "memory" for one process
+    FEED_CHANNEL: str = "intelligagent:ticket-feed"  # Redis pub/sub channel
+    FEED_BUFFER_SIZE: int = 256  # Undelivered changes a slow subscriber may hold before it is told to refetch
+    FEED_MAX_SUBSCRIBERS: int = 20000  # Open streams per worker; more are refused with 503
+    FEED_MAX_FILTER_IDS: int = 100  # Ids a subscription may filter on, all filters together
+    FEED_KEEPALIVE_INTERVAL: float = 15.0  # Seconds of silence after which a stream sends a comment line
+    FEED_STREAM_MAX_SECONDS: float = 3600.0  # Streams end after this and clients reconnect, rebalancing workers
+
     # Redis
     REDIS_URL: str = "redis://redis:6379"
     
-    # Kafkaexit
+    # Cache (in-process LRU in front of Redis)
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: str = "redis"  # "redis" or "memory" for a single process without Redis
+    CACHE_LOCAL_MAXSIZE: int = 10000
+    CACHE_LOCAL_TTL: float = 5.0  # Seconds; bounds staleness across workers
+    CACHE_TTL: int = 300  # Seconds in Redis
+    CACHE_INVALIDATION_TTL: int = 10  # Seconds an invalidated key refuses fills from loads begun before it
+    CACHE_REDIS_TIMEOUT: float = 0.25
+
+    # Single-flight reads (identical concurrent reads in a worker share one query; see core/singleflight.py)
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_MAX_KEYS: int = 10000  # Reads coalesced at once; more run on their own
+    
+    # Kafka
     KAFKA_BOOTSTRAP_SERVERS: str = "kafka:9092"
     
+    # Outbox relay (publishes ticket and user events written to outbox_events)
+    OUTBOX_BROKER: str = "kafka"  # "kafka", "file" or "memory"
+    OUTBOX_FILE_PATH: str = "outbox-events.bin"  # Where the "file" broker appends batches
+    OUTBOX_TOPIC_PREFIX: str = "intelligagent"  # Events go to "<prefix>.tickets" / "<prefix>.users"
+    OUTBOX_BATCH_SIZE: int = 1000  # Events claimed, published and deleted per round
+    OUTBOX_POLL_INTERVAL: float = 0.5  # Seconds to wait when the outbox is empty
+    OUTBOX_RETRY_MAX_DELAY: float = 30.0  # Backoff cap after broker failures
+    
+    # Admission control (see core/admission.py); together the read and write
+    # limits must not exceed what a worker's pool can hand out (DB_POOL_SIZE +
+    # DB_MAX_OVERFLOW), or admitted requests queue on the pool; serve() checks
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_READ_CONCURRENCY: int = 30  # Reads served at once; the rest queue
+    ADMISSION_WRITE_CONCURRENCY: int = 10  # Writes served at once; the rest queue
+    ADMISSION_READ_QUEUE: int = 200  # Reads waiting beyond this many are shed with 503
+    ADMISSION_WRITE_QUEUE: int = 50
+    ADMISSION_QUEUE_SLO: float = 1.0  # Seconds a request may wait for a slot before it is shed
+    RATE_LIMIT_PER_SECOND: float = 100.0  # Per client, sustained; 0 disables rate limiting
+    RATE_LIMIT_BURST: int = 200  # Requests a client may make at once after being idle
+    RATE_LIMIT_BACKEND: str = "redis"  # "redis" to share buckets between workers, or "memory"
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # Identify clients by X-Forwarded-For (behind a proxy)
+    
+    # Ticket triage (LLM priority, category and draft reply; see services/ticket_triage.py)
+    TRIAGE_ENABLED: bool = False
+    TRIAGE_LLM: str = "groq"  # "groq", or "fake" for the deterministic offline stand-in
+    GROQ_API_KEY: Optional[str] = None
+    TRIAGE_MODEL: str = "llama3-8b-8192"
+    TRIAGE_LLM_BASE_URL: Optional[str] = None  # e.g. a fake_llm server; Groq's API when unset
+    TRIAGE_LLM_TIMEOUT: float = 30.0
+    TRIAGE_BATCH_SIZE: int = 16  # Tickets per LLM request
+    TRIAGE_BATCH_DELAY: float = 0.2  # Seconds to wait for a batch to fill
+    TRIAGE_MAX_CONCURRENCY: int = 4  # LLM requests in flight at once
+    TRIAGE_QUEUE_SIZE: int = 10000  # Tickets waiting beyond this are left for the backfill
+    TRIAGE_CACHE_SIZE: int = 10000  # Earlier answers kept for reuse
+    TRIAGE_CACHE_SIMILARITY: float = 0.9  # Cosine similarity at which an earlier answer is reused
+    
+    # Similar ticket search (vector index; see services/ticket_similarity.py)
+    SIMILARITY_ENABLED: bool = True
+    SIMILARITY_INDEX_PATH: str = "data/ticket-index"  # Directory shared by the workers on a host; data/ is not checked in
+    SIMILARITY_SCAN_BUDGET: int = 10000  # Postings a search may score; bounds its latency
+    SIMILARITY_MIN_SCORE: float = 0.3  # Default cutoff of GET /tickets/{id}/similar
+    SIMILARITY_DUPLICATE_SCORE: float = 0.8  # New tickets this similar to an existing one are flagged
+    SIMILARITY_CHECK_LIMIT: int = 5  # Likely duplicates returned when a ticket is created
+    SIMILARITY_REBUILD_BATCH_SIZE: int = 10000  # Tickets read per query by the rebuild
+    SIMILARITY_REBUILD_INTERVAL: float = 3600.0  # Seconds between rebuilds with --watch; tickets indexed since are held in each worker's memory
+    
+    # Metrics
+    METRICS_ENABLED: bool = True  # Serve /metrics and instrument requests, queries and pools
+    
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     DEBUG: bool = True
     
+    # Serving (`python main.py`). Every worker has its own pool per database, so
+    # API_WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must fit DB_MAX_CONNECTIONS on each replica, and
+    # DB_MAX_CONNECTIONS - DB_JOB_CONNECTIONS on the primary; serve() refuses to start otherwise
+    API_WORKERS: int = 1  # Worker processes
+    DB_MAX_CONNECTIONS: int = 80  # Per database, below Postgres's max_connections of 100 to leave room for migrations
+    DB_JOB_CONNECTIONS: int = 3  # Primary connections of the outbox relay, ticket stats reconciler and similarity index rebuilder
+    API_SHUTDOWN_TIMEOUT: float = 30.0  # Seconds a stopping worker waits for requests in flight
+    DB_PREWARM_CONNECTIONS: int = 4  # Pool connections a worker opens before accepting traffic; 0 skips
+    
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     
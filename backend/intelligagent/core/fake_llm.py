@@ -0,0 +1,114 @@
+"""
+A deterministic stand-in for Groq's chat completions API.
+
+``FakeLLM.app`` answers ``POST /openai/v1/chat/completions`` the way the
+triage prompt asks, classifying each ticket with keyword rules and drafting a
+reply from a template, so ``GroqTriageClient`` itself runs offline: in
+process through ``FakeLLM.client()``, or against a server started with
+``python -m intelligagent.core.fake_llm`` and TRIAGE_LLM_BASE_URL pointed at
+it. Identical requests always get identical answers.
+"""
+import asyncio
+import json
+import time
+from typing import List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+
+from intelligagent.core.text_vectors import normalize_text
+from intelligagent.db.models import TicketCategory, TicketPriority
+
+# First matching rule wins; no match is OTHER
+CATEGORY_KEYWORDS: List[Tuple[TicketCategory, frozenset]] = [
+    (TicketCategory.BILLING, frozenset(
+        "bill billing charge charged invoice payment price refund subscription".split())),
+    (TicketCategory.ACCOUNT, frozenset(
+        "account email locked login password profile sign signin username".split())),
+    (TicketCategory.TECHNICAL, frozenset(
+        "broken bug crash crashes down error errors fail fails failing outage slow timeout".split())),
+    (TicketCategory.FEATURE_REQUEST, frozenset(
+        "add feature idea request suggestion wish would".split())),
+]
+URGENT_WORDS = frozenset("asap breach critical down emergency immediately outage security urgent".split())
+MINOR_WORDS = frozenset("cosmetic minor question typo".split())
+
+REPLIES = {
+    TicketCategory.BILLING: "our billing team is reviewing the charges on your account",
+    TicketCategory.ACCOUNT: "we are looking into your account access",
+    TicketCategory.TECHNICAL: "our engineers are investigating the problem you reported",
+    TicketCategory.FEATURE_REQUEST: "we have passed your suggestion on to our product team",
+    TicketCategory.OTHER: "an agent will follow up with you shortly",
+}
+
+
+def classify(title: str, description: str) -> dict:
+    """The fake model's answer for one ticket."""
+    words = set(normalize_text(f"{title} {description}").split())
+    category = next((category for category, keywords in CATEGORY_KEYWORDS if words & keywords), TicketCategory.OTHER)
+    if words & URGENT_WORDS:
+        priority = TicketPriority.HIGH
+    elif category == TicketCategory.FEATURE_REQUEST or words & MINOR_WORDS:
+        priority = TicketPriority.LOW
+    else:
+        priority = TicketPriority.MEDIUM
+    return {
+        "priority": priority.value,
+        "category": category.value,
+        "suggested_reply": f"Thanks for contacting us about \"{title}\": {REPLIES[category]}.",
+    }
+
+
+class FakeLLM:
+    """The fake API with counters of what it was asked, and an optional delay per request."""
+
+    def __init__(self, latency: float = 0.0, model: str = "fake-triage"):
+        self.latency = latency
+        self.model = model
+        self.requests = 0
+        self.tickets = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = FastAPI()
+        self.app.post("/openai/v1/chat/completions")(self.chat_completions)
+
+    async def chat_completions(self, request: Request) -> dict:
+        body = await request.json()
+        tickets = json.loads(body["messages"][-1]["content"])["tickets"]
+        self.requests += 1
+        self.tickets += len(tickets)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        results = [{"index": ticket["index"], **classify(ticket["title"], ticket["description"])} for ticket in tickets]
+        content = json.dumps({"results": results})
+        return {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", self.model),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def client(self, model: Optional[str] = None):
+        """A ``GroqTriageClient`` calling this app in process."""
+        from intelligagent.core.llm import GroqTriageClient
+
+        http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://fake-llm")
+        return GroqTriageClient("fake-key", model or self.model, base_url="http://fake-llm", http_client=http_client)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(FakeLLM().app, host="127.0.0.1", port=8001)
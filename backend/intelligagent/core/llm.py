@@ -0,0 +1,127 @@
+"""
+LLM clients for ticket triage.
+
+A triage client classifies a whole batch of tickets in one request: for each
+it returns a priority, a category and a draft first reply, or ``None`` when
+the model's answer for that ticket was missing or invalid. Any object with
+``triage`` and ``close`` coroutines like ``GroqTriageClient``'s can stand in.
+
+``GroqTriageClient`` sends the batch as one chat completion through Groq's
+OpenAI-compatible API and asks for a JSON object back. ``fake_llm`` serves
+that API deterministically, so the same client can run offline.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import httpx
+from pydantic import ValidationError
+
+from intelligagent.core.config import settings
+from intelligagent.db.models import TicketCategory, TicketPriority
+from intelligagent.schemas.ticket import TicketTriage
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You triage customer support tickets. The user message is a JSON object whose \"tickets\" list holds "
+    "tickets with an index, title and description. Answer with a JSON object whose \"results\" list has one "
+    "object per ticket with: \"index\" (the ticket's index), \"priority\" (one of "
+    f"{', '.join(priority.value for priority in TicketPriority)}), \"category\" (one of "
+    f"{', '.join(category.value for category in TicketCategory)}) and \"suggested_reply\" (a short, polite "
+    "first reply an agent could send). Answer with the JSON object only."
+)
+
+# Upper bound on completion tokens per ticket in a batch
+MAX_TOKENS_PER_TICKET = 200
+
+
+@dataclass(frozen=True)
+class TriageRequest:
+    """A ticket to triage."""
+
+    ticket_id: int
+    title: str
+    description: Optional[str] = None
+    priority: Optional[TicketPriority] = None  # As created; None leaves the ticket's priority alone
+
+    @property
+    def text(self) -> str:
+        return f"{self.title}\n{self.description or ''}"
+
+
+def build_messages(tickets: Sequence[TriageRequest]) -> List[dict]:
+    batch = [
+        {"index": index, "title": ticket.title, "description": ticket.description or ""}
+        for index, ticket in enumerate(tickets)
+    ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps({"tickets": batch})},
+    ]
+
+
+def parse_results(content: str, count: int) -> List[Optional[TicketTriage]]:
+    """The model's answer for each of ``count`` tickets, ``None`` where it is missing or invalid."""
+    results: List[Optional[TicketTriage]] = [None] * count
+    try:
+        answers = json.loads(content)["results"]
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Triage answer is not the requested JSON object: %.200s", content)
+        return results
+    for answer in answers if isinstance(answers, list) else []:
+        try:
+            index = answer["index"]
+            if isinstance(index, int) and 0 <= index < count:
+                results[index] = TicketTriage.model_validate(answer)
+        except (KeyError, TypeError, ValidationError) as exc:
+            logger.warning("Skipping invalid triage result %.200r: %s", answer, exc)
+    return results
+
+
+class GroqTriageClient:
+    """Triage through Groq chat completions, one request per batch."""
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+    ):
+        from groq import AsyncGroq
+
+        self.model = model
+        self._client = AsyncGroq(
+            api_key=api_key, base_url=base_url, http_client=http_client, timeout=timeout, max_retries=max_retries
+        )
+
+    async def triage(self, tickets: Sequence[TriageRequest]) -> List[Optional[TicketTriage]]:
+        completion = await self._client.chat.completions.create(
+            model=self.model,
+            messages=build_messages(tickets),
+            temperature=0,
+            response_format={"type": "json_object"},
+            max_tokens=MAX_TOKENS_PER_TICKET * len(tickets),
+        )
+        return parse_results(completion.choices[0].message.content or "", len(tickets))
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def create_triage_client():
+    """Build the triage client from settings: Groq, or the in-process fake."""
+    if settings.TRIAGE_LLM == "fake":
+        from intelligagent.core.fake_llm import FakeLLM
+
+        return FakeLLM().client()
+    if settings.TRIAGE_LLM == "groq":
+        return GroqTriageClient(
+            settings.GROQ_API_KEY or "", settings.TRIAGE_MODEL, base_url=settings.TRIAGE_LLM_BASE_URL,
+            timeout=settings.TRIAGE_LLM_TIMEOUT,
+        )
+    raise ValueError(f"Unknown triage LLM {settings.TRIAGE_LLM!r}")
@@ -0,0 +1,399 @@
+"""
+Prometheus metrics for the API, its database engines and the cache.
+
+- ``MetricsMiddleware`` records latency, status and in-flight requests per
+  route, and the SQL statements and database time each request spent.
+- ``install_query_hooks`` times every statement of every engine and charges
+  it to the current request and the current ``@count_queries`` service
+  function, both tracked in context variables.
+- ``instrument_engine`` times how long connections are held out of the pool
+  and counts new ones, through the pool's checkout, checkin and connect
+  events, and reports pool saturation; ``CacheCollector`` reports the cache
+  counters.
+
+Every metric update takes a lock, so the request path is kept to one
+histogram observation, plus two counter increments when the request ran SQL,
+on label children bound once per route (``benchmarks/bench_metrics.py``
+measures the overhead). In-flight requests, pools and the cache are read only
+when ``/metrics`` is scraped.
+
+With several worker processes each keeps its own counters, and a scrape
+reaches one of them. ``use_multiprocess_dir``, called by ``python main.py``
+before it starts the workers, makes prometheus_client write every worker's
+counters and histograms to files that ``create_registry`` sums. The
+scrape-time collectors cannot be summed that way: in-flight requests, pool,
+cache and admission figures are those of the worker that answered.
+"""
+import os
+import tempfile
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label used for requests that matched no route, so bad paths cannot create series
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Status is a label of the histogram, whose _count doubles as the request
+# counter, so a request costs one histogram observation
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to serve a request", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+# Counters rather than histograms, updated only by requests that ran SQL; per
+# request figures are their rate over the rate of requests
+REQUEST_STATEMENTS = Counter("http_request_db_statements", "SQL statements executed by requests", ["method", "route"])
+REQUEST_DB_TIME = Counter("http_request_db_seconds", "Time requests spent executing SQL", ["method", "route"])
+SERVICE_CALLS = Counter("service_calls", "Calls to service functions", ["function"])
+SERVICE_STATEMENTS = Counter("service_db_statements", "SQL statements executed by service functions", ["function"])
+SERVICE_DB_TIME = Counter("service_db_seconds", "Time service functions spent executing SQL", ["function"])
+POOL_HOLD_TIME = Histogram(
+    "db_pool_connection_hold_seconds", "Time a connection was checked out of the pool", ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+POOL_CONNECTS = Counter("db_pool_connects", "Database connections opened by the pool", ["engine"])
+
+
+class QueryStats:
+    """Statements executed and seconds spent executing them."""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Requests being served, by method. Only the event loop updates it, so plain
+# ints do; the gauge is built from it at scrape time
+requests_in_progress: Dict[str, int] = defaultdict(int)
+
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+_service_queries: ContextVar[Optional[QueryStats]] = ContextVar("service_queries", default=None)
+
+
+def _timed_execute(method: str):
+    """A dialect ``do_execute*`` hook running the dialect's own ``method`` under a timer.
+
+    Timing inside the dialect hooks, rather than with before/after cursor
+    events, keeps connections off SQLAlchemy's slower event-dispatching path.
+    """
+
+    def execute(cursor, statement, *args):
+        context = args[-1]
+        if context is None:  # Sequence and default prefetches; let the dialect run them
+            return False
+        start = perf_counter()
+        try:
+            getattr(context.dialect, method)(cursor, statement, *args)
+        finally:
+            elapsed = perf_counter() - start
+            stats = _request_queries.get()
+            if stats is not None:
+                stats.statements += 1
+                stats.seconds += elapsed
+            stats = _service_queries.get()
+            if stats is not None:
+                stats.statements += 1
+                stats.seconds += elapsed
+        return True
+
+    return execute
+
+
+_QUERY_HOOKS = {name: _timed_execute(name) for name in ("do_execute", "do_executemany", "do_execute_no_params")}
+
+
+def install_query_hooks() -> None:
+    """Time the statements of every engine, including ones created later."""
+    for name, hook in _QUERY_HOOKS.items():
+        if not event.contains(Engine, name, hook):
+            event.listen(Engine, name, hook)
+
+
+def uninstall_query_hooks() -> None:
+    for name, hook in _QUERY_HOOKS.items():
+        if event.contains(Engine, name, hook):
+            event.remove(Engine, name, hook)
+
+
+def count_queries(fn: Callable) -> Callable:
+    """Count calls to a sync service function and the SQL they execute.
+
+    Statements are charged to the innermost decorated function, so a service
+    function calling another does not count the inner one's queries twice.
+    """
+    name = f"{fn.__module__.rpartition('.')[2]}.{fn.__name__}"
+    calls = SERVICE_CALLS.labels(name)
+    statements = SERVICE_STATEMENTS.labels(name)
+    seconds = SERVICE_DB_TIME.labels(name)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        stats = QueryStats()
+        token = _service_queries.set(stats)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _service_queries.reset(token)
+            calls.inc()
+            if stats.statements:
+                statements.inc(stats.statements)
+                seconds.inc(stats.seconds)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics.
+
+    The route label is the matched path template, read from the endpoint the
+    router stored in the scope, so ``/tickets/1`` and ``/tickets/2`` share
+    ``/tickets/{ticket_id}``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+        self._latency: Dict[Tuple[str, str, int], Any] = {}
+        self._queries: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        route = self._routes.get(endpoint)
+        if route is None:
+            route = UNMATCHED_ROUTE
+            router = scope.get("router")
+            if endpoint is not None and router is not None:
+                route = next((r.path for r in router.routes if getattr(r, "endpoint", None) is endpoint), route)
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_progress[method] += 1
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            _request_queries.reset(token)
+            requests_in_progress[method] -= 1
+            route = self._route(scope)
+            latency = self._latency.get((method, route, status))
+            if latency is None:
+                latency = self._latency[(method, route, status)] = REQUEST_LATENCY.labels(method, route, status)
+            latency.observe(elapsed)
+            if stats.statements:
+                queries = self._queries.get((method, route))
+                if queries is None:
+                    queries = self._queries[(method, route)] = (
+                        REQUEST_STATEMENTS.labels(method, route),
+                        REQUEST_DB_TIME.labels(method, route),
+                    )
+                queries[0].inc(stats.statements)
+                queries[1].inc(stats.seconds)
+
+
+class InProgressCollector:
+    """Reports ``requests_in_progress`` at scrape time."""
+
+    def collect(self):
+        gauge = GaugeMetricFamily("http_requests_in_progress", "Requests being served", labels=["method"])
+        for method, count in list(requests_in_progress.items()):
+            gauge.add_metric([method], count)
+        yield gauge
+
+
+class PoolCollector:
+    """Reports checked-out connections and saturation of instrumented pools at scrape time."""
+
+    def __init__(self):
+        # name -> (engine, max_overflow it was created with)
+        self.engines: Dict[str, Tuple[Engine, int]] = {}
+
+    def collect(self):
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections checked out of the pool", labels=["engine"])
+        capacity = GaugeMetricFamily(
+            "db_pool_capacity", "Connections the pool may hand out, including overflow", labels=["engine"]
+        )
+        saturation = GaugeMetricFamily(
+            "db_pool_saturation", "Checked-out connections as a share of the pool's capacity", labels=["engine"]
+        )
+        for name, (engine, max_overflow) in self.engines.items():
+            pool = engine.pool
+            if not isinstance(pool, QueuePool):
+                continue
+            # A negative max_overflow means no limit; measure against the base size then
+            limit = pool.size() + max(max_overflow, 0)
+            in_use = pool.checkedout()
+            checked_out.add_metric([name], in_use)
+            capacity.add_metric([name], limit)
+            saturation.add_metric([name], in_use / limit if limit else 0.0)
+        yield checked_out
+        yield capacity
+        yield saturation
+
+
+pool_collector = PoolCollector()
+
+
+def _pool_listeners(name: str) -> Dict[str, Callable]:
+    observe = POOL_HOLD_TIME.labels(name).observe
+    connects = POOL_CONNECTS.labels(name)
+
+    def on_connect(dbapi_connection, connection_record):
+        connects.inc()
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = perf_counter()
+
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            observe(perf_counter() - checked_out_at)
+
+    return {"connect": on_connect, "checkout": on_checkout, "checkin": on_checkin}
+
+
+_instrumented: Dict[str, Tuple[Engine, Dict[str, Callable]]] = {}
+
+
+def instrument_engine(engine: Engine, name: str, max_overflow: int = 10) -> None:
+    """Time connections held out of ``engine``'s pool and report its saturation as ``name``.
+
+    Pool events are kept when ``Engine.dispose`` replaces the pool, and do
+    not move statements onto SQLAlchemy's slower event-dispatching path as
+    connection events would. The pool does not expose its overflow limit,
+    so pass the ``max_overflow`` the engine was created with (10 is
+    ``create_engine``'s default).
+    """
+    uninstrument_engine(name)
+    listeners = _pool_listeners(name)
+    for identifier, listener in listeners.items():
+        event.listen(engine, identifier, listener)
+    _instrumented[name] = (engine, listeners)
+    pool_collector.engines[name] = (engine, max_overflow)
+
+
+def uninstrument_engine(name: str) -> None:
+    """Undo ``instrument_engine`` for ``name``, if it was instrumented."""
+    engine, listeners = _instrumented.pop(name, (None, {}))
+    for identifier, listener in listeners.items():
+        event.remove(engine, identifier, listener)
+    pool_collector.engines.pop(name, None)
+
+
+class CacheCollector:
+    """Reports a ``TwoTierCache``'s counters and hit ratio at scrape time."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def collect(self):
+        stats = self.cache.stats.as_dict()
+        lookups = CounterMetricFamily("cache_lookups", "Cache lookups by outcome", labels=["result"])
+        for result in ("local_hits", "remote_hits", "misses"):
+            lookups.add_metric([result], stats[result])
+        yield lookups
+        yield CounterMetricFamily("cache_errors", "Failed Redis operations", value=stats["errors"])
+        yield CounterMetricFamily("cache_invalidations", "Cache keys invalidated", value=stats["invalidations"])
+        yield GaugeMetricFamily("cache_hit_ratio", "Share of lookups served from either tier", value=stats["hit_ratio"])
+        yield GaugeMetricFamily("cache_local_entries", "Entries in the in-process tier", value=len(self.cache.local))
+
+
+class AdmissionCollector:
+    """Reports an ``AdmissionController``'s slots, queues, shed requests and rate limiting at scrape time."""
+
+    def __init__(self, admission):
+        self.admission = admission
+
+    def collect(self):
+        active = GaugeMetricFamily("admission_active", "Requests holding a slot", labels=["class"])
+        queued = GaugeMetricFamily("admission_queued", "Requests waiting for a slot", labels=["class"])
+        limit = GaugeMetricFamily("admission_limit", "Requests that may hold a slot at once", labels=["class"])
+        service = GaugeMetricFamily(
+            "admission_service_time_seconds", "Moving average of the time a request holds its slot", labels=["class"]
+        )
+        admitted = CounterMetricFamily("admission_admitted", "Requests given a slot", labels=["class"])
+        shed = CounterMetricFamily("admission_shed", "Requests refused with 503", labels=["class", "reason"])
+        for limiter in (self.admission.reads, self.admission.writes):
+            active.add_metric([limiter.name], limiter.active)
+            queued.add_metric([limiter.name], limiter.queued)
+            limit.add_metric([limiter.name], limiter.limit)
+            service.add_metric([limiter.name], limiter.service_time)
+            admitted.add_metric([limiter.name], limiter.admitted)
+            for reason, count in limiter.shed.items():
+                shed.add_metric([limiter.name, reason], count)
+        yield from (active, queued, limit, service, admitted, shed)
+        rate_limiter = self.admission.rate_limiter
+        if rate_limiter is not None:
+            yield CounterMetricFamily("rate_limited", "Requests refused with 429", value=rate_limiter.limited)
+            yield CounterMetricFamily("rate_limit_errors", "Failed Redis rate limit checks", value=rate_limiter.errors)
+
+
+def register_collectors(registry: CollectorRegistry, cache, admission=None) -> None:
+    """Add the scrape-time collectors for in-flight requests, pools, ``cache`` and ``admission``."""
+    registry.register(InProgressCollector())
+    registry.register(pool_collector)
+    registry.register(CacheCollector(cache))
+    if admission is not None:
+        registry.register(AdmissionCollector(admission))
+
+
+# Read by prometheus_client when it is imported, so it must be set before the workers start
+MULTIPROCESS_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def use_multiprocess_dir() -> str:
+    """Have worker processes started after this share their metrics through an emptied directory.
+
+    Uses ``PROMETHEUS_MULTIPROC_DIR`` when set, or a new temporary directory.
+    A directory set in the environment must exist already: this process
+    imported prometheus_client, which writes there from the first counter.
+    """
+    path = os.environ.get(MULTIPROCESS_DIR_ENV) or tempfile.mkdtemp(prefix="intelligagent-metrics-")
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):  # Left by an earlier run, whose counts would be added in
+            os.remove(os.path.join(path, name))
+    os.environ[MULTIPROCESS_DIR_ENV] = path
+    return path
+
+
+def create_registry(cache, admission=None) -> CollectorRegistry:
+    """The registry ``/metrics`` serves, with the scrape-time collectors registered.
+
+    Under ``PROMETHEUS_MULTIPROC_DIR`` it sums the metrics of all workers;
+    otherwise it is the default registry of this process.
+    """
+    if os.environ.get(MULTIPROCESS_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    register_collectors(registry, cache, admission)
+    return registry
@@ -0,0 +1,134 @@
+"""
+Single-flight coalescing of identical concurrent reads within a worker.
+
+When a popular ticket changes, many dashboards re-read it within the same
+few milliseconds. ``SingleFlight.do`` runs the first call for a key (the
+leader) and has every call for that key made while it runs (followers)
+await the leader's result instead of querying again, so a stampede of N
+identical reads costs one query. Results are shared objects: callers must
+not mutate them, which the cached schemas and serialized bodies this is
+used for never are.
+
+A follower gets what a query started before it arrived returns, at most one
+query duration older than a query of its own. Writes ``forget`` the keys
+they change, and ``forget_group`` the lists they may appear in, so reads
+made after a write in this worker never join a flight started before it.
+Reads on sessions pinned to the primary after a client's own write, which
+may have gone to another worker, are never coalesced: ``shared_key`` gives
+them no key. Keys are tracked only while their call runs, and at most
+``maxsize`` at once; beyond that calls run uncoalesced. Calls are made on
+the event loop only, so no locking is needed.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from intelligagent.core.config import settings
+from intelligagent.db.replicas import is_pinned
+
+T = TypeVar("T")
+
+
+class SingleFlightStats:
+    """Counters for a ``SingleFlight``."""
+
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self.overflows = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"leaders": self.leaders, "followers": self.followers, "overflows": self.overflows}
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result with concurrent callers for the key."""
+
+    def __init__(self, maxsize: int = 10_000, enabled: bool = True):
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self.stats = SingleFlightStats()
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Optional[Hashable], call: Callable[[], Awaitable[T]]) -> T:
+        """Return ``call()``, or the result of the call for ``key`` already running.
+
+        A ``None`` key runs ``call`` on its own. A failure of the running call is raised to its followers too. If its
+        leader is cancelled (the client went away), followers start over
+        and one of them becomes the leader.
+        """
+        while True:
+            if not self.enabled or key is None:
+                return await call()
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            self.stats.followers += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                self.stats.followers -= 1  # The leader was cancelled: try again
+
+        if len(self._flights) >= self.maxsize:
+            self.stats.overflows += 1
+            return await call()
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        self.stats.leaders += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            flight.exception()  # Retrieved: there may be no follower to raise it to
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def forget(self, key: Hashable) -> None:
+        """Have calls for ``key`` from now on start a new flight rather than join the running one."""
+        self._flights.pop(key, None)
+
+    def forget_group(self, *groups: str) -> None:
+        """Have reads of ``groups`` from now on start new flights; see ``shared_key``."""
+        for group in groups:
+            self._generations[group] = self._generations.get(group, 0) + 1
+
+    def generation(self, group: str) -> int:
+        return self._generations.get(group, 0)
+
+    def reset(self) -> None:
+        self._flights.clear()
+        self._generations.clear()
+        self.stats = SingleFlightStats()
+
+
+def create_single_flight() -> SingleFlight:
+    """Build the application's single-flight group from settings."""
+    return SingleFlight(settings.SINGLE_FLIGHT_MAX_KEYS, enabled=settings.SINGLE_FLIGHT_ENABLED)
+
+
+# Global single-flight group, shared by the cache and the list routes
+flights = create_single_flight()
+
+
+def shared_key(db, group: str, *parts: Any) -> Optional[tuple]:
+    """A key for a read of ``group`` through ``db``, or ``None`` if the read must not be shared.
+
+    Reads from the primary and from each replica never share a flight, nor
+    do reads begun before and after ``flights.forget_group(group)``.
+    """
+    if is_pinned(db):
+        return None
+    return (db.bind, group, flights.generation(group), *parts)
@@ -0,0 +1,69 @@
+"""
+Hashed bag-of-words vectors for comparing ticket texts.
+
+``normalize_text`` lower-cases text, turns every number into 0 and keeps word
+characters only, so texts differing only in case, punctuation or numbers
+(order ids, amounts, dates) normalize alike. ``HashingVectorizer`` maps the
+words and adjacent word pairs of normalized text onto ``dim`` signed buckets
+with CRC32, which unlike ``hash()`` is the same in every process, weights
+them by 1 + log(count) and scales the vector to unit length, so the dot
+product of two vectors is their cosine similarity.
+
+Vectors are sparse, as dicts of bucket to weight: a ticket has tens of
+features whatever ``dim`` is.
+"""
+import hashlib
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+SparseVector = Dict[int, float]
+
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d+")
+
+# Words too common to tell tickets apart
+STOP_WORDS = frozenset(
+    "a an and are as at be been but by can could do for from has have hi hello i if in is it its me my no not of "
+    "on or our please so thanks that the there this to was we were what when will with you your".split()
+)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_WORD.findall(_NUMBER.sub("0", text.lower())))
+
+
+def text_hash(text: str) -> str:
+    """Digest of the normalized text; equal for texts that normalize alike."""
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+
+class HashingVectorizer:
+    """Unit-length sparse vectors of hashed words and word pairs."""
+
+    def __init__(self, dim: int = 1 << 18):
+        self.dim = dim
+
+    def features(self, text: str) -> List[str]:
+        words = [word for word in normalize_text(text).split() if word not in STOP_WORDS]
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def transform(self, text: str) -> SparseVector:
+        vector: SparseVector = {}
+        for feature, count in Counter(self.features(text)).items():
+            digest = zlib.crc32(feature.encode())
+            # The top bit picks the sign, so colliding features tend to cancel
+            weight = (1.0 + math.log(count)) * (-1.0 if digest & 0x80000000 else 1.0)
+            bucket = digest % self.dim
+            vector[bucket] = vector.get(bucket, 0.0) + weight
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {bucket: weight / norm for bucket, weight in vector.items() if weight} if norm else {}
+
+
+def cosine(a: SparseVector, b: SparseVector) -> float:
+    """Cosine similarity of two unit-length vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
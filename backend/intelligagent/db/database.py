@@ -1,7 +1,57 @@
-from sqlalchemy import create_engine
+import asyncio
+import os
+from contextlib import AsyncExitStack
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from intelligagent.core.config import settings
+from intelligagent.db.replicas import ReplicaSet, pinned_to_primary
+
+# asyncio driver used for each backend when deriving the async URL
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Rewrite a sync database URL to use the asyncio driver for its backend."""
+    sa_url = make_url(url)
+    backend = sa_url.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver and sa_url.get_driver_name() != driver:
+        sa_url = sa_url.set(drivername=f"{backend}+{driver}")
+    return sa_url.render_as_string(hide_password=False)
+
+def get_pool_options(url: str) -> dict:
+    """Pool sizing for server databases; SQLite picks its own pool class."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+
+def pool_connections(url: str) -> int:
+    """Most connections one process's pool for ``url`` opens; 0 where SQLite picks the pool."""
+    options = get_pool_options(url)
+    return options.get("pool_size", 0) + options.get("max_overflow", 0)
+
+def enable_sqlite_foreign_keys(engine) -> None:
+    """Enforce foreign keys on every new SQLite connection of ``engine``.
+
+    SQLite ships with them off; writes rely on the constraint to reject
+    tickets that reference a missing user.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
 # Create SQLAlchemy engine
 engine = create_engine(
@@ -10,17 +60,104 @@ engine = create_engine(
     pool_pre_ping=True,   # Verify connections before use
 )
 
+enable_sqlite_foreign_keys(engine)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async engine used by the API routers
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=settings.DEBUG,
+    pool_pre_ping=True,
+    **get_pool_options(ASYNC_DATABASE_URL),
+)
+enable_sqlite_foreign_keys(async_engine.sync_engine)
+
+# Objects stay usable after commit so responses never trigger lazy loads
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Read replicas for the read-only endpoints, with the primary as fallback
+REPLICA_URLS = [get_async_database_url(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+read_replicas = ReplicaSet.from_urls(
+    AsyncSessionLocal,
+    REPLICA_URLS,
+    pool_options=get_pool_options,
+    echo=settings.DEBUG,
+    pool_pre_ping=True,
+)
+
+def dispose_inherited_pools() -> None:
+    """Forget the pooled connections a forked worker inherited, without closing them.
+
+    The parent still owns those sockets, so closing them here would break it;
+    ``dispose(close=False)`` gives the child empty pools of its own, which it
+    fills on first use (SQLAlchemy's recipe for ``os.fork``).
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for replica in read_replicas.replicas:
+        replica.engine.sync_engine.dispose(close=False)
+
+# Workers spawned by uvicorn import everything afresh; this covers forking servers
+# (gunicorn --preload) and multiprocessing's fork start method
+os.register_at_fork(after_in_child=dispose_inherited_pools)
+
+async def prewarm_pool(async_engine, connections: int) -> int:
+    """Open up to ``connections`` connections of ``async_engine``'s pool at once and return them to it.
+
+    Returns how many were opened; pools that keep no connections (SQLite
+    files use NullPool) are left alone.
+    """
+    pool = async_engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return 0
+    connections = min(connections, pool.size())
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*(stack.enter_async_context(async_engine.connect()) for _ in range(connections)))
+    return connections
+
+async def prewarm_pools(connections: int) -> int:
+    """Pre-open ``connections`` connections to the primary and to each read replica."""
+    engines = [async_engine] + [replica.engine for replica in read_replicas.replicas]
+    return sum(await asyncio.gather(*(prewarm_pool(each, connections) for each in engines)))
+
 # Create Base class for models
 Base = declarative_base()
 
 # Dependency to get database session
 def get_db():
-    """Get database session."""
+    """Get a sync database session.
+
+    The API routers are async only, with no switch back to this path; it
+    serves scripts and sync jobs that want a request-style session.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+# Dependency to get async database session
+async def get_async_db():
+    """Get async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency to get a session for read-only endpoints
+async def get_read_db(request: Request):
+    """Get an async session on a healthy read replica.
+
+    Falls back to the primary when no replica is configured or healthy, and
+    for clients that wrote within READ_YOUR_WRITES_WINDOW seconds, whose
+    reads are then never coalesced with others' (see core/singleflight.py).
+    """
+    pinned = pinned_to_primary(request.cookies, settings.READ_YOUR_WRITES_WINDOW)
+    async with read_replicas.session(pin_to_primary=pinned) as db:
+        yield db
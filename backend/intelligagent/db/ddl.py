@@ -0,0 +1,318 @@
+"""
+Dialect-specific DDL the models cannot express: full-text search objects and
+the triggers that keep derived data in step with writes.
+
+Each definition lives here once and is used twice: ``models`` has
+``create_all`` run it after creating its table, and the migration that
+introduced it runs the same statements. Definitions map a dialect to the
+statements to run per table. Migrations are replayed in order on new
+databases, so a definition must keep working against the schema of the
+revision that introduced it: changing one means a new definition and a
+migration replacing the old objects, not an edit here.
+"""
+import re
+from typing import Dict, List, Sequence
+
+# dialect -> table -> statements, run in order
+TableDDL = Dict[str, Dict[str, List[str]]]
+
+
+def for_dialect(ddl: TableDDL, dialect: str) -> List[str]:
+    """Every statement of ``ddl`` for ``dialect``, table by table."""
+    return [statement for statements in ddl.get(dialect, {}).values() for statement in statements]
+
+
+_DROPS = [
+    (re.compile(r"CREATE TRIGGER IF NOT EXISTS (\w+)"), "DROP TRIGGER IF EXISTS {}"),
+    (re.compile(r"CREATE VIRTUAL TABLE IF NOT EXISTS (\w+)"), "DROP TABLE IF EXISTS {}"),
+    (re.compile(r"CREATE OR REPLACE FUNCTION (\w+)\(\)"), "DROP FUNCTION IF EXISTS {}() CASCADE"),
+]
+
+
+def drop_statements(statements: Sequence[str]) -> List[str]:
+    """Statements dropping the triggers, functions and FTS tables ``statements`` create, last first.
+
+    Postgres triggers are dropped with their functions; columns and indexes
+    are left to the caller.
+    """
+    drops = []
+    for statement in reversed(statements):
+        for pattern, drop in _DROPS:
+            match = pattern.match(statement)
+            if match:
+                drops.append(drop.format(match.group(1)))
+    return drops
+
+
+# Full-text search. Both variants are maintained by the database on every
+# write, so they never need a rebuild.
+#
+# Postgres: stored generated tsvector columns with GIN indexes. Title terms
+# weigh more than description terms.
+TICKET_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+COMMENT_SEARCH_VECTOR = "to_tsvector('english', body)"
+
+# SQLite: external-content FTS5 tables kept in step by triggers
+SEARCH_DDL: TableDDL = {
+    "sqlite": {
+        "tickets": [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5("
+            "title, description, content='tickets', content_rowid='id', tokenize='porter unicode61')",
+            "CREATE TRIGGER IF NOT EXISTS tickets_fts_ai AFTER INSERT ON tickets BEGIN "
+            "INSERT INTO tickets_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+            "CREATE TRIGGER IF NOT EXISTS tickets_fts_ad AFTER DELETE ON tickets BEGIN "
+            "INSERT INTO tickets_fts(tickets_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); END",
+            "CREATE TRIGGER IF NOT EXISTS tickets_fts_au AFTER UPDATE OF title, description ON tickets BEGIN "
+            "INSERT INTO tickets_fts(tickets_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO tickets_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+        ],
+        "comments": [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5("
+            "body, content='comments', content_rowid='id', tokenize='porter unicode61')",
+            "CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN "
+            "INSERT INTO comments_fts(rowid, body) VALUES (new.id, new.body); END",
+            "CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN "
+            "INSERT INTO comments_fts(comments_fts, rowid, body) VALUES ('delete', old.id, old.body); END",
+            "CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE OF body ON comments BEGIN "
+            "INSERT INTO comments_fts(comments_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+            "INSERT INTO comments_fts(rowid, body) VALUES (new.id, new.body); END",
+        ],
+    },
+    "postgresql": {
+        "tickets": [
+            f"ALTER TABLE tickets ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({TICKET_SEARCH_VECTOR}) STORED",
+            "CREATE INDEX ix_tickets_search_vector ON tickets USING gin (search_vector)",
+        ],
+        "comments": [
+            f"ALTER TABLE comments ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({COMMENT_SEARCH_VECTOR}) STORED",
+            "CREATE INDEX ix_comments_search_vector ON comments USING gin (search_vector)",
+        ],
+    },
+}
+
+
+# Transactional outbox. Triggers write an event row for every ticket insert
+# and update and every user insert, inside the writing transaction, so an
+# event exists exactly when its change commits and the write itself stays a
+# single statement. Enum values are stored by name and lower-cased into the
+# API's values.
+TICKET_EVENT_JSON = {
+    "sqlite": (
+        "json_object('id', new.id, 'title', new.title, 'description', new.description, "
+        "'status', lower(new.status), 'priority', lower(new.priority), "
+        "'requester_id', new.requester_id, 'assignee_id', new.assignee_id, "
+        "'created_at', new.created_at, 'updated_at', new.updated_at)"
+    ),
+    "postgresql": (
+        "json_build_object('id', NEW.id, 'title', NEW.title, 'description', NEW.description, "
+        "'status', lower(NEW.status::text), 'priority', lower(NEW.priority::text), "
+        "'requester_id', NEW.requester_id, 'assignee_id', NEW.assignee_id, "
+        "'created_at', NEW.created_at, 'updated_at', NEW.updated_at)::text"
+    ),
+}
+USER_EVENT_JSON = {
+    "sqlite": (
+        "json_object('id', new.id, 'email', new.email, 'name', new.name, "
+        "'role', lower(new.role), 'created_at', new.created_at)"
+    ),
+    "postgresql": (
+        "json_build_object('id', NEW.id, 'email', NEW.email, 'name', NEW.name, "
+        "'role', lower(NEW.role::text), 'created_at', NEW.created_at)::text"
+    ),
+}
+
+
+def _sqlite_outbox_trigger(name: str, when: str, table: str, aggregate: str, event_type: str, payload: str) -> str:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {when} ON {table} BEGIN "
+        "INSERT INTO outbox_events (aggregate_type, aggregate_id, event_type, payload) "
+        f"VALUES ('{aggregate}', new.id, '{event_type}', {payload}); END"
+    )
+
+
+OUTBOX_DDL: TableDDL = {
+    "sqlite": {
+        "tickets": [
+            _sqlite_outbox_trigger("tickets_outbox_ai", "INSERT", "tickets", "ticket", "ticket.created",
+                                   TICKET_EVENT_JSON["sqlite"]),
+            _sqlite_outbox_trigger("tickets_outbox_au", "UPDATE", "tickets", "ticket", "ticket.updated",
+                                   TICKET_EVENT_JSON["sqlite"]),
+        ],
+        "users": [
+            _sqlite_outbox_trigger("users_outbox_ai", "INSERT", "users", "user", "user.created",
+                                   USER_EVENT_JSON["sqlite"]),
+        ],
+    },
+    "postgresql": {
+        "tickets": [
+            "CREATE OR REPLACE FUNCTION outbox_ticket_event() RETURNS trigger AS $$ BEGIN "
+            "INSERT INTO outbox_events (aggregate_type, aggregate_id, event_type, payload) "
+            "VALUES ('ticket', NEW.id, CASE TG_OP WHEN 'INSERT' THEN 'ticket.created' ELSE 'ticket.updated' END, "
+            f"{TICKET_EVENT_JSON['postgresql']}); RETURN NULL; END $$ LANGUAGE plpgsql",
+            "CREATE TRIGGER tickets_outbox AFTER INSERT OR UPDATE ON tickets "
+            "FOR EACH ROW EXECUTE FUNCTION outbox_ticket_event()",
+        ],
+        "users": [
+            "CREATE OR REPLACE FUNCTION outbox_user_event() RETURNS trigger AS $$ BEGIN "
+            "INSERT INTO outbox_events (aggregate_type, aggregate_id, event_type, payload) "
+            f"VALUES ('user', NEW.id, 'user.created', {USER_EVENT_JSON['postgresql']}); "
+            "RETURN NULL; END $$ LANGUAGE plpgsql",
+            "CREATE TRIGGER users_outbox AFTER INSERT ON users "
+            "FOR EACH ROW EXECUTE FUNCTION outbox_user_event()",
+        ],
+    },
+}
+
+
+# Ticket counters. Triggers apply every ticket insert, update of status,
+# priority or assignee, and delete to ticket_counters in the writing
+# transaction: the changed keys' deltas are summed and upserted into the
+# ticket's shard. A periodic reconciliation recounts from tickets and upserts
+# the differences, which fixes drift from writes that bypassed the triggers.
+COUNTER_SHARDS = 8
+
+# (dimension, key expression, condition) per dialect; "{row}" becomes new,
+# old or tickets. Keys are text on both, with the hour as e.g. 2025-01-31T09.
+TICKET_COUNTER_KEYS = {
+    "sqlite": [
+        ("status", "{row}.status", None),
+        ("priority", "{row}.priority", None),
+        ("assignee", "coalesce(CAST({row}.assignee_id AS TEXT), 'none')", "{row}.status <> 'CLOSED'"),
+        ("open_hour", "strftime('%Y-%m-%dT%H', {row}.created_at)", "{row}.status = 'OPEN'"),
+    ],
+    "postgresql": [
+        ("status", "{row}.status::text", None),
+        ("priority", "{row}.priority::text", None),
+        ("assignee", "coalesce(CAST({row}.assignee_id AS text), 'none')", "{row}.status <> 'CLOSED'"),
+        ("open_hour", "to_char({row}.created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24')", "{row}.status = 'OPEN'"),
+    ],
+}
+
+
+def _counter_deltas(dialect: str, row: str, delta: int) -> list:
+    return [
+        f"SELECT '{dimension}' AS dimension, {key.format(row=row)} AS key, {delta} AS delta"
+        + (f" WHERE {condition.format(row=row)}" if condition else "")
+        for dimension, key, condition in TICKET_COUNTER_KEYS[dialect]
+    ]
+
+
+def _counter_upsert(deltas: list, shard: str) -> str:
+    # "WHERE true" keeps SQLite from reading ON CONFLICT as a join constraint
+    return (
+        "INSERT INTO ticket_counters (dimension, key, shard, count) "
+        f"SELECT dimension, key, {shard}, sum(delta) FROM ({' UNION ALL '.join(deltas)}) AS deltas "
+        "WHERE true GROUP BY dimension, key HAVING sum(delta) <> 0 "
+        "ON CONFLICT (dimension, key, shard) DO UPDATE SET count = ticket_counters.count + excluded.count"
+    )
+
+
+def _counter_update_condition(old: str, new: str, distinct: str) -> str:
+    return " OR ".join(f"{old}.{column} {distinct} {new}.{column}" for column in ("status", "priority", "assignee_id"))
+
+
+COUNTER_DDL: TableDDL = {
+    "sqlite": {
+        "tickets": [
+            "CREATE TRIGGER IF NOT EXISTS tickets_counters_ai AFTER INSERT ON tickets BEGIN "
+            f"{_counter_upsert(_counter_deltas('sqlite', 'new', 1), f'new.id % {COUNTER_SHARDS}')}; END",
+            "CREATE TRIGGER IF NOT EXISTS tickets_counters_au AFTER UPDATE OF status, priority, assignee_id ON tickets "
+            f"WHEN {_counter_update_condition('old', 'new', 'IS NOT')} BEGIN "
+            f"{_counter_upsert(_counter_deltas('sqlite', 'old', -1) + _counter_deltas('sqlite', 'new', 1), f'new.id % {COUNTER_SHARDS}')}; END",
+            "CREATE TRIGGER IF NOT EXISTS tickets_counters_ad AFTER DELETE ON tickets BEGIN "
+            f"{_counter_upsert(_counter_deltas('sqlite', 'old', -1), f'old.id % {COUNTER_SHARDS}')}; END",
+        ],
+    },
+    "postgresql": {
+        "tickets": [
+            "CREATE OR REPLACE FUNCTION ticket_counters_apply() RETURNS trigger AS $$ BEGIN "
+            "IF TG_OP = 'INSERT' THEN "
+            f"{_counter_upsert(_counter_deltas('postgresql', 'NEW', 1), f'NEW.id % {COUNTER_SHARDS}')}; "
+            "ELSIF TG_OP = 'UPDATE' THEN "
+            f"{_counter_upsert(_counter_deltas('postgresql', 'OLD', -1) + _counter_deltas('postgresql', 'NEW', 1), f'NEW.id % {COUNTER_SHARDS}')}; "
+            "ELSE "
+            f"{_counter_upsert(_counter_deltas('postgresql', 'OLD', -1), f'OLD.id % {COUNTER_SHARDS}')}; "
+            "END IF; RETURN NULL; END $$ LANGUAGE plpgsql",
+            "CREATE TRIGGER tickets_counters AFTER INSERT OR DELETE ON tickets "
+            "FOR EACH ROW EXECUTE FUNCTION ticket_counters_apply()",
+            "CREATE TRIGGER tickets_counters_update AFTER UPDATE OF status, priority, assignee_id ON tickets "
+            f"FOR EACH ROW WHEN ({_counter_update_condition('OLD', 'NEW', 'IS DISTINCT FROM')}) "
+            "EXECUTE FUNCTION ticket_counters_apply()",
+        ],
+    },
+}
+
+
+def _counter_reconciliation(dialect: str) -> str:
+    """One statement upserting, into shard 0, the difference between a recount and the counters.
+
+    Being a single statement it sees one snapshot of both tables, and since
+    it adds deltas rather than overwriting, concurrent trigger updates are kept.
+    """
+    recount = [
+        f"SELECT '{dimension}' AS dimension, {key.format(row='tickets')} AS key, count(*) AS delta FROM tickets"
+        + (f" WHERE {condition.format(row='tickets')}" if condition else "")
+        + " GROUP BY 2"
+        for dimension, key, condition in TICKET_COUNTER_KEYS[dialect]
+    ]
+    recorded = "SELECT dimension, key, -sum(count) AS delta FROM ticket_counters GROUP BY dimension, key"
+    return _counter_upsert([*recount, recorded], "0")
+
+
+TICKET_COUNTER_RECONCILIATION = {dialect: _counter_reconciliation(dialect) for dialect in TICKET_COUNTER_KEYS}
+
+
+# First response. A trigger on comments stamps the ticket with the time of its
+# first public comment by an agent or admin, in the comment's transaction,
+# and bumps updated_at so readers polling for changed tickets see it. SLA
+# breaches go to the outbox like ticket changes.
+FIRST_RESPONSE_UPDATE = (
+    "UPDATE tickets SET first_response_at = {row}.created_at, updated_at = {row}.created_at "
+    "WHERE id = {row}.ticket_id AND first_response_at IS NULL "
+    "AND EXISTS (SELECT 1 FROM users WHERE id = {row}.author_id AND role IN ('AGENT', 'ADMIN'))"
+)
+SLA_BREACH_EVENT_JSON = {
+    "sqlite": (
+        "json_object('ticket_id', new.ticket_id, 'kind', lower(new.kind), 'priority', lower(new.priority), "
+        "'deadline', new.deadline, 'breached_at', new.breached_at)"
+    ),
+    "postgresql": (
+        "json_build_object('ticket_id', NEW.ticket_id, 'kind', lower(NEW.kind::text), "
+        "'priority', lower(NEW.priority::text), 'deadline', NEW.deadline, 'breached_at', NEW.breached_at)::text"
+    ),
+}
+
+SLA_DDL: TableDDL = {
+    "sqlite": {
+        "comments": [
+            "CREATE TRIGGER IF NOT EXISTS comments_first_response_ai AFTER INSERT ON comments "
+            f"WHEN NOT new.is_internal BEGIN {FIRST_RESPONSE_UPDATE.format(row='new')}; END",
+        ],
+        "sla_breaches": [
+            "CREATE TRIGGER IF NOT EXISTS sla_breaches_outbox_ai AFTER INSERT ON sla_breaches BEGIN "
+            "INSERT INTO outbox_events (aggregate_type, aggregate_id, event_type, payload) "
+            f"VALUES ('ticket', new.ticket_id, 'ticket.sla_breached', {SLA_BREACH_EVENT_JSON['sqlite']}); END",
+        ],
+    },
+    "postgresql": {
+        "comments": [
+            "CREATE OR REPLACE FUNCTION ticket_first_response() RETURNS trigger AS $$ BEGIN "
+            f"{FIRST_RESPONSE_UPDATE.format(row='NEW')}; RETURN NULL; END $$ LANGUAGE plpgsql",
+            "CREATE TRIGGER comments_first_response AFTER INSERT ON comments "
+            "FOR EACH ROW WHEN (NOT NEW.is_internal) EXECUTE FUNCTION ticket_first_response()",
+        ],
+        "sla_breaches": [
+            "CREATE OR REPLACE FUNCTION outbox_sla_breach_event() RETURNS trigger AS $$ BEGIN "
+            "INSERT INTO outbox_events (aggregate_type, aggregate_id, event_type, payload) "
+            f"VALUES ('ticket', NEW.ticket_id, 'ticket.sla_breached', {SLA_BREACH_EVENT_JSON['postgresql']}); "
+            "RETURN NULL; END $$ LANGUAGE plpgsql",
+            "CREATE TRIGGER sla_breaches_outbox AFTER INSERT ON sla_breaches "
+            "FOR EACH ROW EXECUTE FUNCTION outbox_sla_breach_event()",
+        ],
+    },
+}
@@ -1,9 +1,34 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Index, DDL, event
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from intelligagent.db.database import Base
+from intelligagent.db.ddl import COUNTER_DDL, OUTBOX_DDL, SEARCH_DDL, SLA_DDL, TableDDL
 import enum
 
+# Predicate of the partial index on unclosed tickets. Queries that should use
+# the index must repeat it with the literal inlined, not as a bound parameter.
+NOT_CLOSED_PREDICATE = "status <> 'CLOSED'"
+
+# Dispatch order of open tickets: highest priority first, then oldest. The
+# enum is stored by name, so priority rank is spelled out; queries must use
+# the same expression text for the planner to match the index on it.
+OPEN_PREDICATE = "status = 'OPEN'"
+DISPATCH_RANK = "(CASE priority WHEN 'HIGH' THEN 0 WHEN 'MEDIUM' THEN 1 ELSE 2 END)"
+
+# Tickets the triage pipeline has not classified yet
+UNTRIAGED_PREDICATE = "category IS NULL"
+
+# SQLite fills server defaults with CURRENT_TIMESTAMP, which has no fractional
+# seconds. Storing bound values in the same format keeps string comparison of
+# stored and bound timestamps (e.g. keyset cursors) consistent.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 class UserRole(str, enum.Enum):
     """User roles in the system."""
     CUSTOMER = "customer"
@@ -22,15 +47,33 @@ class TicketPriority(str, enum.Enum):
     MEDIUM = "medium"
     HIGH = "high"
 
+class TicketCategory(str, enum.Enum):
+    """What a ticket is about; set by triage."""
+    BILLING = "billing"
+    TECHNICAL = "technical"
+    ACCOUNT = "account"
+    FEATURE_REQUEST = "feature_request"
+    OTHER = "other"
+
+class SlaKind(str, enum.Enum):
+    """Which SLA deadline: the first agent reply, or closing the ticket."""
+    FIRST_RESPONSE = "first_response"
+    RESOLUTION = "resolution"
+
 class User(Base):
     """User model representing system users."""
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination sort keys (id breaks ties)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     name = Column(String(255), nullable=False)
     role = Column(Enum(UserRole), default=UserRole.CUSTOMER, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     tickets_created = relationship("Ticket", foreign_keys="Ticket.requester_id", back_populates="requester")
@@ -40,16 +83,48 @@ class User(Base):
 class Ticket(Base):
     """Ticket model representing customer support requests."""
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Keyset pagination sort keys (id breaks ties)
+        Index("ix_tickets_created_at_id", "created_at", "id"),
+        Index("ix_tickets_updated_at_id", "updated_at", "id"),
+        Index("ix_tickets_priority_id", "priority", "id"),
+        # Ticket lists per requester / assignee, newest first
+        Index("ix_tickets_requester_id_created_at", "requester_id", "created_at"),
+        Index("ix_tickets_assignee_id_created_at", "assignee_id", "created_at"),
+        # Unclosed work per agent, optionally narrowed to one priority
+        Index(
+            "ix_tickets_open_assignee_priority",
+            "assignee_id", "priority", "created_at",
+            postgresql_where=text(NOT_CLOSED_PREDICATE),
+            sqlite_where=text(NOT_CLOSED_PREDICATE),
+        ),
+        # Dispatch queue: next open ticket to hand to an agent
+        Index(
+            "ix_tickets_dispatch_queue",
+            text(DISPATCH_RANK), "created_at", "id",
+            postgresql_where=text(OPEN_PREDICATE),
+            sqlite_where=text(OPEN_PREDICATE),
+        ),
+        # Tickets still waiting for triage, for the backfill
+        Index(
+            "ix_tickets_untriaged", "id",
+            postgresql_where=text(UNTRIAGED_PREDICATE),
+            sqlite_where=text(UNTRIAGED_PREDICATE),
+        ),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
     description = Column(Text)
     status = Column(Enum(TicketStatus), default=TicketStatus.OPEN, nullable=False)
     priority = Column(Enum(TicketPriority), default=TicketPriority.MEDIUM, nullable=False)
     requester_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     assignee_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    category = Column(Enum(TicketCategory), nullable=True)  # Unset until triaged
+    suggested_reply = Column(Text)  # Draft first reply from triage, for agents
+    first_response_at = Column(Timestamp)  # First public comment by an agent or admin; set by a trigger
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     requester = relationship("User", foreign_keys=[requester_id], back_populates="tickets_created")
@@ -59,14 +134,122 @@ class Ticket(Base):
 class Comment(Base):
     """Comment model representing conversation on tickets."""
     __tablename__ = "comments"
+    __table_args__ = (
+        # Comment thread of a ticket in posting order
+        Index("ix_comments_ticket_id_created_at", "ticket_id", "created_at"),
+        Index("ix_comments_author_id", "author_id"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     body = Column(Text, nullable=False)
     is_internal = Column(Boolean, default=False, nullable=False)  # Internal notes vs customer-visible
     ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     
     # Relationships
     ticket = relationship("Ticket", back_populates="comments")
     author = relationship("User", back_populates="comments")
+
+class OutboxEvent(Base):
+    """Ticket and user lifecycle event waiting to be published.
+
+    Rows are written by triggers in the transaction of the change they
+    describe and deleted by the relay once the broker has them, so the table
+    only holds the unpublished backlog. ``id`` orders events.
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    aggregate_type = Column(String(32), nullable=False)  # "ticket" or "user"
+    aggregate_id = Column(Integer, nullable=False)
+    event_type = Column(String(64), nullable=False)  # e.g. "ticket.created"
+    payload = Column(Text, nullable=False)  # JSON in the shape of the API schema
+    created_at = Column(Timestamp, server_default=func.now())
+
+
+class SlaBreach(Base):
+    """A ticket that missed an SLA deadline, recorded once per ticket and kind.
+
+    Every worker tracking deadlines inserts the breaches it sees, ignoring
+    conflicts, so the first insert wins and a trigger turns it into one
+    ``ticket.sla_breached`` outbox event.
+    """
+    __tablename__ = "sla_breaches"
+
+    ticket_id = Column(Integer, ForeignKey("tickets.id"), primary_key=True)
+    kind = Column(Enum(SlaKind), primary_key=True)
+    priority = Column(Enum(TicketPriority), nullable=False)  # When the deadline passed
+    deadline = Column(Timestamp, nullable=False)
+    breached_at = Column(Timestamp, server_default=func.now())
+
+
+class TicketCounter(Base):
+    """One shard of a ticket count, kept current by triggers on ``tickets``.
+
+    ``dimension`` names what is counted and ``key`` the value counted: every
+    ticket by ``status`` and by ``priority``, unclosed tickets by ``assignee``
+    (``"none"`` when unassigned) and open tickets by ``open_hour``, the UTC
+    hour they were created in. A ticket's changes always go to shard
+    ``id % COUNTER_SHARDS``, so writers rarely wait on each other's counter
+    rows; the count of a key is the sum of its shards.
+    """
+    __tablename__ = "ticket_counters"
+
+    dimension = Column(String(16), primary_key=True)
+    key = Column(String(32), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    count = Column(BigInteger().with_variant(Integer, "sqlite"), nullable=False, default=0)
+
+
+def _create_after(ddl: TableDDL) -> None:
+    """Have ``create_all`` run ``ddl`` after creating each of its tables."""
+    for dialect, tables in ddl.items():
+        for table_name, statements in tables.items():
+            for statement in statements:
+                # DDL() formats statements with %, so literal signs are doubled
+                event.listen(
+                    Base.metadata.tables[table_name], "after_create",
+                    DDL(statement.replace("%", "%%")).execute_if(dialect=dialect),
+                )
+
+
+# Full-text search (see db/ddl.py). The index lives outside the mapped columns
+# because it is dialect specific.
+_create_after(SEARCH_DDL)
+for _table in (Ticket.__table__, Comment.__table__):
+    # Triggers go with their table; the FTS table has to be dropped explicitly
+    event.listen(
+        _table, "after_drop",
+        DDL(f"DROP TABLE IF EXISTS {_table.name}_fts").execute_if(dialect="sqlite"),
+    )
+
+
+# Transactional outbox (see db/ddl.py)
+_create_after(OUTBOX_DDL)
+# Dropping the trigger functions takes their triggers with them
+for _function in ("outbox_ticket_event", "outbox_user_event"):
+    event.listen(
+        OutboxEvent.__table__, "after_drop",
+        DDL(f"DROP FUNCTION IF EXISTS {_function}() CASCADE").execute_if(dialect="postgresql"),
+    )
+
+
+# Ticket counters (see db/ddl.py)
+_create_after(COUNTER_DDL)
+event.listen(
+    TicketCounter.__table__, "after_drop",
+    DDL("DROP FUNCTION IF EXISTS ticket_counters_apply() CASCADE").execute_if(dialect="postgresql"),
+)
+
+
+# First response and SLA breaches (see db/ddl.py)
+_create_after(SLA_DDL)
+for _table, _function in (
+    (Comment.__table__, "ticket_first_response"),
+    (SlaBreach.__table__, "outbox_sla_breach_event"),
+):
+    event.listen(
+        _table, "after_drop",
+        DDL(f"DROP FUNCTION IF EXISTS {_function}() CASCADE").execute_if(dialect="postgresql"),
+    )
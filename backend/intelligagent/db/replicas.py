@@ -0,0 +1,216 @@
+"""
+Routing read-only sessions to read replicas.
+
+``ReplicaSet`` holds an async engine per replica and hands out sessions on
+the healthy replica with the fewest sessions open, falling back to the
+primary when there are no replicas, none is healthy, or the caller asks to
+be pinned to the primary.
+
+A replica is marked down as soon as a session on it fails to reach the
+database, and comes back when a periodic ``SELECT 1`` succeeds again.
+
+Replicas lag the primary, so a client that has just written may not see its
+write on a replica. ``ReadYourWritesMiddleware`` sets a short-lived cookie
+on every successful write response, and ``pinned_to_primary`` keeps sending
+that client's reads to the primary while the cookie is valid. Keeping the
+state in the client means it holds across workers without shared storage.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+logger = logging.getLogger(__name__)
+
+# Cookie holding the Unix time until which a client's reads go to the primary
+PRIMARY_PIN_COOKIE = "primary_until"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Session.info keys: the replica a read session is on, and whether it was pinned to the primary
+REPLICA_INFO_KEY = "replica"
+PINNED_INFO_KEY = "pinned_to_primary"
+
+
+def is_unavailable(exc: BaseException) -> bool:
+    """Whether ``exc`` means the database could not be reached, as opposed to a failed query."""
+    if isinstance(exc, DBAPIError):
+        return exc.connection_invalidated or isinstance(exc, (OperationalError, InterfaceError))
+    return isinstance(exc, OSError)
+
+
+class Replica:
+    """One read replica: its engine, sessions and health."""
+
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        self.healthy = True
+        self.open_sessions = 0
+
+
+class ReplicaSet:
+    """Hands out read sessions on healthy replicas, or on the primary."""
+
+    def __init__(self, primary: async_sessionmaker, replicas: Sequence[Replica] = ()):
+        self.primary = primary
+        self.replicas: List[Replica] = list(replicas)
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_urls(
+        cls,
+        primary: async_sessionmaker,
+        urls: Sequence[str],
+        engine_factory: Callable = create_async_engine,
+        pool_options: Callable[[str], dict] = lambda url: {},
+        **options,
+    ) -> "ReplicaSet":
+        """Create an engine per async database URL with ``engine_factory(url, **options, **pool_options(url))``."""
+        return cls(primary, [
+            Replica(f"replica-{i}", engine_factory(url, **options, **pool_options(url))) for i, url in enumerate(urls)
+        ])
+
+    def choose(self) -> Optional[Replica]:
+        """The healthy replica with the fewest open sessions, taking turns on ties."""
+        best = None
+        count = len(self.replicas)
+        for offset in range(count):
+            replica = self.replicas[(self._next + offset) % count]
+            if replica.healthy and (best is None or replica.open_sessions < best.open_sessions):
+                best = replica
+        if count:
+            self._next = (self._next + 1) % count
+        return best
+
+    def mark_down(self, replica: Replica) -> None:
+        if replica.healthy:
+            logger.warning("Read replica %s is unavailable; routing its reads elsewhere", replica.name)
+        replica.healthy = False
+
+    @asynccontextmanager
+    async def session(self, pin_to_primary: bool = False) -> AsyncIterator[AsyncSession]:
+        """A session on the chosen replica, or on the primary when pinned or none is healthy."""
+        replica = None if pin_to_primary else self.choose()
+        if replica is None:
+            async with self.primary() as db:
+                if pin_to_primary:
+                    db.info[PINNED_INFO_KEY] = True
+                yield db
+            return
+
+        replica.open_sessions += 1
+        try:
+            async with replica.sessionmaker() as db:
+                db.info[REPLICA_INFO_KEY] = replica.name
+                yield db
+        except Exception as exc:
+            if is_unavailable(exc):
+                self.mark_down(replica)
+            raise
+        finally:
+            replica.open_sessions -= 1
+
+    async def check_health(self, timeout: float = 2.0) -> None:
+        """Run ``SELECT 1`` on every replica and mark each up or down."""
+
+        async def check(replica: Replica) -> None:
+            try:
+                async with replica.engine.connect() as conn:
+                    await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout)
+            except Exception as exc:  # Any failure to answer takes the replica out
+                if replica.healthy:
+                    logger.warning("Read replica %s failed its health check: %s", replica.name, exc)
+                replica.healthy = False
+            else:
+                if not replica.healthy:
+                    logger.info("Read replica %s is healthy again", replica.name)
+                replica.healthy = True
+
+        await asyncio.gather(*(check(replica) for replica in self.replicas))
+
+    async def _check_periodically(self, interval: float) -> None:
+        while True:
+            await self.check_health(timeout=interval)
+            await asyncio.sleep(interval)
+
+    def start_health_checks(self, interval: float) -> None:
+        """Check replicas every ``interval`` seconds on the running loop until ``close``."""
+        if self.replicas and self._health_task is None:
+            self._health_task = asyncio.get_running_loop().create_task(self._check_periodically(interval))
+
+    async def close(self) -> None:
+        """Stop health checks and dispose of the replica engines."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+def on_replica(db) -> bool:
+    """Whether ``db`` is a session on a read replica, whose reads may lag the primary."""
+    return REPLICA_INFO_KEY in db.info
+
+
+def is_pinned(db) -> bool:
+    """Whether ``db`` was pinned to the primary because its client wrote moments ago."""
+    return db.info.get(PINNED_INFO_KEY, False)
+
+
+def pinned_to_primary(cookies, window: float, now: Optional[float] = None) -> bool:
+    """Whether the client wrote within the last ``window`` seconds, per its pin cookie.
+
+    Pins further ahead than ``window`` are ignored, so a forged cookie cannot
+    keep a client on the primary.
+    """
+    if window <= 0:
+        return False
+    value = cookies.get(PRIMARY_PIN_COOKIE)
+    if not value:
+        return False
+    try:
+        until = float(value)
+    except ValueError:
+        return False
+    now = time.time() if now is None else now
+    return now < until <= now + window
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware pinning a client to the primary for ``window`` seconds after a write.
+
+    Any successful response to an unsafe method counts as a write and gets a
+    pin cookie.
+    """
+
+    def __init__(self, app, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={time.time() + self.window:.3f}; "
+                    f"Max-Age={max(1, round(self.window))}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
@@ -1,10 +1,13 @@
 # Import all schemas for easy access
-from .user import User, UserCreate, UserUpdate, UserBase
-from .ticket import Ticket, TicketCreate, TicketUpdate, TicketBase, TicketWithRequester
-from .comment import Comment, CommentCreate, CommentBase, CommentWithAuthor
+from .user import User, UserCreate, UserUpdate, UserBase, UserSort
+from .ticket import Ticket, TicketCreate, TicketUpdate, TicketBase, TicketWithRequester, TicketDetail, TicketDispatch, TicketSort, TicketBulkError, TicketBulkResult
+from .comment import Comment, CommentCreate, CommentUpdate, CommentBase, CommentWithAuthor
+from .pagination import Page, SortOrder
 
 __all__ = [
-    "User", "UserCreate", "UserUpdate", "UserBase",
-    "Ticket", "TicketCreate", "TicketUpdate", "TicketBase", "TicketWithRequester", 
-    "Comment", "CommentCreate", "CommentBase", "CommentWithAuthor"
+    "User", "UserCreate", "UserUpdate", "UserBase", "UserSort",
+    "Ticket", "TicketCreate", "TicketUpdate", "TicketBase", "TicketWithRequester", "TicketDetail", "TicketSort",
+    "TicketDispatch", "TicketBulkError", "TicketBulkResult",
+    "Comment", "CommentCreate", "CommentUpdate", "CommentBase", "CommentWithAuthor",
+    "Page", "SortOrder"
 ]
@@ -12,12 +12,17 @@ class CommentCreate(CommentBase):
     ticket_id: int
     author_id: int
 
+# Schema for updating a comment
+class CommentUpdate(BaseModel):
+    body: Optional[str] = None
+    is_internal: Optional[bool] = None
+
 # Schema for comment responses (what the API returns)
 class Comment(CommentBase):
     id: int
     ticket_id: int
     author_id: int
-    created_at: str
+    created_at: datetime
     
     class Config:
         from_attributes = True
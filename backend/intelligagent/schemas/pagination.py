@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+import enum
+
+T = TypeVar("T")
+
+class SortOrder(str, enum.Enum):
+    """Direction for keyset-paginated listings."""
+    ASC = "asc"
+    DESC = "desc"
+
+# Envelope for keyset-paginated list responses
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to fetch the next page
@@ -1,6 +1,17 @@
 from pydantic import BaseModel
-from typing import Optional, List
-from intelligagent.db.models import TicketStatus, TicketPriority
+from typing import Dict, Optional, List
+from datetime import datetime
+from intelligagent.db.models import SlaKind, TicketCategory, TicketStatus, TicketPriority
+from intelligagent.schemas.comment import CommentWithAuthor
+from intelligagent.schemas.pagination import Page
+from intelligagent.schemas.user import User
+import enum
+
+class TicketSort(str, enum.Enum):
+    """Sort keys available for ticket listings."""
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+    PRIORITY = "priority"
 
 # Base Ticket schema with common fields
 class TicketBase(BaseModel):
@@ -20,19 +31,103 @@ class TicketUpdate(BaseModel):
     priority: Optional[TicketPriority] = None
     assignee_id: Optional[int] = None
 
+# Schema for an agent asking for the next ticket to work on
+class TicketDispatch(BaseModel):
+    agent_id: int
+
 # Schema for ticket responses (what the API returns)
 class Ticket(TicketBase):
     id: int
     status: TicketStatus
     requester_id: int
     assignee_id: Optional[int] = None
-    created_at: str
-    updated_at: str
+    category: Optional[TicketCategory] = None
+    first_response_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
     
     class Config:
         from_attributes = True
 
+# A ticket found similar to another, scored by cosine similarity of their texts
+class TicketMatch(BaseModel):
+    id: int
+    score: float
+
+# Schema for ticket creation responses: the ticket plus likely duplicates, most similar first
+class TicketCreated(Ticket):
+    similar_tickets: List[TicketMatch] = []
+
+# Schema for similar ticket listings
+class SimilarTicket(Ticket):
+    score: float
+
 # Schema for ticket with requester info
 class TicketWithRequester(Ticket):
     requester_name: str
     requester_email: str
+
+# Schema for the ticket detail view: people involved plus one page of the thread
+class TicketDetail(Ticket):
+    requester: User
+    assignee: Optional[User] = None
+    suggested_reply: Optional[str] = None
+    comments: Page[CommentWithAuthor]
+
+# Per-row failure in a bulk ticket request
+class TicketBulkError(BaseModel):
+    index: int  # Position of the row in the request body
+    detail: str
+
+# Schema for bulk ticket creation responses
+class TicketBulkResult(BaseModel):
+    created: int
+    failed: int
+    ids: List[int]  # Ids of the created tickets, in request order
+    errors: List[TicketBulkError]
+
+# Which tickets a bulk update changes; every criterion given must hold
+class TicketFilter(BaseModel):
+    status: Optional[TicketStatus] = None
+    priority: Optional[TicketPriority] = None
+    assignee_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None  # Exclusive; tickets older than this
+
+# Schema for bulk ticket updates: one set of changes for the listed tickets or those matching a filter
+class TicketBulkUpdate(BaseModel):
+    ids: Optional[List[int]] = None
+    filter: Optional[TicketFilter] = None
+    update: TicketUpdate
+
+# Schema for bulk ticket update responses
+class TicketBulkUpdateResult(BaseModel):
+    dry_run: bool
+    matched: int  # Tickets changed, or that would be changed in a dry run
+    ids: List[int]  # Ids of the changed tickets, ascending; empty in a dry run
+
+# Schema for what triage decided about a ticket
+class TicketTriage(BaseModel):
+    priority: TicketPriority
+    category: TicketCategory
+    suggested_reply: str
+
+# Schema for ticket statistics; assignee counts cover tickets that are not closed
+class TicketStats(BaseModel):
+    total: int
+    by_status: Dict[TicketStatus, int]
+    by_priority: Dict[TicketPriority, int]
+    by_assignee: Dict[int, int]  # Agent id -> unclosed tickets
+    unassigned: int  # Unclosed tickets without an assignee
+    open_by_age: Dict[str, int]  # Open tickets per age bucket, youngest first
+    as_of: datetime
+
+# Schema for an SLA deadline of an unclosed ticket
+class TicketSlaDeadline(BaseModel):
+    ticket_id: int
+    kind: SlaKind
+    priority: TicketPriority
+    assignee_id: Optional[int] = None
+    deadline: datetime
+    breached: bool
+    seconds_left: float  # Negative once breached
@@ -2,6 +2,12 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional
 from intelligagent.db.models import UserRole
 from datetime import datetime
+import enum
+
+class UserSort(str, enum.Enum):
+    """Sort keys available for user listings."""
+    CREATED_AT = "created_at"
+    EMAIL = "email"
 
 # Base User schema with common fields
 class UserBase(BaseModel):
@@ -23,6 +29,7 @@ class UserUpdate(BaseModel):
 class User(UserBase):
     id: int
     created_at: datetime
+    updated_at: datetime
     
     class Config:
         from_attributes = True  # Allows conversion from SQLAlchemy models
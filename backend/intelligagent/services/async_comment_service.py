@@ -0,0 +1,91 @@
+"""
+Async comment service used by the API routers.
+
+Each coroutine runs the matching function from ``comment_service`` through
+``AsyncSession.run_sync``, so the query logic stays in ``comment_service`` while
+the database I/O is awaited on the event loop.
+
+Comments come back as schemas built from eagerly loaded rows, so nothing is
+lazy loaded once the session work is done.
+
+A public comment may be the ticket's first response, which a trigger stamps
+on the ticket: creating one drops the cached ticket and asks SLA tracking to
+sync.
+
+Comment writes are published to the ticket feed, routed by their ticket's
+requester and assignee; the ticket is read through the cache, and only
+while the feed may have subscribers.
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from intelligagent.core.cache import cache
+from intelligagent.db.models import Comment
+from intelligagent.schemas.comment import (
+    Comment as CommentSchema, CommentCreate, CommentUpdate, CommentWithAuthor,
+)
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.services import async_ticket_service, comment_service, sla, ticket_feed
+
+def comment_with_author(db_comment: Comment) -> CommentWithAuthor:
+    """Build the response schema for a comment whose author is loaded."""
+    return CommentWithAuthor(
+        **CommentSchema.model_validate(db_comment).model_dump(),
+        author_name=db_comment.author.name,
+        author_email=db_comment.author.email,
+    )
+
+async def publish_comment(
+    db: AsyncSession, event_type: str, comment_id: int, ticket_id: int, comment: Optional[CommentSchema] = None
+) -> None:
+    """Publish a committed comment write to the ticket feed, if it may have subscribers."""
+    if not ticket_feed.wanted():
+        return
+    ticket = await async_ticket_service.get_ticket(db, ticket_id)
+    if ticket is not None:
+        ticket_feed.publish(ticket_feed.comment_event(event_type, comment_id, ticket, comment))
+
+async def create_comment(db: AsyncSession, comment: CommentCreate) -> CommentSchema:
+    """Create a new comment."""
+    db_comment = await db.run_sync(comment_service.create_comment, comment)
+    if not db_comment.is_internal:
+        await cache.delete(async_ticket_service.ticket_key(db_comment.ticket_id))
+        sla.request_sync()
+    created = CommentSchema.model_validate(db_comment)
+    await publish_comment(db, "comment.created", created.id, created.ticket_id, created)
+    return created
+
+async def get_comment(db: AsyncSession, comment_id: int) -> Optional[CommentWithAuthor]:
+    """Get a comment by ID with its author."""
+    db_comment = await db.run_sync(comment_service.get_comment, comment_id)
+    return comment_with_author(db_comment) if db_comment else None
+
+async def get_comments_page(
+    db: AsyncSession,
+    ticket_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order: SortOrder = SortOrder.ASC,
+) -> Tuple[List[CommentWithAuthor], Optional[str]]:
+    """Get a page of a ticket's comments with their authors."""
+    db_comments, next_cursor = await db.run_sync(
+        comment_service.get_comments_page, ticket_id, limit, cursor, order
+    )
+    return [comment_with_author(db_comment) for db_comment in db_comments], next_cursor
+
+async def update_comment(db: AsyncSession, comment_id: int, comment_update: CommentUpdate) -> Optional[CommentSchema]:
+    """Update a comment's body or visibility."""
+    db_comment = await db.run_sync(comment_service.update_comment, comment_id, comment_update)
+    if db_comment is None:
+        return None
+    updated = CommentSchema.model_validate(db_comment)
+    if comment_update.model_fields_set:
+        await publish_comment(db, "comment.updated", updated.id, updated.ticket_id, updated)
+    return updated
+
+async def delete_comment(db: AsyncSession, comment_id: int) -> bool:
+    """Delete a comment; returns whether it existed."""
+    ticket_id = await db.run_sync(comment_service.delete_comment, comment_id)
+    if ticket_id is None:
+        return False
+    await publish_comment(db, "comment.deleted", comment_id, ticket_id)
+    return True
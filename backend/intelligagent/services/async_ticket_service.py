@@ -0,0 +1,232 @@
+"""
+Async ticket service used by the API routers.
+
+Each coroutine runs the matching function from ``ticket_service`` through
+``AsyncSession.run_sync``, so the query logic stays in ``ticket_service`` while
+the database I/O is awaited on the event loop.
+
+Single-ticket lookups read through the application cache and return ``Ticket``
+schemas; writes refresh the cached entry and the ticket's SLA deadlines once
+they have committed, keep later list reads from joining flights begun before
+them, and are published to the ticket feed.
+"""
+from datetime import datetime
+from typing import List, Optional, Sequence, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from intelligagent.core.cache import cache
+from intelligagent.core.singleflight import flights
+from intelligagent.db.replicas import is_pinned, on_replica
+from intelligagent.db.models import Ticket, TicketPriority
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.schemas.ticket import (
+    Ticket as TicketSchema, TicketCreate, TicketDetail, TicketFilter, TicketTriage, TicketUpdate, TicketSort,
+)
+from intelligagent.schemas.user import User as UserSchema
+from intelligagent.services import (
+    async_comment_service, sla, ticket_feed, ticket_search, ticket_service, ticket_stats,
+)
+
+# Single-flight groups of the list routes tickets appear in
+TICKET_LIST_FLIGHTS = ("tickets", "user-tickets")
+
+def ticket_key(ticket_id: int) -> str:
+    return f"ticket:{ticket_id}"
+
+async def cache_ticket(db_ticket) -> TicketSchema:
+    """Store a freshly committed ticket (a ``Ticket`` or a row with its fields) in the cache and update its SLA deadlines."""
+    ticket = TicketSchema.model_validate(db_ticket)
+    await cache.set(ticket_key(ticket.id), ticket)
+    flights.forget_group(*TICKET_LIST_FLIGHTS)
+    sla.observe(ticket)
+    return ticket
+
+async def create_ticket(db: AsyncSession, ticket: TicketCreate) -> TicketSchema:
+    """Create a new ticket in the database."""
+    db_ticket = await db.run_sync(ticket_service.create_ticket, ticket)
+    created = await cache_ticket(db_ticket)
+    ticket_feed.publish_ticket("ticket.created", created)
+    return created
+
+async def create_tickets_bulk(
+    db: AsyncSession, tickets: Sequence[TicketCreate], known_requesters: Optional[Set[int]] = None
+) -> List[Tuple[Optional[int], Optional[str]]]:
+    """Insert many tickets with batched multi-row INSERT ... RETURNING."""
+    rows = []
+    outcomes = await db.run_sync(ticket_service.create_tickets_bulk, tickets, known_requesters, rows)
+    created = [(ticket_id, ticket.priority) for ticket, (ticket_id, error) in zip(tickets, outcomes) if error is None]
+    if created:
+        flights.forget_group(*TICKET_LIST_FLIGHTS)
+    sla.observe_created([ticket_id for ticket_id, _ in created], [priority for _, priority in created])
+    if ticket_feed.wanted():
+        for row in rows:
+            ticket_feed.publish_ticket("ticket.created", TicketSchema.model_validate(row))
+    return outcomes
+
+async def get_ticket(db: AsyncSession, ticket_id: int) -> Optional[TicketSchema]:
+    """Get a ticket by ID."""
+    async def load():
+        db_ticket = await db.run_sync(ticket_service.get_ticket, ticket_id)
+        return TicketSchema.model_validate(db_ticket) if db_ticket else None
+    return await cache.get_or_load(
+        ticket_key(ticket_id), TicketSchema, load, shared=not on_replica(db), coalesce=not is_pinned(db)
+    )
+
+async def get_tickets_by_ids(db: AsyncSession, ticket_ids: Sequence[int]) -> List[Ticket]:
+    """Get the tickets with the given IDs, in no particular order."""
+    return await db.run_sync(ticket_service.get_tickets_by_ids, ticket_ids)
+
+async def get_ticket_version(db: AsyncSession, ticket_id: int) -> Optional[datetime]:
+    """Get a ticket's updated_at, from the cache when it holds the ticket."""
+    ticket = await cache.get(ticket_key(ticket_id), TicketSchema)
+    if ticket is not None:
+        return ticket.updated_at
+    return await db.run_sync(ticket_service.get_ticket_version, ticket_id)
+
+async def get_ticket_stats(db: AsyncSession) -> dict:
+    """Get ticket counts by status, priority, assignee and open-ticket age."""
+    return await db.run_sync(ticket_stats.get_ticket_stats)
+
+async def get_tickets(db: AsyncSession, skip: int = 0, limit: int = 100):
+    """Get a list of tickets with pagination."""
+    return await db.run_sync(ticket_service.get_tickets, skip, limit)
+
+async def get_tickets_page(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: TicketSort = TicketSort.CREATED_AT,
+    order: SortOrder = SortOrder.DESC,
+    columns: Optional[Sequence] = None,
+) -> Tuple[List[Ticket], Optional[str]]:
+    """Get a page of tickets, or of plain rows of ``columns``, and the cursor for the next page."""
+    return await db.run_sync(ticket_service.get_tickets_page, limit, cursor, sort, order, columns)
+
+async def get_tickets_by_user(db: AsyncSession, user_id: int):
+    """Get all tickets created by a specific user."""
+    return await db.run_sync(ticket_service.get_tickets_by_user, user_id)
+
+async def get_tickets_by_user_version(db: AsyncSession, user_id: int) -> Tuple[int, Optional[datetime]]:
+    """Get the count and latest updated_at of a user's tickets."""
+    return await db.run_sync(ticket_service.get_tickets_by_user_version, user_id)
+
+async def get_tickets_by_assignee(db: AsyncSession, assignee_id: int):
+    """Get all tickets assigned to a specific user."""
+    return await db.run_sync(ticket_service.get_tickets_by_assignee, assignee_id)
+
+async def get_open_tickets_by_assignee(db: AsyncSession, assignee_id: int, priority: Optional[TicketPriority] = None):
+    """Get unclosed tickets assigned to a user, oldest first, optionally at one priority."""
+    return await db.run_sync(ticket_service.get_open_tickets_by_assignee, assignee_id, priority)
+
+async def search_tickets(db: AsyncSession, q: str, limit: int = 20) -> List[Ticket]:
+    """Get the tickets best matching ``q``, most relevant first."""
+    return await db.run_sync(ticket_search.search_tickets, q, limit)
+
+async def update_ticket(db: AsyncSession, ticket_id: int, ticket_update: TicketUpdate) -> Optional[TicketSchema]:
+    """Update a ticket's information."""
+    row = await db.run_sync(ticket_service.update_ticket, ticket_id, ticket_update)
+    if row is None:
+        return None
+    updated = await cache_ticket(row)
+    # The assignee it replaced, from the same statement, tells the agent losing the ticket
+    ticket_feed.publish_ticket("ticket.updated", updated, row.previous_assignee_id)
+    return updated
+
+async def apply_triage(
+    db: AsyncSession, ticket_id: int, triage: TicketTriage, created_priority: Optional[TicketPriority] = None
+) -> Optional[TicketSchema]:
+    """Write a triage result, keeping a priority changed since the ticket was created."""
+    db_ticket = await db.run_sync(ticket_service.apply_triage, ticket_id, triage, created_priority)
+    if db_ticket is None:
+        return None
+    updated = await cache_ticket(db_ticket)
+    ticket_feed.publish_ticket("ticket.updated", updated)
+    return updated
+
+async def count_tickets_matching(
+    db: AsyncSession, ids: Optional[Sequence[int]] = None, ticket_filter: Optional[TicketFilter] = None,
+    chunk_size: int = 500,
+) -> int:
+    """Count the tickets among ``ids``, ``chunk_size`` ids per query, or matching ``ticket_filter``."""
+    if ids is None:
+        return await db.run_sync(ticket_service.count_tickets_matching, None, ticket_filter)
+    ids = sorted(set(ids))
+    count = 0
+    for start in range(0, len(ids), chunk_size):
+        count += await db.run_sync(ticket_service.count_tickets_matching, ids[start:start + chunk_size])
+    return count
+
+async def update_tickets_bulk(
+    db: AsyncSession,
+    ticket_update: TicketUpdate,
+    ids: Optional[Sequence[int]] = None,
+    ticket_filter: Optional[TicketFilter] = None,
+    chunk_size: int = 500,
+) -> List:
+    """Apply ``ticket_update`` to ``ids`` or to the tickets matching ``ticket_filter``, a chunk per statement.
+
+    Every chunk commits on its own and its tickets then leave the cache, have
+    their SLA deadlines updated and are published to the ticket feed, so a
+    failure part way through leaves the earlier chunks applied and announced.
+    Returns the changed rows in id order.
+    """
+    changed = []
+
+    async def apply(*chunk) -> List:
+        rows = await db.run_sync(ticket_service.update_tickets_chunk, ticket_update, *chunk)
+        if rows:
+            await cache.delete(*(ticket_key(row.id) for row in rows))
+            flights.forget_group(*TICKET_LIST_FLIGHTS)
+            for row in rows:
+                sla.observe(row)
+            if ticket_feed.wanted():
+                for row in rows:
+                    ticket_feed.publish_ticket("ticket.updated", TicketSchema.model_validate(row), row.previous_assignee_id)
+        changed.extend(rows)
+        return rows
+
+    if ids is not None:
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), chunk_size):
+            await apply(ids[start:start + chunk_size])
+        return changed
+    after_id = 0
+    while True:
+        rows = await apply(None, ticket_filter, after_id, chunk_size)
+        if len(rows) < chunk_size:
+            return changed
+        after_id = rows[-1].id
+
+async def claim_next_ticket(db: AsyncSession, agent_id: int, max_in_progress: int) -> Optional[TicketSchema]:
+    """Assign the highest-priority, oldest open ticket to an agent."""
+    db_ticket = await db.run_sync(ticket_service.claim_next_ticket, agent_id, max_in_progress)
+    if db_ticket is None:
+        return None
+    claimed = await cache_ticket(db_ticket)
+    ticket_feed.publish_ticket("ticket.updated", claimed)
+    return claimed
+
+async def get_ticket_detail(
+    db: AsyncSession, ticket_id: int, comment_limit: int = 100, comment_cursor: Optional[str] = None
+) -> Optional[TicketDetail]:
+    """Get a ticket with its requester, assignee and one page of comments.
+
+    Costs two queries however long the thread is: the ticket joined to both
+    users, then the comment page joined to its authors.
+    """
+    db_ticket = await db.run_sync(ticket_service.get_ticket_with_users, ticket_id)
+    if db_ticket is None:
+        return None
+    comments, next_cursor = await async_comment_service.get_comments_page(
+        db, ticket_id, limit=comment_limit, cursor=comment_cursor
+    )
+    return TicketDetail(
+        **TicketSchema.model_validate(db_ticket).model_dump(),
+        requester=UserSchema.model_validate(db_ticket.requester),
+        assignee=UserSchema.model_validate(db_ticket.assignee) if db_ticket.assignee else None,
+        suggested_reply=db_ticket.suggested_reply,
+        comments={"items": comments, "next_cursor": next_cursor},
+    )
+
+async def get_ticket_with_requester(db: AsyncSession, ticket_id: int):
+    """Get a ticket with requester information."""
+    return await db.run_sync(ticket_service.get_ticket_with_requester, ticket_id)
@@ -0,0 +1,103 @@
+"""
+Async user service used by the API routers.
+
+Each coroutine runs the matching function from ``user_service`` through
+``AsyncSession.run_sync``, so the query logic stays in ``user_service`` while
+the database I/O is awaited on the event loop.
+
+Single-user lookups read through the application cache and return ``User``
+schemas; writes refresh the cached entry once they have committed.
+"""
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from intelligagent.core.cache import cache
+from intelligagent.core.singleflight import flights
+from intelligagent.db.replicas import is_pinned, on_replica
+from intelligagent.db.models import User
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.schemas.user import User as UserSchema, UserCreate, UserUpdate, UserSort
+from intelligagent.services import user_service
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+def user_email_key(email: str) -> str:
+    return f"user:email:{email}"
+
+async def cache_user(db_user: User) -> UserSchema:
+    """Store a freshly committed user under its id and email keys."""
+    user = UserSchema.model_validate(db_user)
+    await cache.set(user_key(user.id), user)
+    # The email key holds only the id; the id entry stays authoritative
+    await cache.set(user_email_key(user.email), user.id)
+    flights.forget_group("users")  # Page reads begun before the write
+    return user
+
+async def create_user(db: AsyncSession, user: UserCreate) -> UserSchema:
+    """Create a new user in the database."""
+    db_user = await db.run_sync(user_service.create_user, user)
+    return await cache_user(db_user)
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[UserSchema]:
+    """Get a user by ID."""
+    async def load():
+        db_user = await db.run_sync(user_service.get_user, user_id)
+        return UserSchema.model_validate(db_user) if db_user else None
+    return await cache.get_or_load(
+        user_key(user_id), UserSchema, load, shared=not on_replica(db), coalesce=not is_pinned(db)
+    )
+
+async def get_user_version(db: AsyncSession, user_id: int) -> Optional[datetime]:
+    """Get a user's updated_at, from the cache when it holds the user."""
+    user = await cache.get(user_key(user_id), UserSchema)
+    if user is not None:
+        return user.updated_at
+    return await db.run_sync(user_service.get_user_version, user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[UserSchema]:
+    """Get a user by email address."""
+    loaded: List[UserSchema] = []
+    async def load():
+        db_user = await db.run_sync(user_service.get_user_by_email, email)
+        if db_user is None:
+            return None
+        loaded.append(UserSchema.model_validate(db_user))
+        # The email key only: a read must not fill the id entry with what a write may have replaced
+        return db_user.id
+    user_id = await cache.get_or_load(
+        user_email_key(email), int, load, shared=not on_replica(db), coalesce=not is_pinned(db)
+    )
+    if loaded:
+        return loaded[0]
+    if user_id is None:
+        return None
+    user = await get_user(db, user_id)
+    if user is not None and user.email == email:
+        return user
+    # The user has changed email since this key was written
+    await cache.delete(user_email_key(email))
+    db_user = await db.run_sync(user_service.get_user_by_email, email)
+    return UserSchema.model_validate(db_user) if db_user else None
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
+    """Get a list of users with pagination."""
+    return await db.run_sync(user_service.get_users, skip, limit)
+
+async def get_users_page(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: UserSort = UserSort.CREATED_AT,
+    order: SortOrder = SortOrder.DESC,
+    columns: Optional[Sequence] = None,
+) -> Tuple[List[User], Optional[str]]:
+    """Get a page of users, or of plain rows of ``columns``, and the cursor for the next page."""
+    return await db.run_sync(user_service.get_users_page, limit, cursor, sort, order, columns)
+
+async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate) -> Optional[UserSchema]:
+    """Update a user's information."""
+    db_user = await db.run_sync(user_service.update_user, user_id, user_update)
+    if db_user is None:
+        return None
+    return await cache_user(db_user)
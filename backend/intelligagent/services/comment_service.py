@@ -0,0 +1,82 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from intelligagent.core.metrics import count_queries
+from intelligagent.db.models import Comment, Ticket
+from intelligagent.schemas.comment import CommentCreate, CommentUpdate
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.services.pagination import keyset_page
+from intelligagent.services.ticket_service import UserNotFound, is_foreign_key_violation
+
+# Cursor sort name for comment threads
+COMMENT_SORT = "created_at"
+
+class TicketNotFound(LookupError):
+    """A comment write referenced a ticket that does not exist."""
+
+@count_queries
+def create_comment(db: Session, comment: CommentCreate) -> Comment:
+    """Create a comment with a single INSERT ... RETURNING.
+
+    Ticket and author are only looked up when the foreign key rejects the
+    insert, to tell ``TicketNotFound`` from ``UserNotFound``.
+    """
+    try:
+        db_comment = db.scalars(insert(Comment).values(**comment.dict()).returning(Comment)).one()
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if not is_foreign_key_violation(exc):
+            raise
+        if db.get(Ticket, comment.ticket_id) is None:
+            raise TicketNotFound("Ticket not found") from exc
+        raise UserNotFound("Author not found") from exc
+    return db_comment
+
+@count_queries
+def get_comment(db: Session, comment_id: int) -> Optional[Comment]:
+    """Get a comment by ID with its author."""
+    return db.query(Comment).options(joinedload(Comment.author)).filter(Comment.id == comment_id).first()
+
+@count_queries
+def get_comments_page(
+    db: Session,
+    ticket_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order: SortOrder = SortOrder.ASC,
+) -> Tuple[List[Comment], Optional[str]]:
+    """Get a page of a ticket's comments with their authors, in posting order.
+
+    Authors are joined into the page query, so a page costs one query.
+    """
+    query = db.query(Comment).options(joinedload(Comment.author)).filter(Comment.ticket_id == ticket_id)
+    return keyset_page(
+        query, Comment.created_at, Comment.id,
+        sort=COMMENT_SORT, order=order, limit=limit, cursor=cursor,
+    )
+
+@count_queries
+def update_comment(db: Session, comment_id: int, comment_update: CommentUpdate) -> Optional[Comment]:
+    """Update a comment with a single UPDATE ... RETURNING."""
+    update_data = comment_update.dict(exclude_unset=True)
+    if not update_data:
+        return get_comment(db, comment_id)
+    stmt = (
+        update(Comment)
+        .where(Comment.id == comment_id)
+        .values(**update_data)
+        .returning(Comment)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    db_comment = db.scalars(stmt).one_or_none()
+    db.commit()
+    return db_comment
+
+@count_queries
+def delete_comment(db: Session, comment_id: int) -> Optional[int]:
+    """Delete a comment; returns the id of its ticket, or ``None`` when it did not exist."""
+    ticket_id = db.scalar(delete(Comment).where(Comment.id == comment_id).returning(Comment.ticket_id))
+    db.commit()
+    return ticket_id
@@ -0,0 +1,158 @@
+"""
+Relay from the transactional outbox to the event broker.
+
+Runs as its own process (``python -m intelligagent.services.outbox_relay``),
+so publishing never touches the request path: a write only adds its outbox
+row, through a trigger, in its own transaction. Each round reads the oldest
+events, publishes them as one ordered batch and deletes them once the broker
+has accepted them. A crash or broker error before the delete commits leaves
+the batch in place to be published again, so delivery is at-least-once.
+
+Only one relay publishes at a time, since two interleaving batches could
+reorder a ticket's events. On Postgres each round holds a transaction-level
+advisory lock and spare relays skip their turn.
+"""
+import asyncio
+import logging
+import signal
+
+from sqlalchemy import bindparam, delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from intelligagent.core.config import settings
+from intelligagent.core.events import Event, create_broker
+from intelligagent.db.database import AsyncSessionLocal
+from intelligagent.db.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_try_advisory_xact_lock
+RELAY_LOCK_KEY = 0x0B7B0C5
+
+TRY_RELAY_LOCK = text("SELECT pg_try_advisory_xact_lock(:key)").bindparams(key=RELAY_LOCK_KEY)
+
+OLDEST_EVENTS = (
+    select(
+        OutboxEvent.id, OutboxEvent.aggregate_type, OutboxEvent.aggregate_id,
+        OutboxEvent.event_type, OutboxEvent.payload, OutboxEvent.created_at,
+    )
+    .order_by(OutboxEvent.id)
+    .limit(bindparam("batch_size"))
+)
+
+# Deleting by id rather than by range: on Postgres a lower id can still be
+# uncommitted when the batch is read, and must survive until it is published
+DELETE_EVENTS = delete(OutboxEvent).where(OutboxEvent.id.in_(bindparam("ids", expanding=True)))
+
+
+def to_event(row, topic_prefix: str) -> Event:
+    return Event(
+        event_id=row.id,
+        topic=f"{topic_prefix}.{row.aggregate_type}s",
+        key=str(row.aggregate_id),
+        event_type=row.event_type,
+        payload=row.payload,
+        occurred_at=row.created_at,
+    )
+
+
+async def relay_batch(db: AsyncSession, broker, batch_size: int, topic_prefix: str) -> int:
+    """Publish and delete up to ``batch_size`` of the oldest outbox events.
+
+    Returns the number of events published; 0 when the outbox is empty or
+    another relay holds the lock. Broker errors propagate with the batch left
+    in the outbox.
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql" and not await db.scalar(TRY_RELAY_LOCK):
+            return 0
+        rows = (await db.execute(OLDEST_EVENTS, {"batch_size": batch_size})).all()
+        if not rows:
+            return 0
+        await broker.publish([to_event(row, topic_prefix) for row in rows])
+        await db.execute(DELETE_EVENTS, {"ids": [row.id for row in rows]})
+        await db.commit()
+        return len(rows)
+    finally:
+        await db.rollback()
+
+
+class OutboxRelay:
+    """Drains the outbox into a broker until stopped."""
+
+    def __init__(
+        self,
+        session_factory,
+        broker,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        topic_prefix: str = settings.OUTBOX_TOPIC_PREFIX,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+        max_retry_delay: float = settings.OUTBOX_RETRY_MAX_DELAY,
+    ):
+        self.session_factory = session_factory
+        self.broker = broker
+        self.batch_size = batch_size
+        self.topic_prefix = topic_prefix
+        self.poll_interval = poll_interval
+        self.max_retry_delay = max_retry_delay
+        self.published = 0
+        self.failures = 0
+
+    async def relay_once(self) -> int:
+        """Publish one batch; see ``relay_batch``."""
+        async with self.session_factory() as db:
+            published = await relay_batch(db, self.broker, self.batch_size, self.topic_prefix)
+        self.published += published
+        return published
+
+    async def drain(self) -> int:
+        """Publish batches until the outbox is empty; returns the events published."""
+        total = 0
+        while published := await self.relay_once():
+            total += published
+        return total
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Relay until ``stop`` is set, backing off exponentially while the broker fails."""
+        retry_delay = 0.0
+        while not stop.is_set():
+            try:
+                published = await self.relay_once()
+            except Exception:
+                self.failures += 1
+                retry_delay = min(max(retry_delay * 2, self.poll_interval), self.max_retry_delay)
+                logger.exception("Publishing outbox events failed; retrying in %.1fs", retry_delay)
+                await _wait(stop, retry_delay)
+                continue
+            retry_delay = 0.0
+            # A full batch means more are waiting; otherwise poll again shortly
+            if published < self.batch_size:
+                await _wait(stop, self.poll_interval)
+
+
+async def _wait(stop: asyncio.Event, timeout: float) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    broker = create_broker()
+    relay = OutboxRelay(AsyncSessionLocal, broker)
+    logger.info("Relaying outbox events to the %s broker", settings.OUTBOX_BROKER)
+    try:
+        await relay.run(stop)
+    finally:
+        await broker.close()
+    logger.info("Outbox relay stopped after publishing %d events", relay.published)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Keyset (cursor) pagination helpers shared by the service layer.
+
+A page is ordered by ``(sort key, id)`` and the next page starts strictly after
+the last row of the previous one, so the database seeks straight to it through
+an index instead of counting past ``OFFSET`` rows. The cursor handed to clients
+is an opaque base64 token carrying the sort name plus the last row's key and id.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import Query
+
+from intelligagent.schemas.pagination import SortOrder
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor is malformed or belongs to a different sort."""
+
+
+def encode_cursor(sort: str, key: Any, row_id: int) -> str:
+    """Build an opaque cursor positioned after the row ``(key, row_id)``."""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    elif hasattr(key, "value"):  # Enum members
+        key = key.value
+    payload = json.dumps([sort, key, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, key_type: type) -> Tuple[Any, int]:
+    """Return the ``(key, id)`` position stored in a cursor for ``sort``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort or not isinstance(row_id, int):
+            raise InvalidCursor("Cursor does not match the requested sort order")
+        if key_type is datetime:
+            key = datetime.fromisoformat(key)
+        elif key_type is not str:
+            key = key_type(key)
+    except InvalidCursor:
+        raise
+    except (binascii.Error, TypeError, ValueError) as exc:
+        raise InvalidCursor("Malformed pagination cursor") from exc
+    return key, row_id
+
+
+def keyset_page(
+    query: Query,
+    sort_column,
+    id_column,
+    sort: str,
+    order: SortOrder = SortOrder.DESC,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page of ``query`` ordered by ``(sort_column, id_column)``.
+
+    Returns the rows and the cursor for the next page, or ``None`` on the last page.
+    """
+    if cursor:
+        key, last_id = decode_cursor(cursor, sort, sort_column.type.python_type)
+        position = tuple_(sort_column, id_column)
+        # Bind with the column's own type; inference drops dialect variants
+        after = tuple_(literal(key, sort_column.type), literal(last_id, id_column.type))
+        if order == SortOrder.ASC:
+            query = query.filter(position > after)
+        else:
+            query = query.filter(position < after)
+
+    if order == SortOrder.ASC:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    else:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+
+    # One extra row tells us whether another page exists without a COUNT
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, sort_column.key), getattr(last, id_column.key))
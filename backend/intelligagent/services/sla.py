@@ -0,0 +1,403 @@
+"""
+SLA deadlines of unclosed tickets, tracked in process.
+
+Each priority has a policy (SLA_FIRST_RESPONSE_MINUTES, SLA_RESOLUTION_MINUTES):
+within those times of its creation a ticket is due a first response, its
+first public comment by an agent or admin (``first_response_at``, stamped by
+a trigger on comments), and resolution, being closed.
+
+``SlaTracker`` keeps the pending deadlines in a heap, so the next one to pass
+is at the top and the deadlines due within a window are found by walking only
+the heap entries due before its end; ``GET /tickets/sla/at-risk`` never
+queries the tickets table. Entries made stale by later writes stay in the
+heap and are skipped, until the heap is rebuilt from the live deadlines.
+
+The tracker loads unclosed tickets in the background when the app starts,
+keyset-paginated by id. It is kept current by the ticket writes of its own
+process, which win over rows loaded concurrently, and every
+SLA_SYNC_INTERVAL seconds by reading the tickets changed since the last read
+through the updated_at index, which brings in other workers' writes and first
+responses.
+
+When a deadline passes the tracker calls its listeners and inserts the breach
+into ``sla_breaches``. Conflicts are ignored, so whichever worker sees a
+breach first records it, and a trigger turns the row into one
+``ticket.sla_breached`` outbox event.
+"""
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from intelligagent.core.config import settings
+from intelligagent.core.metrics import count_queries
+from intelligagent.db.database import AsyncSessionLocal
+from intelligagent.db.models import NOT_CLOSED_PREDICATE, SlaBreach, SlaKind, Ticket, TicketPriority, TicketStatus
+
+logger = logging.getLogger(__name__)
+
+# Changes are re-read this far back, for transactions that committed after a
+# later-stamped one and for clock differences between workers and database
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Seconds GET /tickets/sla/at-risk waits for the deadlines to load before a 503
+LOAD_WAIT = 1.0
+
+TRACKED_COLUMNS = (
+    Ticket.id, Ticket.priority, Ticket.status, Ticket.assignee_id, Ticket.created_at, Ticket.first_response_at,
+    Ticket.updated_at,
+)
+
+
+def utc(value: datetime) -> datetime:
+    """``value`` as an aware UTC datetime; naive values (SQLite) are taken to be UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(frozen=True)
+class SlaPolicy:
+    first_response: timedelta
+    resolution: timedelta
+
+
+def load_policies() -> Dict[TicketPriority, SlaPolicy]:
+    return {
+        priority: SlaPolicy(
+            first_response=timedelta(minutes=settings.SLA_FIRST_RESPONSE_MINUTES[priority.value]),
+            resolution=timedelta(minutes=settings.SLA_RESOLUTION_MINUTES[priority.value]),
+        )
+        for priority in TicketPriority
+    }
+
+
+@dataclass(frozen=True)
+class TrackedTicket:
+    """The fields of a ticket its deadlines depend on."""
+
+    id: int
+    priority: TicketPriority
+    status: TicketStatus
+    created_at: datetime
+    first_response_at: Optional[datetime] = None
+    assignee_id: Optional[int] = None
+
+    @classmethod
+    def of(cls, ticket) -> "TrackedTicket":
+        """From a model, schema or row with the same attribute names."""
+        return cls(
+            ticket.id, ticket.priority, ticket.status, utc(ticket.created_at),
+            utc(ticket.first_response_at) if ticket.first_response_at else None, ticket.assignee_id,
+        )
+
+
+@dataclass(frozen=True)
+class SlaDeadline:
+    ticket_id: int
+    kind: SlaKind
+    priority: TicketPriority
+    assignee_id: Optional[int]
+    deadline: datetime
+
+
+Key = Tuple[int, SlaKind]
+
+
+class SlaTracker:
+    """Pending and breached SLA deadlines of unclosed tickets.
+
+    Without a ``session_factory`` nothing is loaded, synced or recorded.
+    """
+
+    def __init__(
+        self,
+        policies: Dict[TicketPriority, SlaPolicy],
+        session_factory=None,
+        sync_interval: float = settings.SLA_SYNC_INTERVAL,
+        page_size: int = settings.SLA_LOAD_PAGE_SIZE,
+        clock: Callable[[], datetime] = utc_now,
+    ):
+        self.policies = policies
+        self.session_factory = session_factory
+        self.sync_interval = sync_interval
+        self.page_size = page_size
+        self.clock = clock
+        self._pending: Dict[Key, SlaDeadline] = {}
+        self._breached: Dict[Key, SlaDeadline] = {}
+        self._heap: List[Tuple[datetime, int, SlaKind]] = []
+        self._listeners: List[Callable[[SlaDeadline], None]] = []
+        self._written_while_loading: Optional[Set[int]] = set()  # None once loaded
+        self._loaded = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._sync_requested = False
+        self._synced_until: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.breaches = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded.is_set()
+
+    def subscribe(self, listener: Callable[[SlaDeadline], None]) -> None:
+        """Call ``listener`` with every deadline that passes."""
+        self._listeners.append(listener)
+
+    def deadlines(self, ticket: TrackedTicket) -> List[SlaDeadline]:
+        """The deadlines still to meet of ``ticket``."""
+        if ticket.status == TicketStatus.CLOSED:
+            return []
+        policy = self.policies[ticket.priority]
+        deadlines = [SlaDeadline(ticket.id, SlaKind.RESOLUTION, ticket.priority, ticket.assignee_id,
+                                 ticket.created_at + policy.resolution)]
+        if ticket.first_response_at is None:
+            deadlines.append(SlaDeadline(ticket.id, SlaKind.FIRST_RESPONSE, ticket.priority, ticket.assignee_id,
+                                         ticket.created_at + policy.first_response))
+        return deadlines
+
+    def observe(self, ticket: TrackedTicket) -> None:
+        """Take in a ticket just written by this process."""
+        if self._written_while_loading is not None:
+            self._written_while_loading.add(ticket.id)
+        self._apply(ticket)
+
+    def _apply(self, ticket: TrackedTicket) -> None:
+        previous = {}
+        for kind in SlaKind:
+            key = (ticket.id, kind)
+            previous[kind] = (self._pending.pop(key, None), self._breached.pop(key, None))
+        for entry in self.deadlines(ticket):
+            key = (ticket.id, entry.kind)
+            pending, breached = previous[entry.kind]
+            if breached is not None and breached.deadline == entry.deadline:
+                self._breached[key] = entry
+                continue
+            self._pending[key] = entry
+            if pending is None or pending.deadline != entry.deadline:
+                if not self._heap or entry.deadline < self._heap[0][0]:
+                    self._wake.set()  # Sooner than the loop is waiting for
+                heapq.heappush(self._heap, (entry.deadline, ticket.id, entry.kind))
+        if len(self._heap) > 2 * len(self._pending) + 1000:
+            self._heap = [(entry.deadline, entry.ticket_id, entry.kind) for entry in self._pending.values()]
+            heapq.heapify(self._heap)
+
+    def fire_due(self) -> List[SlaDeadline]:
+        """Move the deadlines that have passed to breached and notify the listeners."""
+        now = self.clock()
+        fired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, ticket_id, kind = heapq.heappop(self._heap)
+            entry = self._pending.get((ticket_id, kind))
+            if entry is None or entry.deadline != deadline:
+                continue  # Stale
+            del self._pending[(ticket_id, kind)]
+            self._breached[(ticket_id, kind)] = entry
+            fired.append(entry)
+        self.breaches += len(fired)
+        for entry in fired:
+            for listener in self._listeners:
+                try:
+                    listener(entry)
+                except Exception:
+                    logger.exception("SLA breach listener failed for %s", entry)
+        return fired
+
+    def at_risk(
+        self,
+        within: timedelta,
+        kind: Optional[SlaKind] = None,
+        assignee_id: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[SlaDeadline]:
+        """Breached deadlines and those due within ``within``, soonest first."""
+        horizon = self.clock() + within
+        found = list(self._breached.values())
+        # Heap order: a node due after the horizon has no descendant due before it
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            if index >= len(self._heap) or self._heap[index][0] > horizon:
+                continue
+            deadline, ticket_id, entry_kind = self._heap[index]
+            entry = self._pending.get((ticket_id, entry_kind))
+            if entry is not None and entry.deadline == deadline:
+                found.append(entry)
+            stack.extend((2 * index + 1, 2 * index + 2))
+        found = [
+            entry for entry in found
+            if (kind is None or entry.kind == kind) and (assignee_id is None or entry.assignee_id == assignee_id)
+        ]
+        return heapq.nsmallest(limit, found, key=lambda entry: entry.deadline)
+
+    async def load(self) -> None:
+        """Load the deadlines of every unclosed ticket, skipping tickets this process wrote meanwhile."""
+        self._synced_until = self.clock() - SYNC_OVERLAP
+        after_id = 0
+        while True:
+            async with self.session_factory() as db:
+                rows = (await db.execute(
+                    select(*TRACKED_COLUMNS)
+                    .where(Ticket.id > after_id, text(NOT_CLOSED_PREDICATE))
+                    .order_by(Ticket.id)
+                    .limit(self.page_size)
+                )).all()
+            for row in rows:
+                if row.id not in self._written_while_loading:
+                    self._apply(TrackedTicket.of(row))
+            if len(rows) < self.page_size:
+                break
+            after_id = rows[-1].id
+        self._written_while_loading = None
+        self._loaded.set()
+
+    async def sync(self) -> int:
+        """Take in the tickets changed since the last sync; returns how many were read."""
+        since = self._synced_until
+        self._synced_until = self.clock() - SYNC_OVERLAP
+        read = 0
+        after: Optional[Tuple[datetime, int]] = None
+        while True:
+            stmt = select(*TRACKED_COLUMNS).where(Ticket.updated_at >= since)
+            if after is not None:
+                stmt = stmt.where(or_(
+                    Ticket.updated_at > after[0], and_(Ticket.updated_at == after[0], Ticket.id > after[1])
+                ))
+            async with self.session_factory() as db:
+                rows = (await db.execute(stmt.order_by(Ticket.updated_at, Ticket.id).limit(self.page_size))).all()
+            for row in rows:
+                self._apply(TrackedTicket.of(row))
+            read += len(rows)
+            if len(rows) < self.page_size:
+                return read
+            after = (rows[-1].updated_at, rows[-1].id)
+
+    def request_sync(self) -> None:
+        """Sync now rather than at the next interval, e.g. after a write changed tickets through a trigger."""
+        self._sync_requested = True
+        self._wake.set()
+
+    async def _record(self, breaches: Sequence[SlaDeadline]) -> None:
+        async with self.session_factory() as db:
+            await db.run_sync(record_breaches, breaches)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.session_factory is None:
+            self._written_while_loading = None
+            self._loaded.set()
+        while not self.loaded:
+            try:
+                await self.load()
+            except Exception:
+                logger.exception("Loading SLA deadlines failed; retrying")
+                await asyncio.sleep(self.sync_interval)
+        next_sync = loop.time() + self.sync_interval
+        while True:
+            fired = self.fire_due()
+            if fired and self.session_factory is not None:
+                try:
+                    await self._record(fired)
+                except Exception:
+                    logger.exception("Recording %d SLA breaches failed", len(fired))
+            if self.session_factory is not None and (self._sync_requested or loop.time() >= next_sync):
+                self._sync_requested = False
+                next_sync = loop.time() + self.sync_interval
+                try:
+                    await self.sync()
+                except Exception:
+                    logger.exception("Syncing SLA deadlines failed")
+                continue  # The sync may have brought deadlines that are already due
+            timeout = next_sync - loop.time()
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - self.clock()).total_seconds())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(timeout, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start loading, then firing and syncing, on the running loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def ready(self, timeout: float = LOAD_WAIT) -> bool:
+        """Start if not started yet and wait up to ``timeout`` seconds for the deadlines to load."""
+        self.start()
+        try:
+            await asyncio.wait_for(self._loaded.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": len(self._pending), "breached": len(self._breached), "breaches_fired": self.breaches}
+
+
+@count_queries
+def record_breaches(db: Session, breaches: Sequence[SlaDeadline]) -> int:
+    """Insert breaches not recorded yet; returns how many were new."""
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(SlaBreach).values([
+        {"ticket_id": entry.ticket_id, "kind": entry.kind, "priority": entry.priority, "deadline": entry.deadline}
+        for entry in breaches
+    ]).on_conflict_do_nothing(index_elements=["ticket_id", "kind"])
+    recorded = db.execute(stmt).rowcount
+    db.commit()
+    return recorded
+
+
+def log_breach(entry: SlaDeadline) -> None:
+    logger.warning(
+        "Ticket %d breached its %s SLA (%s priority, due %s)",
+        entry.ticket_id, entry.kind.value, entry.priority.value, entry.deadline.isoformat(),
+    )
+
+
+def create_tracker(session_factory=AsyncSessionLocal) -> Optional[SlaTracker]:
+    """The application's SLA tracker, or ``None`` when SLA tracking is disabled."""
+    if not settings.SLA_ENABLED:
+        return None
+    tracker = SlaTracker(load_policies(), session_factory)
+    tracker.subscribe(log_breach)
+    return tracker
+
+
+# Global SLA tracker; started and closed by the app's lifespan
+tracker = create_tracker()
+
+
+def observe(ticket) -> None:
+    """Update the deadlines of a ticket this process just wrote, when SLA tracking is enabled."""
+    if tracker is not None:
+        tracker.observe(TrackedTicket.of(ticket))
+
+
+def observe_created(ticket_ids: Sequence[int], priorities: Sequence[TicketPriority]) -> None:
+    """Track tickets just inserted in bulk, as created now; the next sync corrects the timestamps."""
+    if tracker is not None:
+        now = utc_now()
+        for ticket_id, priority in zip(ticket_ids, priorities):
+            tracker.observe(TrackedTicket(ticket_id, priority, TicketStatus.OPEN, now))
+
+
+def request_sync() -> None:
+    if tracker is not None:
+        tracker.request_sync()
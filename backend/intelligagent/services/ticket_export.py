@@ -0,0 +1,124 @@
+"""
+Streaming ticket export for analytics.
+
+Tickets are read as plain Core rows through a server-side cursor
+(``AsyncSession.stream`` with ``yield_per``) and formatted chunk by chunk, so
+memory use depends on the chunk size rather than on the number of rows
+exported. Comments are fetched per chunk with one ``IN`` query when requested.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from intelligagent.db.models import Comment, Ticket, TicketPriority, TicketStatus
+
+TICKET_COLUMNS = [
+    Ticket.id, Ticket.title, Ticket.description, Ticket.status, Ticket.priority,
+    Ticket.requester_id, Ticket.assignee_id, Ticket.created_at, Ticket.updated_at,
+]
+COMMENT_COLUMNS = [Comment.id, Comment.body, Comment.is_internal, Comment.author_id, Comment.created_at]
+
+CSV_HEADER = [column.key for column in TICKET_COLUMNS]
+
+
+class ExportFormat(str, enum.Enum):
+    """Output formats for ticket exports."""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def export_statement(
+    status: Optional[TicketStatus] = None,
+    priority: Optional[TicketPriority] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Select:
+    """Select exported ticket columns in (created_at, id) order, optionally filtered."""
+    stmt = select(*TICKET_COLUMNS)
+    if status is not None:
+        stmt = stmt.where(Ticket.status == status)
+    if priority is not None:
+        stmt = stmt.where(Ticket.priority == priority)
+    if created_from is not None:
+        stmt = stmt.where(Ticket.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Ticket.created_at < created_to)
+    return stmt.order_by(Ticket.created_at, Ticket.id)
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _comments_by_ticket(db: AsyncSession, ticket_ids: List[int]) -> Dict[int, List[Dict]]:
+    comments: Dict[int, List[Dict]] = {ticket_id: [] for ticket_id in ticket_ids}
+    result = await db.execute(
+        select(Comment.ticket_id, *COMMENT_COLUMNS)
+        .where(Comment.ticket_id.in_(ticket_ids))
+        .order_by(Comment.ticket_id, Comment.created_at, Comment.id)
+    )
+    for row in result:
+        ticket_id, *values = row
+        comments[ticket_id].append(
+            {column.key: _plain(value) for column, value in zip(COMMENT_COLUMNS, values)}
+        )
+    return comments
+
+
+async def iter_ticket_export(
+    db: AsyncSession,
+    export_format: ExportFormat = ExportFormat.NDJSON,
+    include_comments: bool = False,
+    chunk_size: int = 1000,
+    **filters: Any,
+) -> AsyncIterator[str]:
+    """Yield the export as text chunks of up to ``chunk_size`` tickets each."""
+    if export_format == ExportFormat.CSV:
+        header = CSV_HEADER + (["comments"] if include_comments else [])
+        yield _csv_lines([header])
+
+    result = await db.stream(
+        export_statement(**filters),
+        execution_options={"yield_per": chunk_size},
+    )
+    async for partition in result.partitions():
+        rows = [[_plain(value) for value in row] for row in partition]
+        comments = None
+        if include_comments:
+            comments = await _comments_by_ticket(db, [row[0] for row in rows])
+
+        if export_format == ExportFormat.CSV:
+            if comments is not None:
+                for row in rows:
+                    row.append(json.dumps(comments[row[0]]))
+            yield _csv_lines(rows)
+        else:
+            lines = []
+            for row in rows:
+                record = dict(zip(CSV_HEADER, row))
+                if comments is not None:
+                    record["comments"] = comments[row[0]]
+                lines.append(json.dumps(record))
+            yield "\n".join(lines) + "\n"
+
+
+def _csv_lines(rows: List[List[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
@@ -0,0 +1,560 @@
+"""
+Real-time feed of ticket and comment changes, pushed to subscribers.
+
+``GET /tickets/stream`` (server-sent events) and its WebSocket equivalent
+subscribe to the feed of their worker, optionally filtered to tickets by id,
+requester or assignee; without filters a subscriber gets every change. The
+async ticket and comment services publish a ``FeedEvent`` once a write has
+committed: ``ticket.created``, ``ticket.updated``, ``comment.created``,
+``comment.updated`` and ``comment.deleted``, one per ticket for the bulk
+endpoints too.
+
+``FeedHub`` indexes subscriptions by the ids they filter on, so an event is
+matched by a few dict lookups however many connections are open, and an
+idle subscription is a small object and a parked coroutine: thousands of
+idle connections cost a worker little more than their sockets.
+
+A subscriber that falls behind does not hold back the others. Each
+``Subscription`` keeps its undelivered events in a bounded ordered map keyed
+by ticket or comment, so a newer version of a ticket replaces the pending
+one instead of queueing behind it, and a subscriber holding ``buffer_size``
+distinct changes has them dropped for one ``feed.reset`` event, telling the
+client to refetch what it shows.
+
+With a ``fanout`` (Redis pub/sub, or ``InMemoryFanout`` between feeds in one
+process) events are delivered locally at once and published in the
+background in batches, and each worker delivers the events published by
+the others. A worker whose outgoing queue overflows sends ``feed.reset`` to
+the others in place of what it dropped. Events are not stored: a subscriber only gets changes made while
+it is connected, and after losing the fanout connection every subscriber is
+sent ``feed.reset``.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+from functools import cached_property
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from intelligagent.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to reach the fanout after it failed
+RETRY_INTERVAL = 1.0
+
+# Seconds the fanout listener waits for a message before checking the connection
+LISTEN_TIMEOUT = 1.0
+
+
+def _encode(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+@dataclass(frozen=True)
+class FeedEvent:
+    """A committed change, with the ids subscriptions are matched on."""
+
+    type: str
+    key: str  # Versions of the same ticket or comment share a key; the newest replaces older undelivered ones
+    ticket_id: int
+    requester_id: Optional[int]
+    assignee_ids: Tuple[int, ...]  # The assignee, and the previous one when the ticket was reassigned
+    data: str  # JSON of the ticket or comment
+
+    @classmethod
+    def create(
+        cls, event_type: str, key: str, ticket_id: int, requester_id: Optional[int],
+        assignee_ids: Iterable[Optional[int]], data,
+    ) -> "FeedEvent":
+        assignees = tuple(dict.fromkeys(assignee for assignee in assignee_ids if assignee is not None))
+        return cls(event_type, key, ticket_id, requester_id, assignees, _encode(data))
+
+    @cached_property
+    def message(self) -> str:
+        """The JSON sent to clients, encoded once for all of them."""
+        return f'{{"type":{_encode(self.type)},"ticket_id":{self.ticket_id},"data":{self.data}}}'
+
+    def wire(self, origin: str) -> bytes:
+        return _encode([origin, self.type, self.key, self.ticket_id, self.requester_id, self.assignee_ids,
+                        self.data]).encode()
+
+    @classmethod
+    def from_wire(cls, data: bytes) -> Tuple[str, "FeedEvent"]:
+        origin, event_type, key, ticket_id, requester_id, assignee_ids, event_data = json.loads(data)
+        return origin, cls(event_type, key, ticket_id, requester_id, tuple(assignee_ids), event_data)
+
+
+def ticket_event(event_type: str, ticket, previous_assignee_id: Optional[int] = None) -> FeedEvent:
+    """An event carrying ``ticket`` (a ``Ticket`` schema) as it is now."""
+    return FeedEvent.create(
+        event_type, f"ticket:{ticket.id}", ticket.id, ticket.requester_id,
+        (ticket.assignee_id, previous_assignee_id), ticket.model_dump(mode="json"),
+    )
+
+
+def comment_event(event_type: str, comment_id: int, ticket, comment=None) -> FeedEvent:
+    """An event about a comment on ``ticket``, carrying ``comment`` (a ``Comment`` schema) unless it was deleted."""
+    data = comment.model_dump(mode="json") if comment is not None else {"id": comment_id}
+    return FeedEvent.create(
+        event_type, f"comment:{comment_id}", ticket.id, ticket.requester_id, (ticket.assignee_id,), data,
+    )
+
+
+def control_event(event_type: str, **data) -> FeedEvent:
+    """An event about the stream itself rather than a ticket, sent to a subscriber whatever its filters."""
+    return FeedEvent(event_type, event_type, 0, None, (), _encode(data))
+
+
+# Sent in place of changes a subscriber was too slow to take, and after a fanout outage
+RESET = control_event("feed.reset")
+
+
+class Subscription:
+    """One subscriber's filters and undelivered events.
+
+    ``ticket_ids``, ``requester_ids`` and ``assignee_ids`` each select the
+    tickets with one of those ids; an event is delivered when any filter
+    matches it, or always when there are no filters.
+    """
+
+    __slots__ = ("ticket_ids", "requester_ids", "assignee_ids", "buffer_size", "closed", "delivered",
+                 "coalesced", "resets", "_pending", "_ready")
+
+    def __init__(
+        self,
+        ticket_ids: Iterable[int] = (),
+        requester_ids: Iterable[int] = (),
+        assignee_ids: Iterable[int] = (),
+        buffer_size: int = 256,
+    ):
+        self.ticket_ids = frozenset(ticket_ids)
+        self.requester_ids = frozenset(requester_ids)
+        self.assignee_ids = frozenset(assignee_ids)
+        self.buffer_size = buffer_size
+        self.closed = False
+        self.delivered = 0
+        self.coalesced = 0
+        self.resets = 0
+        self._pending: "OrderedDict[str, FeedEvent]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.ticket_ids or self.requester_ids or self.assignee_ids)
+
+    def filters(self) -> Dict[str, List[int]]:
+        return {
+            "ticket_id": sorted(self.ticket_ids),
+            "requester_id": sorted(self.requester_ids),
+            "assignee_id": sorted(self.assignee_ids),
+        }
+
+    def put(self, event: FeedEvent) -> None:
+        """Queue ``event``, replacing an undelivered version of the same ticket or comment."""
+        if self.closed:
+            return
+        pending = self._pending
+        previous = pending.get(event.key)
+        if previous is not None:
+            self.coalesced += 1
+            if previous.type.endswith(".created") and not event.type.endswith(".deleted"):
+                # Still new to this subscriber: announce the latest version as created
+                event = replace(event, type=previous.type)
+            pending[event.key] = event  # Keeps the place of the version it replaces
+        elif RESET.key in pending:
+            return  # Already told to refetch, which covers this change
+        elif len(pending) >= self.buffer_size:
+            pending.clear()
+            pending[RESET.key] = RESET
+            self.resets += 1
+        else:
+            pending[event.key] = event
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> List[FeedEvent]:
+        """Wait up to ``timeout`` seconds for events and take all of them, oldest first.
+
+        Returns an empty list when the wait times out and once the subscription is closed.
+        """
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        if self.closed:
+            return []
+        events = list(self._pending.values())
+        self._pending.clear()
+        self.delivered += len(events)
+        return events
+
+    def close(self) -> None:
+        """End the subscription: a waiting ``get`` returns and later events are dropped."""
+        self.closed = True
+        self._pending.clear()
+        self._ready.set()
+
+
+class FeedHub:
+    """The subscriptions of one process, indexed by the ids they filter on."""
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._unfiltered: Set[Subscription] = set()
+        self._by_ticket: Dict[int, Set[Subscription]] = {}
+        self._by_requester: Dict[int, Set[Subscription]] = {}
+        self._by_assignee: Dict[int, Set[Subscription]] = {}
+        self.events = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def _indexes(self, subscription: Subscription):
+        yield self._by_ticket, subscription.ticket_ids
+        yield self._by_requester, subscription.requester_ids
+        yield self._by_assignee, subscription.assignee_ids
+
+    def add(self, subscription: Subscription) -> None:
+        self._subscriptions.add(subscription)
+        if not subscription.filtered:
+            self._unfiltered.add(subscription)
+        for index, ids in self._indexes(subscription):
+            for key in ids:
+                index.setdefault(key, set()).add(subscription)
+
+    def remove(self, subscription: Subscription) -> None:
+        """Drop and close ``subscription``; removing it twice is harmless."""
+        subscription.close()
+        if subscription not in self._subscriptions:
+            return
+        self._subscriptions.discard(subscription)
+        self._unfiltered.discard(subscription)
+        for index, ids in self._indexes(subscription):
+            for key in ids:
+                subscribers = index[key]
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del index[key]
+
+    def matching(self, event: FeedEvent) -> Set[Subscription]:
+        matched = set(self._unfiltered)
+        matched.update(self._by_ticket.get(event.ticket_id, ()))
+        if event.requester_id is not None:
+            matched.update(self._by_requester.get(event.requester_id, ()))
+        for assignee_id in event.assignee_ids:
+            matched.update(self._by_assignee.get(assignee_id, ()))
+        return matched
+
+    def deliver(self, event: FeedEvent) -> int:
+        """Queue ``event`` for every matching subscription; returns how many there were."""
+        self.events += 1
+        matched = self.matching(event)
+        for subscription in matched:
+            subscription.put(event)
+        return len(matched)
+
+    def broadcast(self, event: FeedEvent) -> None:
+        """Queue ``event`` for every subscription, whatever its filters."""
+        for subscription in self._subscriptions:
+            subscription.put(event)
+
+    def close(self) -> None:
+        for subscription in list(self._subscriptions):
+            self.remove(subscription)
+
+
+async def _iter_queue(queue: asyncio.Queue, listeners: List[asyncio.Queue]) -> AsyncIterator[bytes]:
+    try:
+        while True:
+            yield await queue.get()
+    finally:
+        listeners.remove(queue)
+
+
+class InMemoryFanout:
+    """Fans messages out between feeds of one process; for tests and single-process development."""
+
+    def __init__(self):
+        self._listeners: Dict[str, List[asyncio.Queue]] = {}
+        self.published = 0
+
+    async def publish(self, channel: str, messages: Sequence[bytes]) -> None:
+        self.published += len(messages)
+        for queue in self._listeners.get(channel, ()):
+            for message in messages:
+                queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """Start receiving what is published on ``channel``; returns the messages as they come."""
+        queue: asyncio.Queue = asyncio.Queue()
+        listeners = self._listeners.setdefault(channel, [])
+        listeners.append(queue)
+        return _iter_queue(queue, listeners)
+
+    async def close(self) -> None:
+        pass
+
+
+async def _iter_pubsub(pubsub) -> AsyncIterator[bytes]:
+    try:
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_TIMEOUT)
+            if message is not None:
+                yield message["data"]
+    finally:
+        await pubsub.aclose()
+
+
+class RedisFanout:
+    """Fans messages out between workers through a Redis pub/sub channel.
+
+    Publishing uses a client with short timeouts; listening uses a connection
+    of its own, which polls so that a dead connection is noticed.
+    """
+
+    def __init__(self, url: str, timeout: float):
+        self.publisher = redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.listener = redis.from_url(url, socket_connect_timeout=timeout, health_check_interval=30)
+
+    async def publish(self, channel: str, messages: Sequence[bytes]) -> None:
+        async with self.publisher.pipeline(transaction=False) as pipe:
+            for message in messages:
+                pipe.publish(channel, message)
+            await pipe.execute()
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """Subscribe to ``channel``; returns the messages as they come."""
+        pubsub = self.listener.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel)
+        except BaseException:
+            await pubsub.aclose()
+            raise
+        return _iter_pubsub(pubsub)
+
+    async def close(self) -> None:
+        await self.publisher.aclose()
+        await self.listener.aclose()
+
+
+class TicketFeed:
+    """A process's feed: local subscribers, and the fanout sharing events with other workers."""
+
+    def __init__(
+        self,
+        fanout=None,
+        channel: str = "intelligagent:ticket-feed",
+        buffer_size: int = 256,
+        max_subscribers: int = 20_000,
+        publish_queue_size: int = 10_000,
+        publish_batch_size: int = 100,
+    ):
+        self.fanout = fanout
+        self.channel = channel
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.publish_queue_size = publish_queue_size
+        self.publish_batch_size = publish_batch_size
+        self.hub = FeedHub()
+        self.origin = uuid.uuid4().hex  # Tells this feed's messages apart when they come back from the fanout
+        self._outgoing: Deque[bytes] = deque()
+        self._outgoing_ready = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+
+    @property
+    def wanted(self) -> bool:
+        """Whether an event published now may reach a subscriber, here or in another worker."""
+        return self.fanout is not None or self.hub.subscribers > 0
+
+    @property
+    def full(self) -> bool:
+        return self.hub.subscribers >= self.max_subscribers
+
+    def subscribe(self, ticket_ids=(), requester_ids=(), assignee_ids=()) -> Subscription:
+        subscription = Subscription(ticket_ids, requester_ids, assignee_ids, self.buffer_size)
+        self.hub.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.hub.remove(subscription)
+
+    def publish(self, event: FeedEvent) -> None:
+        """Deliver ``event`` to this process's subscribers, and queue it for the other workers."""
+        self.published += 1
+        self.hub.deliver(event)
+        if self.fanout is None:
+            return
+        if len(self._outgoing) >= self.publish_queue_size:
+            # Too far behind to catch up: have the other workers' subscribers refetch instead
+            self.dropped += len(self._outgoing) + 1
+            self._outgoing.clear()
+            event = RESET
+        self._outgoing.append(event.wire(self.origin))
+        self._outgoing_ready.set()
+
+    async def flush(self) -> int:
+        """Publish the queued events to the fanout; returns how many were sent."""
+        sent = 0
+        while self._outgoing:
+            batch = [self._outgoing.popleft() for _ in range(min(self.publish_batch_size, len(self._outgoing)))]
+            await self.fanout.publish(self.channel, batch)
+            sent += len(batch)
+        return sent
+
+    async def _run_publisher(self) -> None:
+        while True:
+            await self._outgoing_ready.wait()
+            self._outgoing_ready.clear()
+            try:
+                await self.flush()
+            except (RedisError, OSError) as exc:
+                self.errors += 1
+                self.dropped += len(self._outgoing)
+                self._outgoing.clear()  # Other workers miss these; their subscribers are reset on reconnect
+                logger.warning("Publishing ticket feed events failed: %s", exc)
+                await asyncio.sleep(RETRY_INTERVAL)
+
+    def _receive(self, data: bytes) -> None:
+        try:
+            origin, event = FeedEvent.from_wire(data)
+        except (ValueError, TypeError):
+            logger.warning("Ignoring a malformed ticket feed message")
+            return
+        if origin == self.origin:
+            return
+        self.received += 1
+        if event.type == RESET.type:
+            self.hub.broadcast(event)
+        else:
+            self.hub.deliver(event)
+
+    async def _run_listener(self) -> None:
+        missed = False
+        while True:
+            try:
+                messages = await self.fanout.subscribe(self.channel)
+                try:
+                    if missed:
+                        # Changes made elsewhere while disconnected never arrive: have clients refetch
+                        self.hub.broadcast(RESET)
+                        missed = False
+                    async for data in messages:
+                        self._receive(data)
+                finally:
+                    await messages.aclose()
+            except (RedisError, OSError) as exc:
+                self.errors += 1
+                missed = True
+                logger.warning("Ticket feed lost its fanout connection: %s", exc)
+                await asyncio.sleep(RETRY_INTERVAL)
+
+    def start(self) -> None:
+        """Start publishing to and listening on the fanout, on the running loop."""
+        if self.fanout is not None and not self._tasks:
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._run_publisher()), loop.create_task(self._run_listener())]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self.hub.close()
+        if self.fanout is not None:
+            await self.fanout.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": self.hub.subscribers,
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+def _sse(event: FeedEvent) -> bytes:
+    return f"event: {event.type}\ndata: {event.message}\n\n".encode()
+
+
+async def iter_sse(
+    feed: TicketFeed,
+    ticket_ids: Iterable[int] = (),
+    requester_ids: Iterable[int] = (),
+    assignee_ids: Iterable[int] = (),
+    max_seconds: float = 3600.0,
+    keepalive: float = 15.0,
+) -> AsyncIterator[bytes]:
+    """Server-sent events for a new subscription for up to ``max_seconds``, then the stream ends.
+
+    Subscribes on first iteration and starts with ``feed.ready``; a comment
+    line follows ``keepalive`` idle seconds so proxies keep the connection
+    open. Unsubscribes when the stream ends or the client goes away.
+    """
+    deadline = time.monotonic() + max_seconds
+    subscription = feed.subscribe(ticket_ids, requester_ids, assignee_ids)
+    try:
+        yield b"retry: 3000\n" + _sse(control_event("feed.ready", filters=subscription.filters()))
+        while not subscription.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = await subscription.get(min(keepalive, remaining))
+            if events:
+                yield b"".join(_sse(event) for event in events)
+            elif not subscription.closed and deadline > time.monotonic():
+                yield b": keepalive\n\n"
+    finally:
+        feed.unsubscribe(subscription)
+
+
+def create_feed() -> Optional[TicketFeed]:
+    """The application's ticket feed, or ``None`` when the feed is disabled."""
+    if not settings.FEED_ENABLED:
+        return None
+    fanout = None
+    if settings.FEED_BACKEND == "redis":
+        fanout = RedisFanout(settings.REDIS_URL, settings.CACHE_REDIS_TIMEOUT)
+    return TicketFeed(
+        fanout,
+        channel=settings.FEED_CHANNEL,
+        buffer_size=settings.FEED_BUFFER_SIZE,
+        max_subscribers=settings.FEED_MAX_SUBSCRIBERS,
+    )
+
+
+# Global ticket feed; started and closed by the app's lifespan
+feed = create_feed()
+
+
+def wanted() -> bool:
+    """Whether publishing is worth a lookup now: the feed is enabled and someone may be listening."""
+    return feed is not None and feed.wanted
+
+
+def publish(event: FeedEvent) -> None:
+    if feed is not None:
+        feed.publish(event)
+
+
+def publish_ticket(event_type: str, ticket, previous_assignee_id: Optional[int] = None) -> None:
+    """Publish a change to ``ticket`` (a ``Ticket`` schema) when the feed is enabled and may have subscribers."""
+    if wanted():
+        feed.publish(ticket_event(event_type, ticket, previous_assignee_id))
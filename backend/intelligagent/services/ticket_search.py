@@ -0,0 +1,99 @@
+"""
+Ranked full-text search over ticket titles, descriptions and comment bodies.
+
+Postgres matches the generated ``search_vector`` columns through their GIN
+indexes and ranks with ``ts_rank``; SQLite matches the FTS5 tables and ranks
+with ``bm25``. Either way a ticket's score is the sum of its own match and its
+matching comments (weighted lower), and the ranked ids are joined back to
+``tickets`` in the same statement.
+"""
+import re
+from typing import List
+
+from sqlalchemy import Float, Integer, select, text
+from sqlalchemy.orm import Session
+
+from intelligagent.core.metrics import count_queries
+from intelligagent.db.models import Ticket
+
+# Comment matches count for less than a match on the ticket itself
+COMMENT_WEIGHT = 0.5
+
+# Each source contributes at most limit * CANDIDATE_FACTOR of its best
+# matches, so ranking a common term sorts a bounded set rather than every
+# matching ticket and comment
+CANDIDATE_FACTOR = 5
+
+# bm25 column weights for tickets_fts(title, description)
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+POSTGRES_RANKED = f"""
+    SELECT ticket_id, sum(score) AS score FROM (
+        (SELECT t.id AS ticket_id, ts_rank(t.search_vector, q.query) AS score
+         FROM tickets t, plainto_tsquery('english', :q) AS q(query)
+         WHERE t.search_vector @@ q.query
+         ORDER BY score DESC LIMIT :candidates)
+        UNION ALL
+        (SELECT c.ticket_id, ts_rank(c.search_vector, q.query) * {COMMENT_WEIGHT} AS score
+         FROM comments c, plainto_tsquery('english', :q) AS q(query)
+         WHERE c.search_vector @@ q.query
+         ORDER BY score DESC LIMIT :candidates)
+    ) AS matches
+    GROUP BY ticket_id
+"""
+
+# bm25 is lower for better matches, so it is negated into a score
+SQLITE_RANKED = f"""
+    SELECT ticket_id, sum(score) AS score FROM (
+        SELECT * FROM (
+            SELECT rowid AS ticket_id, -bm25(tickets_fts, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score
+            FROM tickets_fts WHERE tickets_fts MATCH :q
+            ORDER BY score DESC LIMIT :candidates
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT c.ticket_id, -bm25(comments_fts) * {COMMENT_WEIGHT} AS score
+            FROM comments_fts JOIN comments c ON c.id = comments_fts.rowid
+            WHERE comments_fts MATCH :q
+            ORDER BY score DESC LIMIT :candidates
+        )
+    )
+    GROUP BY ticket_id
+"""
+
+_WORD = re.compile(r"\w+")
+
+
+def fts5_query(q: str) -> str:
+    """Turn free text into an FTS5 query requiring every word.
+
+    Each word is quoted so FTS5 operators and punctuation in user input are
+    matched literally instead of parsed.
+    """
+    return " ".join(f'"{word}"' for word in _WORD.findall(q))
+
+
+@count_queries
+def search_tickets(db: Session, q: str, limit: int = 20) -> List[Ticket]:
+    """Get the ``limit`` tickets best matching ``q``, most relevant first."""
+    if db.get_bind().dialect.name == "sqlite":
+        ranked_sql, q = SQLITE_RANKED, fts5_query(q)
+    else:
+        ranked_sql = POSTGRES_RANKED
+    if not q.strip():
+        return []
+
+    ranked = (
+        text(ranked_sql)
+        .bindparams(q=q, candidates=limit * CANDIDATE_FACTOR)
+        .columns(ticket_id=Integer, score=Float)
+        .subquery("ranked")
+    )
+    stmt = (
+        select(Ticket)
+        .join(ranked, Ticket.id == ranked.c.ticket_id)
+        .order_by(ranked.c.score.desc(), Ticket.id)
+        .limit(limit)
+    )
+    return list(db.scalars(stmt))
@@ -1,50 +1,477 @@
-from sqlalchemy.orm import Session
-from intelligagent.db.models import Ticket, User
-from intelligagent.schemas.ticket import TicketCreate, TicketUpdate
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import bindparam, case, func, insert, literal, literal_column, select, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import Session, aliased, joinedload
+from intelligagent.core.metrics import count_queries
+from intelligagent.db.models import DISPATCH_RANK, Ticket, User, TicketPriority, TicketStatus
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.schemas.ticket import (
+    Ticket as TicketSchema, TicketCreate, TicketFilter, TicketTriage, TicketUpdate, TicketSort,
+)
+from intelligagent.services.pagination import decode_cursor, encode_cursor, keyset_page
 
+TICKET_SORT_COLUMNS = {
+    TicketSort.CREATED_AT: Ticket.created_at,
+    TicketSort.UPDATED_AT: Ticket.updated_at,
+}
+
+# Lowest to highest; priority pages walk one level at a time
+PRIORITY_LEVELS = [TicketPriority.LOW, TicketPriority.MEDIUM, TicketPriority.HIGH]
+
+# Matches the partial index predicate (models.NOT_CLOSED_PREDICATE); the value
+# is rendered inline so the planner can prove the index applies
+NOT_CLOSED = Ticket.status != literal(TicketStatus.CLOSED, Ticket.status.type, literal_execute=True)
+
+def _status_literal(status: TicketStatus):
+    # Inlined like NOT_CLOSED, for the partial index predicates on status
+    return literal(status, Ticket.status.type, literal_execute=True)
+
+# What callers of ticket writes need back: the fields of the Ticket schema, for
+# the response, cache, feed, SLA deadlines and the similar ticket index (not
+# suggested_reply)
+TICKET_RETURNING = tuple(getattr(Ticket, name) for name in TicketSchema.model_fields)
+
+# SQLSTATE for foreign_key_violation
+FOREIGN_KEY_VIOLATION = "23503"
+
+class UserNotFound(LookupError):
+    """A ticket write referenced a user that does not exist."""
+
+class WorkloadCapReached(Exception):
+    """An agent already holds the maximum number of in-progress tickets."""
+
+def is_foreign_key_violation(exc: IntegrityError) -> bool:
+    code = getattr(exc.orig, "sqlstate", None) or getattr(exc.orig, "pgcode", None)
+    if code is not None:
+        return code == FOREIGN_KEY_VIOLATION
+    return "FOREIGN KEY constraint failed" in str(exc.orig)
+
+@count_queries
 def create_ticket(db: Session, ticket: TicketCreate) -> Ticket:
-    """Create a new ticket in the database."""
-    db_ticket = Ticket(
-        title=ticket.title,
-        description=ticket.description,
-        priority=ticket.priority,
-        requester_id=ticket.requester_id
-    )
-    db.add(db_ticket)
-    db.commit()
-    db.refresh(db_ticket)
+    """Create a new ticket with a single INSERT ... RETURNING.
+
+    The requester is not looked up first: a missing one violates the foreign
+    key and is raised as ``UserNotFound``.
+    """
+    try:
+        db_ticket = db.scalars(insert(Ticket).values(**_ticket_row(ticket)).returning(Ticket)).one()
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if is_foreign_key_violation(exc):
+            raise UserNotFound("Requester not found") from exc
+        raise
     return db_ticket
 
+@count_queries
+def create_tickets_bulk(
+    db: Session,
+    tickets: Sequence[TicketCreate],
+    known_requesters: Optional[Set[int]] = None,
+    created_rows: Optional[List] = None,
+) -> List[Tuple[Optional[int], Optional[str]]]:
+    """Insert many tickets with batched multi-row INSERT ... RETURNING.
+
+    Requesters are checked with one ``IN`` query for the ids not already in
+    ``known_requesters``, which is updated so callers streaming several
+    batches don't look the same requester up twice. The inserted rows, as
+    ``TICKET_RETURNING`` in id order, are appended to ``created_rows`` when it
+    is given. Returns ``(id, None)`` or ``(None, error)`` for each input
+    ticket, in input order.
+    """
+    known = known_requesters if known_requesters is not None else set()
+    unknown = {ticket.requester_id for ticket in tickets} - known
+    if unknown:
+        known.update(db.scalars(select(User.id).where(User.id.in_(unknown))))
+
+    results: List[Tuple[Optional[int], Optional[str]]] = [(None, "Requester not found")] * len(tickets)
+    positions = [i for i, ticket in enumerate(tickets) if ticket.requester_id in known]
+    rows = [_ticket_row(tickets[i]) for i in positions]
+    if not rows:
+        return results
+
+    try:
+        inserted = _insert_returning(db, rows)
+        db.commit()
+    except DBAPIError:
+        # Isolate the offending rows instead of failing the whole batch
+        db.rollback()
+        inserted = [_insert_ticket_row(db, row) for row in rows]
+
+    for position, (row, error) in zip(positions, inserted):
+        results[position] = (row.id, None) if row is not None else (None, error)
+    if created_rows is not None:
+        created_rows.extend(sorted((row for row, _ in inserted if row is not None), key=lambda row: row.id))
+    return results
+
+def _ticket_row(ticket: TicketCreate) -> Dict:
+    return {
+        "title": ticket.title,
+        "description": ticket.description,
+        "priority": ticket.priority,
+        "requester_id": ticket.requester_id,
+    }
+
+def _insert_returning(db: Session, rows: List[Dict]) -> List[Tuple[Any, None]]:
+    """Insert ``rows`` in multi-row statements and return ``(TICKET_RETURNING row, None)`` in row order."""
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLAlchemy can't batch order-correlated RETURNING on SQLite. SQLite
+        # numbers the rows of one statement in VALUES order while holding the
+        # write lock, so ascending ids line up with the input rows.
+        inserted = sorted(db.execute(insert(Ticket).returning(*TICKET_RETURNING), rows).all(), key=lambda row: row.id)
+    else:
+        inserted = db.execute(insert(Ticket).returning(*TICKET_RETURNING, sort_by_parameter_order=True), rows).all()
+    return [(row, None) for row in inserted]
+
+def _insert_ticket_row(db: Session, row: Dict) -> Tuple[Any, Optional[str]]:
+    try:
+        inserted = db.execute(insert(Ticket).returning(*TICKET_RETURNING), row).one()
+        db.commit()
+        return inserted, None
+    except DBAPIError as exc:
+        db.rollback()
+        return None, str(exc.orig)
+
+@count_queries
 def get_ticket(db: Session, ticket_id: int) -> Ticket:
     """Get a ticket by ID."""
     return db.query(Ticket).filter(Ticket.id == ticket_id).first()
 
+@count_queries
+def get_tickets_by_ids(db: Session, ticket_ids: Sequence[int]) -> List[Ticket]:
+    """Get the tickets with the given IDs, in no particular order."""
+    if not ticket_ids:
+        return []
+    return db.query(Ticket).filter(Ticket.id.in_(ticket_ids)).all()
+
+@count_queries
 def get_tickets(db: Session, skip: int = 0, limit: int = 100):
-    """Get a list of tickets with pagination."""
-    return db.query(Ticket).offset(skip).limit(limit).all()
+    """Get a list of tickets with offset pagination."""
+    return db.query(Ticket).order_by(Ticket.id).offset(skip).limit(limit).all()
+
+@count_queries
+def get_tickets_page(
+    db: Session,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: TicketSort = TicketSort.CREATED_AT,
+    order: SortOrder = SortOrder.DESC,
+    columns: Optional[Sequence] = None,
+) -> Tuple[List[Ticket], Optional[str]]:
+    """Get a page of tickets and the cursor for the next page.
+
+    Pass ``columns`` to get plain rows of those columns instead of ``Ticket``
+    objects; they must include the sort key and id.
+    """
+    entities = columns or [Ticket]
+    if sort == TicketSort.PRIORITY:
+        return _get_tickets_page_by_priority(db, limit, cursor, order, entities)
+    return keyset_page(
+        db.query(*entities), TICKET_SORT_COLUMNS[sort], Ticket.id,
+        sort=sort.value, order=order, limit=limit, cursor=cursor,
+    )
+
+def _get_tickets_page_by_priority(
+    db: Session, limit: int, cursor: Optional[str], order: SortOrder, entities: Sequence
+) -> Tuple[List[Ticket], Optional[str]]:
+    """Page through tickets by priority level, then id.
 
+    The enum is stored by name, so its collation is not its rank. Each level is
+    read as its own range on ``(priority, id)``, moving on to the next level
+    only when the current one runs out.
+    """
+    levels = PRIORITY_LEVELS if order == SortOrder.ASC else PRIORITY_LEVELS[::-1]
+    id_order = Ticket.id.asc() if order == SortOrder.ASC else Ticket.id.desc()
+    start, last_id = 0, None
+    if cursor:
+        level, last_id = decode_cursor(cursor, TicketSort.PRIORITY.value, TicketPriority)
+        start = levels.index(level)
+
+    tickets: List[Ticket] = []
+    for level in levels[start:]:
+        query = db.query(*entities).filter(Ticket.priority == level)
+        if last_id is not None:
+            query = query.filter(Ticket.id > last_id if order == SortOrder.ASC else Ticket.id < last_id)
+            last_id = None  # Only the cursor's own level resumes mid-range
+        tickets.extend(query.order_by(id_order).limit(limit + 1 - len(tickets)).all())
+        if len(tickets) > limit:
+            break
+
+    if len(tickets) <= limit:
+        return tickets, None
+    tickets = tickets[:limit]
+    last = tickets[-1]
+    return tickets, encode_cursor(TicketSort.PRIORITY.value, last.priority, last.id)
+
+@count_queries
 def get_tickets_by_user(db: Session, user_id: int):
-    """Get all tickets created by a specific user."""
-    return db.query(Ticket).filter(Ticket.requester_id == user_id).all()
+    """Get all tickets created by a specific user, newest first."""
+    return (
+        db.query(Ticket)
+        .filter(Ticket.requester_id == user_id)
+        .order_by(Ticket.created_at.desc())
+        .all()
+    )
 
+@count_queries
+def get_ticket_version(db: Session, ticket_id: int) -> Optional[datetime]:
+    """Get a ticket's updated_at without loading it; ``None`` if there is no such ticket."""
+    return db.scalar(select(Ticket.updated_at).where(Ticket.id == ticket_id))
+
+@count_queries
+def get_tickets_by_user_version(db: Session, user_id: int) -> Tuple[int, Optional[datetime]]:
+    """Get the count and latest updated_at of a user's tickets without loading them."""
+    count, last_updated = db.execute(
+        select(func.count(), func.max(Ticket.updated_at)).where(Ticket.requester_id == user_id)
+    ).one()
+    return count, last_updated
+
+@count_queries
 def get_tickets_by_assignee(db: Session, assignee_id: int):
-    """Get all tickets assigned to a specific user."""
-    return db.query(Ticket).filter(Ticket.assignee_id == assignee_id).all()
+    """Get all tickets assigned to a specific user, newest first."""
+    return (
+        db.query(Ticket)
+        .filter(Ticket.assignee_id == assignee_id)
+        .order_by(Ticket.created_at.desc())
+        .all()
+    )
 
-def update_ticket(db: Session, ticket_id: int, ticket_update: TicketUpdate) -> Ticket:
-    """Update a ticket's information."""
-    db_ticket = get_ticket(db, ticket_id)
-    if not db_ticket:
+@count_queries
+def get_open_tickets_by_assignee(db: Session, assignee_id: int, priority: Optional[TicketPriority] = None):
+    """Get unclosed tickets assigned to a user, oldest first, optionally at one priority."""
+    query = db.query(Ticket).filter(NOT_CLOSED, Ticket.assignee_id == assignee_id)
+    if priority is not None:
+        query = query.filter(Ticket.priority == priority)
+    return query.order_by(Ticket.created_at).all()
+
+@count_queries
+def update_ticket(db: Session, ticket_id: int, ticket_update: TicketUpdate):
+    """Update a ticket with a single UPDATE ... RETURNING.
+
+    Returns the ticket as a row of ``TICKET_RETURNING`` plus the
+    ``previous_assignee_id`` it had before, or ``None`` when no ticket has
+    ``ticket_id``. An unknown assignee violates the foreign key and is raised
+    as ``UserNotFound``.
+    """
+    rows = _update_returning_previous(db, ticket_update, _previous_assignees(Ticket.id == ticket_id))
+    return rows[0] if rows else None
+
+@count_queries
+def apply_triage(
+    db: Session, ticket_id: int, triage: TicketTriage, created_priority: Optional[TicketPriority] = None
+) -> Optional[Ticket]:
+    """Write a triage result with a single UPDATE ... RETURNING.
+
+    The triaged priority only replaces ``created_priority`` if the ticket
+    still has it, checked in the same statement, so a priority an agent set
+    in the meantime is kept; with ``created_priority`` ``None`` the priority
+    is left alone. Returns ``None`` when no ticket has ``ticket_id``.
+    """
+    values = {"category": triage.category, "suggested_reply": triage.suggested_reply}
+    if created_priority is not None:
+        values["priority"] = case(
+            (Ticket.priority == created_priority, literal(triage.priority, Ticket.priority.type)),
+            else_=Ticket.priority,
+        )
+    stmt = (
+        update(Ticket)
+        .where(Ticket.id == ticket_id)
+        .values(**values)
+        .returning(Ticket)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    db_ticket = db.scalars(stmt).one_or_none()
+    db.commit()
+    return db_ticket
+
+
+def ticket_filter_conditions(ticket, ticket_filter: TicketFilter) -> List:
+    """WHERE conditions on ``ticket`` (the model or an alias) for the criteria set in ``ticket_filter``."""
+    conditions = []
+    if ticket_filter.status is not None:
+        conditions.append(ticket.status == ticket_filter.status)
+    if ticket_filter.priority is not None:
+        conditions.append(ticket.priority == ticket_filter.priority)
+    if ticket_filter.assignee_id is not None:
+        conditions.append(ticket.assignee_id == ticket_filter.assignee_id)
+    if ticket_filter.created_from is not None:
+        conditions.append(ticket.created_at >= ticket_filter.created_from)
+    if ticket_filter.created_to is not None:
+        conditions.append(ticket.created_at < ticket_filter.created_to)
+    return conditions
+
+@count_queries
+def count_tickets_matching(
+    db: Session, ids: Optional[Sequence[int]] = None, ticket_filter: Optional[TicketFilter] = None
+) -> int:
+    """Count the tickets among ``ids``, or matching ``ticket_filter``."""
+    if ids is not None:
+        return db.scalar(select(func.count()).select_from(Ticket).where(Ticket.id.in_(ids)))
+    return db.scalar(select(func.count()).select_from(Ticket).where(*ticket_filter_conditions(Ticket, ticket_filter)))
+
+def _previous_assignees(*conditions, limit: Optional[int] = None):
+    """A CTE of the tickets an update will change, locked, with their assignees before it.
+
+    MATERIALIZED makes both databases read it once, before the UPDATE that
+    selects its rows changes any of them; on Postgres FOR UPDATE then holds
+    the rows, so the assignees read are the ones replaced.
+    """
+    chunk = (
+        select(Ticket.id.label("ticket_id"), Ticket.assignee_id.label("previous_assignee_id"))
+        .where(*conditions)
+        .order_by(Ticket.id)
+        .limit(limit)
+    )
+    return chunk.with_for_update().cte("previous").prefix_with("MATERIALIZED")
+
+def _update_returning_previous(db: Session, ticket_update: TicketUpdate, previous) -> List:
+    """Apply ``ticket_update`` to the tickets of ``previous`` in one statement and commit.
+
+    Returns rows of ``TICKET_RETURNING`` and ``previous_assignee_id`` in id
+    order; an unknown assignee is raised as ``UserNotFound``.
+    """
+    # SQLite renders RETURNING columns unqualified, hence the CTE's distinct column names
+    previous_assignee = (
+        select(previous.c.previous_assignee_id)
+        .where(previous.c.ticket_id == Ticket.id)
+        .scalar_subquery()
+        .label("previous_assignee_id")
+    )
+    stmt = (
+        update(Ticket)
+        .where(Ticket.id.in_(select(previous.c.ticket_id)))
+        .values(**ticket_update.dict(exclude_unset=True))
+        .returning(*TICKET_RETURNING, previous_assignee)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        rows = db.execute(stmt).all()
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if is_foreign_key_violation(exc):
+            raise UserNotFound("Assignee not found") from exc
+        raise
+    return sorted(rows, key=lambda row: row.id)
+
+@count_queries
+def update_tickets_chunk(
+    db: Session,
+    ticket_update: TicketUpdate,
+    ids: Optional[Sequence[int]] = None,
+    ticket_filter: Optional[TicketFilter] = None,
+    after_id: int = 0,
+    limit: int = 500,
+) -> List:
+    """Apply ``ticket_update`` to a chunk of tickets in one UPDATE ... RETURNING and commit.
+
+    The chunk is ``ids``, or the first ``limit`` tickets matching
+    ``ticket_filter`` with ids above ``after_id``, so filtered updates walk
+    the table in id order whether or not the change takes tickets out of the
+    filter. updated_at is set by the column's onupdate. Returns rows of
+    ``TICKET_RETURNING`` and ``previous_assignee_id`` in id order; an unknown
+    assignee is raised as ``UserNotFound``.
+    """
+    if ids is not None:
+        previous = _previous_assignees(Ticket.id.in_(ids))
+    else:
+        previous = _previous_assignees(Ticket.id > after_id, *ticket_filter_conditions(Ticket, ticket_filter), limit=limit)
+    return _update_returning_previous(db, ticket_update, previous)
+
+def _in_progress_count(ticket):
+    # "Not closed" is implied, but SQLite only uses the partial index on
+    # unclosed tickets when the query repeats its predicate
+    return (
+        select(func.count())
+        .select_from(ticket)
+        .where(
+            ticket.assignee_id == bindparam("agent_id"),
+            ticket.status != _status_literal(TicketStatus.CLOSED),
+            ticket.status == _status_literal(TicketStatus.IN_PROGRESS),
+        )
+    )
+
+def _claim_statement(skip_locked: bool):
+    queued, held = aliased(Ticket), aliased(Ticket)
+    next_open = (
+        select(queued.id)
+        .where(queued.status == _status_literal(TicketStatus.OPEN))
+        .order_by(literal_column(DISPATCH_RANK), queued.created_at, queued.id)
+        .limit(1)
+    )
+    if skip_locked:
+        next_open = next_open.with_for_update(skip_locked=True)
+    return (
+        update(Ticket)
+        .where(
+            Ticket.id == next_open.scalar_subquery(),
+            Ticket.status == _status_literal(TicketStatus.OPEN),
+            _in_progress_count(held).scalar_subquery() < bindparam("max_in_progress"),
+        )
+        .values(assignee_id=bindparam("agent_id"), status=TicketStatus.IN_PROGRESS)
+        .returning(Ticket)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+# Built once: constructing the aliased subqueries costs more than running them
+IN_PROGRESS_COUNT = _in_progress_count(Ticket)
+CLAIM_NEXT = _claim_statement(skip_locked=False)
+CLAIM_NEXT_SKIP_LOCKED = _claim_statement(skip_locked=True)
+LOCK_AGENT = select(User.id).where(User.id == bindparam("agent_id")).with_for_update()
+
+@count_queries
+def count_in_progress(db: Session, agent_id: int) -> int:
+    """Count the tickets an agent currently has in progress."""
+    return db.scalar(IN_PROGRESS_COUNT, {"agent_id": agent_id})
+
+@count_queries
+def claim_next_ticket(db: Session, agent_id: int, max_in_progress: int) -> Optional[Ticket]:
+    """Assign the highest-priority, oldest open ticket to an agent.
+
+    The claim is one ``UPDATE ... WHERE id = (next open ticket) RETURNING``
+    guarded by ``status = 'OPEN'`` and by the agent's live in-progress count.
+    On Postgres the agent row is locked first, in a savepoint, so one
+    agent's concurrent claims can't overshoot the cap, and the inner select
+    uses ``FOR UPDATE SKIP LOCKED`` so agents never queue behind each other's
+    candidate rows. SQLite runs the statement under its single write lock,
+    so the guarded update is already atomic without row locks.
+
+    Returns ``None`` when no ticket is open; raises ``WorkloadCapReached``
+    when the agent is at ``max_in_progress``. Either way the caller's
+    transaction is left open, without the agent lock.
+    """
+    params = {"agent_id": agent_id, "max_in_progress": max_in_progress}
+    if db.get_bind().dialect.name == "postgresql":
+        agent_lock = db.begin_nested()
+        db.execute(LOCK_AGENT, params)
+        stmt = CLAIM_NEXT_SKIP_LOCKED
+    else:
+        agent_lock = None
+        stmt = CLAIM_NEXT
+    db_ticket = db.scalars(stmt, params).one_or_none()
+    if db_ticket is None:
+        # Only an empty claim pays for telling "queue empty" from "at cap"
+        at_cap = count_in_progress(db, agent_id) >= max_in_progress
+        if agent_lock is not None:
+            agent_lock.rollback()  # The UPDATE changed nothing; this releases the agent row
+        if at_cap:
+            raise WorkloadCapReached(f"Agent already has {max_in_progress} tickets in progress")
         return None
-    
-    update_data = ticket_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_ticket, field, value)
-    
     db.commit()
-    db.refresh(db_ticket)
     return db_ticket
 
+@count_queries
+def get_ticket_with_users(db: Session, ticket_id: int) -> Optional[Ticket]:
+    """Get a ticket with its requester and assignee joined in one query."""
+    return (
+        db.query(Ticket)
+        .options(joinedload(Ticket.requester), joinedload(Ticket.assignee))
+        .filter(Ticket.id == ticket_id)
+        .first()
+    )
+
+@count_queries
 def get_ticket_with_requester(db: Session, ticket_id: int):
     """Get a ticket with requester information."""
     return db.query(Ticket, User).join(User, Ticket.requester_id == User.id).filter(Ticket.id == ticket_id).first()
@@ -0,0 +1,500 @@
+"""
+Similar and duplicate tickets from a memory-mapped vector index.
+
+Tickets are vectorized locally from title and description with
+``HashingVectorizer``. ``TicketVectorIndex`` keeps them in a directory shared
+by every worker on the host, as generations written by ``rebuild``:
+
+- ``vectors.log``: append-only records of ticket id, buckets and weights; a
+  ticket's latest record is its vector.
+- ``vectors.offsets``: where each ticket's record starts, by ticket id.
+- ``postings.offsets``, ``postings.ids``, ``postings.weights``: for each
+  bucket, the tickets with a weight in it, oldest first, and those weights.
+
+These files are memory-mapped, so workers share them through the page cache
+and opening an index reads nothing up front. Tickets created or edited after
+the rebuild are appended to the log under a file lock; each worker reads the
+records past the rebuilt part before a search and keeps their postings in
+memory until the next rebuild.
+
+A search is a sparse dot product through the postings of the query's
+buckets, rarest first, scanning at most ``scan_budget`` postings (the newest
+ones, for buckets shared by more tickets than that), so common words cannot
+make it slow. The best-scoring candidates are then ranked by exact cosine
+similarity to their current vectors, which also discards postings left
+behind by edited tickets. Without NumPy, scanning millions of vectors would
+take seconds; a query touches a small fraction of the postings.
+
+Rebuild after restoring the database with
+``python -m intelligagent.services.ticket_similarity``, and regularly with
+``--watch``, which rebuilds every ``SIMILARITY_REBUILD_INTERVAL`` seconds
+and bounds how many appended postings the workers hold in memory. A rebuild
+streams tickets from the database in batches, builds the new generation
+beside the current one, then switches to it, carrying over tickets indexed
+in the meantime.
+"""
+import argparse
+import contextlib
+import fcntl
+import heapq
+import json
+import logging
+import mmap
+import os
+import shutil
+import signal
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import select
+
+from intelligagent.core.config import settings
+from intelligagent.core.text_vectors import HashingVectorizer, SparseVector, cosine
+from intelligagent.db.database import SessionLocal
+from intelligagent.db.models import Ticket
+
+logger = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct("<II")  # Ticket id, number of buckets; then uint32 buckets and float32 weights
+
+CURRENT_FILE = "CURRENT"  # Name of the generation in use
+LOCK_FILE = "lock"
+META_FILE = "meta.json"
+LOG_FILE = "vectors.log"
+OFFSETS_FILE = "vectors.offsets"
+POSTINGS_OFFSETS_FILE = "postings.offsets"
+POSTINGS_IDS_FILE = "postings.ids"
+POSTINGS_WEIGHTS_FILE = "postings.weights"
+
+# Candidates ranked by exact cosine per result asked for
+RERANK_FACTOR = 5
+
+Match = Tuple[int, float]
+
+
+def ticket_text(title: str, description: Optional[str]) -> str:
+    return f"{title}\n{description or ''}"
+
+
+def encode_record(ticket_id: int, vector: SparseVector) -> bytes:
+    buckets = array("I", vector.keys())
+    weights = array("f", vector.values())
+    return RECORD_HEADER.pack(ticket_id, len(buckets)) + buckets.tobytes() + weights.tobytes()
+
+
+def iter_records(buffer, start: int = 0) -> Iterator[Tuple[int, int, memoryview, memoryview]]:
+    """Yield ``(end, ticket_id, buckets, weights)`` for the complete records in ``buffer`` from ``start``."""
+    view = memoryview(buffer)
+    position = start
+    while position + RECORD_HEADER.size <= len(view):
+        ticket_id, count = RECORD_HEADER.unpack_from(view, position)
+        body = position + RECORD_HEADER.size
+        end = body + 8 * count
+        if end > len(view):
+            break
+        yield end, ticket_id, view[body:body + 4 * count].cast("I"), view[body + 4 * count:end].cast("f")
+        position = end
+
+
+class _Generation:
+    """One rebuilt index, memory-mapped, plus the records appended to its log since."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        meta = json.loads((path / META_FILE).read_text())
+        self.dim = meta["dim"]
+        self.base_size = meta["base_size"]
+        self._maps: List[mmap.mmap] = []
+        self.log_fd = os.open(path / LOG_FILE, os.O_RDWR | os.O_APPEND)
+        self.log = self._map(path / LOG_FILE, self.base_size)
+        self.offsets = self._map(path / OFFSETS_FILE).cast("Q")
+        self.starts = self._map(path / POSTINGS_OFFSETS_FILE).cast("Q")
+        self.ids = self._map(path / POSTINGS_IDS_FILE).cast("I")
+        self.weights = self._map(path / POSTINGS_WEIGHTS_FILE).cast("f")
+        # Records past base_size, replayed from the log
+        self.tail = self.base_size
+        self.vectors: Dict[int, SparseVector] = {}
+        self.postings: Dict[int, List[Match]] = {}
+
+    def _map(self, path: Path, length: Optional[int] = None) -> memoryview:
+        if length is None:
+            length = path.stat().st_size if path.exists() else 0
+        if not length:
+            return memoryview(b"")
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped)
+
+    def catch_up(self) -> None:
+        """Take in the records other writers appended to the log."""
+        size = os.fstat(self.log_fd).st_size
+        if size <= self.tail:
+            return
+        data = os.pread(self.log_fd, size - self.tail, self.tail)
+        consumed = 0
+        for consumed, ticket_id, buckets, weights in iter_records(data):
+            vector = dict(zip(buckets, weights))
+            self.vectors[ticket_id] = vector
+            for bucket, weight in vector.items():
+                self.postings.setdefault(bucket, []).append((ticket_id, weight))
+        self.tail += consumed
+
+    def frequency(self, bucket: int) -> int:
+        """How many postings ``bucket`` has."""
+        base = self.starts[bucket + 1] - self.starts[bucket] if self.starts else 0
+        return base + len(self.postings.get(bucket, ()))
+
+    def accumulate(self, bucket: int, weight: float, scores: Dict[int, float], budget: int) -> int:
+        """Add ``weight`` times the newest ``budget`` postings of ``bucket`` to ``scores``; returns how many."""
+        scanned = 0
+        for ticket_id, other in reversed(self.postings.get(bucket, ())):
+            if scanned == budget:
+                return scanned
+            scores[ticket_id] = scores.get(ticket_id, 0.0) + weight * other
+            scanned += 1
+        if self.starts:
+            end = self.starts[bucket + 1]
+            start = max(self.starts[bucket], end - (budget - scanned))
+            for ticket_id, other in zip(self.ids[start:end], self.weights[start:end]):
+                scores[ticket_id] = scores.get(ticket_id, 0.0) + weight * other
+            scanned += end - start
+        return scanned
+
+    def vector(self, ticket_id: int) -> Optional[SparseVector]:
+        vector = self.vectors.get(ticket_id)
+        if vector is not None:
+            return vector
+        if ticket_id >= len(self.offsets) or not self.offsets[ticket_id]:
+            return None
+        position = self.offsets[ticket_id] - 1
+        _, count = RECORD_HEADER.unpack_from(self.log, position)
+        body = position + RECORD_HEADER.size
+        return dict(zip(self.log[body:body + 4 * count].cast("I"), self.log[body + 4 * count:body + 8 * count].cast("f")))
+
+    def close(self) -> None:
+        for view in (self.log, self.offsets, self.starts, self.ids, self.weights):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        os.close(self.log_fd)
+
+
+class TicketVectorIndex:
+    """Top-k cosine search over ticket vectors kept under ``path``.
+
+    Nothing is read or created on disk until the index is first used. Calls
+    from several threads take turns, so the API can run them off its event
+    loop.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        vectorizer: Optional[HashingVectorizer] = None,
+        scan_budget: int = settings.SIMILARITY_SCAN_BUDGET,
+    ):
+        self.path = Path(path)
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.scan_budget = scan_budget
+        self._lock_fd: Optional[int] = None
+        self._generation: Optional[_Generation] = None
+        self._mutex = threading.RLock()  # Guards the open generation and its in-memory tail
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the index's file lock, which serializes appends and generation switches across processes."""
+        if self._lock_fd is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._lock_fd = os.open(self.path / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _create_generation(self, base_size: int = 0, **meta) -> Path:
+        path = self.path / f"gen-{time.time_ns()}"
+        path.mkdir(parents=True)
+        (path / LOG_FILE).touch()
+        meta = {"dim": self.vectorizer.dim, "base_size": base_size, "built_at": datetime.now(timezone.utc).isoformat(), **meta}
+        (path / META_FILE).write_text(json.dumps(meta))
+        return path
+
+    def _switch_to(self, name: str) -> None:
+        """Point CURRENT at generation ``name``; call holding the lock."""
+        pending = self.path / f"{CURRENT_FILE}.tmp"
+        pending.write_text(name)
+        os.replace(pending, self.path / CURRENT_FILE)
+
+    def _current_name(self) -> str:
+        current = self.path / CURRENT_FILE
+        if not current.exists():
+            with self._locked():
+                if not current.exists():
+                    self._switch_to(self._create_generation().name)
+        return current.read_text()
+
+    def _open_current(self) -> _Generation:
+        """The generation in use, reopened if a rebuild replaced it."""
+        name = self._current_name()
+        if self._generation is None or self._generation.path.name != name:
+            generation = _Generation(self.path / name)
+            if generation.dim != self.vectorizer.dim:
+                generation.close()
+                raise ValueError(f"index at {self.path} has dim {generation.dim}, vectorizer has {self.vectorizer.dim}")
+            if self._generation is not None:
+                self._generation.close()
+            self._generation = generation
+        return self._generation
+
+    def refresh(self) -> None:
+        """Catch up with rebuilds and with tickets indexed by other processes."""
+        with self._mutex:
+            self._open_current().catch_up()
+
+    def add(self, tickets: Iterable[Tuple[int, str]]) -> Dict[int, SparseVector]:
+        """Index or reindex ``(ticket_id, text)`` pairs; returns their vectors."""
+        vectors = {ticket_id: self.vectorizer.transform(text) for ticket_id, text in tickets}
+        if not vectors:
+            return vectors
+        records = b"".join(encode_record(ticket_id, vector) for ticket_id, vector in vectors.items())
+        self._current_name()
+        with self._mutex:
+            with self._locked():
+                # Checked under the lock, so a rebuild switching generations cannot miss the append
+                generation = self._open_current()
+                os.write(generation.log_fd, records)
+            generation.catch_up()
+        return vectors
+
+    def vector(self, ticket_id: int) -> Optional[SparseVector]:
+        """The indexed vector of a ticket, if it has one."""
+        with self._mutex:
+            self.refresh()
+            return self._generation.vector(ticket_id)
+
+    def search(
+        self, vector: SparseVector, limit: int = 10, min_score: float = 0.0, exclude: Optional[int] = None
+    ) -> List[Match]:
+        """The ``limit`` tickets most cosine-similar to ``vector``, at least ``min_score``, best first."""
+        with self._mutex:
+            self.refresh()
+            generation = self._generation
+            scores: Dict[int, float] = {}
+            budget = self.scan_budget
+            for _, bucket in sorted((generation.frequency(bucket), bucket) for bucket in vector):
+                if budget <= 0:
+                    break
+                budget -= generation.accumulate(bucket, vector[bucket], scores, budget)
+            scores.pop(exclude, None)
+            matches = []
+            for ticket_id in heapq.nlargest(limit * RERANK_FACTOR, scores, key=scores.__getitem__):
+                current = generation.vector(ticket_id)
+                score = cosine(vector, current) if current else 0.0
+                if score > 0 and score >= min_score:
+                    matches.append((ticket_id, score))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:limit]
+
+    def rebuild(self, tickets: Iterable[Tuple[int, str]]) -> int:
+        """Build a new generation from ``(ticket_id, text)`` pairs in id order and switch to it.
+
+        Tickets appended to the current generation meanwhile are carried
+        over. Returns how many tickets the new generation holds.
+        """
+        old_name = self._current_name()
+        carry_from = (self.path / old_name / LOG_FILE).stat().st_size
+        path = self._create_generation()
+        dim = self.vectorizer.dim
+        frequencies = array("Q", bytes(8 * dim))
+        offsets = array("Q")
+        count = 0
+        with open(path / LOG_FILE, "wb") as log:
+            for ticket_id, text in tickets:
+                vector = self.vectorizer.transform(text)
+                if ticket_id >= len(offsets):
+                    offsets.frombytes(bytes(8 * (ticket_id + 1 - len(offsets))))
+                offsets[ticket_id] = log.tell() + 1
+                log.write(encode_record(ticket_id, vector))
+                for bucket in vector:
+                    frequencies[bucket] += 1
+                count += 1
+            base_size = log.tell()
+        (path / OFFSETS_FILE).write_bytes(offsets.tobytes())
+
+        starts = array("Q", [0])
+        for frequency in frequencies:
+            starts.append(starts[-1] + frequency)
+        (path / POSTINGS_OFFSETS_FILE).write_bytes(starts.tobytes())
+        self._write_postings(path, starts, base_size)
+        (path / META_FILE).write_text(json.dumps({
+            "dim": dim, "base_size": base_size, "tickets": count, "postings": starts[-1],
+            "built_at": datetime.now(timezone.utc).isoformat(),
+        }))
+
+        with self._locked():
+            current = self._current_name()
+            old_log = self.path / current / LOG_FILE
+            with open(old_log, "rb") as f:
+                f.seek(carry_from if current == old_name else 0)
+                carried = f.read()
+            with open(path / LOG_FILE, "ab") as log:
+                log.write(carried)
+            self._switch_to(path.name)
+        for stale in self.path.glob("gen-*"):
+            if stale != path:
+                shutil.rmtree(stale, ignore_errors=True)  # Processes still mapping it keep their copy
+        return count
+
+    @staticmethod
+    def _write_postings(path: Path, starts: array, base_size: int) -> None:
+        """Fill the postings files from the generation's log, bucket by bucket in log order."""
+        total = starts[-1]
+        for name in (POSTINGS_IDS_FILE, POSTINGS_WEIGHTS_FILE):
+            with open(path / name, "wb") as f:
+                f.truncate(4 * total)
+        if not total:
+            return
+        cursors = array("Q", starts)
+        with contextlib.ExitStack() as stack:
+            maps = []
+            for name in (LOG_FILE, POSTINGS_IDS_FILE, POSTINGS_WEIGHTS_FILE):
+                f = stack.enter_context(open(path / name, "r+b"))
+                mapped = stack.enter_context(mmap.mmap(f.fileno(), 0))
+                maps.append(mapped)
+            log, ids_map, weights_map = maps
+            ids, weights = memoryview(ids_map).cast("I"), memoryview(weights_map).cast("f")
+            try:
+                for _, ticket_id, buckets, bucket_weights in iter_records(memoryview(log)[:base_size]):
+                    for bucket, weight in zip(buckets, bucket_weights):
+                        position = cursors[bucket]
+                        ids[position] = ticket_id
+                        weights[position] = weight
+                        cursors[bucket] = position + 1
+                    buckets.release()
+                    bucket_weights.release()
+            finally:
+                ids.release()
+                weights.release()
+
+    def close(self) -> None:
+        with self._mutex:
+            if self._generation is not None:
+                self._generation.close()
+                self._generation = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+
+def create_index() -> Optional[TicketVectorIndex]:
+    """The application's similar ticket index, or ``None`` when disabled."""
+    if not settings.SIMILARITY_ENABLED:
+        return None
+    return TicketVectorIndex(settings.SIMILARITY_INDEX_PATH)
+
+
+# Global similar ticket index; opened on first use
+index = create_index()
+
+
+def find_similar(ticket_id: int, title: str, description: Optional[str], limit: int, min_score: float) -> List[Match]:
+    """The tickets most similar to a ticket's current text, best first."""
+    if index is None:
+        return []
+    return index.search(index.vectorizer.transform(ticket_text(title, description)), limit, min_score, exclude=ticket_id)
+
+
+def index_tickets(tickets: Sequence[Tuple[int, str, Optional[str]]]) -> None:
+    """Index new or edited ``(ticket_id, title, description)``; failures are logged, not raised."""
+    if index is None or not tickets:
+        return
+    try:
+        index.add((ticket_id, ticket_text(title, description)) for ticket_id, title, description in tickets)
+    except OSError:
+        logger.exception("Indexing tickets %s for similarity failed", [ticket[0] for ticket in tickets])
+
+
+def check_new_ticket(ticket_id: int, title: str, description: Optional[str]) -> List[Match]:
+    """Likely duplicates of a just-created ticket, which is then indexed."""
+    if index is None:
+        return []
+    try:
+        vector = index.vectorizer.transform(ticket_text(title, description))
+        matches = index.search(vector, settings.SIMILARITY_CHECK_LIMIT, settings.SIMILARITY_DUPLICATE_SCORE, ticket_id)
+        index.add([(ticket_id, ticket_text(title, description))])
+    except OSError:
+        logger.exception("Similarity check of ticket %d failed", ticket_id)
+        return []
+    return matches
+
+
+def iter_ticket_texts(session_factory, batch_size: int) -> Iterator[Tuple[int, str]]:
+    """Every ticket's ``(id, text)`` in id order, read in keyset-paginated batches."""
+    after_id = 0
+    while True:
+        with session_factory() as db:
+            rows = db.execute(
+                select(Ticket.id, Ticket.title, Ticket.description)
+                .where(Ticket.id > after_id)
+                .order_by(Ticket.id)
+                .limit(batch_size)
+            ).all()
+        if not rows:
+            return
+        for ticket_id, title, description in rows:
+            yield ticket_id, ticket_text(title, description)
+        after_id = rows[-1].id
+
+
+def rebuild_index(target: TicketVectorIndex, session_factory, batch_size: int = settings.SIMILARITY_REBUILD_BATCH_SIZE) -> int:
+    """Regenerate ``target`` from every ticket in the database; returns how many were indexed."""
+    return target.rebuild(iter_ticket_texts(session_factory, batch_size))
+
+
+def _rebuild_logged(target: TicketVectorIndex, session_factory) -> None:
+    started = time.perf_counter()
+    count = rebuild_index(target, session_factory)
+    logger.info("Indexed %d tickets in %s in %.1fs", count, target.path, time.perf_counter() - started)
+
+
+def run_rebuilds(target: TicketVectorIndex, session_factory, stop: threading.Event, interval: float) -> None:
+    """Rebuild ``target`` now, then every ``interval`` seconds until ``stop`` is set."""
+    while True:
+        try:
+            _rebuild_logged(target, session_factory)
+        except Exception:
+            logger.exception("Rebuilding the similar ticket index failed")
+        if stop.wait(interval):
+            return
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the similar ticket index from the database.")
+    parser.add_argument(
+        "--watch", action="store_true", help="rebuild every SIMILARITY_REBUILD_INTERVAL seconds until stopped"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    target = TicketVectorIndex(settings.SIMILARITY_INDEX_PATH)
+    try:
+        if not args.watch:
+            _rebuild_logged(target, SessionLocal)
+            return
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        logger.info("Rebuilding the similar ticket index every %.0fs", settings.SIMILARITY_REBUILD_INTERVAL)
+        run_rebuilds(target, SessionLocal, stop, settings.SIMILARITY_REBUILD_INTERVAL)
+    finally:
+        target.close()
+
+
+if __name__ == "__main__":
+    main()
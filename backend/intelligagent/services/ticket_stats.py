@@ -0,0 +1,155 @@
+"""
+Ticket statistics read from the trigger-maintained ``ticket_counters`` table.
+
+``get_ticket_stats`` sums the counter shards per key in one statement, so its
+cost grows with the number of distinct statuses, priorities, assignees and
+creation hours of open tickets, not with the number of tickets. Open-ticket
+ages are bucketed from those creation hours, each taken at its midpoint.
+
+Counters can drift from the tickets table when rows are written without the
+triggers (a restored dump, a manual fix). ``reconcile_ticket_counters``
+recounts and upserts the differences; run it periodically with
+``python -m intelligagent.services.ticket_stats``. On Postgres a
+transaction-level advisory lock lets only one reconciliation run at a time.
+"""
+import asyncio
+import logging
+import signal
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from intelligagent.core.config import settings
+from intelligagent.core.metrics import count_queries
+from intelligagent.db.database import AsyncSessionLocal
+from intelligagent.db.ddl import TICKET_COUNTER_RECONCILIATION
+from intelligagent.db.models import TicketCounter, TicketPriority, TicketStatus
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_try_advisory_xact_lock
+RECONCILE_LOCK_KEY = 0x7C0947
+
+TRY_RECONCILE_LOCK = text("SELECT pg_try_advisory_xact_lock(:key)").bindparams(key=RECONCILE_LOCK_KEY)
+
+# Format of the open_hour counter keys (UTC)
+HOUR_KEY_FORMAT = "%Y-%m-%dT%H"
+
+UNASSIGNED_KEY = "none"
+
+# (bucket, upper age bound); the last bucket takes everything older
+OPEN_AGE_BUCKETS: List[Tuple[str, Optional[timedelta]]] = [
+    ("under_4h", timedelta(hours=4)),
+    ("4h_to_24h", timedelta(hours=24)),
+    ("1d_to_3d", timedelta(days=3)),
+    ("3d_to_7d", timedelta(days=7)),
+    ("7d_to_30d", timedelta(days=30)),
+    ("over_30d", None),
+]
+
+COUNTER_TOTALS = (
+    select(TicketCounter.dimension, TicketCounter.key, func.sum(TicketCounter.count))
+    .group_by(TicketCounter.dimension, TicketCounter.key)
+)
+
+
+def age_bucket(age: timedelta) -> str:
+    for bucket, upper in OPEN_AGE_BUCKETS:
+        if upper is None or age < upper:
+            return bucket
+    raise AssertionError("the last bucket is unbounded")
+
+
+@count_queries
+def get_ticket_stats(db: Session, now: Optional[datetime] = None) -> Dict:
+    """Ticket counts by status, priority and assignee, and open tickets by age.
+
+    ``by_assignee`` and ``unassigned`` count tickets that are not closed.
+    Ages are measured from ``now`` (default: the current UTC time) to the
+    middle of the hour a ticket was created in.
+    """
+    now = now or datetime.now(timezone.utc)
+    by_status = {status: 0 for status in TicketStatus}
+    by_priority = {priority: 0 for priority in TicketPriority}
+    by_assignee: Dict[int, int] = {}
+    unassigned = 0
+    open_by_age = {bucket: 0 for bucket, _ in OPEN_AGE_BUCKETS}
+
+    for dimension, key, count in db.execute(COUNTER_TOTALS):
+        if not count:
+            continue
+        if dimension == "status":
+            by_status[TicketStatus[key]] = count
+        elif dimension == "priority":
+            by_priority[TicketPriority[key]] = count
+        elif dimension == "assignee":
+            if key == UNASSIGNED_KEY:
+                unassigned = count
+            else:
+                by_assignee[int(key)] = count
+        elif dimension == "open_hour":
+            created = datetime.strptime(key, HOUR_KEY_FORMAT).replace(tzinfo=timezone.utc)
+            open_by_age[age_bucket(now - created - timedelta(minutes=30))] += count
+
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_priority": by_priority,
+        "by_assignee": dict(sorted(by_assignee.items())),
+        "unassigned": unassigned,
+        "open_by_age": open_by_age,
+        "as_of": now,
+    }
+
+
+@count_queries
+def reconcile_ticket_counters(db: Session) -> int:
+    """Correct ``ticket_counters`` from a recount of ``tickets`` and commit.
+
+    Returns the number of counter keys that were off; 0 as well when another
+    reconciliation holds the lock.
+    """
+    dialect = db.get_bind().dialect.name
+    try:
+        if dialect == "postgresql" and not db.scalar(TRY_RECONCILE_LOCK):
+            return 0
+        corrected = db.execute(text(TICKET_COUNTER_RECONCILIATION[dialect])).rowcount
+        db.execute(delete(TicketCounter).where(TicketCounter.count == 0))
+        db.commit()
+        return corrected
+    finally:
+        db.rollback()
+
+
+async def run_reconciliation(session_factory, stop: asyncio.Event, interval: float) -> None:
+    """Reconcile every ``interval`` seconds until ``stop`` is set."""
+    while not stop.is_set():
+        try:
+            async with session_factory() as db:
+                corrected = await db.run_sync(reconcile_ticket_counters)
+        except Exception:
+            logger.exception("Reconciling ticket counters failed")
+        else:
+            if corrected:
+                logger.warning("Reconciled %d drifted ticket counter keys", corrected)
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Reconciling ticket counters every %.0fs", settings.TICKET_STATS_RECONCILE_INTERVAL)
+    await run_reconciliation(AsyncSessionLocal, stop, settings.TICKET_STATS_RECONCILE_INTERVAL)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
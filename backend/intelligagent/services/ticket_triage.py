@@ -0,0 +1,327 @@
+"""
+Asynchronous ticket triage: priority, category and a draft reply from an LLM.
+
+Ticket creation submits tickets to ``TriagePipeline`` without waiting. A
+worker gathers them into micro-batches of up to ``batch_size`` tickets, or
+whatever arrived within ``max_delay`` of the first, and sends each batch to
+the LLM client as one request, with at most ``max_concurrency`` requests in
+flight. While that many are in flight the worker stops batching and tickets
+queue up to ``queue_size``; beyond that they are dropped and left for the
+backfill.
+
+Before a ticket reaches the LLM, ``TriageCache`` is checked for an earlier
+answer to the same text once normalized, then for one to a text whose vector
+is at least ``similarity`` cosine-similar; a ticket whose text is already on
+its way to the LLM waits for that answer instead. Results are written back
+with ``apply_triage``, which refreshes the cached ticket. The triaged
+priority only replaces the one a ticket was created with: if an agent
+changed it before triage finished, theirs is kept.
+
+Tickets still without a category (dropped, failed, or created while triage
+was off) are triaged by ``python -m intelligagent.services.ticket_triage``.
+Their priority as created is no longer known, so the backfill only writes
+the category and suggested reply.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from intelligagent.core.config import settings
+from intelligagent.core.llm import TriageRequest, create_triage_client
+from intelligagent.core.text_vectors import HashingVectorizer, SparseVector, text_hash
+from intelligagent.db.database import AsyncSessionLocal
+from intelligagent.db.models import Ticket, TicketPriority, UNTRIAGED_PREDICATE
+from intelligagent.schemas.ticket import TicketTriage
+from intelligagent.services import async_ticket_service
+
+logger = logging.getLogger(__name__)
+
+
+class TriageCache:
+    """Earlier triage answers by normalized text, and by similar text.
+
+    Keeps the ``maxsize`` most recently used answers. Similar texts are found
+    through an inverted index from vector bucket to entries, so a lookup
+    only scores entries sharing a feature with the text.
+    """
+
+    def __init__(self, maxsize: int = 10_000, similarity: float = 0.9, vectorizer: Optional[HashingVectorizer] = None):
+        self.maxsize = maxsize
+        self.similarity = similarity
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self._entries: "OrderedDict[str, Tuple[SparseVector, TicketTriage]]" = OrderedDict()
+        self._postings: Dict[int, Dict[str, float]] = {}
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, vector: SparseVector) -> Optional[TicketTriage]:
+        """The answer stored for ``key`` (a ``text_hash``), or for the most similar text close enough."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[1]
+        scores: Dict[str, float] = {}
+        for bucket, weight in vector.items():
+            for other, other_weight in self._postings.get(bucket, {}).items():
+                scores[other] = scores.get(other, 0.0) + weight * other_weight
+        best = max(scores, key=scores.__getitem__, default=None)
+        if best is not None and scores[best] >= self.similarity:
+            self._entries.move_to_end(best)
+            self.similar_hits += 1
+            return self._entries[best][1]
+        self.misses += 1
+        return None
+
+    def set(self, key: str, vector: SparseVector, result: TicketTriage) -> None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = (vector, result)
+        for bucket, weight in vector.items():
+            self._postings.setdefault(bucket, {})[key] = weight
+        while len(self._entries) > self.maxsize:
+            evicted, (evicted_vector, _) = self._entries.popitem(last=False)
+            for bucket in evicted_vector:
+                postings = self._postings[bucket]
+                del postings[evicted]
+                if not postings:
+                    del self._postings[bucket]
+
+
+class TriagePipeline:
+    """Micro-batches submitted tickets through an LLM client and writes the results back."""
+
+    def __init__(
+        self,
+        client,
+        session_factory,
+        cache: Optional[TriageCache] = None,
+        batch_size: int = settings.TRIAGE_BATCH_SIZE,
+        max_delay: float = settings.TRIAGE_BATCH_DELAY,
+        max_concurrency: int = settings.TRIAGE_MAX_CONCURRENCY,
+        queue_size: int = settings.TRIAGE_QUEUE_SIZE,
+    ):
+        self.client = client
+        self.session_factory = session_factory
+        self.cache = cache or TriageCache(settings.TRIAGE_CACHE_SIZE, settings.TRIAGE_CACHE_SIMILARITY)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue: "asyncio.Queue[TriageRequest]" = asyncio.Queue(queue_size)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._pending: Dict[str, asyncio.Future] = {}  # Texts on their way to the LLM, by hash
+        self._calls: Set[asyncio.Task] = set()
+        self._worker: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.llm_calls = 0
+        self.llm_tickets = 0
+        self.failed = 0
+        self.written = 0
+
+    def submit(self, ticket: TriageRequest) -> bool:
+        """Queue a ticket for triage; ``False`` if the queue is full and it was dropped."""
+        try:
+            self._queue.put_nowait(ticket)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    def start(self) -> None:
+        """Start batching on the running loop."""
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def join(self) -> None:
+        """Wait until every ticket submitted so far is triaged and written, or has failed."""
+        await self._queue.join()
+
+    async def close(self) -> None:
+        """Stop batching and wait for the requests in flight."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._calls:
+            await asyncio.gather(*self._calls, return_exceptions=True)
+        await self.client.close()
+
+    async def _next_batch(self) -> List[TriageRequest]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            await self._slots.acquire()  # Blocks batching while max_concurrency requests are in flight
+            call = asyncio.create_task(self._triage(batch))
+            self._calls.add(call)
+            call.add_done_callback(self._calls.discard)
+
+    async def _triage(self, batch: Sequence[TriageRequest]) -> None:
+        """Answer ``batch`` from the cache, the requests in flight and one LLM request, then write it back.
+
+        Runs holding one of the ``max_concurrency`` slots, released once its own LLM request is done.
+        """
+        waiting: List[Tuple[TriageRequest, asyncio.Future]] = []
+        answered: List[Tuple[TriageRequest, TicketTriage]] = []
+        to_ask: Dict[str, Tuple[SparseVector, List[TriageRequest]]] = {}
+        own: Dict[str, asyncio.Future] = {}
+        try:
+            try:
+                for ticket in batch:
+                    key = text_hash(ticket.text)
+                    if key in to_ask:
+                        to_ask[key][1].append(ticket)
+                    elif key in self._pending:
+                        waiting.append((ticket, self._pending[key]))
+                    else:
+                        vector = self.cache.vectorizer.transform(ticket.text)
+                        cached = self.cache.get(key, vector)
+                        if cached is not None:
+                            answered.append((ticket, cached))
+                        else:
+                            to_ask[key] = (vector, [ticket])
+                            own[key] = self._pending[key] = asyncio.get_running_loop().create_future()
+                if to_ask:
+                    answered.extend(await self._ask(to_ask, own))
+            finally:
+                self._slots.release()
+                for key, future in own.items():
+                    del self._pending[key]
+                    if not future.done():
+                        future.set_result(None)
+
+            for ticket, future in waiting:
+                result = await future
+                if result is None:
+                    self.failed += 1
+                else:
+                    answered.append((ticket, result))
+            await self._write(answered)
+        except Exception:
+            logger.exception("Triage of tickets %s failed", [ticket.ticket_id for ticket in batch])
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _ask(
+        self, to_ask: Dict[str, Tuple[SparseVector, List[TriageRequest]]], own: Dict[str, asyncio.Future]
+    ) -> List[Tuple[TriageRequest, TicketTriage]]:
+        keys = list(to_ask)
+        self.llm_calls += 1
+        self.llm_tickets += len(keys)
+        try:
+            results = await self.client.triage([to_ask[key][1][0] for key in keys])
+        except Exception:
+            logger.exception("Triage request for %d tickets failed", len(keys))
+            results = [None] * len(keys)
+        answered = []
+        for key, result in zip(keys, results):
+            vector, tickets = to_ask[key]
+            own[key].set_result(result)
+            if result is None:
+                self.failed += len(tickets)
+                continue
+            self.cache.set(key, vector, result)
+            answered.extend((ticket, result) for ticket in tickets)
+        return answered
+
+    async def _write(self, answered: Sequence[Tuple[TriageRequest, TicketTriage]]) -> None:
+        if not answered:
+            return
+        async with self.session_factory() as db:
+            for ticket, result in answered:
+                if await async_ticket_service.apply_triage(db, ticket.ticket_id, result, ticket.priority) is not None:
+                    self.written += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+            "llm_calls": self.llm_calls,
+            "llm_tickets": self.llm_tickets,
+            "cache_exact_hits": self.cache.exact_hits,
+            "cache_similar_hits": self.cache.similar_hits,
+            "failed": self.failed,
+            "written": self.written,
+        }
+
+
+def create_pipeline() -> Optional[TriagePipeline]:
+    """The application's triage pipeline, or ``None`` when triage is disabled."""
+    if not settings.TRIAGE_ENABLED:
+        return None
+    return TriagePipeline(create_triage_client(), AsyncSessionLocal)
+
+
+# Global triage pipeline; started and closed by the app's lifespan
+pipeline = create_pipeline()
+
+
+def submit(ticket_id: int, title: str, description: Optional[str], priority: TicketPriority) -> None:
+    """Queue a new ticket, created with ``priority``, for triage when triage is enabled."""
+    if pipeline is not None:
+        pipeline.submit(TriageRequest(ticket_id, title, description, priority))
+
+
+async def untriaged_tickets(db: AsyncSession, after_id: int, limit: int) -> List[TriageRequest]:
+    stmt = (
+        select(Ticket.id, Ticket.title, Ticket.description)
+        .where(Ticket.id > after_id, text(UNTRIAGED_PREDICATE))
+        .order_by(Ticket.id)
+        .limit(limit)
+    )
+    return [TriageRequest(*row) for row in await db.execute(stmt)]
+
+
+async def backfill(pipeline: TriagePipeline, session_factory, page_size: int = 1000) -> int:
+    """Triage every ticket without a category, oldest first; returns how many were submitted."""
+    submitted = 0
+    after_id = 0
+    while True:
+        async with session_factory() as db:
+            tickets = await untriaged_tickets(db, after_id, page_size)
+        if not tickets:
+            return submitted
+        for ticket in tickets:
+            while not pipeline.submit(ticket):
+                await pipeline.join()  # Queue full: let it drain
+        submitted += len(tickets)
+        after_id = tickets[-1].ticket_id
+        await pipeline.join()
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    triage = TriagePipeline(create_triage_client(), AsyncSessionLocal)
+    triage.start()
+    try:
+        submitted = await backfill(triage, AsyncSessionLocal)
+    finally:
+        await triage.close()
+    logger.info("Triaged %d tickets: %s", submitted, triage.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
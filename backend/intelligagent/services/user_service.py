@@ -1,7 +1,19 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from intelligagent.core.metrics import count_queries
 from intelligagent.db.models import User
-from intelligagent.schemas.user import UserCreate, UserUpdate
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.schemas.user import UserCreate, UserUpdate, UserSort
+from intelligagent.services.pagination import keyset_page
 
+USER_SORT_COLUMNS = {
+    UserSort.CREATED_AT: User.created_at,
+    UserSort.EMAIL: User.email,
+}
+
+@count_queries
 def create_user(db: Session, user: UserCreate) -> User:
     """Create a new user in the database."""
     db_user = User(
@@ -14,18 +26,46 @@ def create_user(db: Session, user: UserCreate) -> User:
     db.refresh(db_user)
     return db_user
 
+@count_queries
 def get_user(db: Session, user_id: int) -> User:
     """Get a user by ID."""
     return db.query(User).filter(User.id == user_id).first()
 
+@count_queries
+def get_user_version(db: Session, user_id: int) -> Optional[datetime]:
+    """Get a user's updated_at without loading it; ``None`` if there is no such user."""
+    return db.scalar(select(User.updated_at).where(User.id == user_id))
+
+@count_queries
 def get_user_by_email(db: Session, email: str) -> User:
     """Get a user by email address."""
     return db.query(User).filter(User.email == email).first()
 
+@count_queries
 def get_users(db: Session, skip: int = 0, limit: int = 100):
-    """Get a list of users with pagination."""
-    return db.query(User).offset(skip).limit(limit).all()
+    """Get a list of users with offset pagination."""
+    return db.query(User).order_by(User.id).offset(skip).limit(limit).all()
+
+@count_queries
+def get_users_page(
+    db: Session,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: UserSort = UserSort.CREATED_AT,
+    order: SortOrder = SortOrder.DESC,
+    columns: Optional[Sequence] = None,
+) -> Tuple[List[User], Optional[str]]:
+    """Get a page of users and the cursor for the next page.
+
+    Pass ``columns`` to get plain rows of those columns instead of ``User``
+    objects; they must include the sort key and id.
+    """
+    return keyset_page(
+        db.query(*(columns or [User])), USER_SORT_COLUMNS[sort], User.id,
+        sort=sort.value, order=order, limit=limit, cursor=cursor,
+    )
 
+@count_queries
 def update_user(db: Session, user_id: int, user_update: UserUpdate) -> User:
     """Update a user's information."""
     db_user = get_user(db, user_id)
@@ -1,28 +1,136 @@
+"""
+The IntelliAgent API.
+
+``create_app()`` builds the application without opening a connection, and
+``main:app`` is created on first access. Importing this module is not free:
+the modules it imports build the process's settings, database engines, read
+replicas, cache, admission controller, SLA tracker and ticket feed, so the
+environment (and ``.env``) must be in place first. ``python main.py`` serves
+the app from ``--workers`` processes (API_WORKERS): uvicorn binds the socket
+once and spawns workers that each import the app afresh, so every worker
+creates its own engines and pools (``dispose_inherited_pools`` covers forking
+servers); ``serve`` checks that the pools fit DB_MAX_CONNECTIONS together and
+that admission control admits no more requests than a pool can serve. A
+worker warms up in its lifespan, before it accepts connections, and on
+SIGTERM stops accepting, waits up to API_SHUTDOWN_TIMEOUT seconds for requests
+in flight, then closes its background tasks and pools. Ticket streams run
+until that timeout cuts them (WebSockets are closed at once) and their
+clients reconnect elsewhere.
+"""
+import argparse
+import logging
 import os
-from fastapi import FastAPI, HTTPException
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Sequence
 from dotenv import load_dotenv
 
-# Load environment variables
+# Before the imports below: settings are read when core.config is imported
 load_dotenv()
 
+from fastapi import APIRouter, FastAPI, HTTPException, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from sqlalchemy.orm import configure_mappers
+
 # Import our API routes
-from intelligagent.api import users, tickets
+from intelligagent.api import users, tickets, comments
+from intelligagent.core import metrics
+from intelligagent.core.admission import AdmissionMiddleware, admission
+from intelligagent.core.cache import cache
+from intelligagent.core.config import settings
+from intelligagent.core.singleflight import flights
+from intelligagent.db.database import (
+    ASYNC_DATABASE_URL, REPLICA_URLS, async_engine, engine, get_pool_options, pool_connections, prewarm_pools,
+    read_replicas,
+)
+from intelligagent.db.replicas import ReadYourWritesMiddleware
+from intelligagent.schemas.ticket import Ticket as TicketSchema
+from intelligagent.schemas.user import User as UserSchema
+from intelligagent.services import sla, ticket_feed, ticket_triage
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def instrument_process() -> CollectorRegistry:
+    """Instrument this process's engines once and return the registry ``/metrics`` serves."""
+    metrics.install_query_hooks()
+    metrics.instrument_engine(engine, "sync")  # Created with create_engine's default pool
+    metrics.instrument_engine(
+        async_engine.sync_engine, "async", get_pool_options(async_engine.url).get("max_overflow", 10)
+    )
+    for replica in read_replicas.replicas:
+        metrics.instrument_engine(
+            replica.engine.sync_engine, replica.name, get_pool_options(replica.engine.url).get("max_overflow", 10)
+        )
+    return metrics.create_registry(cache, admission if settings.ADMISSION_ENABLED else None)
+
+async def warm_up(app: FastAPI) -> None:
+    """Do the one-off work of first requests before the worker takes any.
 
-app = FastAPI(title="IntelliAgent", version="0.1.0")
+    Configures the ORM mappers, builds the OpenAPI schema and the cache's
+    serializers, and opens DB_PREWARM_CONNECTIONS connections to each database.
+    """
+    start = time.perf_counter()
+    configure_mappers()
+    app.openapi()
+    cache.prepare(UserSchema, TicketSchema, int)
+    opened = 0
+    if settings.DB_PREWARM_CONNECTIONS > 0:
+        try:
+            opened = await prewarm_pools(settings.DB_PREWARM_CONNECTIONS)
+        except Exception:
+            logger.warning("Pre-opening database connections failed; they open on first use", exc_info=True)
+    logger.info("Worker %d warmed up in %.0f ms (%d connections opened)",
+                os.getpid(), (time.perf_counter() - start) * 1000, opened)
 
-# Include our API routers
-app.include_router(users.router)
-app.include_router(tickets.router)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up(app)
+    read_replicas.start_health_checks(settings.REPLICA_HEALTH_CHECK_INTERVAL)
+    if ticket_triage.pipeline is not None:
+        ticket_triage.pipeline.start()
+    if sla.tracker is not None:
+        sla.tracker.start()
+    if ticket_feed.feed is not None:
+        ticket_feed.feed.start()
+    yield
+    if ticket_feed.feed is not None:
+        await ticket_feed.feed.close()
+    if sla.tracker is not None:
+        await sla.tracker.close()
+    if ticket_triage.pipeline is not None:
+        await ticket_triage.pipeline.close()
+    await read_replicas.close()
+    await async_engine.dispose()
+    engine.dispose()
 
-@app.get("/")
+router = APIRouter()
+
+@router.get("/")
 async def root():
     return {"message": "Hello from IntelliAgent!"}
 
-@app.get("/health")
+@router.get("/health")
 async def health():
     return {"status": "healthy"}
 
-@app.get("/test-groq")
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(generate_latest(instrument_process()), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/cache-stats")
+async def cache_stats():
+    """Show hit and miss counters for the user/ticket cache, and how many reads shared a query"""
+    return {
+        "enabled": cache.enabled,
+        "local_entries": len(cache.local),
+        **cache.stats.as_dict(),
+        "single_flight": {"enabled": flights.enabled, "in_flight": len(flights), **flights.stats.as_dict()},
+    }
+
+@router.get("/test-groq")
 async def test_groq():
     """Test endpoint to verify Groq configuration"""
     groq_api_key = os.getenv("GROQ_API_KEY")
@@ -39,7 +147,7 @@ async def test_groq():
         "api_key_preview": f"{groq_api_key[:8]}..."
     }
 
-@app.get("/env-info")
+@router.get("/env-info")
 async def env_info():
     """Show current environment configuration"""
     return {
@@ -49,20 +157,91 @@ async def env_info():
         "groq_configured": bool(os.getenv("GROQ_API_KEY") and os.getenv("GROQ_API_KEY") != "your_groq_api_key_here")
     }
 
-if __name__ == "__main__":
+def create_app() -> FastAPI:
+    """Build the application; no connection is opened until its lifespan starts."""
+    app = FastAPI(title="IntelliAgent", version="0.1.0", lifespan=lifespan)
+
+    if read_replicas.replicas and settings.READ_YOUR_WRITES_WINDOW > 0:
+        app.add_middleware(ReadYourWritesMiddleware, window=settings.READ_YOUR_WRITES_WINDOW)
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(metrics.MetricsMiddleware)
+        instrument_process()
+
+    # Added last so it runs first: shed requests cost no routing or metrics work
+    if settings.ADMISSION_ENABLED:
+        app.add_middleware(AdmissionMiddleware, controller=admission)
+
+    # Include our API routers
+    app.include_router(users.router)
+    app.include_router(tickets.router)
+    app.include_router(comments.router)
+    app.include_router(router)
+    return app
+
+def __getattr__(name: str):
+    # ``main:app`` for uvicorn and the tests, built on first access
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def check_pool_budget(workers: int, url: str = ASYNC_DATABASE_URL, replica_urls: Sequence[str] = REPLICA_URLS) -> None:
+    """Raise ValueError if ``workers`` pools could together exceed DB_MAX_CONNECTIONS on the primary
+    ``url`` or on any of ``replica_urls``, or if admission control lets a worker serve more requests
+    at once than its pool has connections.
+
+    On the primary, DB_JOB_CONNECTIONS of the budget are left to the services beside the API.
+    """
+    budgets = [("the primary", url, settings.DB_MAX_CONNECTIONS - settings.DB_JOB_CONNECTIONS)]
+    budgets += [(f"replica-{i}", replica_url, settings.DB_MAX_CONNECTIONS) for i, replica_url in enumerate(replica_urls)]
+    for name, database_url, budget in budgets:
+        needed = workers * pool_connections(database_url)
+        if needed > budget:
+            raise ValueError(
+                f"{workers} workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) is {needed} connections to {name}, "
+                f"over the {budget} the API may open there; shrink the pools or raise DB_MAX_CONNECTIONS"
+            )
+    per_worker = pool_connections(url)
+    admitted = settings.ADMISSION_READ_CONCURRENCY + settings.ADMISSION_WRITE_CONCURRENCY
+    if settings.ADMISSION_ENABLED and per_worker and admitted > per_worker:
+        raise ValueError(
+            f"ADMISSION_READ_CONCURRENCY + ADMISSION_WRITE_CONCURRENCY is {admitted}, over the {per_worker} "
+            f"connections of a worker's pool; admitted requests would queue on the pool instead of being shed"
+        )
+
+def serve(host: str, port: int, workers: int, reload: bool = False) -> None:
+    """Run the app under uvicorn from ``workers`` processes, or one reloading on code changes."""
     import uvicorn
-    
-    host = os.getenv("HOST", "0.0.0.0")
-    port = int(os.getenv("PORT", "8000"))
-    debug = os.getenv("DEBUG", "false").lower() == "true"
-    
+
+    check_pool_budget(1 if reload else workers)
+    if workers > 1 and settings.METRICS_ENABLED:
+        metrics.use_multiprocess_dir()
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=None if reload else workers,
+        reload=reload,
+        timeout_graceful_shutdown=settings.API_SHUTDOWN_TIMEOUT,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the IntelliAgent API.")
+    parser.add_argument("--host", default=os.getenv("HOST", settings.API_HOST))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", settings.API_PORT)))
+    parser.add_argument("--workers", type=int, default=settings.API_WORKERS, help="worker processes (API_WORKERS)")
+    parser.add_argument("--reload", action="store_true", help="one process restarted on code changes, for development")
+    args = parser.parse_args()
+    if args.reload and args.workers > 1:
+        parser.error("--reload runs a single worker")
+
     print(f"🚀 Starting IntelliAgent server...")
-    print(f"📍 Host: {host}")
-    print(f"🔌 Port: {port}")
-    print(f"🐛 Debug: {debug}")
+    print(f"📍 Host: {args.host}")
+    print(f"🔌 Port: {args.port}")
+    print(f"👷 Workers: {args.workers}")
+    print(f"🐛 Reload: {args.reload}")
     print(f"🔑 Groq API Key: {'✅ Configured' if os.getenv('GROQ_API_KEY') and os.getenv('GROQ_API_KEY') != 'your_groq_api_key_here' else '❌ Not configured'}")
-    
-    if debug:
-        uvicorn.run("main:app", host=host, port=port, reload=True)
-    else:
-        uvicorn.run(app, host=host, port=port)
+
+    serve(args.host, args.port, args.workers, reload=args.reload)
@@ -20,6 +20,20 @@ from intelligagent.db.models import Base
 from intelligagent.db.database import engine
 target_metadata = Base.metadata
 
+# Full-text search columns, indexes and tables are dialect specific and live
+# outside the models (see intelligagent.db.models); keep autogenerate from
+# proposing to drop them.
+SEARCH_OBJECTS = {
+    "search_vector", "ix_tickets_search_vector", "ix_comments_search_vector",
+    "tickets_fts", "comments_fts",
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None:
+        return name not in SEARCH_OBJECTS and not name.startswith(("tickets_fts_", "comments_fts_"))
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -42,6 +56,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -65,7 +80,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,32 @@
+"""Add keyset pagination indexes on tickets and users
+
+Revision ID: 3b9c1d7e5a20
+Revises: 90f312822d4b
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9c1d7e5a20'
+down_revision: Union[str, None] = '90f312822d4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tickets_created_at_id', 'tickets', ['created_at', 'id'], unique=False)
+    op.create_index('ix_tickets_updated_at_id', 'tickets', ['updated_at', 'id'], unique=False)
+    op.create_index('ix_tickets_priority_id', 'tickets', ['priority', 'id'], unique=False)
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_tickets_priority_id', table_name='tickets')
+    op.drop_index('ix_tickets_updated_at_id', table_name='tickets')
+    op.drop_index('ix_tickets_created_at_id', table_name='tickets')
@@ -0,0 +1,37 @@
+"""Add the dispatch queue index on open tickets
+
+Orders open tickets by priority rank, then age, so claiming the next ticket
+reads the first entry of the index.
+
+Revision ID: 5d2f8c61ab47
+Revises: e7a41b0c9d52
+Create Date: 2026-10-18 15:26:44.107932
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f8c61ab47'
+down_revision: Union[str, None] = 'e7a41b0c9d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPEN_PREDICATE = sa.text("status = 'OPEN'")
+DISPATCH_RANK = sa.text("(CASE priority WHEN 'HIGH' THEN 0 WHEN 'MEDIUM' THEN 1 ELSE 2 END)")
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_tickets_dispatch_queue', 'tickets', [DISPATCH_RANK, 'created_at', 'id'],
+        unique=False,
+        postgresql_where=OPEN_PREDICATE,
+        sqlite_where=OPEN_PREDICATE,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tickets_dispatch_queue', table_name='tickets')
@@ -0,0 +1,47 @@
+"""Add ticket_counters and the triggers that keep it current
+
+Ticket inserts, deletes and changes of status, priority or assignee update
+per-shard counts in the writing transaction. Existing tickets are counted
+into shard 0 here.
+
+Revision ID: 6a1e3f9c2d75
+Revises: f18b2d7c4e90
+Create Date: 2026-10-18 22:10:42.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from intelligagent.db.ddl import COUNTER_DDL, TICKET_COUNTER_RECONCILIATION, drop_statements, for_dialect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1e3f9c2d75'
+down_revision: Union[str, None] = 'f18b2d7c4e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ticket_counters",
+        sa.Column('dimension', sa.String(length=16), nullable=False),
+        sa.Column('key', sa.String(length=32), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('count', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.PrimaryKeyConstraint('dimension', 'key', 'shard'),
+    )
+    dialect = op.get_bind().dialect.name
+    for statement in for_dialect(COUNTER_DDL, dialect):
+        op.execute(statement)
+    if dialect in TICKET_COUNTER_RECONCILIATION:
+        # Against the empty table the reconciliation counts every existing ticket into shard 0
+        op.execute(TICKET_COUNTER_RECONCILIATION[dialect])
+
+
+def downgrade() -> None:
+    for statement in drop_statements(for_dialect(COUNTER_DDL, op.get_bind().dialect.name)):
+        op.execute(statement)
+    op.drop_table('ticket_counters')
@@ -0,0 +1,41 @@
+"""Add tickets.category and tickets.suggested_reply
+
+Written by the triage pipeline. A partial index on untriaged tickets keeps
+the triage backfill from scanning triaged ones.
+
+Revision ID: 8e4b7a2c1f36
+Revises: 6a1e3f9c2d75
+Create Date: 2026-10-18 23:12:40.518733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b7a2c1f36'
+down_revision: Union[str, None] = '6a1e3f9c2d75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ticket_category = sa.Enum('BILLING', 'TECHNICAL', 'ACCOUNT', 'FEATURE_REQUEST', 'OTHER', name='ticketcategory')
+
+
+def upgrade() -> None:
+    ticket_category.create(op.get_bind(), checkfirst=True)
+    op.add_column('tickets', sa.Column('category', ticket_category, nullable=True))
+    op.add_column('tickets', sa.Column('suggested_reply', sa.Text(), nullable=True))
+    op.create_index(
+        'ix_tickets_untriaged', 'tickets', ['id'],
+        postgresql_where=sa.text("category IS NULL"),
+        sqlite_where=sa.text("category IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tickets_untriaged', table_name='tickets')
+    op.drop_column('tickets', 'suggested_reply')
+    op.drop_column('tickets', 'category')
+    ticket_category.drop(op.get_bind(), checkfirst=True)
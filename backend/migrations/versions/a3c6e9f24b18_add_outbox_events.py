@@ -0,0 +1,44 @@
+"""Add the outbox_events table and the triggers that fill it
+
+Every ticket insert and update and every user insert writes an event row in
+its own transaction; the outbox relay publishes and deletes them.
+
+Revision ID: a3c6e9f24b18
+Revises: 5d2f8c61ab47
+Create Date: 2026-10-18 20:31:05.524913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from intelligagent.db.ddl import OUTBOX_DDL, drop_statements, for_dialect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c6e9f24b18'
+down_revision: Union[str, None] = '5d2f8c61ab47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('aggregate_type', sa.String(length=32), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=64), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    for statement in for_dialect(OUTBOX_DDL, op.get_bind().dialect.name):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in drop_statements(for_dialect(OUTBOX_DDL, op.get_bind().dialect.name)):
+        op.execute(statement)
+    op.drop_table('outbox_events')
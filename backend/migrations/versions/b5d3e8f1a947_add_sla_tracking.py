@@ -0,0 +1,63 @@
+"""Add tickets.first_response_at and sla_breaches
+
+A trigger on comments stamps first_response_at with the first public comment
+by an agent or admin; existing tickets are backfilled from their comments.
+sla_breaches records each missed deadline once, and a trigger turns every row
+into a ticket.sla_breached outbox event.
+
+Revision ID: b5d3e8f1a947
+Revises: 8e4b7a2c1f36
+Create Date: 2026-10-19 08:41:17.204561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from intelligagent.db.ddl import SLA_DDL, drop_statements, for_dialect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d3e8f1a947'
+down_revision: Union[str, None] = '8e4b7a2c1f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SLA_KIND = postgresql.ENUM('FIRST_RESPONSE', 'RESOLUTION', name='slakind', create_type=False)
+TICKET_PRIORITY = postgresql.ENUM('LOW', 'MEDIUM', 'HIGH', name='ticketpriority', create_type=False)
+
+BACKFILL = (
+    "UPDATE tickets SET first_response_at = (SELECT min(comments.created_at) FROM comments "
+    "JOIN users ON users.id = comments.author_id WHERE comments.ticket_id = tickets.id "
+    "AND NOT comments.is_internal AND users.role IN ('AGENT', 'ADMIN'))"
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.add_column('tickets', sa.Column('first_response_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(BACKFILL)
+    SLA_KIND.create(bind, checkfirst=True)
+    op.create_table(
+        'sla_breaches',
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('kind', SLA_KIND, nullable=False),
+        sa.Column('priority', TICKET_PRIORITY, nullable=False),
+        sa.Column('deadline', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('breached_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['ticket_id'], ['tickets.id'], ),
+        sa.PrimaryKeyConstraint('ticket_id', 'kind'),
+    )
+    for statement in for_dialect(SLA_DDL, bind.dialect.name):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for statement in drop_statements(for_dialect(SLA_DDL, bind.dialect.name)):
+        op.execute(statement)
+    op.drop_table('sla_breaches')
+    SLA_KIND.drop(bind, checkfirst=True)
+    op.drop_column('tickets', 'first_response_at')
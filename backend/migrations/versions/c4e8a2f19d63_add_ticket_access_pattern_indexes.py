@@ -0,0 +1,52 @@
+"""Add indexes for ticket and comment access patterns
+
+Drops the ix_*_id indexes, which duplicate the primary keys, and indexes the
+foreign keys and filters used by the service layer.
+
+Revision ID: c4e8a2f19d63
+Revises: 3b9c1d7e5a20
+Create Date: 2026-10-18 11:47:05.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f19d63'
+down_revision: Union[str, None] = '3b9c1d7e5a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOT_CLOSED_PREDICATE = sa.text("status <> 'CLOSED'")
+
+
+def upgrade() -> None:
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_tickets_id', table_name='tickets')
+    op.drop_index('ix_comments_id', table_name='comments')
+
+    op.create_index('ix_tickets_requester_id_created_at', 'tickets', ['requester_id', 'created_at'], unique=False)
+    op.create_index('ix_tickets_assignee_id_created_at', 'tickets', ['assignee_id', 'created_at'], unique=False)
+    op.create_index(
+        'ix_tickets_open_assignee_priority', 'tickets', ['assignee_id', 'priority', 'created_at'],
+        unique=False,
+        postgresql_where=NOT_CLOSED_PREDICATE,
+        sqlite_where=NOT_CLOSED_PREDICATE,
+    )
+    op.create_index('ix_comments_ticket_id_created_at', 'comments', ['ticket_id', 'created_at'], unique=False)
+    op.create_index('ix_comments_author_id', 'comments', ['author_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_author_id', table_name='comments')
+    op.drop_index('ix_comments_ticket_id_created_at', table_name='comments')
+    op.drop_index('ix_tickets_open_assignee_priority', table_name='tickets')
+    op.drop_index('ix_tickets_assignee_id_created_at', table_name='tickets')
+    op.drop_index('ix_tickets_requester_id_created_at', table_name='tickets')
+
+    op.create_index('ix_comments_id', 'comments', ['id'], unique=False)
+    op.create_index('ix_tickets_id', 'tickets', ['id'], unique=False)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
@@ -0,0 +1,52 @@
+"""Add full-text search over tickets and comments
+
+Postgres gets stored generated tsvector columns with GIN indexes; SQLite gets
+external-content FTS5 tables kept in step by triggers and backfilled here.
+
+Revision ID: e7a41b0c9d52
+Revises: c4e8a2f19d63
+Create Date: 2026-10-18 14:02:31.418275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from intelligagent.db.ddl import SEARCH_DDL, drop_statements, for_dialect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a41b0c9d52'
+down_revision: Union[str, None] = 'c4e8a2f19d63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_UPGRADE = [
+    *SEARCH_DDL['sqlite']['tickets'],
+    "INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild')",
+    *SEARCH_DDL['sqlite']['comments'],
+    "INSERT INTO comments_fts(comments_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Adding a stored generated column rewrites the table and fills it
+        for statement in for_dialect(SEARCH_DDL, 'postgresql'):
+            op.execute(statement)
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_comments_search_vector', table_name='comments')
+        op.drop_index('ix_tickets_search_vector', table_name='tickets')
+        op.drop_column('comments', 'search_vector')
+        op.drop_column('tickets', 'search_vector')
+    elif dialect == 'sqlite':
+        for statement in drop_statements(SQLITE_UPGRADE):
+            op.execute(statement)
@@ -0,0 +1,48 @@
+"""Add users.updated_at
+
+Conditional GETs on users derive their ETag from it. Existing users start
+from their creation time.
+
+Revision ID: f18b2d7c4e90
+Revises: a3c6e9f24b18
+Create Date: 2026-10-18 21:04:17.862051
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from intelligagent.db.ddl import OUTBOX_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f18b2d7c4e90'
+down_revision: Union[str, None] = 'a3c6e9f24b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    updated_at = sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite can't add a column with a non-constant default in place
+        with op.batch_alter_table('users', recreate='always') as batch_op:
+            batch_op.add_column(updated_at)
+        # Rebuilding the table drops its triggers; the outbox one is put back
+        for statement in OUTBOX_DDL['sqlite']['users']:
+            op.execute(statement)
+    else:
+        op.add_column('users', updated_at)
+    op.execute("UPDATE users SET updated_at = created_at")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('users', recreate='always') as batch_op:
+            batch_op.drop_column('updated_at')
+        # Rebuilding the table drops its triggers; the outbox one is put back
+        for statement in OUTBOX_DDL['sqlite']['users']:
+            op.execute(statement)
+    else:
+        op.drop_column('users', 'updated_at')
@@ -1,20 +1,31 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from typing import Generator
 
-from intelligagent.db.database import Base, get_db
+from intelligagent.db.database import Base, enable_sqlite_foreign_keys, get_db, get_async_db, get_read_db
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from main import app
+from intelligagent.core.admission import admission
+from intelligagent.core.cache import cache, InMemoryRedis
+from intelligagent.core.config import settings
+from intelligagent.core.singleflight import flights
+from intelligagent.services import sla, ticket_feed, ticket_similarity
+from intelligagent.services.ticket_similarity import TicketVectorIndex
 from intelligagent.db.models import User, Ticket, Comment, UserRole, TicketStatus, TicketPriority
 from intelligagent.schemas.user import UserCreate
 from intelligagent.schemas.ticket import TicketCreate
 
+def pytest_configure(config):
+    """Fail tests that make SQLAlchemy warn, e.g. about a session ending a transaction it does not own."""
+    config.addinivalue_line("filterwarnings", "error::sqlalchemy.exc.SAWarning")
+
 # Test database configuration
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
@@ -23,6 +34,7 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+enable_sqlite_foreign_keys(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def override_get_db():
@@ -36,6 +48,58 @@ def override_get_db():
 # Override the database dependency
 app.dependency_overrides[get_db] = override_get_db
 
+@pytest.fixture(autouse=True)
+def reset_cache():
+    """Give every test an empty cache backed by the in-memory Redis stand-in."""
+    cache.reset(remote=InMemoryRedis())
+    yield cache
+
+@pytest.fixture(autouse=True)
+def reset_flights():
+    """Give every test a single-flight group with no reads in flight."""
+    flights.reset()
+    yield flights
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Give every test empty rate limit buckets kept in process."""
+    rate_limiter = admission.rate_limiter
+    if rate_limiter is None:
+        yield
+        return
+    remote = rate_limiter.remote
+    rate_limiter.remote = None
+    rate_limiter.reset()
+    yield
+    rate_limiter.remote = remote
+
+@pytest.fixture(autouse=True)
+def no_prewarm(monkeypatch):
+    """Keep the app's warm-up from connecting to the configured database."""
+    monkeypatch.setattr(settings, "DB_PREWARM_CONNECTIONS", 0)
+
+@pytest.fixture(autouse=True)
+def similarity_index(tmp_path, monkeypatch):
+    """Give every test an empty similar ticket index of its own."""
+    index = TicketVectorIndex(tmp_path / "ticket-index")
+    monkeypatch.setattr(ticket_similarity, "index", index)
+    yield index
+    index.close()
+
+@pytest.fixture(autouse=True)
+def sla_tracker(monkeypatch):
+    """Give every test an empty SLA tracker that never queries the database."""
+    tracker = sla.SlaTracker(sla.load_policies())
+    monkeypatch.setattr(sla, "tracker", tracker)
+    yield tracker
+
+@pytest.fixture(autouse=True)
+def feed(monkeypatch):
+    """Give every test a ticket feed of its own that delivers within the process."""
+    test_feed = ticket_feed.TicketFeed()
+    monkeypatch.setattr(ticket_feed, "feed", test_feed)
+    yield test_feed
+
 @pytest.fixture(scope="session")
 def db_engine():
     """Create database engine for testing."""
@@ -67,6 +131,46 @@ def client(db_session):
         yield test_client
     app.dependency_overrides.clear()
 
+@pytest.fixture
+def api_engines(tmp_path):
+    """Create sync and async engines sharing one SQLite file."""
+    db_path = tmp_path / "api.db"
+    sync_engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+    )
+    enable_sqlite_foreign_keys(sync_engine)
+    Base.metadata.create_all(bind=sync_engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    enable_sqlite_foreign_keys(async_engine.sync_engine)
+    yield sync_engine, async_engine
+    sync_engine.dispose()
+
+@pytest.fixture
+def api_session(api_engines):
+    """Sync session for seeding and inspecting the database behind api_client."""
+    sync_engine, _ = api_engines
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def api_client(api_engines):
+    """Create a test client whose routers use the async session path."""
+    _, async_engine = api_engines
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db  # No replicas: reads use the same file
+    with TestClient(app) as test_client:
+        yield test_client
+        test_client.portal.call(async_engine.dispose)
+    app.dependency_overrides.clear()
+
 # Test data factories
 @pytest.fixture
 def sample_user_data():
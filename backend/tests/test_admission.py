@@ -0,0 +1,204 @@
+"""
+Tests for admission control, load shedding and per-client rate limiting.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from intelligagent.core.admission import (
+    AdmissionController, AdmissionMiddleware, ConcurrencyLimiter, LocalTokenBuckets, RateLimiter, Shed,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestConcurrencyLimiter:
+    """Test cases for slots and the bounded queue."""
+
+    def test_queue_is_fifo_and_bounded(self):
+        """Test that freed slots go to waiters in order and a full queue sheds at once."""
+        async def scenario():
+            limiter = ConcurrencyLimiter("read", limit=1, queue_size=2, max_wait=5.0)
+            await limiter.acquire()
+            order = []
+
+            async def wait(name):
+                await limiter.acquire()
+                order.append(name)
+
+            first, second = asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))
+            await asyncio.sleep(0)
+            with pytest.raises(Shed) as shed:
+                await limiter.acquire()
+
+            limiter.release()
+            await first
+            limiter.release()
+            await second
+            limiter.release()
+            return limiter, order, shed.value
+
+        # Act
+        limiter, order, shed = asyncio.run(scenario())
+
+        # Assert
+        assert order == ["first", "second"]
+        assert shed.reason == "queue_full" and shed.retry_after >= 1
+        assert (limiter.active, limiter.queued, limiter.admitted) == (0, 0, 3)
+
+    def test_waiting_past_the_slo_sheds(self):
+        """Test that a waiter is shed after max_wait and leaves no trace in the queue."""
+        async def scenario():
+            limiter = ConcurrencyLimiter("write", limit=1, queue_size=5, max_wait=0.05)
+            await limiter.acquire()
+            with pytest.raises(Shed) as shed:
+                await limiter.acquire()
+            limiter.release()
+            return limiter, shed.value
+
+        # Act
+        limiter, shed = asyncio.run(scenario())
+
+        # Assert
+        assert shed.reason == "timeout"
+        assert (limiter.active, limiter.queued) == (0, 0)
+
+    def test_predicted_wait_beyond_the_slo_sheds_without_queueing(self):
+        """Test that slow recent requests make the limiter reject up front."""
+        async def scenario():
+            limiter = ConcurrencyLimiter("read", limit=2, queue_size=100, max_wait=1.0)
+            for _ in range(50):
+                limiter.observe(3.0)  # Each slot is held for about 3s
+            await limiter.acquire()
+            await limiter.acquire()
+            with pytest.raises(Shed) as shed:
+                await limiter.acquire()
+            return limiter, shed.value
+
+        # Act
+        limiter, shed = asyncio.run(scenario())
+
+        # Assert
+        assert shed.reason == "deadline"
+        assert shed.retry_after == pytest.approx(limiter.expected_wait())
+        assert limiter.queued == 0
+
+
+class TestRateLimiter:
+    """Test cases for the per-client token buckets."""
+
+    def test_local_buckets_refill_over_time(self):
+        """Test that a client gets its burst, then one request per 1/rate seconds."""
+        # Arrange
+        clock = FakeClock()
+        buckets = LocalTokenBuckets(rate=2.0, burst=3, clock=clock)
+
+        # Act / Assert
+        assert [buckets.take("a") for _ in range(3)] == [0, 0, 0]
+        assert buckets.take("a") == pytest.approx(0.5)
+        assert buckets.take("b") == 0  # Other clients are unaffected
+        clock.now += 0.5
+        assert buckets.take("a") == 0
+
+    def test_falls_back_to_local_buckets_while_redis_is_down(self):
+        """Test that Redis errors switch to in-process buckets and Redis is retried later."""
+        # Arrange
+        calls = []
+
+        class DownRedis:
+            def register_script(self, script):
+                async def run(keys, args):
+                    calls.append(keys)
+                    raise RedisConnectionError("connection refused")
+                return run
+
+        clock = FakeClock()
+        limiter = RateLimiter(DownRedis(), rate=1.0, burst=1, retry_interval=5.0, clock=clock)
+
+        # Act
+        waits = [asyncio.run(limiter.take("client")) for _ in range(2)]
+        clock.now += 5.0
+        asyncio.run(limiter.take("client"))
+
+        # Assert
+        assert waits[0] == 0 and waits[1] > 0
+        assert len(calls) == 2  # The second request did not wait on Redis
+        assert limiter.errors == 2 and limiter.limited == 1
+
+
+@pytest.fixture
+def gated_app():
+    """An app whose /slow requests hold their slot until ``release`` is set, behind one read slot."""
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    controller = AdmissionController(
+        reads=ConcurrencyLimiter("read", limit=1, queue_size=0, max_wait=1.0),
+        writes=ConcurrencyLimiter("write", limit=1, queue_size=0, max_wait=1.0),
+        rate_limiter=RateLimiter(None, rate=1.0, burst=3),
+    )
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app, release
+
+
+class TestAdmissionMiddleware:
+    """Test cases for shedding and rate limiting over HTTP."""
+
+    def test_overload_sheds_with_retry_after_but_health_is_served(self, gated_app):
+        """Test that a saturated class answers 503 while /health still gets through."""
+        app, release = gated_app
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                held = asyncio.create_task(client.get("/slow"))
+                await asyncio.sleep(0.05)
+                shed = await client.get("/slow")
+                health = [await client.get("/health") for _ in range(5)]  # Beyond the rate limit, too
+                release.set()
+                return await held, shed, health
+
+        # Act
+        held, shed, health = asyncio.run(scenario())
+
+        # Assert
+        assert held.status_code == 200
+        assert shed.status_code == 503
+        assert int(shed.headers["Retry-After"]) >= 1
+        assert [response.status_code for response in health] == [200] * 5
+
+    def test_rate_limited_client_gets_429(self, gated_app):
+        """Test that a client past its burst is refused with 429 and Retry-After."""
+        app, release = gated_app
+        release.set()
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return [await client.get("/slow") for _ in range(4)]
+
+        # Act
+        responses = asyncio.run(scenario())
+
+        # Assert
+        assert [response.status_code for response in responses] == [200, 200, 200, 429]
+        assert responses[-1].headers["Retry-After"] == "1"
+        assert responses[-1].json() == {"detail": "Rate limit exceeded"}
@@ -0,0 +1,104 @@
+"""
+Tests for the user and ticket API routers on the async session path.
+"""
+import pytest
+
+from intelligagent.db.models import User, Ticket, UserRole, TicketStatus
+
+
+@pytest.fixture
+def requester(api_session):
+    """Create a requester in the API database."""
+    user = User(email="requester@example.com", name="Requester", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    api_session.refresh(user)
+    return user
+
+
+class TestUserAPI:
+    """Test cases for the /users endpoints."""
+    
+    def test_create_and_read_user(self, api_client):
+        """Test creating a user and reading it back."""
+        # Act
+        response = api_client.post("/users/", json={"email": "new@example.com", "name": "New User"})
+        
+        # Assert
+        assert response.status_code == 200
+        created = response.json()
+        assert created["email"] == "new@example.com"
+        assert created["role"] == UserRole.CUSTOMER.value
+        
+        response = api_client.get(f"/users/{created['id']}")
+        assert response.status_code == 200
+        assert response.json()["name"] == "New User"
+    
+    def test_create_user_duplicate_email(self, api_client, requester):
+        """Test that a duplicate email is rejected."""
+        # Act
+        response = api_client.post("/users/", json={"email": requester.email, "name": "Other"})
+        
+        # Assert
+        assert response.status_code == 400
+    
+    def test_update_user_not_found(self, api_client):
+        """Test updating a user that doesn't exist."""
+        # Act
+        response = api_client.put("/users/999", json={"name": "Nobody"})
+        
+        # Assert
+        assert response.status_code == 404
+
+
+class TestTicketAPI:
+    """Test cases for the /tickets endpoints."""
+    
+    def test_create_ticket_success(self, api_client, requester):
+        """Test creating a ticket for an existing requester."""
+        # Act
+        response = api_client.post(
+            "/tickets/",
+            json={"title": "Printer on fire", "requester_id": requester.id},
+        )
+        
+        # Assert
+        assert response.status_code == 200
+        ticket = response.json()
+        assert ticket["title"] == "Printer on fire"
+        assert ticket["status"] == TicketStatus.OPEN.value
+        assert ticket["created_at"] is not None
+    
+    def test_create_ticket_unknown_requester(self, api_client):
+        """Test creating a ticket for a requester that doesn't exist."""
+        # Act
+        response = api_client.post("/tickets/", json={"title": "Orphan", "requester_id": 999})
+        
+        # Assert
+        assert response.status_code == 404
+    
+    def test_update_and_list_tickets(self, api_client, api_session, requester):
+        """Test updating a ticket and listing tickets by requester."""
+        # Arrange
+        ticket = Ticket(title="Slow login", requester_id=requester.id)
+        api_session.add(ticket)
+        api_session.commit()
+        
+        # Act
+        response = api_client.put(f"/tickets/{ticket.id}", json={"status": "in_progress"})
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["status"] == TicketStatus.IN_PROGRESS.value
+        
+        response = api_client.get(f"/tickets/user/{requester.id}")
+        assert response.status_code == 200
+        assert [t["id"] for t in response.json()] == [ticket.id]
+    
+    def test_read_ticket_not_found(self, api_client):
+        """Test reading a ticket that doesn't exist."""
+        # Act
+        response = api_client.get("/tickets/999")
+        
+        # Assert
+        assert response.status_code == 404
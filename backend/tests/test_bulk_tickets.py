@@ -0,0 +1,215 @@
+"""
+Tests for bulk ticket ingestion and bulk ticket updates.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from intelligagent.db.models import OutboxEvent, User, Ticket, UserRole, TicketPriority, TicketStatus
+from intelligagent.schemas.ticket import TicketCreate
+from intelligagent.services.ticket_service import create_tickets_bulk
+
+
+@pytest.fixture
+def requester(api_session):
+    """Create a requester in the API database."""
+    user = User(email="bulk@example.com", name="Bulk", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    api_session.refresh(user)
+    return user
+
+
+class TestCreateTicketsBulk:
+    """Test cases for the create_tickets_bulk service function."""
+    
+    def test_inserts_in_order_and_reports_unknown_requesters(self, db_session, db_user):
+        """Test that ids come back in input order and bad requesters are per-row errors."""
+        # Arrange
+        tickets = [
+            TicketCreate(title="first", requester_id=db_user.id),
+            TicketCreate(title="orphan", requester_id=999),
+            TicketCreate(title="third", requester_id=db_user.id, priority=TicketPriority.HIGH),
+        ]
+        
+        # Act
+        results = create_tickets_bulk(db_session, tickets)
+        
+        # Assert
+        assert results[1] == (None, "Requester not found")
+        first_id, third_id = results[0][0], results[2][0]
+        assert db_session.get(Ticket, first_id).title == "first"
+        assert db_session.get(Ticket, third_id).priority == TicketPriority.HIGH
+    
+    def test_known_requesters_skip_lookup(self, db_session, db_user, db_engine):
+        """Test that requesters already validated are not queried again."""
+        # Arrange
+        known = set()
+        user_id = db_user.id
+        create_tickets_bulk(db_session, [TicketCreate(title="a", requester_id=user_id)], known)
+        tickets = [TicketCreate(title=f"b{i}", requester_id=user_id) for i in range(50)]
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db_engine, "before_cursor_execute", listener)
+        
+        # Act
+        try:
+            create_tickets_bulk(db_session, tickets, known)
+        finally:
+            event.remove(db_engine, "before_cursor_execute", listener)
+        
+        # Assert
+        assert known == {user_id}
+        assert not any(s.startswith("SELECT") for s in statements)
+        assert sum(s.startswith("INSERT") for s in statements) == 1
+
+
+class TestBulkEndpoint:
+    """Test cases for POST /tickets/bulk."""
+    
+    def test_json_array_with_row_errors(self, api_client, requester):
+        """Test that invalid rows are reported without failing the others."""
+        # Act
+        response = api_client.post("/tickets/bulk", json=[
+            {"title": "ok 1", "requester_id": requester.id},
+            {"requester_id": requester.id},
+            {"title": "bad requester", "requester_id": 999},
+            {"title": "ok 2", "requester_id": requester.id},
+        ])
+        
+        # Assert
+        assert response.status_code == 200
+        body = response.json()
+        assert body["created"] == 2
+        assert [error["index"] for error in body["errors"]] == [1, 2]
+        assert "title" in body["errors"][0]["detail"]
+    
+    def test_ndjson_stream_in_batches(self, api_client, api_session, requester):
+        """Test NDJSON ingestion across several batches."""
+        # Arrange
+        lines = [json.dumps({"title": f"stream {i}", "requester_id": requester.id}) for i in range(25)]
+        lines.insert(10, "{not json")
+        
+        # Act
+        response = api_client.post(
+            "/tickets/bulk",
+            params={"batch_size": 7},
+            content="\n".join(lines) + "\n",
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        
+        # Assert
+        body = response.json()
+        assert body["created"] == 25
+        assert body["errors"][0]["index"] == 10
+        titles = [api_session.get(Ticket, ticket_id).title for ticket_id in body["ids"]]
+        assert titles == [f"stream {i}" for i in range(25)]
+    
+    def test_rejects_non_array_body(self, api_client):
+        """Test that a JSON object body is rejected."""
+        response = api_client.post("/tickets/bulk", json={"title": "single"})
+        assert response.status_code == 400
+
+
+@pytest.fixture
+def agents(api_session):
+    """Create two agents in the API database."""
+    users = [User(email=f"agent{i}@example.com", name=f"Agent {i}", role=UserRole.AGENT) for i in range(2)]
+    api_session.add_all(users)
+    api_session.commit()
+    return users
+
+
+class TestBulkUpdateEndpoint:
+    """Test cases for PATCH /tickets/bulk."""
+
+    def test_ids_are_updated_in_chunks(self, api_client, api_engines, api_session, requester, agents):
+        """Test that listed tickets change, chunk by chunk, with updated_at and events maintained."""
+        # Arrange
+        old = datetime(2024, 1, 1)
+        tickets = [Ticket(title=f"t{i}", requester_id=requester.id, created_at=old, updated_at=old) for i in range(7)]
+        api_session.add_all(tickets)
+        api_session.commit()
+        ids = [ticket.id for ticket in tickets]
+        cached = api_client.get(f"/tickets/{ids[0]}").json()
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        async_engine = api_engines[1].sync_engine
+
+        # Act
+        event.listen(async_engine, "before_cursor_execute", listener)
+        try:
+            response = api_client.patch(
+                "/tickets/bulk", params={"chunk_size": 3},
+                json={"ids": ids[:5] + [ids[0], 999], "update": {"assignee_id": agents[0].id, "status": "in_progress"}},
+            )
+        finally:
+            event.remove(async_engine, "before_cursor_execute", listener)
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {"dry_run": False, "matched": 5, "ids": ids[:5]}
+        assert len(statements) == 2, statements  # 6 distinct ids, 3 a chunk
+        assert all("UPDATE tickets SET" in statement and "RETURNING" in statement for statement in statements)
+        api_session.expire_all()
+        changed = [api_session.get(Ticket, ticket_id) for ticket_id in ids]
+        assert [ticket.status for ticket in changed] == [TicketStatus.IN_PROGRESS] * 5 + [TicketStatus.OPEN] * 2
+        assert all(ticket.updated_at > old for ticket in changed[:5]) and changed[5].updated_at == old
+        assert api_client.get(f"/tickets/{ids[0]}").json()["assignee_id"] == agents[0].id != cached["assignee_id"]
+        assert api_session.query(OutboxEvent).filter_by(event_type="ticket.updated").count() == 5
+
+    def test_filter_reassigns_an_agents_tickets(self, api_client, api_session, requester, agents):
+        """Test that a filter selects by assignee, status and age, even when the change takes tickets out of it."""
+        # Arrange
+        leaver, successor = agents
+        now = datetime.utcnow()
+        tickets = [
+            Ticket(title="old open", requester_id=requester.id, assignee_id=leaver.id,
+                   created_at=now - timedelta(days=3)),
+            Ticket(title="old closed", requester_id=requester.id, assignee_id=leaver.id,
+                   status=TicketStatus.CLOSED, created_at=now - timedelta(days=3)),
+            Ticket(title="new open", requester_id=requester.id, assignee_id=leaver.id),
+            Ticket(title="other agent", requester_id=requester.id, assignee_id=successor.id,
+                   created_at=now - timedelta(days=3)),
+        ] + [
+            Ticket(title=f"backlog {i}", requester_id=requester.id, assignee_id=leaver.id,
+                   status=TicketStatus.IN_PROGRESS, created_at=now - timedelta(days=2))
+            for i in range(5)
+        ]
+        api_session.add_all(tickets)
+        api_session.commit()
+        body = {
+            "filter": {"assignee_id": leaver.id, "created_to": (now - timedelta(days=1)).isoformat()},
+            "update": {"assignee_id": successor.id},
+        }
+
+        # Act
+        dry_run = api_client.patch("/tickets/bulk", params={"dry_run": True}, json=body).json()
+        applied = api_client.patch("/tickets/bulk", params={"chunk_size": 2}, json=body).json()
+
+        # Assert
+        expected = sorted([tickets[0].id, tickets[1].id] + [ticket.id for ticket in tickets[4:]])
+        assert dry_run == {"dry_run": True, "matched": 7, "ids": []}
+        assert applied == {"dry_run": False, "matched": 7, "ids": expected}
+        api_session.expire_all()
+        assert api_session.get(Ticket, tickets[2].id).assignee_id == leaver.id
+
+    def test_rejects_ambiguous_or_empty_requests(self, api_client, api_session, requester):
+        """Test that requests must pick tickets one way, with criteria, and change something."""
+        # Arrange
+        api_session.add(Ticket(title="open", requester_id=requester.id))
+        api_session.commit()
+
+        # Act
+        both = api_client.patch("/tickets/bulk", json={"ids": [1], "filter": {"status": "open"},
+                                                       "update": {"priority": "high"}})
+        empty_filter = api_client.patch("/tickets/bulk", json={"filter": {}, "update": {"priority": "high"}})
+        no_changes = api_client.patch("/tickets/bulk", json={"ids": [1], "update": {}})
+        unknown_assignee = api_client.patch("/tickets/bulk", json={"filter": {"status": "open"},
+                                                                   "update": {"assignee_id": 999}})
+
+        # Assert
+        assert [both.status_code, empty_filter.status_code, no_changes.status_code] == [400, 400, 400]
+        assert unknown_assignee.status_code == 404
@@ -0,0 +1,263 @@
+"""
+Tests for the two-tier user/ticket cache.
+"""
+import asyncio
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from intelligagent.core.cache import LRUCache, InMemoryRedis, TwoTierCache
+from intelligagent.db.models import User, Ticket, UserRole
+from intelligagent.schemas.user import User as UserSchema
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class BrokenRedis:
+    """Remote tier whose every call fails like an unreachable server."""
+    
+    async def get(self, key):
+        raise RedisConnectionError("connection refused")
+    
+    async def set(self, key, value, ex=None, nx=False):
+        raise RedisConnectionError("connection refused")
+    
+    async def delete(self, *keys):
+        raise RedisConnectionError("connection refused")
+    
+    def pipeline(self, transaction=True):
+        raise RedisConnectionError("connection refused")
+
+
+@pytest.fixture
+def requester(api_session):
+    """Create a user in the API database."""
+    user = User(email="cached@example.com", name="Cached", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    api_session.refresh(user)
+    return user
+
+
+class TestLRUCache:
+    """Test cases for the local tier."""
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is evicted at capacity."""
+        lru = LRUCache(maxsize=2, ttl=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        
+        assert lru.get("a") == 1
+        assert lru.get("b") is None
+        assert lru.get("c") == 3
+    
+    def test_entries_expire(self):
+        """Test that entries disappear after their TTL."""
+        clock = FakeClock()
+        lru = LRUCache(maxsize=10, ttl=5, clock=clock)
+        lru.set("a", 1)
+        
+        clock.now = 4.9
+        assert lru.get("a") == 1
+        clock.now = 5.0
+        assert lru.get("a") is None
+
+
+class TestTwoTierCache:
+    """Test cases for TwoTierCache."""
+    
+    def test_remote_hit_fills_local_tier(self):
+        """Test that a value loaded by another worker is served from Redis, then locally."""
+        remote = InMemoryRedis()
+        loader_worker = TwoTierCache(remote)
+        reader = TwoTierCache(remote)
+        user = UserSchema(
+            id=1, email="a@example.com", name="A", role=UserRole.AGENT,
+            created_at="2025-01-01T00:00:00", updated_at="2025-01-01T00:00:00",
+        )
+        
+        async def loader():
+            return user
+        
+        async def scenario():
+            await loader_worker.get_or_load("user:1", UserSchema, loader)
+            first = await reader.get("user:1", UserSchema)
+            second = await reader.get("user:1", UserSchema)
+            return first, second
+        
+        first, second = asyncio.run(scenario())
+        
+        assert first == user and second == user
+        assert reader.stats.remote_hits == 1
+        assert reader.stats.local_hits == 1
+    
+    def test_redis_errors_fall_back_to_loader(self):
+        """Test that an unreachable Redis degrades to database reads."""
+        broken = TwoTierCache(BrokenRedis())
+        loads = []
+        
+        async def loader():
+            loads.append(1)
+            return 42
+        
+        async def scenario():
+            await broken.get_or_load("k", int, loader)
+            broken.local.clear()
+            return await broken.get_or_load("k", int, loader)
+        
+        assert asyncio.run(scenario()) == 42
+        assert len(loads) == 2
+        assert broken.stats.errors >= 2
+    
+    def test_loads_that_raced_a_write_do_not_cache_what_they_read(self):
+        """Test that a load which read before a write committed caches neither what it read nor anything shared."""
+        remote = InMemoryRedis()
+        cache = TwoTierCache(remote)
+        other_worker = TwoTierCache(remote)
+        
+        async def scenario():
+            read, release = asyncio.Event(), asyncio.Event()
+        
+            async def stale_loader():
+                read.set()  # Read the old row, then stall until the write lands
+                await release.wait()
+                return "old"
+        
+            load = asyncio.create_task(cache.get_or_load("k", str, stale_loader))
+            await read.wait()
+            await cache.set("k", "new")
+            release.set()
+            loaded = await load
+            return loaded, await cache.get("k", str), await other_worker.get("k", str)
+        
+        assert asyncio.run(scenario()) == ("old", "new", None)
+    
+    def test_invalidations_keep_earlier_loads_out_of_redis(self):
+        """Test that a deleted key refuses fills until its tombstone expires."""
+        clock = FakeClock()
+        remote = InMemoryRedis(clock=clock)
+        writer = TwoTierCache(remote, invalidation_ttl=10)
+        reader = TwoTierCache(remote)
+        
+        async def loader():
+            return "old"  # Read by another worker before the delete committed
+        
+        async def scenario():
+            await writer.set("k", "current")
+            await writer.delete("k")
+            before = await reader.get_or_load("k", str, loader)
+            refused = await remote.get(reader._key("k")), reader.local.get("k")
+            clock.now = 10
+            await reader.get_or_load("k", str, loader)
+            return before, refused, await writer.get("k", str)
+        
+        before, refused, after = asyncio.run(scenario())
+        
+        assert before == "old"  # Served, but not cached
+        assert refused == (b"", None)
+        assert after == "old"
+    
+    def test_writers_reaching_redis_out_of_commit_order_leave_no_stale_copy(self):
+        """Test that the writer of an older version setting last cannot leave it in Redis."""
+        clock = FakeClock()
+        remote = InMemoryRedis(clock=clock)
+        older_writer, newer_writer, reader = (TwoTierCache(remote, invalidation_ttl=10) for _ in range(3))
+        
+        async def loader():
+            return "v2"  # What the database holds once both writes have committed
+        
+        async def scenario():
+            # v1 commits before v2, but its writer reaches the cache after v2's
+            await newer_writer.set("k", "v2")
+            await older_writer.set("k", "v1")
+            during = await reader.get_or_load("k", str, loader), await remote.get(reader._key("k"))
+            clock.now = 10
+            reader.local.clear()
+            after = await reader.get_or_load("k", str, loader), await TwoTierCache(remote).get("k", str)
+            return during, after
+        
+        during, after = asyncio.run(scenario())
+        
+        assert during == ("v2", b"")
+        assert after == ("v2", "v2")
+    
+    def test_replica_loads_fill_only_the_local_tier(self):
+        """Test that shared=False keeps a possibly lagging read out of Redis."""
+        remote = InMemoryRedis()
+        cache = TwoTierCache(remote)
+        
+        async def loader():
+            return 7
+        
+        async def scenario():
+            await cache.get_or_load("k", int, loader, shared=False)
+            return await remote.get(cache._key("k"))
+        
+        assert asyncio.run(scenario()) is None
+        assert cache.local.get("k") == 7
+    
+    def test_primary_loads_do_not_join_replica_loads(self):
+        """Test that a load from the primary never gets a lagging replica's answer."""
+        cache = TwoTierCache(InMemoryRedis())
+        
+        async def scenario():
+            release = asyncio.Event()
+        
+            async def replica_loader():
+                await release.wait()
+                return "lagging"
+        
+            async def primary_loader():
+                return "current"
+        
+            replica_read = asyncio.create_task(cache.get_or_load("k", str, replica_loader, shared=False))
+            await asyncio.sleep(0)
+            primary_read = await cache.get_or_load("k", str, primary_loader)
+            release.set()
+            return await replica_read, primary_read
+        
+        assert asyncio.run(scenario()) == ("lagging", "current")
+
+
+class TestCachedEndpoints:
+    """Test cases for read-through and write invalidation via the API."""
+    
+    def test_repeat_reads_hit_cache(self, api_client, requester, reset_cache):
+        """Test that the second read of a user is a cache hit."""
+        api_client.get(f"/users/{requester.id}")
+        api_client.get(f"/users/{requester.id}")
+        
+        stats = api_client.get("/cache-stats").json()
+        assert stats["misses"] == 1
+        assert stats["local_hits"] == 1
+    
+    def test_update_user_refreshes_cache(self, api_client, requester):
+        """Test that reads after an update see the new values."""
+        api_client.get(f"/users/{requester.id}")
+        api_client.put(f"/users/{requester.id}", json={"name": "Renamed", "email": "moved@example.com"})
+        
+        assert api_client.get(f"/users/{requester.id}").json()["name"] == "Renamed"
+        # The old address is free again and the new one is taken
+        assert api_client.post("/users/", json={"email": "cached@example.com", "name": "Reuse"}).status_code == 200
+        assert api_client.post("/users/", json={"email": "moved@example.com", "name": "Dup"}).status_code == 400
+    
+    def test_update_ticket_refreshes_cache(self, api_client, api_session, requester):
+        """Test that a cached ticket is replaced when it is updated."""
+        ticket = Ticket(title="Cached ticket", requester_id=requester.id)
+        api_session.add(ticket)
+        api_session.commit()
+        
+        api_client.get(f"/tickets/{ticket.id}")
+        api_client.put(f"/tickets/{ticket.id}", json={"title": "Edited"})
+        
+        assert api_client.get(f"/tickets/{ticket.id}").json()["title"] == "Edited"
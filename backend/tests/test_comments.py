@@ -0,0 +1,140 @@
+"""
+Tests for the comment API and the ticket detail view.
+"""
+import pytest
+from sqlalchemy import insert
+
+from intelligagent.db.models import User, Ticket, Comment, UserRole
+from tests.test_ticket_writes import counted_statements
+
+
+@pytest.fixture
+def people(api_session):
+    """Create a requester and an agent in the API database."""
+    requester = User(email="customer@example.com", name="Customer", role=UserRole.CUSTOMER)
+    agent = User(email="agent@example.com", name="Agent", role=UserRole.AGENT)
+    api_session.add_all([requester, agent])
+    api_session.commit()
+    return requester, agent
+
+
+@pytest.fixture
+def ticket(api_session, people):
+    """Create a ticket assigned to the agent."""
+    requester, agent = people
+    ticket = Ticket(title="Thread", requester_id=requester.id, assignee_id=agent.id)
+    api_session.add(ticket)
+    api_session.commit()
+    return ticket
+
+
+class TestCommentAPI:
+    """Test cases for the /comments endpoints."""
+
+    def test_comment_crud(self, api_client, ticket, people):
+        """Test creating, reading, editing and deleting a comment."""
+        # Arrange
+        _, agent = people
+
+        # Act
+        created = api_client.post(
+            "/comments/", json={"body": "Looking", "ticket_id": ticket.id, "author_id": agent.id}
+        )
+        comment_id = created.json()["id"]
+        edited = api_client.put(f"/comments/{comment_id}", json={"body": "On it", "is_internal": True})
+        read = api_client.get(f"/comments/{comment_id}")
+        deleted = api_client.delete(f"/comments/{comment_id}")
+
+        # Assert
+        assert created.status_code == 200
+        assert edited.json()["body"] == "On it"
+        assert read.json()["author_name"] == "Agent"
+        assert read.json()["is_internal"] is True
+        assert deleted.status_code == 204
+        assert api_client.get(f"/comments/{comment_id}").status_code == 404
+        assert api_client.delete(f"/comments/{comment_id}").status_code == 404
+
+    def test_create_comment_unknown_references(self, api_client, ticket, people):
+        """Test that a missing ticket or author is reported by name."""
+        # Arrange
+        requester, _ = people
+
+        # Act
+        no_ticket = api_client.post("/comments/", json={"body": "x", "ticket_id": 999, "author_id": requester.id})
+        no_author = api_client.post("/comments/", json={"body": "x", "ticket_id": ticket.id, "author_id": 999})
+
+        # Assert
+        assert (no_ticket.status_code, no_ticket.json()["detail"]) == (404, "Ticket not found")
+        assert (no_author.status_code, no_author.json()["detail"]) == (404, "Author not found")
+
+    def test_ticket_comments_are_paged(self, api_client, api_session, ticket, people):
+        """Test paging a ticket's comments in posting order."""
+        # Arrange
+        requester, _ = people
+        api_session.add_all(
+            [Comment(body=f"c{i}", ticket_id=ticket.id, author_id=requester.id) for i in range(5)]
+        )
+        api_session.commit()
+
+        # Act
+        first = api_client.get(f"/comments/ticket/{ticket.id}", params={"limit": 3}).json()
+        second = api_client.get(
+            f"/comments/ticket/{ticket.id}", params={"limit": 3, "cursor": first["next_cursor"]}
+        ).json()
+
+        # Assert
+        assert [c["body"] for c in first["items"] + second["items"]] == [f"c{i}" for i in range(5)]
+        assert second["next_cursor"] is None
+        assert api_client.get("/comments/ticket/999").status_code == 404
+
+
+class TestTicketDetail:
+    """Test cases for GET /tickets/{id}/full."""
+
+    def test_detail_query_count_is_constant(self, api_client, api_session, api_engines, ticket, people):
+        """Test that a ticket with 1,000 comments is served in two queries per page."""
+        # Arrange
+        requester, agent = people
+        api_session.execute(insert(Comment), [
+            {"body": f"comment {i}", "ticket_id": ticket.id, "author_id": (requester.id, agent.id)[i % 2]}
+            for i in range(1000)
+        ])
+        api_session.commit()
+        _, async_engine = api_engines
+
+        # Act
+        with counted_statements(async_engine.sync_engine) as statements:
+            response = api_client.get(f"/tickets/{ticket.id}/full", params={"limit": 500})
+
+        # Assert
+        assert response.status_code == 200
+        body = response.json()
+        assert body["requester"]["email"] == "customer@example.com"
+        assert body["assignee"]["name"] == "Agent"
+        assert len(body["comments"]["items"]) == 500
+        assert body["comments"]["items"][1]["author_name"] == "Agent"
+        assert len(statements) == 2, statements
+
+        with counted_statements(async_engine.sync_engine) as statements:
+            rest = api_client.get(
+                f"/tickets/{ticket.id}/full", params={"limit": 500, "cursor": body["comments"]["next_cursor"]}
+            ).json()
+        assert len(rest["comments"]["items"]) == 500
+        assert rest["comments"]["next_cursor"] is None
+        assert len(statements) == 2, statements
+
+    def test_detail_unassigned_and_missing(self, api_client, api_session, people):
+        """Test the detail view of an unassigned ticket and of a missing one."""
+        # Arrange
+        requester, _ = people
+        ticket = Ticket(title="Alone", requester_id=requester.id)
+        api_session.add(ticket)
+        api_session.commit()
+
+        # Act
+        response = api_client.get(f"/tickets/{ticket.id}/full")
+
+        # Assert
+        assert response.json()["assignee"] is None
+        assert response.json()["comments"] == {"items": [], "next_cursor": None}
+        assert api_client.get("/tickets/999/full").status_code == 404
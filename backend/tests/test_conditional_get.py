@@ -0,0 +1,160 @@
+"""
+Tests for ETags and If-None-Match on the ticket and user read endpoints.
+"""
+from datetime import datetime
+
+import pytest
+
+from intelligagent.api.conditional import etag_matches, make_etag
+from intelligagent.core.cache import InMemoryRedis
+from intelligagent.db.models import User, Ticket, UserRole
+from tests.test_ticket_writes import counted_statements
+
+# Rows start out last updated well in the past, so a write in the test always
+# moves updated_at even at SQLite's one-second timestamp resolution
+LONG_AGO = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def requester(api_session):
+    """Create a requester in the API database."""
+    user = User(email="poller@example.com", name="Poller", role=UserRole.CUSTOMER, updated_at=LONG_AGO)
+    api_session.add(user)
+    api_session.commit()
+    return user
+
+
+@pytest.fixture
+def ticket(api_session, requester):
+    """Create a ticket for the requester."""
+    ticket = Ticket(title="Polled", requester_id=requester.id, updated_at=LONG_AGO)
+    api_session.add(ticket)
+    api_session.commit()
+    return ticket
+
+
+def revalidate(api_client, url, etag):
+    return api_client.get(url, headers={"If-None-Match": etag})
+
+
+class TestTicketConditionalGet:
+    """Test cases for conditional GET /tickets/{id}."""
+
+    def test_unchanged_ticket_is_not_modified(self, api_client, ticket):
+        """Test that a matching ETag gets an empty 304 carrying the same ETag."""
+        # Arrange
+        first = api_client.get(f"/tickets/{ticket.id}")
+        etag = first.headers["ETag"]
+
+        # Act
+        response = revalidate(api_client, f"/tickets/{ticket.id}", etag)
+
+        # Assert
+        assert etag.startswith('"') and etag.endswith('"')
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+    def test_update_changes_etag(self, api_client, ticket):
+        """Test that a write invalidates the ETag the client holds."""
+        # Arrange
+        etag = api_client.get(f"/tickets/{ticket.id}").headers["ETag"]
+
+        # Act
+        api_client.put(f"/tickets/{ticket.id}", json={"title": "Edited"})
+        response = revalidate(api_client, f"/tickets/{ticket.id}", etag)
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["title"] == "Edited"
+        assert response.headers["ETag"] != etag
+        assert revalidate(api_client, f"/tickets/{ticket.id}", response.headers["ETag"]).status_code == 304
+
+    def test_revalidation_reads_only_the_version(self, api_client, api_engines, ticket, reset_cache):
+        """Test that a 304 costs one metadata query on a cache miss and none on a hit."""
+        # Arrange
+        _, async_engine = api_engines
+        etag = api_client.get(f"/tickets/{ticket.id}").headers["ETag"]
+
+        # Act
+        with counted_statements(async_engine.sync_engine) as cached:
+            revalidate(api_client, f"/tickets/{ticket.id}", etag)
+        reset_cache.reset(remote=InMemoryRedis())
+        with counted_statements(async_engine.sync_engine) as uncached:
+            response = revalidate(api_client, f"/tickets/{ticket.id}", etag)
+
+        # Assert
+        assert response.status_code == 304
+        assert cached == []
+        assert len(uncached) == 1
+        assert uncached[0].startswith("SELECT tickets.updated_at")
+
+    def test_missing_ticket_and_stale_or_foreign_etags(self, api_client, ticket):
+        """Test 404s and non-matching tags fall through to a normal response."""
+        # Act / Assert
+        assert revalidate(api_client, "/tickets/999", '"abc"').status_code == 404
+        assert revalidate(api_client, f"/tickets/{ticket.id}", '"stale"').status_code == 200
+
+
+class TestUserConditionalGet:
+    """Test cases for conditional GET /users/{id}."""
+
+    def test_user_etag(self, api_client, requester):
+        """Test 304 for an unchanged user and 200 once it is edited."""
+        # Arrange
+        etag = api_client.get(f"/users/{requester.id}").headers["ETag"]
+
+        # Act
+        unchanged = revalidate(api_client, f"/users/{requester.id}", etag)
+        api_client.put(f"/users/{requester.id}", json={"name": "Renamed"})
+        changed = revalidate(api_client, f"/users/{requester.id}", etag)
+
+        # Assert
+        assert unchanged.status_code == 304
+        assert changed.status_code == 200
+        assert changed.json()["name"] == "Renamed"
+        assert changed.headers["ETag"] != etag
+
+
+class TestUserTicketsConditionalGet:
+    """Test cases for conditional GET /tickets/user/{id}."""
+
+    def test_list_etag_follows_count_and_updates(self, api_client, requester, ticket):
+        """Test that the list ETag changes when a ticket is added or edited."""
+        # Arrange
+        url = f"/tickets/user/{requester.id}"
+        etag = api_client.get(url).headers["ETag"]
+
+        # Act
+        unchanged = revalidate(api_client, url, etag)
+        api_client.put(f"/tickets/{ticket.id}", json={"status": "closed"})
+        edited = revalidate(api_client, url, etag)
+        api_client.post("/tickets/", json={"title": "Another", "requester_id": requester.id})
+        added = revalidate(api_client, url, edited.headers["ETag"])
+
+        # Assert
+        assert unchanged.status_code == 304
+        assert edited.status_code == 200
+        assert edited.json()[0]["status"] == "closed"
+        assert added.status_code == 200
+        assert len(added.json()) == 2
+        assert revalidate(api_client, url, added.headers["ETag"]).status_code == 304
+
+    def test_empty_list_and_unknown_user(self, api_client, requester):
+        """Test that an empty list has an ETag and an unknown user is still a 404."""
+        # Arrange
+        etag = api_client.get(f"/tickets/user/{requester.id}").headers["ETag"]
+
+        # Act / Assert
+        assert revalidate(api_client, f"/tickets/user/{requester.id}", etag).status_code == 304
+        assert revalidate(api_client, "/tickets/user/999", etag).status_code == 404
+
+
+def test_etag_matching():
+    """Test If-None-Match lists, weak prefixes and the wildcard."""
+    etag = make_etag("ticket", 1, datetime(2025, 1, 1))
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert make_etag("ticket", 1, datetime(2025, 1, 1)) != make_etag("user", 1, datetime(2025, 1, 1))
@@ -0,0 +1,163 @@
+"""
+Tests for the ticket dispatch queue.
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from intelligagent.core.config import settings
+from intelligagent.db.database import enable_sqlite_foreign_keys
+from intelligagent.db.models import User, Ticket, UserRole, TicketStatus, TicketPriority
+from intelligagent.services import async_ticket_service
+from intelligagent.services.ticket_service import WorkloadCapReached
+
+CONCURRENT_AGENTS = 200
+QUEUED_TICKETS = 600
+AGENT_CAP = 5
+
+
+@pytest.fixture
+def agent(api_session):
+    """Create an agent in the API database."""
+    user = User(email="agent@example.com", name="Agent", role=UserRole.AGENT)
+    api_session.add(user)
+    api_session.commit()
+    api_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def customer(api_session):
+    """Create a customer in the API database."""
+    user = User(email="customer@example.com", name="Customer", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    api_session.refresh(user)
+    return user
+
+
+class TestDispatchAPI:
+    """Test cases for POST /tickets/dispatch/next."""
+
+    def test_claims_by_priority_then_age(self, api_client, api_session, agent, customer):
+        """Test that the highest-priority, oldest open ticket is claimed first."""
+        # Arrange
+        base = datetime(2025, 1, 1)
+        api_session.add_all([
+            Ticket(title="old low", priority=TicketPriority.LOW, requester_id=customer.id, created_at=base),
+            Ticket(title="new high", priority=TicketPriority.HIGH, requester_id=customer.id,
+                   created_at=base + timedelta(hours=2)),
+            Ticket(title="old high", priority=TicketPriority.HIGH, requester_id=customer.id,
+                   created_at=base + timedelta(hours=1)),
+            Ticket(title="closed high", priority=TicketPriority.HIGH, status=TicketStatus.CLOSED,
+                   requester_id=customer.id, created_at=base),
+            Ticket(title="medium", priority=TicketPriority.MEDIUM, requester_id=customer.id, created_at=base),
+        ])
+        api_session.commit()
+
+        # Act
+        claimed = [api_client.post("/tickets/dispatch/next", json={"agent_id": agent.id}) for _ in range(5)]
+
+        # Assert
+        assert [r.json()["title"] for r in claimed[:4]] == ["old high", "new high", "medium", "old low"]
+        assert all(r.json()["assignee_id"] == agent.id for r in claimed[:4])
+        assert all(r.json()["status"] == TicketStatus.IN_PROGRESS.value for r in claimed[:4])
+        assert claimed[4].status_code == 204
+
+    def test_workload_cap(self, api_client, api_session, agent, customer, monkeypatch):
+        """Test that an agent at the cap is refused until a ticket is closed."""
+        # Arrange
+        monkeypatch.setattr(settings, "DISPATCH_MAX_IN_PROGRESS", 2)
+        api_session.add_all([Ticket(title=f"t{i}", requester_id=customer.id) for i in range(3)])
+        api_session.commit()
+        first = api_client.post("/tickets/dispatch/next", json={"agent_id": agent.id}).json()
+        api_client.post("/tickets/dispatch/next", json={"agent_id": agent.id})
+
+        # Act
+        refused = api_client.post("/tickets/dispatch/next", json={"agent_id": agent.id})
+        api_client.put(f"/tickets/{first['id']}", json={"status": "closed"})
+        allowed = api_client.post("/tickets/dispatch/next", json={"agent_id": agent.id})
+
+        # Assert
+        assert refused.status_code == 409
+        assert allowed.status_code == 200
+
+    def test_only_agents_can_claim(self, api_client, customer):
+        """Test the role and existence checks on the claiming user."""
+        # Act
+        not_agent = api_client.post("/tickets/dispatch/next", json={"agent_id": customer.id})
+        unknown = api_client.post("/tickets/dispatch/next", json={"agent_id": 999})
+
+        # Assert
+        assert not_agent.status_code == 403
+        assert unknown.status_code == 404
+
+
+def test_concurrent_agents_never_share_a_ticket(api_engines, record_property):
+    """Test 200 agents draining the queue at once: every ticket is claimed exactly once."""
+    # Arrange
+    sync_engine, _ = api_engines
+    with sync_engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"email": f"agent{i}@example.com", "name": f"Agent {i}", "role": "AGENT"}
+            for i in range(CONCURRENT_AGENTS + 1)
+        ])
+        priorities = ["LOW", "MEDIUM", "HIGH"]
+        conn.execute(insert(Ticket), [
+            {"title": f"queued {i}", "requester_id": CONCURRENT_AGENTS + 1, "status": "OPEN",
+             "priority": priorities[i % 3]}
+            for i in range(QUEUED_TICKETS)
+        ])
+    db_url = sync_engine.url.set(drivername="sqlite+aiosqlite")
+
+    async def run_agents():
+        # Per-loop engine so aiosqlite connections belong to this event loop
+        engine = create_async_engine(
+            db_url, connect_args={"timeout": 60},
+            poolclass=AsyncAdaptedQueuePool, pool_size=CONCURRENT_AGENTS, max_overflow=0,
+        )
+        enable_sqlite_foreign_keys(engine.sync_engine)
+        SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+        async def agent_loop(agent_id):
+            claims = []
+            async with SessionLocal() as db:
+                while True:
+                    try:
+                        ticket = await async_ticket_service.claim_next_ticket(db, agent_id, AGENT_CAP)
+                    except WorkloadCapReached:
+                        return claims
+                    if ticket is None:
+                        return claims
+                    claims.append(ticket.id)
+
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(agent_loop(agent_id) for agent_id in range(1, CONCURRENT_AGENTS + 1)))
+            return results, time.perf_counter() - start
+        finally:
+            await engine.dispose()
+
+    # Act
+    results, elapsed = asyncio.run(run_agents())
+
+    # Assert
+    claimed = [ticket_id for claims in results for ticket_id in claims]
+    duplicates = [ticket_id for ticket_id, count in Counter(claimed).items() if count > 1]
+    assert not duplicates
+    assert len(claimed) == QUEUED_TICKETS
+    assert max(len(claims) for claims in results) <= AGENT_CAP
+    with sync_engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT id, assignee_id, status FROM tickets").all()
+    owners = {ticket_id: agent_id for agent_id, claims in enumerate(results, start=1) for ticket_id in claims}
+    assert all(owners[ticket_id] == assignee_id and status == "IN_PROGRESS" for ticket_id, assignee_id, status in rows)
+
+    claims_per_second = len(claimed) / elapsed
+    record_property("claims_per_second", round(claims_per_second, 1))
+    print(f"{len(claimed)} claims by {CONCURRENT_AGENTS} agents in {elapsed:.2f}s ({claims_per_second:.0f}/s)")
@@ -0,0 +1,78 @@
+"""
+Tests for the fast-path serialization of list pages.
+"""
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from intelligagent.api.responses import PageSerializer
+from intelligagent.db.models import User, Ticket, UserRole, TicketStatus, TicketPriority
+from intelligagent.schemas.pagination import Page
+from intelligagent.schemas.ticket import Ticket as TicketSchema
+from intelligagent.services import ticket_service
+
+
+def test_rows_serialize_like_the_schema(db_session):
+    """Test that Core rows produce the exact bytes of the response_model path."""
+    # Arrange
+    user = User(email="fast@example.com", name="Fast", role=UserRole.AGENT)
+    db_session.add(user)
+    db_session.commit()
+    db_session.add_all([
+        Ticket(title='Ünïcode "quoted" \\ title', requester_id=user.id, created_at=datetime(2025, 1, 1)),
+        Ticket(title="Assigned", description="line\nbreak", status=TicketStatus.IN_PROGRESS,
+               priority=TicketPriority.HIGH, requester_id=user.id, assignee_id=user.id,
+               created_at=datetime(2025, 1, 2)),
+    ])
+    db_session.commit()
+    serializer = PageSerializer(TicketSchema)
+
+    # Act
+    models, _ = ticket_service.get_tickets_page(db_session, limit=10)
+    rows, _ = ticket_service.get_tickets_page(db_session, limit=10, columns=serializer.columns(Ticket))
+    fast = serializer.dump_json(rows, "next")
+
+    # Assert
+    page = TypeAdapter(Page[TicketSchema]).validate_python({"items": models, "next_cursor": "next"}, from_attributes=True)
+    assert fast == page.model_dump_json().encode()
+    assert TypeAdapter(Page[TicketSchema]).validate_json(fast) == page
+
+
+class TestListEndpoints:
+    """Test the list endpoints served through PageSerializer."""
+
+    def test_ticket_and_user_pages(self, api_client, api_session):
+        """Test that responses keep their shape, values and content type."""
+        # Arrange
+        user = User(email="lister@example.com", name="Lister", role=UserRole.CUSTOMER)
+        api_session.add(user)
+        api_session.commit()
+        api_session.add_all([Ticket(title=f"t{i}", requester_id=user.id, priority=TicketPriority.LOW) for i in range(3)])
+        api_session.commit()
+
+        # Act
+        tickets = api_client.get("/tickets/", params={"limit": 2, "sort": "priority"})
+        users = api_client.get("/users/")
+
+        # Assert
+        assert tickets.headers["content-type"] == "application/json"
+        body = tickets.json()
+        assert [t["priority"] for t in body["items"]] == ["low", "low"]
+        assert body["items"][0]["status"] == "open"
+        assert body["next_cursor"] is not None
+        assert users.json()["items"][0] == jsonable_encoder(
+            {"id": user.id, "email": user.email, "name": "Lister", "role": "customer",
+             "created_at": user.created_at, "updated_at": user.updated_at}
+        )
+
+    def test_openapi_still_documents_pages(self, api_client):
+        """Test that the list routes still advertise their Page schemas."""
+        # Act
+        paths = api_client.get("/openapi.json").json()["paths"]
+
+        # Assert
+        ok = paths["/tickets/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert ok == {"$ref": "#/components/schemas/Page_Ticket_"}
+        ok = paths["/users/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert ok == {"$ref": "#/components/schemas/Page_User_"}
@@ -0,0 +1,66 @@
+"""
+Tests for the load-testing suite in benchmarks/loadtest.
+"""
+import asyncio
+
+from sqlalchemy import create_engine
+
+from benchmarks.loadtest.dataset import Dataset, seed_dataset
+from benchmarks.loadtest.results import compare, summarize
+from benchmarks.loadtest.runner import build_app, create_load_engine, drive, open_client
+from benchmarks.loadtest.scenarios import SCENARIOS, Context
+from intelligagent.api import tickets, users
+
+
+def test_every_ticket_and_user_route_has_a_scenario():
+    """Test that the mix covers every route of api/tickets.py and api/users.py."""
+    # Arrange
+    routes = {f"{method} {route.path}" for router in (tickets.router, users.router)
+              for route in router.routes for method in getattr(route, "methods", ())}  # WebSocket routes have none
+
+    # Assert
+    assert {scenario.name for scenario in SCENARIOS} == routes
+
+
+def test_seeded_run_succeeds_on_every_route(tmp_path):
+    """Test a small seeded run end to end: every route answers and the summary is complete."""
+    # Arrange
+    url = f"sqlite:///{tmp_path / 'load.db'}"
+    sync_engine = create_engine(url)
+    seed_dataset(sync_engine, users=100, tickets=500, comments=1000, batch_size=200)
+    dataset = Dataset.inspect(sync_engine)
+    sync_engine.dispose()
+
+    async def run():
+        async_engine = create_load_engine(url, pool_size=4)
+        async with open_client(4, app=build_app(async_engine)) as client:
+            recording = await drive(client, SCENARIOS, Context(dataset), concurrency=4, requests=300)
+        await async_engine.dispose()
+        return recording
+
+    # Act
+    results = summarize(asyncio.run(run()), {"dataset": dataset.as_dict()})
+
+    # Assert
+    assert (dataset.users, dataset.tickets, dataset.comments) == (100, 500, 1000)
+    assert results["all"]["requests"] == 300
+    assert results["all"]["errors"] == 0, {name: row["statuses"] for name, row in results["routes"].items()}
+    assert set(results["routes"]) <= {scenario.name for scenario in SCENARIOS}
+    row = results["all"]
+    assert 0 < row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"] <= row["max_ms"]
+
+
+def test_compare_flags_regressions():
+    """Test that slower tails or lower throughput beyond the threshold are flagged."""
+    # Arrange
+    def result(rps, p95):
+        row = {"requests": 100, "errors": 0, "throughput_rps": rps, "p50_ms": 5.0, "p95_ms": p95, "p99_ms": 20.0}
+        return {"all": row, "routes": {"GET /users/{user_id}": row}}
+
+    # Act
+    _, steady = compare(result(100.0, 10.0), result(95.0, 10.5))
+    _, regressed = compare(result(100.0, 10.0), result(100.0, 12.0))
+
+    # Assert
+    assert steady == []
+    assert regressed == ["GET /users/{user_id}", "all"]
@@ -0,0 +1,132 @@
+"""
+Tests for the Prometheus metrics endpoint and instrumentation.
+"""
+import asyncio
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from intelligagent.core import metrics
+from intelligagent.db.models import User, UserRole
+from intelligagent.services import user_service
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestRequestMetrics:
+    """Test cases for the per-route request metrics."""
+
+    def test_latency_and_status_by_route_template(self, api_client, api_session):
+        """Test that requests are labelled by route template and status."""
+        # Arrange
+        user = User(email="metered@example.com", name="Metered", role=UserRole.CUSTOMER)
+        api_session.add(user)
+        api_session.commit()
+        route = dict(method="GET", route="/users/{user_id}")
+        found = sample("http_request_duration_seconds_count", status="200", **route)
+        missing = sample("http_request_duration_seconds_count", status="404", **route)
+
+        # Act
+        api_client.get(f"/users/{user.id}")
+        api_client.get("/users/999")
+        api_client.get("/no/such/path/123")
+
+        # Assert
+        assert sample("http_request_duration_seconds_count", status="200", **route) == found + 1
+        assert sample("http_request_duration_seconds_count", status="404", **route) == missing + 1
+        unmatched = dict(method="GET", route=metrics.UNMATCHED_ROUTE, status="404")
+        assert sample("http_request_duration_seconds_count", **unmatched) >= 1
+        assert sample("http_requests_in_progress", method="GET") == 0
+
+    def test_statements_per_request(self, api_client, api_session):
+        """Test that each request's SQL is counted, and cache hits count none."""
+        # Arrange
+        user = User(email="counted@example.com", name="Counted", role=UserRole.CUSTOMER)
+        api_session.add(user)
+        api_session.commit()
+        route = dict(method="GET", route="/users/{user_id}")
+        statements = sample("http_request_db_statements_total", **route)
+        seconds = sample("http_request_db_seconds_total", **route)
+
+        # Act
+        api_client.get(f"/users/{user.id}")  # Miss: one SELECT
+        api_client.get(f"/users/{user.id}")  # Cached
+
+        # Assert
+        assert sample("http_request_db_statements_total", **route) == statements + 1
+        assert sample("http_request_db_seconds_total", **route) > seconds
+
+    def test_metrics_endpoint(self, api_client):
+        """Test the exposition format and the cache and service series."""
+        # Arrange
+        api_client.get("/users/1")
+
+        # Act
+        response = api_client.get("/metrics")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert 'cache_lookups_total{result="misses"}' in body
+        assert "cache_hit_ratio" in body
+        assert 'service_calls_total{function="user_service.get_user"}' in body
+        assert "/metrics" not in api_client.get("/openapi.json").json()["paths"]
+
+
+def test_service_function_accounting(tmp_path):
+    """Test that a service function's own statements are counted on the sync and async paths."""
+    # Arrange
+    sync_engine = create_engine(f"sqlite:///{tmp_path / 'service.db'}")
+    User.metadata.create_all(sync_engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'service.db'}")
+    labels = dict(function="user_service.get_user_by_email")
+    calls, statements = sample("service_calls_total", **labels), sample("service_db_statements_total", **labels)
+
+    async def lookup():
+        async with AsyncSession(async_engine) as db:
+            await db.run_sync(user_service.get_user_by_email, "nobody@example.com")
+        await async_engine.dispose()
+
+    # Act
+    with Session(sync_engine) as db:
+        user_service.get_user_by_email(db, "nobody@example.com")
+        db.execute(text("SELECT 1"))  # Outside any service function
+    asyncio.run(lookup())
+
+    # Assert
+    assert sample("service_calls_total", **labels) == calls + 2
+    assert sample("service_db_statements_total", **labels) == statements + 2
+    assert sample("service_db_seconds_total", **labels) > 0
+    sync_engine.dispose()
+
+
+def test_pool_hold_time_connects_and_saturation(tmp_path):
+    """Test the pool event listeners, including after dispose, and the saturation gauge."""
+    # Arrange
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=2)
+    metrics.instrument_engine(engine, "test-pool", max_overflow=2)
+    holds = sample("db_pool_connection_hold_seconds_count", engine="test-pool")
+    connects = sample("db_pool_connects_total", engine="test-pool")
+
+    # Act
+    held = [engine.connect() for _ in range(3)]
+    saturation = sample("db_pool_saturation", engine="test-pool")
+    for conn in held:
+        conn.close()
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    # Assert
+    assert sample("db_pool_connection_hold_seconds_count", engine="test-pool") == holds + 4
+    assert sample("db_pool_connects_total", engine="test-pool") == connects + 4
+    assert saturation == 0.75
+    assert sample("db_pool_capacity", engine="test-pool") == 4
+    assert sample("db_pool_checked_out", engine="test-pool") == 0
+    metrics.uninstrument_engine("test-pool")
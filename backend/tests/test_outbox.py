@@ -0,0 +1,195 @@
+"""
+Tests for the transactional outbox and its relay.
+"""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from intelligagent.core.events import Event, FileBroker, InMemoryBroker, decode_batch
+from intelligagent.db.models import OutboxEvent, Ticket, User, UserRole
+from intelligagent.services.outbox_relay import OutboxRelay
+
+
+class FlakyBroker(InMemoryBroker):
+    """In-memory broker whose first ``failures`` publishes raise."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    async def publish(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker unavailable")
+        await super().publish(events)
+
+
+def outbox_rows(api_session):
+    api_session.expire_all()
+    return api_session.query(OutboxEvent).order_by(OutboxEvent.id).all()
+
+
+def run_relay(api_engines, broker, action, **options):
+    """Run ``action(relay)`` against the API database on a fresh event loop."""
+    sync_engine, _ = api_engines
+
+    async def go():
+        engine = create_async_engine(sync_engine.url.set(drivername="sqlite+aiosqlite"))
+        relay = OutboxRelay(async_sessionmaker(engine, expire_on_commit=False), broker, **options)
+        try:
+            return await action(relay)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(go())
+
+
+@pytest.fixture
+def requester(api_session):
+    """Create a requester in the API database."""
+    user = User(email="outbox@example.com", name="Outbox", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    return user
+
+
+class TestOutboxWrites:
+    """Test that writes record their events in the same transaction."""
+
+    def test_writes_record_events(self, api_client, api_session):
+        """Test the events of creating a user and creating and updating a ticket."""
+        # Act
+        user = api_client.post("/users/", json={"email": "new@example.com", "name": "New"}).json()
+        created = api_client.post("/tickets/", json={"title": "Printer", "requester_id": user["id"]}).json()
+        updated = api_client.put(f"/tickets/{created['id']}", json={"status": "in_progress"}).json()
+
+        # Assert
+        rows = outbox_rows(api_session)
+        assert [(r.event_type, r.aggregate_type, r.aggregate_id) for r in rows] == [
+            ("user.created", "user", user["id"]),
+            ("ticket.created", "ticket", created["id"]),
+            ("ticket.updated", "ticket", created["id"]),
+        ]
+        payloads = [json.loads(r.payload) for r in rows]
+        assert payloads[0]["email"] == "new@example.com"
+        assert payloads[0]["role"] == "customer"
+        assert payloads[1]["status"] == "open"
+        assert payloads[2]["status"] == updated["status"] == "in_progress"
+        assert payloads[2]["priority"] == updated["priority"]
+
+    def test_failed_write_records_nothing(self, api_client, api_session, requester):
+        """Test that a rejected write leaves no event behind."""
+        # Arrange
+        before = len(outbox_rows(api_session))
+
+        # Act
+        missing_requester = api_client.post("/tickets/", json={"title": "Orphan", "requester_id": 999})
+        duplicate_user = api_client.post("/users/", json={"email": requester.email, "name": "Again"})
+
+        # Assert
+        assert missing_requester.status_code == 404
+        assert duplicate_user.status_code == 400
+        assert len(outbox_rows(api_session)) == before
+
+
+class TestOutboxRelay:
+    """Test publishing the outbox through a broker."""
+
+    def test_relay_publishes_in_order_and_empties_outbox(self, api_engines, api_session, requester):
+        """Test that batches keep each ticket's events in order and clear the outbox."""
+        # Arrange
+        tickets = [Ticket(title=f"t{i}", requester_id=requester.id) for i in range(5)]
+        api_session.add_all(tickets)
+        api_session.commit()
+        for round_ in range(3):
+            for ticket in tickets:
+                ticket.description = f"round {round_}"
+            api_session.commit()
+        broker = InMemoryBroker()
+
+        # Act
+        published = run_relay(api_engines, broker, OutboxRelay.drain, batch_size=4)
+
+        # Assert
+        events = broker.events()
+        assert published == len(events) == 1 + 5 + 15
+        assert len(broker.batches) == 6
+        assert [e["event_id"] for e in events] == sorted(e["event_id"] for e in events)
+        for ticket in tickets:
+            history = [e for e in events if e["event_type"].startswith("ticket.") and e["key"] == str(ticket.id)]
+            assert [e["event_type"] for e in history] == ["ticket.created"] + ["ticket.updated"] * 3
+            assert [e["data"]["description"] for e in history] == [None, "round 0", "round 1", "round 2"]
+        assert outbox_rows(api_session) == []
+
+    def test_failed_publish_is_retried(self, api_engines, api_session, requester):
+        """Test at-least-once delivery: a batch the broker rejects stays until it is published."""
+        # Arrange
+        api_session.add(Ticket(title="Retry me", requester_id=requester.id))
+        api_session.commit()
+        broker = FlakyBroker(failures=2)
+
+        async def first_attempt(relay):
+            with pytest.raises(ConnectionError):
+                await relay.relay_once()
+
+        async def run_until_drained(relay):
+            stop = asyncio.Event()
+            task = asyncio.create_task(relay.run(stop))
+            while relay.published < 2:
+                await asyncio.sleep(0.01)
+            stop.set()
+            await task
+            return relay.failures
+
+        # Act
+        run_relay(api_engines, broker, first_attempt)
+        kept = len(outbox_rows(api_session))
+        failures = run_relay(api_engines, broker, run_until_drained, poll_interval=0.01)
+
+        # Assert
+        assert kept == 2
+        assert failures == 1
+        assert [e["event_type"] for e in broker.events()] == ["user.created", "ticket.created"]
+        assert outbox_rows(api_session) == []
+
+    def test_file_broker_round_trip(self, api_engines, api_session, tmp_path):
+        """Test that the file broker appends compressed frames that replay in order."""
+        # Arrange
+        api_session.execute(insert(User), [
+            {"email": f"bulk{i}@example.com", "name": "Bulk user", "role": "CUSTOMER"} for i in range(500)
+        ])
+        api_session.commit()
+        broker = FileBroker(str(tmp_path / "events.bin"))
+
+        # Act
+        run_relay(api_engines, broker, OutboxRelay.drain, batch_size=200)
+
+        # Assert
+        events = list(broker.read_events())
+        assert [e["data"]["email"] for e in events] == [f"bulk{i}@example.com" for i in range(500)]
+        raw = sum(len(json.dumps(e)) for e in events)
+        assert (tmp_path / "events.bin").stat().st_size < raw / 4
+
+
+def test_decode_batch_round_trip():
+    """Test that batches are gzip'd JSON lines."""
+    # Arrange
+    broker = InMemoryBroker()
+
+    async def publish():
+        await broker.publish([
+            Event(event_id=1, topic="t.tickets", key="7", event_type="ticket.created",
+                  payload='{"id": 7}', occurred_at="2025-01-01 00:00:00"),
+        ])
+
+    # Act
+    asyncio.run(publish())
+
+    # Assert
+    assert decode_batch(broker.batches[0]) == [{
+        "event_id": 1, "event_type": "ticket.created", "key": "7",
+        "occurred_at": "2025-01-01 00:00:00", "data": {"id": 7},
+    }]
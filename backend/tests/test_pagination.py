@@ -0,0 +1,147 @@
+"""
+Tests for keyset pagination of tickets and users.
+"""
+import pytest
+from datetime import datetime, timedelta
+
+from intelligagent.db.models import User, Ticket, UserRole, TicketPriority
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.schemas.ticket import TicketSort
+from intelligagent.schemas.user import UserSort
+from intelligagent.services.pagination import InvalidCursor, encode_cursor
+from intelligagent.services.ticket_service import get_tickets_page
+from intelligagent.services.user_service import get_users_page
+
+
+def walk(fetch, **kwargs):
+    """Follow next_cursor until the last page and return every row seen."""
+    rows, cursor = fetch(**kwargs)
+    pages = 1
+    while cursor:
+        page, cursor = fetch(cursor=cursor, **kwargs)
+        rows.extend(page)
+        pages += 1
+    return rows, pages
+
+
+@pytest.fixture
+def many_tickets(db_session, db_user):
+    """Create tickets that share timestamps so id has to break ties."""
+    base = datetime(2025, 1, 1, 9, 0, 0)
+    priorities = [TicketPriority.LOW, TicketPriority.MEDIUM, TicketPriority.HIGH]
+    tickets = [
+        Ticket(
+            title=f"Ticket {i}",
+            requester_id=db_user.id,
+            priority=priorities[i % 3],
+            created_at=base + timedelta(minutes=i // 4),
+        )
+        for i in range(23)
+    ]
+    db_session.add_all(tickets)
+    db_session.commit()
+    return tickets
+
+
+class TestTicketPagination:
+    """Test cases for get_tickets_page."""
+    
+    def test_created_at_desc_visits_every_ticket_once(self, db_session, many_tickets):
+        """Test walking all pages newest first."""
+        # Act
+        rows, pages = walk(lambda **kw: get_tickets_page(db_session, limit=5, **kw))
+        
+        # Assert
+        assert pages == 5
+        expected = sorted(many_tickets, key=lambda t: (t.created_at, t.id), reverse=True)
+        assert [t.id for t in rows] == [t.id for t in expected]
+    
+    def test_created_at_asc(self, db_session, many_tickets):
+        """Test walking all pages oldest first."""
+        # Act
+        rows, _ = walk(lambda **kw: get_tickets_page(db_session, limit=4, order=SortOrder.ASC, **kw))
+        
+        # Assert
+        expected = sorted(many_tickets, key=lambda t: (t.created_at, t.id))
+        assert [t.id for t in rows] == [t.id for t in expected]
+    
+    def test_priority_desc_orders_by_rank(self, db_session, many_tickets):
+        """Test priority pages run high, medium, low across page boundaries."""
+        # Act
+        rows, _ = walk(lambda **kw: get_tickets_page(db_session, limit=3, sort=TicketSort.PRIORITY, **kw))
+        
+        # Assert
+        rank = {TicketPriority.HIGH: 0, TicketPriority.MEDIUM: 1, TicketPriority.LOW: 2}
+        expected = sorted(many_tickets, key=lambda t: (rank[t.priority], -t.id))
+        assert [t.id for t in rows] == [t.id for t in expected]
+    
+    def test_last_page_has_no_cursor(self, db_session, many_tickets):
+        """Test that a page covering every row returns no cursor."""
+        # Act
+        rows, cursor = get_tickets_page(db_session, limit=100)
+        
+        # Assert
+        assert len(rows) == len(many_tickets)
+        assert cursor is None
+    
+    def test_cursor_from_other_sort_rejected(self, db_session, many_tickets):
+        """Test that a cursor can't be replayed against a different sort."""
+        # Arrange
+        _, cursor = get_tickets_page(db_session, limit=5, sort=TicketSort.PRIORITY)
+        
+        # Act / Assert
+        with pytest.raises(InvalidCursor):
+            get_tickets_page(db_session, limit=5, cursor=cursor, sort=TicketSort.UPDATED_AT)
+    
+    def test_garbage_cursor_rejected(self, db_session):
+        """Test that a malformed cursor raises InvalidCursor."""
+        with pytest.raises(InvalidCursor):
+            get_tickets_page(db_session, cursor="not-a-cursor")
+
+
+class TestUserPagination:
+    """Test cases for get_users_page."""
+    
+    def test_email_asc(self, db_session):
+        """Test walking users by email."""
+        # Arrange
+        for i in (3, 1, 4, 0, 2):
+            db_session.add(User(email=f"user{i}@example.com", name=f"User {i}", role=UserRole.CUSTOMER))
+        db_session.commit()
+        
+        # Act
+        rows, pages = walk(lambda **kw: get_users_page(db_session, limit=2, sort=UserSort.EMAIL, order=SortOrder.ASC, **kw))
+        
+        # Assert
+        assert pages == 3
+        assert [u.email for u in rows] == [f"user{i}@example.com" for i in range(5)]
+
+
+class TestPaginationAPI:
+    """Test cases for the paginated list endpoints."""
+    
+    def test_read_tickets_envelope(self, api_client, api_session):
+        """Test that GET /tickets returns items and a working next_cursor."""
+        # Arrange
+        user = User(email="pager@example.com", name="Pager", role=UserRole.CUSTOMER)
+        api_session.add(user)
+        api_session.commit()
+        api_session.add_all([Ticket(title=f"T{i}", requester_id=user.id) for i in range(3)])
+        api_session.commit()
+        
+        # Act
+        first = api_client.get("/tickets/", params={"limit": 2}).json()
+        second = api_client.get("/tickets/", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+        
+        # Assert
+        assert len(first["items"]) == 2
+        assert len(second["items"]) == 1
+        assert second["next_cursor"] is None
+    
+    def test_read_users_bad_cursor(self, api_client):
+        """Test that an invalid cursor is a client error."""
+        # Act
+        response = api_client.get("/users/", params={"cursor": encode_cursor("email", "a@b.c", 1)})
+        
+        # Assert
+        assert response.status_code == 400
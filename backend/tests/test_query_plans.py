@@ -0,0 +1,167 @@
+"""
+Query-plan regression tests for the service layer.
+
+Each test runs a service function against a seeded database, captures the SQL
+it emits and runs EXPLAIN on every statement. A test fails if any statement
+reads a table with a sequential scan instead of an index.
+"""
+import re
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from intelligagent.db.models import User, Ticket, Comment, UserRole, TicketStatus, TicketPriority
+from intelligagent.schemas.pagination import SortOrder
+from intelligagent.schemas.ticket import TicketSort
+from intelligagent.schemas.user import UserSort
+from intelligagent.services import ticket_service, user_service
+
+# SQLite reports "SCAN <table>" for a table scan and "SCAN <table> USING ..."
+# when it walks an index in order
+SQLITE_TABLE_SCAN = re.compile(r"\bSCAN (\w+)(?! USING)\s*$")
+
+
+@contextmanager
+def captured_statements(connection):
+    """Collect (statement, parameters) for every query run on ``connection``."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+
+
+def sequential_scans(connection, statement, parameters):
+    """Return the plan lines of ``statement`` that scan a whole table."""
+    if connection.dialect.name == "postgresql":
+        # Ask whether an index can serve the query, not whether the planner
+        # prefers a seq scan on a small test table
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+        return [line for line in plan if "Seq Scan" in line]
+    plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    return [line for line in plan if SQLITE_TABLE_SCAN.search(line)]
+
+
+def assert_indexed(db_session, fn):
+    """Run ``fn`` and assert none of its statements does a sequential scan."""
+    connection = db_session.connection()
+    with captured_statements(connection) as statements:
+        fn()
+    assert statements, "service function ran no queries"
+    for statement, parameters in statements:
+        scans = sequential_scans(connection, statement, parameters)
+        assert not scans, f"sequential scan {scans} in:\n{statement}"
+
+
+@pytest.fixture
+def seeded(db_session):
+    """Seed users, tickets in every state and comments."""
+    users = [
+        User(email=f"plan{i}@example.com", name=f"Plan {i}", role=UserRole.AGENT if i % 4 == 0 else UserRole.CUSTOMER)
+        for i in range(40)
+    ]
+    db_session.add_all(users)
+    db_session.flush()
+    agents = [u for u in users if u.role == UserRole.AGENT]
+    statuses = list(TicketStatus)
+    priorities = list(TicketPriority)
+    base = datetime(2025, 1, 1)
+    tickets = [
+        Ticket(
+            title=f"Plan ticket {i}",
+            requester_id=users[i % len(users)].id,
+            assignee_id=agents[i % len(agents)].id if i % 5 else None,
+            status=statuses[i % len(statuses)],
+            priority=priorities[i % len(priorities)],
+            created_at=base + timedelta(minutes=i),
+            updated_at=base + timedelta(minutes=i),
+        )
+        for i in range(300)
+    ]
+    db_session.add_all(tickets)
+    db_session.flush()
+    db_session.add_all(
+        Comment(body=f"Comment {i}", ticket_id=tickets[i % len(tickets)].id, author_id=users[i % len(users)].id)
+        for i in range(600)
+    )
+    db_session.commit()
+    return {"users": users, "agents": agents, "tickets": tickets}
+
+
+class TestTicketQueryPlans:
+    """Every ticket service query must be served by an index."""
+    
+    def test_get_ticket(self, db_session, seeded):
+        assert_indexed(db_session, lambda: ticket_service.get_ticket(db_session, seeded["tickets"][7].id))
+    
+    def test_get_ticket_with_requester(self, db_session, seeded):
+        assert_indexed(db_session, lambda: ticket_service.get_ticket_with_requester(db_session, seeded["tickets"][7].id))
+    
+    def test_get_tickets_by_user(self, db_session, seeded):
+        assert_indexed(db_session, lambda: ticket_service.get_tickets_by_user(db_session, seeded["users"][3].id))
+    
+    def test_get_tickets_by_assignee(self, db_session, seeded):
+        assert_indexed(db_session, lambda: ticket_service.get_tickets_by_assignee(db_session, seeded["agents"][1].id))
+    
+    @pytest.mark.parametrize("priority", [None, TicketPriority.HIGH])
+    def test_get_open_tickets_by_assignee(self, db_session, seeded, priority):
+        assert_indexed(
+            db_session,
+            lambda: ticket_service.get_open_tickets_by_assignee(db_session, seeded["agents"][1].id, priority),
+        )
+    
+    @pytest.mark.parametrize("sort", list(TicketSort))
+    @pytest.mark.parametrize("order", list(SortOrder))
+    def test_get_tickets_page(self, db_session, seeded, sort, order):
+        _, cursor = ticket_service.get_tickets_page(db_session, limit=10, sort=sort, order=order)
+        assert_indexed(
+            db_session,
+            lambda: ticket_service.get_tickets_page(db_session, limit=10, cursor=cursor, sort=sort, order=order),
+        )
+    
+    def test_claim_next_ticket(self, db_session, seeded):
+        agent_id = seeded["agents"][1].id
+        assert_indexed(db_session, lambda: ticket_service.claim_next_ticket(db_session, agent_id, 1000))
+    
+    def test_claim_at_workload_cap(self, db_session, seeded):
+        agent_id = seeded["agents"][1].id
+        def claim():
+            with pytest.raises(ticket_service.WorkloadCapReached):
+                ticket_service.claim_next_ticket(db_session, agent_id, 1)
+        assert_indexed(db_session, claim)
+    
+    def test_ticket_comments(self, db_session, seeded):
+        ticket = ticket_service.get_ticket(db_session, seeded["tickets"][7].id)
+        assert_indexed(db_session, lambda: list(ticket.comments))
+
+
+class TestUserQueryPlans:
+    """Every user service query must be served by an index."""
+    
+    def test_get_user(self, db_session, seeded):
+        assert_indexed(db_session, lambda: user_service.get_user(db_session, seeded["users"][5].id))
+    
+    def test_get_user_by_email(self, db_session, seeded):
+        assert_indexed(db_session, lambda: user_service.get_user_by_email(db_session, "plan5@example.com"))
+    
+    @pytest.mark.parametrize("sort", list(UserSort))
+    def test_get_users_page(self, db_session, seeded, sort):
+        _, cursor = user_service.get_users_page(db_session, limit=10, sort=sort)
+        assert_indexed(db_session, lambda: user_service.get_users_page(db_session, limit=10, cursor=cursor, sort=sort))
+    
+    def test_user_comments(self, db_session, seeded):
+        user = user_service.get_user(db_session, seeded["users"][5].id)
+        assert_indexed(db_session, lambda: list(user.comments))
+
+
+def test_detects_sequential_scan(db_session, seeded):
+    """The checker itself must flag an unindexed filter."""
+    with pytest.raises(AssertionError, match="sequential scan"):
+        assert_indexed(db_session, lambda: db_session.query(Ticket).filter(Ticket.title == "Plan ticket 3").all())
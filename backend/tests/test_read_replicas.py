@@ -0,0 +1,171 @@
+"""
+Tests for routing read-only endpoints to read replicas.
+
+The primary and each replica are separate SQLite files, so where a read was
+served is visible from the data it returns.
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from intelligagent.api import tickets, users
+from intelligagent.core.cache import cache
+from intelligagent.db.database import Base, get_async_db, get_read_db
+from intelligagent.db.models import User, UserRole
+from intelligagent.db.replicas import (
+    PRIMARY_PIN_COOKIE, ReadYourWritesMiddleware, Replica, ReplicaSet, pinned_to_primary,
+)
+
+WINDOW = 5.0
+
+
+def create_database(path, name):
+    """A SQLite file with the schema and user 1 named ``name``."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"email": "one@example.com", "name": name, "role": UserRole.CUSTOMER}])
+    engine.dispose()
+
+
+@pytest.fixture
+def replica_set(tmp_path):
+    """A primary and two replicas, each holding a user 1 named after it."""
+    for name in ("primary", "replica-0", "replica-1"):
+        create_database(tmp_path / f"{name}.db", name)
+    primary = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}"),
+                                 autoflush=False, expire_on_commit=False)
+    replicas = ReplicaSet(primary, [
+        Replica(name, create_async_engine(f"sqlite+aiosqlite:///{tmp_path / f'{name}.db'}"))
+        for name in ("replica-0", "replica-1")
+    ])
+    yield replicas
+    asyncio.run(replicas.close())
+    asyncio.run(primary.kw["bind"].dispose())
+
+
+@pytest.fixture
+def replica_app(replica_set, monkeypatch):
+    """An app with the user and ticket routers reading through ``replica_set``."""
+    monkeypatch.setattr(cache, "enabled", False)
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(tickets.router)
+    app.add_middleware(ReadYourWritesMiddleware, window=WINDOW)
+
+    async def override_get_async_db():
+        async with replica_set.primary() as db:
+            yield db
+
+    async def override_get_read_db(request: Request):
+        async with replica_set.session(pinned_to_primary(request.cookies, WINDOW)) as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    return app
+
+
+class TestReplicaRouting:
+    """Test how reads are spread over replicas."""
+
+    def test_reads_are_balanced_over_replicas(self, replica_app):
+        """Test that reads alternate between replicas and never reach the primary."""
+        # Act
+        with TestClient(replica_app) as client:
+            names = [client.get("/users/1").json()["name"] for _ in range(4)]
+
+        # Assert
+        assert sorted(names) == ["replica-0", "replica-0", "replica-1", "replica-1"]
+
+    def test_choice_prefers_idle_healthy_replicas(self, replica_set):
+        """Test that the replica with fewer open sessions wins and unhealthy ones are skipped."""
+        # Arrange
+        first, second = replica_set.replicas
+        first.open_sessions = 2
+
+        # Act / Assert
+        assert replica_set.choose() is second
+        second.healthy = False
+        assert replica_set.choose() is first
+        first.healthy = False
+        assert replica_set.choose() is None
+
+    def test_each_replica_gets_the_pool_options_of_its_url(self):
+        """Test that from_urls sizes every replica's pool for its own URL."""
+        # Arrange
+        created = []
+        urls = ["sqlite+aiosqlite:///replica.db", "postgresql+asyncpg://intelligagent@replica/intelligagent"]
+
+        # Act
+        ReplicaSet.from_urls(
+            None, urls, engine_factory=lambda url, **options: created.append((url, options)),
+            pool_options=lambda url: {} if url.startswith("sqlite") else {"pool_size": 10}, pool_pre_ping=True,
+        )
+
+        # Assert
+        assert created == [
+            (urls[0], {"pool_pre_ping": True}),
+            (urls[1], {"pool_pre_ping": True, "pool_size": 10}),
+        ]
+
+    def test_unreachable_replica_is_taken_out_and_restored(self, replica_app, replica_set, tmp_path):
+        """Test that a failing replica is marked down, reads fail over, and a health check restores it."""
+        # Arrange
+        missing = tmp_path / "missing" / "replica.db"
+        replica_set.replicas[1] = Replica("replica-1", create_async_engine(f"sqlite+aiosqlite:///{missing}"))
+
+        with TestClient(replica_app, raise_server_exceptions=False) as client:
+            # Act: whichever read lands on the missing file fails and takes it out
+            statuses = [client.get("/users/1").status_code for _ in range(2)]
+            names = [client.get("/users/1").json()["name"] for _ in range(3)]
+
+            # Assert
+            assert sorted(statuses) == [200, 500]
+            assert names == ["replica-0"] * 3
+            assert replica_set.replicas[1].healthy is False
+
+            # Act: the file comes back
+            missing.parent.mkdir()
+            create_database(missing, "replica-1")
+            client.portal.call(replica_set.check_health)
+
+            # Assert
+            assert replica_set.replicas[1].healthy is True
+            assert "replica-1" in {client.get("/users/1").json()["name"] for _ in range(2)}
+
+
+class TestReadYourWrites:
+    """Test pinning a client to the primary after it writes."""
+
+    def test_writer_reads_its_write_from_the_primary(self, replica_app):
+        """Test that the writing client sees its new user while other clients read replicas."""
+        # Arrange
+        with TestClient(replica_app) as writer, TestClient(replica_app) as other:
+            # Act
+            created = writer.post("/users/", json={"email": "new@example.com", "name": "New"})
+            user_id = created.json()["id"]
+
+            # Assert
+            assert PRIMARY_PIN_COOKIE in created.cookies
+            assert writer.get(f"/users/{user_id}").status_code == 200
+            assert writer.get("/users/1").json()["name"] == "primary"
+            assert other.get(f"/users/{user_id}").status_code == 404  # Replicas have not caught up
+            assert other.get("/users/1").json()["name"].startswith("replica")
+
+    def test_pin_cookie_validation(self):
+        """Test that expired, forged and malformed pins are ignored."""
+        # Arrange
+        now = 1_000.0
+
+        # Act / Assert
+        assert pinned_to_primary({PRIMARY_PIN_COOKIE: "1004.0"}, WINDOW, now=now)
+        assert not pinned_to_primary({PRIMARY_PIN_COOKIE: "999.0"}, WINDOW, now=now)
+        assert not pinned_to_primary({PRIMARY_PIN_COOKIE: "9999999.0"}, WINDOW, now=now)
+        assert not pinned_to_primary({PRIMARY_PIN_COOKIE: "soon"}, WINDOW, now=now)
+        assert not pinned_to_primary({PRIMARY_PIN_COOKIE: "1004.0"}, 0, now=now)
+        assert not pinned_to_primary({}, WINDOW, now=now)
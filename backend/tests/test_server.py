@@ -0,0 +1,211 @@
+"""
+Tests for the app factory, worker warm-up and the multi-worker serve command.
+"""
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import main
+from intelligagent.core import metrics
+from intelligagent.core.config import settings
+from intelligagent.db import database
+from intelligagent.db.database import Base, prewarm_pool
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestAppFactory:
+    """Test cases for create_app and the process-wide setup it shares."""
+
+    def test_apps_are_independent_and_instrumented_once(self):
+        # Act
+        first, second = main.create_app(), main.create_app()
+
+        # Assert
+        assert first is not second and main.app is main.app
+        assert {route.path for route in first.routes} == {route.path for route in second.routes}
+        assert main.instrument_process() is REGISTRY
+
+    def test_warm_up_builds_the_schema(self):
+        # Arrange
+        app = main.create_app()
+
+        # Act
+        asyncio.run(main.warm_up(app))
+
+        # Assert
+        assert app.openapi_schema is not None
+
+    def test_shutdown_disposes_the_sync_engine(self, monkeypatch):
+        # Arrange
+        disposed = []
+        monkeypatch.setattr(database.engine, "dispose", lambda close=True: disposed.append(close))
+
+        # Act
+        with TestClient(main.create_app()):
+            pass
+
+        # Assert
+        assert disposed == [True]
+
+
+class TestWorkerSetup:
+    """Test cases for pre-opened pools, forked workers and shared metrics."""
+
+    def test_prewarm_fills_the_pool(self, tmp_path):
+        # Arrange
+        url = f"sqlite+aiosqlite:///{tmp_path / 'warm.db'}"
+        pooled = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=3)
+        unpooled = create_async_engine(url)  # NullPool for SQLite files
+
+        async def go():
+            try:
+                return await prewarm_pool(pooled, 5), pooled.sync_engine.pool.checkedin(), await prewarm_pool(unpooled, 5)
+            finally:
+                await pooled.dispose()
+                await unpooled.dispose()
+
+        # Act
+        opened, idle, skipped = asyncio.run(go())
+
+        # Assert: capped at the pool size and all returned to it
+        assert (opened, idle, skipped) == (3, 3, 0)
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+    def test_forked_child_gets_its_own_pools(self):
+        # Arrange
+        parent_pools = (id(database.engine.pool), id(database.async_engine.sync_engine.pool))
+
+        # Act
+        pid = os.fork()
+        if pid == 0:
+            child_pools = (id(database.engine.pool), id(database.async_engine.sync_engine.pool))
+            os._exit(0 if all(a != b for a, b in zip(parent_pools, child_pools)) else 1)
+        _, status = os.waitpid(pid, 0)
+
+        # Assert
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert parent_pools == (id(database.engine.pool), id(database.async_engine.sync_engine.pool))
+
+    def test_multiprocess_registry_reads_the_shared_directory(self, tmp_path, monkeypatch):
+        # Arrange: a file left by an earlier run
+        monkeypatch.setenv(metrics.MULTIPROCESS_DIR_ENV, str(tmp_path))
+        (tmp_path / "counter_123.db").write_bytes(b"stale")
+
+        # Act
+        path = metrics.use_multiprocess_dir()
+        registry = metrics.create_registry(main.cache)
+
+        # Assert
+        assert path == str(tmp_path) and os.listdir(tmp_path) == []
+        assert registry is not REGISTRY
+        assert registry.get_sample_value("cache_local_entries") == 0
+
+
+class TestServe:
+    """Test cases for ``python main.py --workers``."""
+
+    def test_workers_must_fit_the_connection_budget(self, monkeypatch):
+        # Arrange: 4 workers of 10 + 10 connections, with 3 kept for the jobs beside the API
+        url = "postgresql+asyncpg://intelligagent@db/intelligagent"
+        replica = "postgresql+asyncpg://intelligagent@replica/intelligagent"
+        monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 10)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 10)
+        monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 80)
+        monkeypatch.setattr(settings, "DB_JOB_CONNECTIONS", 3)
+
+        # Act
+        main.check_pool_budget(3, url, [replica])
+        main.check_pool_budget(4, "sqlite+aiosqlite:///tickets.db", [replica])  # Replicas get the whole budget
+        main.check_pool_budget(64, "sqlite+aiosqlite:///tickets.db", [])  # SQLite pools are not counted
+
+        # Assert
+        with pytest.raises(ValueError, match="80 connections to the primary, over the 77"):
+            main.check_pool_budget(4, url, [])
+        with pytest.raises(ValueError, match="100 connections to replica-1, over the 80"):
+            main.check_pool_budget(5, "sqlite+aiosqlite:///tickets.db", ["sqlite+aiosqlite:///replica.db", replica])
+
+    def test_admission_limits_must_fit_the_pool(self, monkeypatch):
+        # Arrange: pools of 10 + 10 with the default admission limits of 30 reads and 10 writes
+        url = "postgresql+asyncpg://intelligagent@db/intelligagent"
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 10)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 10)
+        monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 80)
+        monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+
+        # Act
+        with pytest.raises(ValueError, match="CONCURRENCY is 40, over the 20 connections"):
+            main.check_pool_budget(3, url, [])
+        monkeypatch.setattr(settings, "ADMISSION_READ_CONCURRENCY", 15)
+        monkeypatch.setattr(settings, "ADMISSION_WRITE_CONCURRENCY", 5)
+
+        # Assert
+        main.check_pool_budget(3, url, [])
+
+    def test_workers_serve_and_stop_gracefully(self, tmp_path):
+        # Arrange
+        db_path = tmp_path / "serve.db"
+        sync_engine = create_engine(f"sqlite:///{db_path}")
+        Base.metadata.create_all(sync_engine)
+        sync_engine.dispose()
+        (tmp_path / "metrics").mkdir()
+        port = free_port()
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{db_path}",
+            "CACHE_BACKEND": "memory",
+            "FEED_BACKEND": "memory",
+            "RATE_LIMIT_BACKEND": "memory",
+            "SIMILARITY_INDEX_PATH": str(tmp_path / "ticket-index"),
+            "PROMETHEUS_MULTIPROC_DIR": str(tmp_path / "metrics"),
+            "DEBUG": "false",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(port), "--workers", "2"],
+            cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+        try:
+            # Act
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    health = httpx.get(f"http://127.0.0.1:{port}/health")
+                    break
+                except httpx.TransportError:
+                    assert server.poll() is None and time.monotonic() < deadline
+                    time.sleep(0.1)
+            created = httpx.post(f"http://127.0.0.1:{port}/users/",
+                                 json={"email": "worker@example.com", "name": "Worker"})
+            scrape = httpx.get(f"http://127.0.0.1:{port}/metrics").text
+            server.send_signal(signal.SIGTERM)
+            code = server.wait(timeout=30)
+        finally:
+            if server.poll() is None:
+                server.kill()
+
+        # Assert
+        assert health.json() == {"status": "healthy"}
+        assert created.status_code == 200
+        assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in scrape
+        assert os.listdir(tmp_path / "metrics")
+        assert code == 0
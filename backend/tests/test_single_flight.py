@@ -0,0 +1,201 @@
+"""
+Tests for single-flight coalescing of identical concurrent reads.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from main import app
+from intelligagent.core.cache import InMemoryRedis
+from intelligagent.core.singleflight import SingleFlight, flights, shared_key
+from intelligagent.db.replicas import PINNED_INFO_KEY
+from intelligagent.db.models import Ticket, User, UserRole
+
+
+class Loader:
+    """An async call that counts its runs and waits to be released."""
+
+    def __init__(self, result="row", error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestSingleFlight:
+    """Test cases for sharing calls between concurrent callers."""
+
+    def test_concurrent_callers_share_one_call(self):
+        async def go():
+            group, load = SingleFlight(), Loader()
+            callers = [asyncio.create_task(group.do("ticket:1", load)) for _ in range(10)]
+            await settle()
+            load.release.set()
+            results = await asyncio.gather(*callers)
+            again = await group.do("ticket:1", load)
+            return results, again, load.calls, group
+
+        # Act
+        results, again, calls, group = asyncio.run(go())
+
+        # Assert
+        assert results == ["row"] * 10 and again == "row"
+        assert calls == 2  # One for the burst, one once it had finished
+        assert group.stats.as_dict() == {"leaders": 2, "followers": 9, "overflows": 0}
+        assert len(group) == 0
+
+    def test_failures_reach_every_caller(self):
+        async def go():
+            group, load = SingleFlight(), Loader(error=LookupError("gone"))
+            callers = [asyncio.create_task(group.do("ticket:1", load)) for _ in range(3)]
+            await settle()
+            load.release.set()
+            return await asyncio.gather(*callers, return_exceptions=True), load.calls
+
+        # Act
+        outcomes, calls = asyncio.run(go())
+
+        # Assert
+        assert [type(outcome) for outcome in outcomes] == [LookupError] * 3 and calls == 1
+
+    def test_followers_take_over_from_a_cancelled_leader(self):
+        async def go():
+            group, load = SingleFlight(), Loader()
+            leader = asyncio.create_task(group.do("ticket:1", load))
+            await settle()
+            followers = [asyncio.create_task(group.do("ticket:1", load)) for _ in range(3)]
+            await settle()
+            leader.cancel()
+            await settle()
+            load.release.set()
+            results = await asyncio.gather(*followers)
+            return leader.cancelled(), results, load.calls
+
+        # Act
+        cancelled, results, calls = asyncio.run(go())
+
+        # Assert
+        assert cancelled and results == ["row"] * 3
+        assert calls == 2  # The cancelled leader's and the new leader's
+
+    def test_keys_beyond_maxsize_run_uncoalesced(self):
+        async def go():
+            group, load = SingleFlight(maxsize=2), Loader()
+            callers = [asyncio.create_task(group.do(key, load)) for key in ("a", "b", "c", "c")]
+            await settle()
+            tracked = len(group)
+            load.release.set()
+            await asyncio.gather(*callers)
+            return tracked, load.calls, group.stats.overflows
+
+        # Act
+        tracked, calls, overflows = asyncio.run(go())
+
+        # Assert
+        assert (tracked, calls, overflows) == (2, 4, 2)
+
+    def test_forgotten_keys_start_a_new_call(self):
+        async def go():
+            group, stale, fresh = SingleFlight(), Loader("before"), Loader("after")
+            before = asyncio.create_task(group.do("ticket:1", stale))
+            await settle()
+            group.forget("ticket:1")  # A write changed the ticket
+            after = asyncio.create_task(group.do("ticket:1", fresh))
+            await settle()
+            stale.release.set()
+            fresh.release.set()
+            return await before, await after
+
+        # Act / Assert
+        assert asyncio.run(go()) == ("before", "after")
+
+    def test_list_reads_after_a_write_start_a_new_flight(self, reset_flights):
+        primary, replica = SimpleNamespace(bind="primary", info={}), SimpleNamespace(bind="replica", info={})
+
+        async def go():
+            stale, fresh = Loader("before"), Loader("after")
+            before = asyncio.create_task(flights.do(shared_key(primary, "tickets", 100), stale))
+            await settle()
+            flights.forget_group("tickets")  # A ticket was created
+            after = asyncio.create_task(flights.do(shared_key(primary, "tickets", 100), fresh))
+            await settle()
+            stale.release.set()
+            fresh.release.set()
+            return await before, await after
+
+        # Act / Assert
+        assert asyncio.run(go()) == ("before", "after")
+        assert shared_key(primary, "tickets", 100) != shared_key(replica, "tickets", 100)
+
+    def test_reads_pinned_to_the_primary_are_not_shared(self):
+        # Arrange
+        pinned = SimpleNamespace(bind="primary", info={PINNED_INFO_KEY: True})
+
+        async def go():
+            group, load = SingleFlight(), Loader()
+            callers = [asyncio.create_task(group.do(shared_key(pinned, "tickets"), load)) for _ in range(3)]
+            await settle()
+            load.release.set()
+            await asyncio.gather(*callers)
+            return load.calls, len(group)
+
+        # Act / Assert
+        assert asyncio.run(go()) == (3, 0)
+
+
+class TestStampede:
+    """Test cases for bursts of identical requests to the read routes."""
+
+    @pytest.fixture
+    def seeded(self, api_session):
+        user = User(email="popular@example.com", name="Popular", role=UserRole.CUSTOMER)
+        api_session.add(user)
+        api_session.flush()
+        api_session.add_all([Ticket(title=f"Ticket {i}", requester_id=user.id) for i in range(5)])
+        api_session.commit()
+        return user.id
+
+    @pytest.mark.parametrize("path, queries", [
+        ("/tickets/1", 1), ("/users/{user_id}", 1), ("/tickets/user/{user_id}", 2), ("/tickets/", 1), ("/users/", 1),
+    ])
+    def test_identical_requests_share_queries(
+        self, api_client, api_engines, seeded, reset_cache, reset_flights, path, queries
+    ):
+        # Arrange
+        _, async_engine = api_engines
+        url = path.format(user_id=seeded)
+        statements = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *_: statements.append(1))
+        single = api_client.get(url)
+        reset_cache.reset(remote=InMemoryRedis())  # Cold, as after the ticket changed
+        reset_flights.reset()
+        statements.clear()
+
+        async def burst():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(client.get(url) for _ in range(20)))
+
+        # Act
+        responses = api_client.portal.call(burst)
+
+        # Assert
+        assert [response.status_code for response in responses] == [200] * 20
+        assert {response.content for response in responses} == {single.content}
+        assert len(statements) == queries  # /tickets/user/{id} reads the user, then the list
+        assert reset_flights.stats.followers > 0
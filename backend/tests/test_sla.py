@@ -0,0 +1,237 @@
+"""
+Tests for SLA deadline tracking, the first response trigger and GET /tickets/sla/at-risk.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from intelligagent.db.models import (
+    Comment, OutboxEvent, SlaBreach, SlaKind, Ticket, TicketPriority, TicketStatus, User, UserRole,
+)
+from intelligagent.services import sla
+from intelligagent.services.sla import SlaTracker, TrackedTicket, record_breaches
+
+START = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    def __init__(self, now=START):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **delta):
+        self.now += timedelta(**delta)
+
+
+def tracked(ticket_id, priority=TicketPriority.HIGH, created_at=START, **fields):
+    return TrackedTicket(ticket_id, priority, fields.pop("status", TicketStatus.OPEN), created_at, **fields)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def tracker(clock):
+    return SlaTracker(sla.load_policies(), clock=clock)
+
+
+@pytest.fixture
+def people(api_session):
+    customer = User(email="customer@example.com", name="Customer", role=UserRole.CUSTOMER)
+    agent = User(email="agent@example.com", name="Agent", role=UserRole.AGENT)
+    api_session.add_all([customer, agent])
+    api_session.commit()
+    return customer, agent
+
+
+class TestSlaTracker:
+    """Test cases for deadlines, breaches and the at-risk view of the tracker."""
+
+    def test_deadlines_follow_priority_and_first_response(self, tracker):
+        # Act
+        high = tracker.deadlines(tracked(1))
+        answered = tracker.deadlines(tracked(2, TicketPriority.LOW, first_response_at=START))
+        closed = tracker.deadlines(tracked(3, status=TicketStatus.CLOSED))
+
+        # Assert
+        assert {entry.kind: entry.deadline for entry in high} == {
+            SlaKind.FIRST_RESPONSE: START + timedelta(hours=1),
+            SlaKind.RESOLUTION: START + timedelta(hours=8),
+        }
+        assert [(entry.kind, entry.deadline) for entry in answered] == [(SlaKind.RESOLUTION, START + timedelta(days=7))]
+        assert closed == []
+
+    def test_fire_due_notifies_once_and_keeps_the_breach(self, tracker, clock):
+        # Arrange
+        fired = []
+        tracker.subscribe(fired.append)
+        tracker.observe(tracked(1))
+        tracker.observe(tracked(2, TicketPriority.MEDIUM))
+
+        # Act
+        clock.advance(minutes=61)
+        first = tracker.fire_due()
+        tracker.observe(tracked(1, assignee_id=7))  # Assigned, still unanswered
+        again = tracker.fire_due()
+
+        # Assert
+        assert [(entry.ticket_id, entry.kind) for entry in first] == [(1, SlaKind.FIRST_RESPONSE)]
+        assert fired == first and again == []
+        breached = tracker.at_risk(timedelta(0))
+        assert [(entry.ticket_id, entry.assignee_id) for entry in breached] == [(1, 7)]
+        assert tracker.stats() == {"pending": 3, "breached": 1, "breaches_fired": 1}
+
+    def test_at_risk_orders_and_filters_without_stale_entries(self, tracker, clock):
+        # Arrange: ticket 2 is later reprioritised, leaving its old deadlines stale in the heap
+        tracker.observe(tracked(1, TicketPriority.MEDIUM, assignee_id=5))
+        tracker.observe(tracked(2, TicketPriority.LOW))
+        tracker.observe(tracked(3, TicketPriority.HIGH, created_at=START - timedelta(minutes=30)))
+        tracker.observe(tracked(2, TicketPriority.HIGH))
+
+        # Act
+        soon = tracker.at_risk(timedelta(hours=1))
+        later = tracker.at_risk(timedelta(hours=4), kind=SlaKind.FIRST_RESPONSE, assignee_id=5)
+
+        # Assert
+        assert [(entry.ticket_id, entry.kind) for entry in soon] == [
+            (3, SlaKind.FIRST_RESPONSE), (2, SlaKind.FIRST_RESPONSE),
+        ]
+        assert [entry.ticket_id for entry in later] == [1]
+        assert tracker.at_risk(timedelta(hours=8), limit=2) == soon
+
+    def test_answered_and_closed_tickets_leave(self, tracker, clock):
+        # Arrange
+        tracker.observe(tracked(1))
+        tracker.observe(tracked(2))
+        clock.advance(minutes=90)
+        tracker.fire_due()
+
+        # Act
+        tracker.observe(tracked(1, first_response_at=START + timedelta(minutes=80)))
+        tracker.observe(tracked(2, status=TicketStatus.CLOSED))
+
+        # Assert
+        assert [(entry.ticket_id, entry.kind) for entry in tracker.at_risk(timedelta(days=1))] == [
+            (1, SlaKind.RESOLUTION),
+        ]
+        clock.advance(days=1)
+        assert [entry.ticket_id for entry in tracker.fire_due()] == [1]
+
+
+class TestSlaDatabase:
+    """Test cases for the first response trigger, loading, syncing and recording breaches."""
+
+    def test_first_public_agent_comment_stamps_first_response(self, api_session, people):
+        # Arrange
+        customer, agent = people
+        ticket = Ticket(title="Cannot log in", requester_id=customer.id)
+        api_session.add(ticket)
+        api_session.commit()
+
+        # Act
+        api_session.add_all([
+            Comment(body="Still broken", ticket_id=ticket.id, author_id=customer.id),
+            Comment(body="Looks like SSO", ticket_id=ticket.id, author_id=agent.id, is_internal=True),
+        ])
+        api_session.commit()
+        api_session.refresh(ticket)
+        unanswered = ticket.first_response_at
+        api_session.add(Comment(body="Looking into it", ticket_id=ticket.id, author_id=agent.id))
+        api_session.commit()
+        api_session.refresh(ticket)
+
+        # Assert
+        assert unanswered is None
+        assert ticket.first_response_at is not None
+        assert ticket.updated_at == ticket.first_response_at
+
+    def test_load_sync_and_record_breaches(self, api_engines, api_session, people):
+        # Arrange
+        sync_engine, _ = api_engines
+        customer, agent = people
+        now = datetime.now(timezone.utc)  # The database stamps new rows with the real time
+        old = now - timedelta(hours=2)
+        tickets = [
+            Ticket(title="Old", priority=TicketPriority.HIGH, requester_id=customer.id, created_at=old),
+            Ticket(title="New", priority=TicketPriority.LOW, requester_id=customer.id),
+            Ticket(title="Done", status=TicketStatus.CLOSED, requester_id=customer.id),
+        ]
+        api_session.add_all(tickets)
+        api_session.commit()
+        clock = FakeClock(now)
+
+        async def go():
+            engine = create_async_engine(sync_engine.url.set(drivername="sqlite+aiosqlite"))
+            tracker = SlaTracker(sla.load_policies(), async_sessionmaker(engine), page_size=1, clock=clock)
+            try:
+                await tracker.load()
+                loaded = tracker.stats()
+                fired = tracker.fire_due()
+                api_session.add(Comment(body="On it", ticket_id=tickets[1].id, author_id=agent.id))
+                api_session.commit()
+                read = await tracker.sync()
+                await tracker._record(fired)
+                await tracker._record(fired)  # Another worker saw the same breaches
+                return loaded, fired, read, tracker.at_risk(timedelta(days=7), kind=SlaKind.FIRST_RESPONSE)
+            finally:
+                await engine.dispose()
+
+        # Act
+        loaded, fired, read, unanswered = asyncio.run(go())
+
+        # Assert
+        assert loaded["pending"] == 4
+        assert {(entry.ticket_id, entry.kind) for entry in fired} == {(tickets[0].id, SlaKind.FIRST_RESPONSE)}
+        assert read >= 1
+        assert [entry.ticket_id for entry in unanswered] == [tickets[0].id]
+        assert [(row.ticket_id, row.kind) for row in api_session.query(SlaBreach)] == [
+            (tickets[0].id, SlaKind.FIRST_RESPONSE),
+        ]
+        events = api_session.query(OutboxEvent).filter_by(event_type="ticket.sla_breached").all()
+        assert len(events) == 1
+        assert json.loads(events[0].payload)["kind"] == "first_response"
+
+    def test_record_breaches_ignores_recorded_ones(self, api_session, people):
+        # Arrange
+        ticket = Ticket(title="Slow", requester_id=people[0].id)
+        api_session.add(ticket)
+        api_session.commit()
+        entry = sla.SlaDeadline(ticket.id, SlaKind.RESOLUTION, TicketPriority.MEDIUM, None, START)
+
+        # Act
+        counts = [record_breaches(api_session, [entry]) for _ in range(2)]
+
+        # Assert
+        assert counts == [1, 0]
+
+
+class TestSlaAtRiskRoute:
+    """Test cases for GET /tickets/sla/at-risk."""
+
+    def test_lists_deadlines_of_written_tickets(self, api_client, people, monkeypatch):
+        # Arrange
+        customer, _ = people
+        ticket = api_client.post("/tickets/", json={"title": "Site down", "priority": "high",
+                                                     "requester_id": customer.id}).json()
+        api_client.post("/tickets/", json={"title": "Typo", "priority": "low", "requester_id": customer.id})
+
+        # Act
+        response = api_client.get("/tickets/sla/at-risk", params={"within_minutes": 120})
+        resolution = api_client.get("/tickets/sla/at-risk", params={"within_minutes": 600, "kind": "resolution"})
+        monkeypatch.setattr(sla, "tracker", None)
+        disabled = api_client.get("/tickets/sla/at-risk")
+
+        # Assert
+        assert response.status_code == 200
+        [entry] = response.json()
+        assert entry["ticket_id"] == ticket["id"] and entry["kind"] == "first_response"
+        assert entry["breached"] is False and 3000 < entry["seconds_left"] <= 3600
+        assert [entry["ticket_id"] for entry in resolution.json()] == [ticket["id"]]
+        assert disabled.status_code == 503
@@ -0,0 +1,147 @@
+"""
+Tests for the streaming ticket export.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import tracemalloc
+import pytest
+from sqlalchemy import text
+
+from intelligagent.db.models import User, Ticket, Comment, UserRole, TicketStatus, TicketPriority
+from main import app
+
+# Size of the constant-memory export; set EXPORT_TEST_ROWS=1000000 for a full-scale run
+LARGE_EXPORT_ROWS = int(os.environ.get("EXPORT_TEST_ROWS", 100_000))
+
+
+def seed_tickets(session, count, requester_id):
+    """Insert ``count`` tickets in one statement with a recursive CTE."""
+    session.execute(
+        text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+            "INSERT INTO tickets (title, description, status, priority, requester_id, created_at, updated_at) "
+            "SELECT 'Ticket ' || i, 'Exported ticket body', 'OPEN', 'MEDIUM', :requester_id, "
+            "datetime('2024-01-01', '+' || i || ' seconds'), datetime('2024-01-01', '+' || i || ' seconds') FROM n"
+        ),
+        {"count": count, "requester_id": requester_id},
+    )
+    session.commit()
+
+
+async def drain_export(query_string: bytes):
+    """Run GET /tickets/export on the ASGI app, counting lines instead of buffering them.
+
+    Returns the number of lines and the peak traced memory while streaming.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/tickets/export", "raw_path": b"/tickets/export",
+        "query_string": query_string, "root_path": "", "headers": [],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    lines = 0
+    status = None
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        # Send the (empty) body once, then block like a connected client until the response ends
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal lines, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            lines += message.get("body", b"").count(b"\n")
+            if not message.get("more_body", False):
+                response_done.set()
+
+    tracemalloc.start()
+    try:
+        await app(scope, receive, send)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert status == 200
+    return lines, peak
+
+
+@pytest.fixture
+def requester(api_session):
+    """Create a requester in the API database."""
+    user = User(email="export@example.com", name="Export", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    api_session.refresh(user)
+    return user
+
+
+class TestTicketExport:
+    """Test cases for GET /tickets/export."""
+    
+    def test_ndjson_with_filters_and_comments(self, api_client, api_session, requester):
+        """Test that filters apply and comments are inlined per ticket."""
+        # Arrange
+        open_ticket = Ticket(title="Open", requester_id=requester.id, priority=TicketPriority.HIGH)
+        closed_ticket = Ticket(title="Closed", requester_id=requester.id, status=TicketStatus.CLOSED)
+        api_session.add_all([open_ticket, closed_ticket])
+        api_session.commit()
+        api_session.add_all([
+            Comment(body="first", ticket_id=open_ticket.id, author_id=requester.id),
+            Comment(body="second", ticket_id=open_ticket.id, author_id=requester.id),
+            Comment(body="other", ticket_id=closed_ticket.id, author_id=requester.id),
+        ])
+        api_session.commit()
+        
+        # Act
+        response = api_client.get("/tickets/export", params={"status": "open", "include_comments": True})
+        
+        # Assert
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["title"] for r in records] == ["Open"]
+        assert records[0]["priority"] == "high"
+        assert [c["body"] for c in records[0]["comments"]] == ["first", "second"]
+    
+    def test_csv_date_range(self, api_client, api_session, requester):
+        """Test CSV output restricted to a created_at range."""
+        # Arrange
+        seed_tickets(api_session, 10, requester.id)
+        
+        # Act
+        response = api_client.get("/tickets/export", params={
+            "format": "csv",
+            "created_from": "2024-01-01T00:00:03",
+            "created_to": "2024-01-01T00:00:06",
+        })
+        
+        # Assert
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0][:3] == ["id", "title", "description"]
+        assert [row[1] for row in rows[1:]] == ["Ticket 3", "Ticket 4", "Ticket 5"]
+        assert rows[1][3] == "open"
+    
+    def test_export_memory_is_constant(self, api_client, api_session, requester):
+        """Test that exporting LARGE_EXPORT_ROWS rows peaks no higher than a few chunks do."""
+        # Arrange
+        seed_tickets(api_session, LARGE_EXPORT_ROWS, requester.id)
+        # Seeded tickets are one second apart, so 40 minutes spans a couple of chunks
+        small_query = b"created_to=2024-01-01T00:40:00"
+        
+        # Act
+        small_lines, small_peak = api_client.portal.call(drain_export, small_query)
+        large_lines, large_peak = api_client.portal.call(drain_export, b"")
+        
+        # Assert
+        assert large_lines == LARGE_EXPORT_ROWS
+        assert small_lines < large_lines / 10
+        assert large_peak < small_peak * 1.5, (small_peak, large_peak)
@@ -0,0 +1,266 @@
+"""
+Tests for the ticket change feed and GET /tickets/stream with its WebSocket.
+"""
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from intelligagent.db.models import User, UserRole
+from intelligagent.schemas.ticket import Ticket
+from intelligagent.services import ticket_feed
+from intelligagent.services.ticket_feed import InMemoryFanout, Subscription, TicketFeed, ticket_event
+
+START = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+
+
+def ticket(ticket_id, requester_id=1, assignee_id=None, title="Printer on fire"):
+    return Ticket(id=ticket_id, title=title, status="open", requester_id=requester_id, assignee_id=assignee_id,
+                  created_at=START, updated_at=START)
+
+
+def parse_sse(body: str):
+    """The (event, data) pairs of a server-sent event stream."""
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def people(api_session):
+    customer = User(email="customer@example.com", name="Customer", role=UserRole.CUSTOMER)
+    agent = User(email="agent@example.com", name="Agent", role=UserRole.AGENT)
+    api_session.add_all([customer, agent])
+    api_session.commit()
+    return customer, agent
+
+
+class TestSubscriptions:
+    """Test cases for filtering, coalescing and overflow."""
+
+    def test_filters_route_events_including_to_the_previous_assignee(self):
+        # Arrange
+        feed = TicketFeed()
+        everything = feed.subscribe()
+        by_requester = feed.subscribe(requester_ids=[7])
+        by_old_assignee = feed.subscribe(assignee_ids=[3])
+        by_ticket = feed.subscribe(ticket_ids=[2])
+
+        # Act
+        feed.publish(ticket_event("ticket.created", ticket(1, requester_id=7)))
+        feed.publish(ticket_event("ticket.updated", ticket(2, assignee_id=4), previous_assignee_id=3))
+        feed.unsubscribe(by_ticket)
+        feed.publish(ticket_event("ticket.updated", ticket(2, assignee_id=5)))
+
+        async def take(subscription):
+            return [(event.type, event.ticket_id) for event in await subscription.get(timeout=0)]
+
+        # Assert
+        assert asyncio.run(take(everything)) == [("ticket.created", 1), ("ticket.updated", 2)]
+        assert asyncio.run(take(by_requester)) == [("ticket.created", 1)]
+        assert asyncio.run(take(by_old_assignee)) == [("ticket.updated", 2)]
+        assert asyncio.run(take(by_ticket)) == [] and by_ticket.closed
+        assert feed.stats()["subscribers"] == 3
+
+    def test_slow_subscriber_gets_latest_versions_then_a_reset(self):
+        # Arrange
+        subscription = Subscription(buffer_size=3)
+
+        # Act: a ticket created and then changed twice before the subscriber reads
+        subscription.put(ticket_event("ticket.created", ticket(1, title="v1")))
+        subscription.put(ticket_event("ticket.updated", ticket(2)))
+        subscription.put(ticket_event("ticket.updated", ticket(1, title="v2")))
+        subscription.put(ticket_event("ticket.updated", ticket(1, title="v3")))
+        coalesced = asyncio.run(subscription.get(timeout=0))
+        for ticket_id in range(10, 15):
+            subscription.put(ticket_event("ticket.updated", ticket(ticket_id)))
+        overflowed = asyncio.run(subscription.get(timeout=0))
+
+        # Assert
+        assert [(event.type, json.loads(event.message)["data"]["title"]) for event in coalesced] == [
+            ("ticket.created", "v3"), ("ticket.updated", "Printer on fire"),
+        ]
+        assert [event.type for event in overflowed] == ["feed.reset"]
+        assert (subscription.coalesced, subscription.resets) == (2, 1)
+
+
+class TestFanout:
+    """Test cases for events crossing workers through a shared fanout."""
+
+    def test_events_reach_other_workers_once(self):
+        async def go():
+            fanout = InMemoryFanout()
+            first, second = TicketFeed(fanout), TicketFeed(fanout)
+            first.start()
+            second.start()
+            await asyncio.sleep(0)  # Let the listeners subscribe
+            here, there = first.subscribe(), second.subscribe(ticket_ids=[1])
+            try:
+                first.publish(ticket_event("ticket.created", ticket(1)))
+                first.publish(ticket_event("ticket.created", ticket(2)))
+                received = await asyncio.wait_for(there.get(), 5)
+                return await here.get(timeout=0), received, await here.get(timeout=0.05)
+            finally:
+                await first.close()
+                await second.close()
+
+        # Act
+        local, remote, repeated = asyncio.run(go())
+
+        # Assert
+        assert [event.ticket_id for event in local] == [1, 2]
+        assert [event.ticket_id for event in remote] == [1]
+        assert repeated == []
+
+    def test_other_workers_reset_when_the_publish_queue_overflows(self):
+        async def go():
+            fanout = InMemoryFanout()
+            first, second = TicketFeed(fanout, publish_queue_size=2), TicketFeed(fanout)
+            second.start()
+            await asyncio.sleep(0)
+            there = second.subscribe(ticket_ids=[99])
+            try:
+                for ticket_id in range(1, 4):  # first's publisher isn't running: the third overflows
+                    first.publish(ticket_event("ticket.updated", ticket(ticket_id)))
+                await first.flush()
+                return await asyncio.wait_for(there.get(), 5), first.dropped
+            finally:
+                await second.close()
+
+        # Act
+        events, dropped = asyncio.run(go())
+
+        # Assert
+        assert [event.type for event in events] == ["feed.reset"] and dropped == 3
+
+    def test_subscribers_reset_after_the_fanout_reconnects(self, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(ticket_feed, "RETRY_INTERVAL", 0)
+
+        class FlakyFanout(InMemoryFanout):
+            failures = 1
+
+            async def subscribe(self, channel):
+                if self.failures:
+                    self.failures -= 1
+                    raise ConnectionError("Redis went away")
+                return await super().subscribe(channel)
+
+        async def go():
+            feed = TicketFeed(FlakyFanout())
+            subscription = feed.subscribe(assignee_ids=[9])
+            feed.start()
+            try:
+                return await asyncio.wait_for(subscription.get(), 5), feed.errors
+            finally:
+                await feed.close()
+
+        # Act
+        events, errors = asyncio.run(go())
+
+        # Assert
+        assert [event.type for event in events] == ["feed.reset"] and errors == 1
+
+
+class TestStreamRoutes:
+    """Test cases for GET /tickets/stream and its WebSocket."""
+
+    def test_websocket_gets_filtered_ticket_and_comment_changes(self, api_client, people):
+        # Arrange
+        customer, agent = people
+        other = api_client.post("/tickets/", json={"title": "Not mine", "requester_id": agent.id}).json()
+
+        with api_client.websocket_connect(f"/tickets/stream?requester_id={customer.id}") as websocket:
+            ready = websocket.receive_json()
+
+            # Act
+            api_client.put(f"/tickets/{other['id']}", json={"priority": "high"})
+            created = api_client.post("/tickets/", json={"title": "VPN down", "requester_id": customer.id}).json()
+            api_client.put(f"/tickets/{created['id']}", json={"assignee_id": agent.id, "status": "in_progress"})
+            comment = api_client.post("/comments/", json={"body": "On it", "ticket_id": created["id"],
+                                                          "author_id": agent.id}).json()
+            api_client.delete(f"/comments/{comment['id']}")
+            events = [websocket.receive_json() for _ in range(4)]
+
+        # Assert
+        assert ready == {"type": "feed.ready", "ticket_id": 0,
+                         "data": {"filters": {"ticket_id": [], "requester_id": [customer.id], "assignee_id": []}}}
+        assert [(event["type"], event["ticket_id"]) for event in events] == [
+            ("ticket.created", created["id"]), ("ticket.updated", created["id"]),
+            ("comment.created", created["id"]), ("comment.deleted", created["id"]),
+        ]
+        assert events[1]["data"]["assignee_id"] == agent.id
+        assert events[2]["data"]["body"] == "On it" and events[3]["data"] == {"id": comment["id"]}
+
+    def test_bulk_writes_reach_old_and_new_assignees(self, api_client, api_session, people):
+        # Arrange
+        customer, leaver = people
+        successor = User(email="successor@example.com", name="Successor", role=UserRole.AGENT)
+        api_session.add(successor)
+        api_session.commit()
+        created = api_client.post(
+            "/tickets/bulk", json=[{"title": f"Backlog {i}", "requester_id": customer.id} for i in range(3)]
+        ).json()
+        ids = created["ids"]
+        api_client.patch("/tickets/bulk", json={"ids": ids, "update": {"assignee_id": leaver.id}})
+
+        with api_client.websocket_connect(f"/tickets/stream?assignee_id={leaver.id}") as leaving, \
+                api_client.websocket_connect(f"/tickets/stream?assignee_id={successor.id}") as taking, \
+                api_client.websocket_connect(f"/tickets/stream?requester_id={customer.id}") as requesting:
+            for websocket in (leaving, taking, requesting):
+                websocket.receive_json()
+
+            # Act
+            api_client.patch("/tickets/bulk", params={"chunk_size": 2}, json={
+                "filter": {"assignee_id": leaver.id}, "update": {"assignee_id": successor.id},
+            })
+            api_client.post("/tickets/bulk", json=[{"title": "Late arrival", "requester_id": customer.id}])
+            left = [leaving.receive_json() for _ in ids]
+            taken = [taking.receive_json() for _ in ids]
+            requested = [requesting.receive_json() for _ in range(len(ids) + 1)]
+
+        # Assert
+        assert [(event["type"], event["ticket_id"]) for event in left] == [("ticket.updated", id_) for id_ in ids]
+        assert [event["data"]["assignee_id"] for event in taken] == [successor.id] * len(ids)
+        assert requested[-1]["type"] == "ticket.created" and requested[-1]["data"]["title"] == "Late arrival"
+
+    def test_server_sent_events_until_max_seconds(self, api_client, people, feed):
+        # Arrange
+        customer, agent = people
+        responses = []
+        listener = threading.Thread(target=lambda: responses.append(api_client.get(
+            "/tickets/stream", params={"assignee_id": agent.id, "max_seconds": 2}
+        )))
+        listener.start()
+        deadline = time.monotonic() + 5
+        while feed.hub.subscribers == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Act
+        created = api_client.post("/tickets/", json={"title": "Laptop", "requester_id": customer.id}).json()
+        api_client.put(f"/tickets/{created['id']}", json={"assignee_id": agent.id})
+        listener.join(10)
+
+        # Assert
+        [response] = responses
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert [(name, data["ticket_id"]) for name, data in parse_sse(response.text)] == [
+            ("feed.ready", 0), ("ticket.updated", created["id"]),
+        ]
+        assert feed.hub.subscribers == 0
+
+    def test_refuses_streams_it_cannot_take(self, api_client, monkeypatch):
+        # Act
+        too_many = api_client.get("/tickets/stream", params={"ticket_id": list(range(101))})
+        monkeypatch.setattr(ticket_feed, "feed", None)
+        disabled = api_client.get("/tickets/stream")
+
+        # Assert
+        assert too_many.status_code == 400
+        assert disabled.status_code == 503
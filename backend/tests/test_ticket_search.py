@@ -0,0 +1,90 @@
+"""
+Tests for full-text ticket search.
+"""
+import pytest
+
+from intelligagent.db.models import User, Ticket, Comment, UserRole
+from intelligagent.services.ticket_search import fts5_query
+
+
+@pytest.fixture
+def requester(api_session):
+    """Create a requester in the API database."""
+    user = User(email="search@example.com", name="Searcher", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    api_session.refresh(user)
+    return user
+
+
+def search(api_client, q, **params):
+    response = api_client.get("/tickets/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return [ticket["title"] for ticket in response.json()]
+
+
+class TestTicketSearch:
+    """Test cases for GET /tickets/search."""
+
+    def test_ranks_title_over_description_over_comments(self, api_client, api_session, requester):
+        """Test that matches in the title outrank description and comment matches."""
+        # Arrange
+        in_title = Ticket(title="Printer offline", description="Nothing prints", requester_id=requester.id)
+        in_description = Ticket(title="Office issue", description="The printer is offline", requester_id=requester.id)
+        in_comment = Ticket(title="Hardware", description="Broken device", requester_id=requester.id)
+        unrelated = Ticket(title="Password reset", requester_id=requester.id)
+        api_session.add_all([in_title, in_description, in_comment, unrelated])
+        api_session.commit()
+        api_session.add(Comment(body="Turns out the printer was offline", ticket_id=in_comment.id, author_id=requester.id))
+        api_session.commit()
+
+        # Act
+        titles = search(api_client, "offline printers")
+
+        # Assert
+        assert titles == ["Printer offline", "Office issue", "Hardware"]
+
+    def test_index_follows_writes(self, api_client, api_session, requester):
+        """Test that ticket and comment writes update the index incrementally."""
+        # Arrange
+        ticket = api_client.post("/tickets/", json={"title": "VPN drops", "requester_id": requester.id}).json()
+        comment = api_client.post(
+            "/comments/", json={"body": "Firewall rule fixed it", "ticket_id": ticket["id"], "author_id": requester.id}
+        ).json()
+
+        # Act / Assert
+        assert search(api_client, "vpn") == ["VPN drops"]
+        assert search(api_client, "firewall") == ["VPN drops"]
+
+        api_client.put(f"/tickets/{ticket['id']}", json={"title": "Wifi drops"})
+        assert search(api_client, "vpn") == []
+        assert search(api_client, "wifi") == ["Wifi drops"]
+
+        api_client.delete(f"/comments/{comment['id']}")
+        assert search(api_client, "firewall") == []
+
+    def test_operators_in_input_are_literal(self, api_client, api_session, requester):
+        """Test that FTS syntax in the query can't break or widen the search."""
+        # Arrange
+        api_session.add(Ticket(title="Email NOT syncing", requester_id=requester.id))
+        api_session.commit()
+
+        # Act / Assert
+        assert search(api_client, 'email NOT "(syncing*') == ["Email NOT syncing"]
+        assert search(api_client, "email OR calendar") == []
+        assert search(api_client, "!!!") == []
+        assert api_client.get("/tickets/search").status_code == 422
+
+    def test_limit(self, api_client, api_session, requester):
+        """Test that at most limit tickets come back."""
+        # Arrange
+        api_session.add_all([Ticket(title=f"Laptop {i}", requester_id=requester.id) for i in range(5)])
+        api_session.commit()
+
+        # Act / Assert
+        assert len(search(api_client, "laptop", limit=3)) == 3
+
+
+def test_fts5_query_quotes_every_word():
+    """Test the FTS5 query built from free text."""
+    assert fts5_query('say "hi" to  NEAR(x)') == '"say" "hi" "to" "NEAR" "x"'
@@ -0,0 +1,178 @@
+"""
+Tests for the similar ticket index, its rebuild and the routes using it.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from intelligagent.db.models import Ticket, User, UserRole
+from intelligagent.services.ticket_similarity import TicketVectorIndex, rebuild_index, run_rebuilds
+
+OUTAGE = "Checkout page down\nThe checkout page returns error 502 when I try to pay for my order"
+OUTAGE_AGAIN = "Checkout down\nCheckout page returns error 502 when trying to pay for my order #8841"
+UNRELATED = [
+    "Dark mode request\nPlease add a dark mode to the dashboard",
+    "Password reset email missing\nI never received the password reset email",
+    "Invoice address wrong\nMy invoice shows the old company address",
+]
+
+
+@pytest.fixture
+def customer(api_session):
+    user = User(email="customer@example.com", name="Customer", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    return user
+
+
+class TestTicketVectorIndex:
+    """Test cases for incremental indexing, search and rebuilds."""
+
+    def test_finds_near_duplicates_first(self, similarity_index):
+        # Arrange
+        similarity_index.add([(1, OUTAGE)] + [(n, text) for n, text in enumerate(UNRELATED, start=2)])
+        query = similarity_index.vectorizer.transform(OUTAGE_AGAIN)
+
+        # Act
+        matches = similarity_index.search(query, limit=3, min_score=0.3)
+
+        # Assert
+        assert [ticket_id for ticket_id, _ in matches] == [1]
+        assert matches[0][1] > 0.6
+        assert similarity_index.search(query, exclude=1, min_score=0.3) == []
+
+    def test_rebuild_keeps_appends_and_other_processes_follow(self, tmp_path):
+        # Arrange: two handles on one directory, as two workers would have
+        path = tmp_path / "shared-index"
+        first, second = TicketVectorIndex(path), TicketVectorIndex(path)
+        first.add([(1, OUTAGE)])
+        second.add([(2, UNRELATED[0])])
+
+        # Act
+        count = second.rebuild([(1, OUTAGE), (3, UNRELATED[1])])
+        first.add([(4, OUTAGE_AGAIN)])
+
+        # Assert: the rebuilt base, then the append, seen from both handles
+        assert count == 2
+        query = first.vectorizer.transform(OUTAGE)
+        for handle in (first, second):
+            assert [ticket_id for ticket_id, _ in handle.search(query, min_score=0.3)] == [1, 4]
+            assert handle.vector(2) is None
+            assert handle.vector(3) == pytest.approx(handle.vectorizer.transform(UNRELATED[1]), abs=1e-6)
+        assert len(list(path.glob("gen-*"))) == 1
+        first.close()
+        second.close()
+
+    def test_reindexed_ticket_is_ranked_by_its_new_text(self, similarity_index):
+        # Arrange
+        similarity_index.rebuild([(1, OUTAGE), (2, UNRELATED[0])])
+
+        # Act
+        similarity_index.add([(1, UNRELATED[2])])
+
+        # Assert: the postings of the old text no longer make it a match
+        assert similarity_index.search(similarity_index.vectorizer.transform(OUTAGE), min_score=0.3) == []
+
+    def test_threads_share_one_handle(self, similarity_index):
+        # Arrange: the API runs index calls in the event loop's thread pool
+        texts = [(n, f"{OUTAGE} {n}") for n in range(1, 41)]
+        query = similarity_index.vectorizer.transform(OUTAGE)
+
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda pair: similarity_index.add([pair]) and similarity_index.search(query), texts))
+
+        # Assert: every append was taken in once
+        generation = similarity_index._generation
+        assert sorted(generation.vectors) == list(range(1, 41))
+        assert sum(map(len, generation.postings.values())) == sum(map(len, generation.vectors.values()))
+
+    def test_scan_budget_prefers_the_newest_postings(self, tmp_path):
+        # Arrange: every ticket shares its words, so each bucket has 50 postings
+        index = TicketVectorIndex(tmp_path / "budget-index", scan_budget=10)
+        index.rebuild((n, OUTAGE) for n in range(1, 51))
+
+        # Act
+        matches = index.search(index.vectorizer.transform(OUTAGE), limit=3)
+
+        # Assert: only the 10 newest tickets were scored
+        assert len(matches) == 3
+        assert {ticket_id for ticket_id, _ in matches} <= set(range(41, 51))
+        index.close()
+
+    def test_scheduled_rebuild_empties_the_workers_memory(self, api_session, customer, similarity_index):
+        # Arrange: tickets a worker indexed as they were created
+        tickets = [Ticket(title=text.split("\n")[0], description=text.split("\n")[1], requester_id=customer.id)
+                   for text in [OUTAGE] + UNRELATED]
+        api_session.add_all(tickets)
+        api_session.commit()
+        similarity_index.add((ticket.id, f"{ticket.title}\n{ticket.description}") for ticket in tickets)
+        rebuilder, stop = TicketVectorIndex(similarity_index.path), threading.Event()
+        stop.set()  # One rebuild, then return
+
+        # Act
+        run_rebuilds(rebuilder, sessionmaker(bind=api_session.get_bind()), stop, interval=0)
+
+        # Assert: the worker reads them from the new generation's files instead
+        matches = similarity_index.search(similarity_index.vectorizer.transform(OUTAGE_AGAIN), min_score=0.3)
+        assert [ticket_id for ticket_id, _ in matches] == [tickets[0].id]
+        assert similarity_index._generation.vectors == {}
+        assert similarity_index._generation.postings == {}
+        rebuilder.close()
+
+
+class TestSimilarTicketRoutes:
+    """Test cases for the similarity check on create and GET /tickets/{id}/similar."""
+
+    def test_create_flags_likely_duplicates(self, api_client, customer):
+        # Arrange
+        title, description = OUTAGE.split("\n")
+        first = api_client.post("/tickets/", json={"title": title, "description": description,
+                                                   "requester_id": customer.id}).json()
+
+        # Act
+        again = api_client.post("/tickets/", json={"title": title, "description": description + "!",
+                                                   "requester_id": customer.id}).json()
+        other = api_client.post("/tickets/", json={"title": "Dark mode request", "requester_id": customer.id}).json()
+
+        # Assert
+        assert first["similar_tickets"] == []
+        assert [match["id"] for match in again["similar_tickets"]] == [first["id"]]
+        assert again["similar_tickets"][0]["score"] == pytest.approx(1.0, abs=1e-3)
+        assert other["similar_tickets"] == []
+
+    def test_similar_lists_tickets_with_scores(self, api_client, api_session, customer, similarity_index):
+        # Arrange: tickets already in the database, indexed by a rebuild
+        texts = [OUTAGE, OUTAGE_AGAIN] + UNRELATED
+        tickets = [Ticket(title=text.split("\n")[0], description=text.split("\n")[1], requester_id=customer.id)
+                   for text in texts]
+        api_session.add_all(tickets)
+        api_session.commit()
+        assert rebuild_index(similarity_index, sessionmaker(bind=api_session.get_bind()), batch_size=2) == 5
+
+        # Act
+        response = api_client.get(f"/tickets/{tickets[0].id}/similar")
+        missing = api_client.get("/tickets/999/similar")
+
+        # Assert
+        assert response.status_code == 200
+        similar = response.json()
+        assert [ticket["id"] for ticket in similar] == [tickets[1].id]
+        assert similar[0]["title"] == "Checkout down" and 0.6 < similar[0]["score"] <= 1.0
+        assert missing.status_code == 404
+
+    def test_edited_ticket_is_reindexed(self, api_client, customer):
+        # Arrange
+        title, description = OUTAGE.split("\n")
+        outage = api_client.post("/tickets/", json={"title": title, "description": description,
+                                                    "requester_id": customer.id}).json()
+        other = api_client.post("/tickets/", json={"title": "Dark mode request", "requester_id": customer.id}).json()
+
+        # Act
+        api_client.put(f"/tickets/{other['id']}", json={"title": title, "description": description})
+        similar = api_client.get(f"/tickets/{outage['id']}/similar").json()
+
+        # Assert
+        assert [ticket["id"] for ticket in similar] == [other["id"]]
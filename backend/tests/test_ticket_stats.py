@@ -0,0 +1,119 @@
+"""
+Tests for ticket statistics and the counters behind them.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import delete, insert, select
+
+from intelligagent.db.models import Ticket, TicketCounter, TicketPriority, TicketStatus, User, UserRole
+from intelligagent.services.ticket_stats import get_ticket_stats, reconcile_ticket_counters
+
+
+@pytest.fixture
+def people(api_session):
+    """An agent and a customer in the API database."""
+    agent = User(email="agent@example.com", name="Agent", role=UserRole.AGENT)
+    customer = User(email="customer@example.com", name="Customer", role=UserRole.CUSTOMER)
+    api_session.add_all([agent, customer])
+    api_session.commit()
+    return agent, customer
+
+
+class TestTicketStatsAPI:
+    """Test cases for GET /tickets/stats."""
+
+    def test_counts_follow_creates_updates_and_dispatch(self, api_client, people):
+        """Test that every kind of ticket write is reflected, read with a single statement."""
+        # Arrange
+        agent, customer = people
+        ids = [
+            api_client.post("/tickets/", json={"title": title, "priority": priority, "requester_id": customer.id})
+            .json()["id"]
+            for title, priority in [("a", "high"), ("b", "low"), ("c", "low")]
+        ]
+        statements = REGISTRY.get_sample_value(
+            "service_db_statements_total", {"function": "ticket_stats.get_ticket_stats"}
+        ) or 0.0
+
+        # Act
+        api_client.put(f"/tickets/{ids[1]}", json={"status": "closed", "priority": "medium"})
+        api_client.post("/tickets/dispatch/next", json={"agent_id": agent.id})  # Claims the high one
+        response = api_client.get("/tickets/stats")
+
+        # Assert
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["total"] == 3
+        assert stats["by_status"] == {"open": 1, "in_progress": 1, "closed": 1}
+        assert stats["by_priority"] == {"low": 1, "medium": 1, "high": 1}
+        assert stats["by_assignee"] == {str(agent.id): 1}
+        assert stats["unassigned"] == 1
+        assert stats["open_by_age"]["under_4h"] == 1
+        assert sum(stats["open_by_age"].values()) == 1
+        assert REGISTRY.get_sample_value(
+            "service_db_statements_total", {"function": "ticket_stats.get_ticket_stats"}
+        ) == statements + 1
+
+    def test_empty(self, api_client):
+        """Test that every status and priority is listed even with no tickets."""
+        # Act
+        stats = api_client.get("/tickets/stats").json()
+
+        # Assert
+        assert stats["total"] == 0
+        assert stats["by_status"] == {"open": 0, "in_progress": 0, "closed": 0}
+        assert stats["by_assignee"] == {}
+        assert set(stats["open_by_age"].values()) == {0}
+
+
+class TestTicketCounters:
+    """Test cases for the counters and their reconciliation."""
+
+    def test_open_tickets_bucketed_by_age(self, api_session, people):
+        """Test that open tickets fall into buckets by the hour they were created in."""
+        # Arrange
+        _, customer = people
+        now = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+        ages = [timedelta(hours=1), timedelta(hours=10), timedelta(days=2), timedelta(days=2, hours=5),
+                timedelta(days=40)]
+        api_session.add_all(
+            Ticket(title=f"aged {age}", requester_id=customer.id, created_at=(now - age).replace(tzinfo=None))
+            for age in ages
+        )
+        api_session.add(Ticket(title="closed", requester_id=customer.id, status=TicketStatus.CLOSED,
+                               created_at=(now - timedelta(hours=1)).replace(tzinfo=None)))
+        api_session.commit()
+
+        # Act
+        stats = get_ticket_stats(api_session, now=now)
+
+        # Assert
+        assert stats["open_by_age"] == {
+            "under_4h": 1, "4h_to_24h": 1, "1d_to_3d": 2, "3d_to_7d": 0, "7d_to_30d": 0, "over_30d": 1,
+        }
+        assert stats["by_status"][TicketStatus.CLOSED] == 1
+
+    def test_reconciliation_fixes_drift(self, api_session, people):
+        """Test that a recount restores counters written around the triggers, then finds nothing to fix."""
+        # Arrange
+        agent, customer = people
+        api_session.add_all([
+            Ticket(title="one", requester_id=customer.id, priority=TicketPriority.HIGH),
+            Ticket(title="two", requester_id=customer.id, status=TicketStatus.IN_PROGRESS, assignee_id=agent.id),
+        ])
+        api_session.commit()
+        expected = get_ticket_stats(api_session)
+        api_session.execute(delete(TicketCounter).where(TicketCounter.dimension == "priority"))
+        api_session.execute(insert(TicketCounter).values(dimension="status", key="CLOSED", shard=3, count=7))
+        api_session.commit()
+
+        # Act
+        corrected = reconcile_ticket_counters(api_session)
+
+        # Assert
+        assert corrected == 3  # Two priorities missing, one status inflated
+        assert get_ticket_stats(api_session, now=expected["as_of"]) == expected
+        assert api_session.scalar(select(TicketCounter).where(TicketCounter.count == 0)) is None
+        assert reconcile_ticket_counters(api_session) == 0
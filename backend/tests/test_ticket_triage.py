@@ -0,0 +1,231 @@
+"""
+Tests for LLM ticket triage: batching, deduplication and write-back.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from intelligagent.core.fake_llm import FakeLLM
+from intelligagent.core.llm import TriageRequest, parse_results
+from intelligagent.core.text_vectors import HashingVectorizer, cosine, text_hash
+from intelligagent.db.models import Ticket, TicketCategory, TicketPriority, User, UserRole
+from intelligagent.schemas.ticket import TicketTriage
+from intelligagent.services import ticket_triage
+from intelligagent.services.ticket_triage import TriageCache, TriagePipeline, backfill
+
+ANSWER = TicketTriage(priority=TicketPriority.LOW, category=TicketCategory.OTHER, suggested_reply="Hi")
+
+
+@pytest.fixture
+def customer(api_session):
+    user = User(email="customer@example.com", name="Customer", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    return user
+
+
+def run_pipeline(async_engine, fake, tickets, **options):
+    """Triage ``tickets`` through a fresh pipeline and return it once everything is written."""
+    async def scenario():
+        pipeline = TriagePipeline(fake.client(), async_sessionmaker(async_engine, expire_on_commit=False), **options)
+        pipeline.start()
+        for ticket in tickets:
+            pipeline.submit(ticket)
+        await pipeline.join()
+        await pipeline.close()
+        await async_engine.dispose()
+        return pipeline
+
+    return asyncio.run(scenario())
+
+
+class TestTextVectors:
+    """Test cases for normalization and similarity."""
+
+    def test_normalized_hash_ignores_case_punctuation_and_numbers(self):
+        assert text_hash("Order #1234 never arrived!") == text_hash("order 9876 never   arrived")
+        assert text_hash("Order never arrived") != text_hash("Order arrived")
+
+    def test_similar_texts_score_higher_than_unrelated_ones(self):
+        vectorizer = HashingVectorizer()
+        base = vectorizer.transform("I was charged twice for my subscription this month, please refund the duplicate")
+        near = vectorizer.transform("I was charged twice for my subscription this month, please refund the extra charge")
+        other = vectorizer.transform("The mobile app crashes when I open the settings screen")
+
+        assert cosine(base, base) == pytest.approx(1.0)
+        assert cosine(base, near) > 0.7
+        assert cosine(base, other) < 0.2
+
+
+class TestTriageCache:
+    """Test cases for exact and similarity lookups."""
+
+    def test_exact_then_similar_then_miss(self):
+        # Arrange
+        cache = TriageCache(maxsize=10, similarity=0.8)
+        text = "Cannot log in to my account after the password reset email"
+        cache.set(text_hash(text), cache.vectorizer.transform(text), ANSWER)
+        near = "Cannot log in to my account after the password reset email arrived"
+        far = "Please add a dark mode to the dashboard"
+
+        # Act / Assert
+        assert cache.get(text_hash(text.upper()), cache.vectorizer.transform(text.upper())) == ANSWER
+        assert cache.get(text_hash(near), cache.vectorizer.transform(near)) == ANSWER
+        assert cache.get(text_hash(far), cache.vectorizer.transform(far)) is None
+        assert (cache.exact_hits, cache.similar_hits, cache.misses) == (1, 1, 1)
+
+    def test_eviction_removes_index_entries(self):
+        # Arrange
+        cache = TriageCache(maxsize=2, similarity=0.99)
+        texts = ["refund my invoice", "reset my password", "app crashes on start"]
+
+        # Act
+        for text in texts:
+            cache.set(text_hash(text), cache.vectorizer.transform(text), ANSWER)
+
+        # Assert
+        assert len(cache) == 2
+        assert cache.get(text_hash(texts[0]), cache.vectorizer.transform(texts[0])) is None
+        indexed = {key for postings in cache._postings.values() for key in postings}
+        assert indexed == {text_hash(texts[1]), text_hash(texts[2])}
+
+
+class TestTriagePipeline:
+    """Test cases for batching, the concurrency cap and write-back."""
+
+    def test_batches_dedups_and_writes_back(self, api_engines, api_session, customer):
+        # Arrange
+        _, async_engine = api_engines
+        titles = [f"Invoice {n} charged twice" for n in range(30)]  # One text once normalized
+        titles += [f"Feature idea number {word}" for word in ("alpha", "beta", "gamma", "delta", "epsilon")]
+        titles += ["Site down, urgent outage"] * 5
+        api_session.add_all(Ticket(title=title, requester_id=customer.id) for title in titles)
+        api_session.commit()
+        tickets = [TriageRequest(ticket.id, ticket.title, ticket.description, ticket.priority)
+                   for ticket in api_session.scalars(select(Ticket).order_by(Ticket.id))]
+        fake = FakeLLM(latency=0.05)
+
+        # Act
+        pipeline = run_pipeline(async_engine, fake, tickets, batch_size=4, max_delay=0.05, max_concurrency=2)
+
+        # Assert: 7 distinct texts reached the LLM, in batches, never more than 2 at once
+        assert fake.tickets == pipeline.llm_tickets == 7
+        assert fake.requests < 7
+        assert fake.max_in_flight <= 2
+        assert pipeline.written == len(titles) and pipeline.failed == 0
+        api_session.expire_all()
+        rows = {ticket.title: ticket for ticket in api_session.scalars(select(Ticket))}
+        assert rows["Invoice 7 charged twice"].category == TicketCategory.BILLING
+        assert rows["Site down, urgent outage"].priority == TicketPriority.HIGH
+        assert rows["Feature idea number beta"].category == TicketCategory.FEATURE_REQUEST
+        assert rows["Feature idea number beta"].priority == TicketPriority.LOW
+        assert all(ticket.suggested_reply for ticket in rows.values())
+
+    def test_priorities_changed_since_creation_are_kept(self, api_engines, api_session, customer):
+        # Arrange: both tickets triage to HIGH; an agent lowered the second before triage finished
+        _, async_engine = api_engines
+        untouched = Ticket(title="Site down, urgent outage", requester_id=customer.id)
+        reprioritized = Ticket(title="Site down, urgent outage again", requester_id=customer.id)
+        backfilled = Ticket(title="Urgent: site down", requester_id=customer.id)
+        api_session.add_all([untouched, reprioritized, backfilled])
+        api_session.commit()
+        tickets = [TriageRequest(ticket.id, ticket.title, ticket.description, TicketPriority.MEDIUM)
+                   for ticket in (untouched, reprioritized)]
+        tickets.append(TriageRequest(backfilled.id, backfilled.title))  # As the backfill submits it
+        reprioritized.priority = TicketPriority.LOW
+        api_session.commit()
+
+        # Act
+        pipeline = run_pipeline(async_engine, FakeLLM(), tickets, max_delay=0.01)
+
+        # Assert
+        api_session.expire_all()
+        assert pipeline.written == 3
+        assert [(ticket.priority, ticket.category) for ticket in (untouched, reprioritized, backfilled)] == [
+            (TicketPriority.HIGH, TicketCategory.TECHNICAL),
+            (TicketPriority.LOW, TicketCategory.TECHNICAL),
+            (TicketPriority.MEDIUM, TicketCategory.TECHNICAL),
+        ]
+
+    def test_failed_requests_leave_tickets_for_the_backfill(self, api_engines, api_session, customer):
+        # Arrange
+        _, async_engine = api_engines
+        api_session.add_all(Ticket(title=f"Printer {word} jammed", requester_id=customer.id)
+                            for word in ("paper", "toner", "tray"))
+        api_session.commit()
+
+        class DownLLM:
+            async def triage(self, tickets):
+                raise ConnectionError("LLM unavailable")
+
+            async def close(self):
+                pass
+
+        async def scenario():
+            session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+            failing = TriagePipeline(DownLLM(), session_factory, max_delay=0.01)
+            failing.start()
+            failed_submitted = await backfill(failing, session_factory)
+            await failing.close()
+
+            fake = FakeLLM()
+            working = TriagePipeline(fake.client(), session_factory, max_delay=0.01)
+            working.start()
+            submitted = await backfill(working, session_factory)
+            again = await backfill(working, session_factory)
+            await working.close()
+            await async_engine.dispose()
+            return failing, failed_submitted, working, submitted, again
+
+        # Act
+        failing, failed_submitted, working, submitted, again = asyncio.run(scenario())
+
+        # Assert
+        assert (failed_submitted, failing.failed, failing.written) == (3, 3, 0)
+        assert (submitted, working.written, again) == (3, 3, 0)
+
+    def test_created_tickets_are_submitted(self, api_client, customer, monkeypatch):
+        """Test that the create and bulk routes feed the pipeline and results show up on reads."""
+        # Arrange
+        fake = FakeLLM()
+        pipeline = TriagePipeline(fake.client(), None, max_delay=0.01)
+        submitted = []
+        monkeypatch.setattr(ticket_triage, "pipeline", pipeline)
+        monkeypatch.setattr(pipeline, "submit", submitted.append)
+
+        # Act
+        api_client.post("/tickets/", json={"title": "Refund request", "requester_id": customer.id})
+        api_client.post("/tickets/bulk", json=[{"title": "Login fails", "requester_id": customer.id},
+                                               {"title": "Bad row"}])
+
+        # Assert
+        assert [(ticket.title, ticket.ticket_id > 0, ticket.priority) for ticket in submitted] == [
+            ("Refund request", True, TicketPriority.MEDIUM), ("Login fails", True, TicketPriority.MEDIUM),
+        ]
+
+    def test_clients_cannot_write_triage_fields(self, api_client, customer):
+        # Arrange
+        created = api_client.post("/tickets/", json={"title": "Refund request", "requester_id": customer.id}).json()
+
+        # Act
+        api_client.put(f"/tickets/{created['id']}", json={"category": "billing", "suggested_reply": "No"})
+        api_client.patch("/tickets/bulk", json={"ids": [created["id"]], "update": {"suggested_reply": "No"}})
+        detail = api_client.get(f"/tickets/{created['id']}/full").json()
+
+        # Assert
+        assert detail["category"] is None and detail["suggested_reply"] is None
+
+
+def test_parse_results_keeps_valid_answers_only():
+    content = (
+        '{"results": [{"index": 1, "priority": "high", "category": "billing", "suggested_reply": "ok"},'
+        ' {"index": 0, "priority": "extreme", "category": "billing", "suggested_reply": "ok"},'
+        ' {"index": 7, "priority": "low", "category": "other", "suggested_reply": "ok"}]}'
+    )
+
+    assert parse_results(content, 3) == [
+        None, TicketTriage(priority="high", category="billing", suggested_reply="ok"), None,
+    ]
+    assert parse_results("not json", 2) == [None, None]
@@ -0,0 +1,193 @@
+"""
+Tests for the single-statement ticket write path.
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import List
+
+import pytest
+from sqlalchemy import event
+
+from intelligagent.db.models import User, Ticket, UserRole, TicketStatus
+from intelligagent.services import ticket_feed
+from intelligagent.services.ticket_feed import InMemoryFanout, TicketFeed
+
+
+@contextmanager
+def counted_statements(engine):
+    """Collect the SQL statements ``engine`` executes inside the block."""
+    statements: List[str] = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+@pytest.fixture
+def requester(api_session):
+    """Create a requester in the API database."""
+    user = User(email="writes@example.com", name="Writer", role=UserRole.CUSTOMER)
+    api_session.add(user)
+    api_session.commit()
+    api_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def agents(api_session):
+    """Create two agents in the API database."""
+    agents = [User(email=f"agent{i}@example.com", name=f"Agent {i}", role=UserRole.AGENT) for i in range(2)]
+    api_session.add_all(agents)
+    api_session.commit()
+    return agents
+
+
+@pytest.fixture
+def fanout_feed(monkeypatch):
+    """A ticket feed that shares events with other workers, as in production, so it always publishes."""
+    feed = TicketFeed(InMemoryFanout())
+    monkeypatch.setattr(ticket_feed, "feed", feed)
+    return feed
+
+
+def taken(subscription) -> List[tuple]:
+    """The (type, ticket id) of the events waiting for ``subscription``."""
+    return [(event.type, event.ticket_id) for event in asyncio.run(subscription.get(timeout=0))]
+
+
+@pytest.fixture
+def async_sync_engine(api_engines):
+    """Sync facade of the engine behind api_client, for statement listeners."""
+    _, async_engine = api_engines
+    return async_engine.sync_engine
+
+
+class TestTicketWriteRoundTrips:
+    """Test that ticket writes take one statement each."""
+
+    def test_create_is_one_insert(self, api_client, async_sync_engine, requester):
+        """Test that POST /tickets runs a single INSERT ... RETURNING."""
+        # Act
+        with counted_statements(async_sync_engine) as statements:
+            response = api_client.post("/tickets/", json={"title": "One trip", "requester_id": requester.id})
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["status"] == TicketStatus.OPEN.value
+        assert len(statements) == 1, statements
+        assert statements[0].startswith("INSERT INTO tickets")
+        assert "RETURNING" in statements[0]
+
+    def test_update_is_one_update(self, api_client, api_session, async_sync_engine, requester):
+        """Test that PUT /tickets/{id} runs a single UPDATE ... RETURNING."""
+        # Arrange
+        ticket = Ticket(title="Before", requester_id=requester.id)
+        api_session.add(ticket)
+        api_session.commit()
+
+        # Act
+        with counted_statements(async_sync_engine) as statements:
+            response = api_client.put(
+                f"/tickets/{ticket.id}", json={"title": "After", "assignee_id": requester.id}
+            )
+
+        # Assert
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["title"], body["assignee_id"], body["requester_id"]) == ("After", requester.id, requester.id)
+        assert len(statements) == 1, statements
+        assert "UPDATE tickets SET" in statements[0]
+        assert "RETURNING" in statements[0]
+
+    def test_unknown_requester_is_rejected_by_foreign_key(self, api_client, api_session, async_sync_engine):
+        """Test that a missing requester is a 404 without a lookup query."""
+        # Act
+        with counted_statements(async_sync_engine) as statements:
+            response = api_client.post("/tickets/", json={"title": "Orphan", "requester_id": 999})
+
+        # Assert
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Requester not found"
+        assert len(statements) == 1
+        assert api_session.query(Ticket).count() == 0
+
+    def test_update_missing_ticket_and_unknown_assignee(self, api_client, api_session, requester):
+        """Test the 404s of the update path."""
+        # Arrange
+        ticket = Ticket(title="Keep", requester_id=requester.id)
+        api_session.add(ticket)
+        api_session.commit()
+
+        # Act
+        missing = api_client.put("/tickets/999", json={"title": "Nope"})
+        bad_assignee = api_client.put(f"/tickets/{ticket.id}", json={"assignee_id": 999})
+
+        # Assert
+        assert missing.status_code == 404
+        assert bad_assignee.status_code == 404
+        assert bad_assignee.json()["detail"] == "Assignee not found"
+        api_session.refresh(ticket)
+        assert ticket.assignee_id is None
+
+
+class TestTicketWritesWithFanout:
+    """Test that publishing to the feed's fanout costs ticket writes no extra statements."""
+
+    def test_reassigning_update_is_one_statement(
+        self, fanout_feed, api_client, api_session, async_sync_engine, requester, agents
+    ):
+        """Test that PUT names the agent losing the ticket from its own UPDATE ... RETURNING."""
+        # Arrange
+        ticket = Ticket(title="Handover", requester_id=requester.id, assignee_id=agents[0].id)
+        api_session.add(ticket)
+        api_session.commit()
+        losing = fanout_feed.subscribe(assignee_ids=[agents[0].id])
+
+        # Act
+        with counted_statements(async_sync_engine) as statements:
+            response = api_client.put(f"/tickets/{ticket.id}", json={"assignee_id": agents[1].id})
+
+        # Assert
+        assert response.status_code == 200
+        assert len(statements) == 1, statements
+        assert taken(losing) == [("ticket.updated", ticket.id)]
+
+    def test_bulk_create_reads_nothing_back(self, fanout_feed, api_client, async_sync_engine, requester):
+        """Test that bulk-created tickets are published from the INSERT's RETURNING rows."""
+        # Arrange
+        everything = fanout_feed.subscribe()
+        tickets = [{"title": f"Bulk {i}", "requester_id": requester.id} for i in range(3)]
+
+        # Act
+        with counted_statements(async_sync_engine) as statements:
+            response = api_client.post("/tickets/bulk", json=tickets)
+
+        # Assert
+        ids = response.json()["ids"]
+        assert len(ids) == 3
+        assert [statement.split()[0] for statement in statements] == ["SELECT", "INSERT"], statements
+        assert taken(everything) == [("ticket.created", ticket_id) for ticket_id in ids]
+
+    def test_reassigning_bulk_update_is_one_statement_per_chunk(
+        self, fanout_feed, api_client, api_session, async_sync_engine, requester, agents
+    ):
+        """Test that a reassigning PATCH /tickets/bulk neither locks nor reads chunks separately."""
+        # Arrange
+        tickets = [Ticket(title=f"t{i}", requester_id=requester.id, assignee_id=agents[0].id) for i in range(4)]
+        api_session.add_all(tickets)
+        api_session.commit()
+        losing = fanout_feed.subscribe(assignee_ids=[agents[0].id])
+
+        # Act
+        with counted_statements(async_sync_engine) as statements:
+            response = api_client.patch(
+                "/tickets/bulk", params={"chunk_size": 2},
+                json={"ids": [ticket.id for ticket in tickets], "update": {"assignee_id": agents[1].id}},
+            )
+
+        # Assert
+        assert response.json()["matched"] == 4
+        assert len(statements) == 2, statements
+        assert taken(losing) == [("ticket.updated", ticket.id) for ticket in tickets]